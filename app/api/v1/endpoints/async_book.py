@@ -0,0 +1,70 @@
+from fastapi import APIRouter, Depends, Header
+from typing import Optional
+from app.core.config import get_settings
+from app.core.http_cache import make_etag, etag_matches, not_modified, with_etag
+from app.schemas.book import BookCreate, BookUpdate, BookRetrieveReq
+from app.core.biz_reposone import BizResponse
+from app.service import async_book_svc
+from app.storage.async_db import get_async_book_repo
+from app.storage.book.book_interface import IAsyncBookRepository
+
+# 与 book.py 路径、参数完全一致的 async def 版本, 由配置项 async_mode 决定挂载哪一套路由 (见 main.py)
+router = APIRouter(prefix="/book")
+
+
+@router.get("/search")
+async def search_book(req: BookRetrieveReq = Depends(), repo: IAsyncBookRepository = Depends(get_async_book_repo)):
+    try:
+        result = await async_book_svc.search_book(repo, req)
+        return BizResponse(data=result)
+    except Exception as e:
+        return BizResponse(data=None, msg=str(e), status_code=500)
+
+
+# 客户端带着 If-None-Match 时先只查询版本号, 一致则直接返回 304, 不加载整行也不序列化;
+# 否则图书与版本号在同一次查询中读出, ETag 与响应体一定对应同一个版本
+@router.get("/{isbn}")
+async def get_book(isbn: str, if_none_match: Optional[str] = Header(None), repo: IAsyncBookRepository = Depends(get_async_book_repo)):
+    try:
+        max_age = get_settings().http_cache_max_age
+        if if_none_match:
+            version = await async_book_svc.get_book_version(repo, isbn)
+            if version is not None and etag_matches(if_none_match, make_etag("book", version)):
+                return not_modified(make_etag("book", version), max_age)
+
+        loaded = await async_book_svc.get_book_with_version(repo, isbn)
+        if loaded is None:
+            return BizResponse(data=None, msg=f"book {isbn} not found.", status_code=404)
+        book_info, version = loaded
+        return with_etag(BizResponse(data=book_info), make_etag("book", version), max_age)
+    except Exception as e:
+        return BizResponse(data=None, msg=str(e), status_code=500)
+
+
+@router.post("/")
+async def add_book(book: BookCreate, repo: IAsyncBookRepository = Depends(get_async_book_repo)):
+    try:
+        book_info = await async_book_svc.create_book(repo, book)
+        return BizResponse(data=book_info)
+    except Exception as e:
+        return BizResponse(data=None, msg=str(e), status_code=500)
+
+
+@router.put("/{isbn}")
+async def update_book(isbn: str, book: BookUpdate, repo: IAsyncBookRepository = Depends(get_async_book_repo)):
+    try:
+        book_info = await async_book_svc.update_book(repo, isbn, book)
+        if book_info:
+            return BizResponse(data=book_info)
+        return BizResponse(data=book_info, msg=f"updated failed: {isbn} not found.")
+    except Exception as e:
+        return BizResponse(data=None, msg=str(e), status_code=500)
+
+
+@router.delete("/{isbn}")
+async def delete_book(isbn: str, repo: IAsyncBookRepository = Depends(get_async_book_repo)):
+    try:
+        book_info = await async_book_svc.delete_book(repo, isbn)
+        return BizResponse(data=book_info)
+    except Exception as e:
+        return BizResponse(data=None, msg=str(e), status_code=500)
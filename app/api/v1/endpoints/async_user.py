@@ -0,0 +1,86 @@
+from fastapi import APIRouter, Depends, Header, Query
+from app.schemas.user import UserCreate,  UserUpdate
+from app.core.biz_reposone import BizResponse
+from app.core.config import get_settings
+from app.core.http_cache import make_etag, etag_matches, not_modified, with_etag
+from app.storage.pagination import MAX_PAGE_SIZE, InvalidCursor
+from app.service import async_user_svc
+from app.storage.async_db import get_async_user_repo
+from app.storage.user.user_interface import IAsyncUserRepository
+
+from typing import Optional
+
+
+# 与 user.py 路径、参数完全一致的 async def 版本, 由配置项 async_mode 决定挂载哪一套路由 (见 main.py)
+# async def 路由直接运行在事件循环上, 不再占用 FastAPI 的线程池
+router = APIRouter()
+
+
+@router.get("/users")
+async def query_batch_users(page: int = Query(0, ge=0), page_size: int = Query(10, ge=1, le=MAX_PAGE_SIZE), cursor: Optional[str] = None,
+                            if_none_match: Optional[str] = Header(None), repo: IAsyncUserRepository = Depends(get_async_user_repo)):
+    try:
+        # 列表的 ETag 由这一页每行的 (uid, version) 与总数计算; 条件请求先只查询这两列, 命中时直接返回 304
+        max_age = get_settings().http_cache_max_age
+        if if_none_match:
+            etag = make_etag("users", await async_user_svc.get_batch_users_version(repo, page, page_size, cursor))
+            if etag_matches(if_none_match, etag):
+                return not_modified(etag, max_age, private=True)
+
+        # 返回的 ETag 由响应体的这些行计算, 不会与另一次查询的结果错位
+        result, version = await async_user_svc.get_batch_users_with_version(repo, page, page_size, cursor)
+        return with_etag(BizResponse(data=result), make_etag("users", version), max_age, private=True)
+    except InvalidCursor as e:
+        return BizResponse(data=list(), msg=str(e), status_code=400)
+    except Exception as e:
+        return BizResponse(data=list(), msg=str(e), status_code=500)
+    
+    
+@router.get("/users/{student_id}")
+async def query_user(student_id: int, if_none_match: Optional[str] = Header(None), repo: IAsyncUserRepository = Depends(get_async_user_repo)):
+    try:
+        # 用户信息属于个人数据, 只允许客户端私有缓存, 不允许共享代理缓存; 条件请求的处理方式与 GET /book/{isbn} 相同
+        max_age = get_settings().http_cache_max_age
+        if if_none_match:
+            version = await async_user_svc.get_user_version(repo, student_id)
+            if version is not None and etag_matches(if_none_match, make_etag("user", version)):
+                return not_modified(make_etag("user", version), max_age, private=True)
+
+        loaded = await async_user_svc.get_user_with_version(repo, student_id)
+        if loaded is None:
+            return BizResponse(data=None)
+        user, version = loaded
+        return with_etag(BizResponse(data=user), make_etag("user", version), max_age, private=True)
+    except Exception as e:
+        return BizResponse(data=None, msg=str(e), status_code=500)
+
+
+@router.post("/users")
+async def create_user(user: UserCreate, repo: IAsyncUserRepository = Depends(get_async_user_repo)):
+    try:
+        user_info = await async_user_svc.create_user(repo, user)
+        return BizResponse(data=user_info)
+    except Exception as e:
+        return BizResponse(data=None, msg=str(e), status_code=500)
+
+
+@router.delete("/users/{student_id}")
+async def delete_user(student_id: int, repo: IAsyncUserRepository = Depends(get_async_user_repo)):
+    try:
+        user_info = await async_user_svc.delete_user(repo, student_id)
+        return BizResponse(data=user_info)
+    except Exception as e:
+        return BizResponse(data=None, msg=str(e), status_code=500)
+
+
+@router.put("/users/{student_id}")
+async def update_user(student_id: int, user_update: UserUpdate, repo: IAsyncUserRepository = Depends(get_async_user_repo)):
+    try:
+        user_info = await async_user_svc.update_user(repo, student_id, user_update)
+        if user_info:
+            return BizResponse(data=user_info)
+        else:
+            return BizResponse(data=user_info, msg=f"updated failed: {student_id} not found.")
+    
+    except Exception as e:
+        return BizResponse(data=None, msg=str(e), status_code=500)
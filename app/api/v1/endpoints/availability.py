@@ -0,0 +1,23 @@
+from fastapi import APIRouter, Depends
+from app.core.biz_reposone import BizResponse
+from app.service import availability_svc
+from app.storage.availability.availability_interface import IAvailabilityRepository
+from app.storage.db import get_availability_repo
+
+
+router = APIRouter(prefix="/availability")
+
+
+# 批量查询图书的可借情况: GET /availability?bids=1,2,3, 不存在的 bid 不出现在结果中
+@router.get("")
+def get_availability(bids: str, warehouses: bool = True, repo: IAvailabilityRepository = Depends(get_availability_repo)):
+    try:
+        bid_list = availability_svc.parse_bids(bids)
+    except ValueError as e:
+        return BizResponse(data=None, msg=str(e), status_code=400)
+
+    try:
+        return BizResponse(data=availability_svc.get_availability(repo, bid_list, warehouses))
+    except Exception as e:
+        return BizResponse(data=None, msg=str(e), status_code=500)
+
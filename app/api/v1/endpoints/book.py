@@ -1,26 +1,69 @@
-from fastapi import APIRouter, Query, Path, Body
+from fastapi import APIRouter, Depends, Header
+from typing import Optional
+from app.core.config import get_settings
+from app.core.http_cache import make_etag, etag_matches, not_modified, with_etag
+from app.schemas.book import BookCreate, BookUpdate, BookRetrieveReq
+from app.core.biz_reposone import BizResponse
+from app.service import book_svc
+from app.storage.db import get_book_repo
+from app.storage.book.book_interface import IBookRepository
 
 router = APIRouter(prefix="/book")
 
 # 添加增删改查的接口, 支持标题、标签、ISBN查询
+# 检索接口需要注册在 /{isbn} 之前, 否则 /search 会被当作 isbn 匹配
+@router.get("/search")
+def search_book(req: BookRetrieveReq = Depends(), repo: IBookRepository = Depends(get_book_repo)):
+    try:
+        result = book_svc.search_book(repo, req)
+        return BizResponse(data=result)
+    except Exception as e:
+        return BizResponse(data=None, msg=str(e), status_code=500)
+
+
+# 客户端带着 If-None-Match 时先只查询版本号, 一致则直接返回 304, 不加载整行也不序列化;
+# 否则图书与版本号在同一次查询中读出, ETag 与响应体一定对应同一个版本
 @router.get("/{isbn}")
-def get_book(isbn: str):
-    # 此处添加逻辑来根据ISBN查询书籍信息
-    return {"code": 0, "data": f"Book details for ISBN: {isbn}"}
+def get_book(isbn: str, if_none_match: Optional[str] = Header(None), repo: IBookRepository = Depends(get_book_repo)):
+    try:
+        max_age = get_settings().http_cache_max_age
+        if if_none_match:
+            version = book_svc.get_book_version(repo, isbn)
+            if version is not None and etag_matches(if_none_match, make_etag("book", version)):
+                return not_modified(make_etag("book", version), max_age)
+
+        loaded = book_svc.get_book_with_version(repo, isbn)
+        if loaded is None:
+            return BizResponse(data=None, msg=f"book {isbn} not found.", status_code=404)
+        book_info, version = loaded
+        return with_etag(BizResponse(data=book_info), make_etag("book", version), max_age)
+    except Exception as e:
+        return BizResponse(data=None, msg=str(e), status_code=500)
 
 # 使用 BaseModel 定义传入的参数 
 @router.post("/")
-def add_book(book: dict = None):
-    # 此处添加逻辑来添加新书
-    return {"code": 0, "data": "Book added successfully"}
+def add_book(book: BookCreate, repo: IBookRepository = Depends(get_book_repo)):
+    try:
+        book_info = book_svc.create_book(repo, book)
+        return BizResponse(data=book_info)
+    except Exception as e:
+        return BizResponse(data=None, msg=str(e), status_code=500)
 
 @router.put("/{isbn}")
-def update_book(isbn: str, book: dict):
-    # 此处添加逻辑来更新书籍信息
-    return {"code": 0, "data": f"Book with ISBN: {isbn} updated successfully"}  
+def update_book(isbn: str, book: BookUpdate, repo: IBookRepository = Depends(get_book_repo)):
+    try:
+        book_info = book_svc.update_book(repo, isbn, book)
+        if book_info:
+            return BizResponse(data=book_info)
+        return BizResponse(data=book_info, msg=f"updated failed: {isbn} not found.")
+    except Exception as e:
+        return BizResponse(data=None, msg=str(e), status_code=500)
 
 
 @router.delete("/{isbn}")
-def delete_book(isbn: str):
-    # 此处添加逻辑来删除书籍
-    return {"code": 0, "data": f"Book with ISBN: {isbn} deleted successfully"}
\ No newline at end of file
+def delete_book(isbn: str, repo: IBookRepository = Depends(get_book_repo)):
+    try:
+        book_info = book_svc.delete_book(repo, isbn)
+        return BizResponse(data=book_info)
+    except Exception as e:
+        return BizResponse(data=None, msg=str(e), status_code=500)
@@ -0,0 +1,37 @@
+from datetime import datetime
+from typing import Optional
+
+from fastapi import APIRouter, Query
+from fastapi.responses import StreamingResponse
+
+from app.core.biz_reposone import BizResponse
+from app.service import export_svc
+from app.storage.db import get_sessionmaker
+from app.storage.export import EXPORT_SPECS, MAX_BATCH_SIZE
+
+
+router = APIRouter(prefix="/export")
+
+
+# 流式导出公开的目录数据 (books / book_inventory); 学生名单与借阅订单含个人信息, 只能通过 python -m app.cli.export 导出
+# 响应边生成边发送, 会话由生成器自己持有: 依赖注入的 get_db 会在响应开始发送前就关闭会话, 不能用于流式响应
+@router.get("/{entity}")
+def export_table(entity: str, format: str = "ndjson", gzip: bool = False,
+                 since: Optional[datetime] = None, until: Optional[datetime] = None,
+                 batch_size: int = Query(5000, ge=1, le=MAX_BATCH_SIZE)):
+    if entity not in EXPORT_SPECS:
+        return BizResponse(data=None, msg=f"unknown entity {entity}, expected one of {sorted(EXPORT_SPECS)}.", status_code=404)
+    if not EXPORT_SPECS[entity].public:
+        return BizResponse(data=None, msg=f"{entity} contains personal data and can only be exported with the CLI.", status_code=403)
+    if format not in export_svc.FORMATS:
+        return BizResponse(data=None, msg=f"unsupported format {format}, expected one of {sorted(export_svc.FORMATS)}.", status_code=400)
+    if (since or until) and EXPORT_SPECS[entity].time_column is None:
+        return BizResponse(data=None, msg=f"{entity} does not support since/until filters.", status_code=400)
+
+    def body():
+        with get_sessionmaker()() as db:
+            yield from export_svc.export_stream(db, entity, format, gzip, since, until, batch_size)
+
+    media_type = "application/gzip" if gzip else export_svc.FORMATS[format]
+    filename = export_svc.export_filename(entity, format, gzip)
+    return StreamingResponse(body(), media_type=media_type, headers={"Content-Disposition": f'attachment; filename="{filename}"'})
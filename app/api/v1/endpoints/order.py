@@ -0,0 +1,55 @@
+from fastapi import APIRouter, Depends
+from app.schemas.order import BorrowReq, ReturnReq
+from app.core.biz_reposone import BizResponse
+from app.service import order_svc
+from app.storage.db import get_order_repo, get_user_repo
+from app.storage.order.order_interface import IOrderRepository
+from app.storage.order.SQLAlchemyOrderRepository import OutOfStockError, RenewalRefused
+from app.storage.user.user_interface import IUserRepository
+
+
+router = APIRouter(prefix="/orders")
+
+
+# 借阅图书, 库存不足时返回 409
+@router.post("")
+def borrow_book(req: BorrowReq, order_repo: IOrderRepository = Depends(get_order_repo), user_repo: IUserRepository = Depends(get_user_repo)):
+    try:
+        order = order_svc.borrow_book(order_repo, user_repo, req)
+        return BizResponse(data=order)
+    except OutOfStockError as e:
+        return BizResponse(data=None, msg=str(e), status_code=409)
+    except Exception as e:
+        return BizResponse(data=None, msg=str(e), status_code=500)
+
+
+@router.put("/{order_id}/return")
+def return_book(order_id: str, req: ReturnReq = None, order_repo: IOrderRepository = Depends(get_order_repo)):
+    try:
+        order = order_svc.return_book(order_repo, order_id, req)
+        return BizResponse(data=order)
+    except Exception as e:
+        return BizResponse(data=None, msg=str(e), status_code=500)
+
+
+# 续借, 次数用完或已经逾期时返回 409
+@router.put("/{order_id}/renew")
+def renew_book(order_id: str, order_repo: IOrderRepository = Depends(get_order_repo)):
+    try:
+        order = order_svc.renew_book(order_repo, order_id)
+        return BizResponse(data=order)
+    except RenewalRefused as e:
+        return BizResponse(data=None, msg=str(e), status_code=409)
+    except Exception as e:
+        return BizResponse(data=None, msg=str(e), status_code=500)
+
+
+@router.get("/{order_id}")
+def get_order(order_id: str, order_repo: IOrderRepository = Depends(get_order_repo)):
+    try:
+        order = order_svc.get_order(order_repo, order_id)
+        if order:
+            return BizResponse(data=order)
+        return BizResponse(data=None, msg=f"order {order_id} not found.", status_code=404)
+    except Exception as e:
+        return BizResponse(data=None, msg=str(e), status_code=500)
@@ -0,0 +1,21 @@
+from fastapi import APIRouter, Depends
+from app.core.biz_reposone import BizResponse
+from app.service import recommend_svc
+from app.storage.db import get_loaders, get_user_repo
+from app.storage.loader import RequestLoaders
+from app.storage.user.user_interface import IUserRepository
+
+
+router = APIRouter(prefix="/recommendations")
+
+
+# 推荐结果在模型刷新时已经预先算好, 这里只做一次字典查询; with_books=true 时附带图书详情 (一次批量查询)
+@router.get("/{student_id}")
+def recommend(student_id: str, with_books: bool = False, user_repo: IUserRepository = Depends(get_user_repo),
+              loaders: RequestLoaders = Depends(get_loaders)):
+    try:
+        books = loaders.book_by_bid if with_books else None
+        return BizResponse(data=recommend_svc.recommend_for_student(user_repo, student_id, books=books))
+    except Exception as e:
+        return BizResponse(data=None, msg=str(e), status_code=500)
+
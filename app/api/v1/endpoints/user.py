@@ -1,32 +1,57 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, Header, HTTPException, Query
 from app.schemas.user import UserCreate,  UserUpdate
 from app.core.biz_reposone import BizResponse
+from app.core.config import get_settings
+from app.core.http_cache import make_etag, etag_matches, not_modified, with_etag
+from app.storage.pagination import MAX_PAGE_SIZE, InvalidCursor
 from app.service import user_svc
 from app.storage.db import get_db, get_user_repo, Session
 from app.storage.user.SQLAlchemyUserRepository import SQLAlchemyUserRepository
 from app.storage.user.user_interface import IUserRepository
 
-from typing import List
+from typing import List, Optional
 
 
 # 只有查询在接口层暴露批量查询，其余 增/删/改 操作, 只在业务层提供，不对外暴露批量处理的接口
 router = APIRouter()
 
 
+# 传入上一页返回的 next_cursor 时按游标翻页, 翻页耗时与页码无关
 @router.get("/users")
-def query_batch_users(page: int = 0, page_size: int = 10, repo: IUserRepository = Depends(get_user_repo)):
+def query_batch_users(page: int = Query(0, ge=0), page_size: int = Query(10, ge=1, le=MAX_PAGE_SIZE), cursor: Optional[str] = None,
+                      if_none_match: Optional[str] = Header(None), repo: IUserRepository = Depends(get_user_repo)):
     try:
-        result = user_svc.get_batch_users(repo, page, page_size)
-        return BizResponse(data=result)
+        # 列表的 ETag 由这一页每行的 (uid, version) 与总数计算; 条件请求先只查询这两列, 命中时直接返回 304
+        max_age = get_settings().http_cache_max_age
+        if if_none_match:
+            etag = make_etag("users", user_svc.get_batch_users_version(repo, page, page_size, cursor))
+            if etag_matches(if_none_match, etag):
+                return not_modified(etag, max_age, private=True)
+
+        # 返回的 ETag 由响应体的这些行计算, 不会与另一次查询的结果错位
+        result, version = user_svc.get_batch_users_with_version(repo, page, page_size, cursor)
+        return with_etag(BizResponse(data=result), make_etag("users", version), max_age, private=True)
+    except InvalidCursor as e:
+        return BizResponse(data=list(), msg=str(e), status_code=400)
     except Exception as e:
         return BizResponse(data=list(), msg=str(e), status_code=500)
     
     
 @router.get("/users/{student_id}")
-def query_user(student_id: int, repo: IUserRepository = Depends(get_user_repo)):
+def query_user(student_id: int, if_none_match: Optional[str] = Header(None), repo: IUserRepository = Depends(get_user_repo)):
     try:
-        user = user_svc.get_user_by_student_id(repo, student_id)
-        return BizResponse(data=user)
+        # 用户信息属于个人数据, 只允许客户端私有缓存, 不允许共享代理缓存; 条件请求的处理方式与 GET /book/{isbn} 相同
+        max_age = get_settings().http_cache_max_age
+        if if_none_match:
+            version = user_svc.get_user_version(repo, student_id)
+            if version is not None and etag_matches(if_none_match, make_etag("user", version)):
+                return not_modified(make_etag("user", version), max_age, private=True)
+
+        loaded = user_svc.get_user_with_version(repo, student_id)
+        if loaded is None:
+            return BizResponse(data=None)
+        user, version = loaded
+        return with_etag(BizResponse(data=user), make_etag("user", version), max_age, private=True)
     except Exception as e:
         return BizResponse(data=None, msg=str(e), status_code=500)
 
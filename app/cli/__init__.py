@@ -0,0 +1 @@
+# 命令行工具: 批量导入/导出等离线任务, 通过 python -m app.cli.<模块名> 运行
\ No newline at end of file
@@ -0,0 +1,46 @@
+import argparse
+import json
+import sys
+
+from sqlalchemy.orm import Session
+
+from app.core.config import get_settings
+from app.storage.book.catalog_snapshot import export_catalog_snapshot
+from app.storage.engine import create_engine_from_settings
+
+
+""" 导出图书目录快照, 建议在批量导入图书之后以及每天定时执行
+
+    python -m app.cli.catalog_snapshot
+    python -m app.cli.catalog_snapshot --output /var/lib/bookhub/catalog.snap --database-url sqlite:///./bookhub.db
+
+    输出路径默认取 BOOKHUB_CATALOG_SNAPSHOT_PATH; 新文件写完后原子替换旧文件, 运行中的 worker 会在
+    BOOKHUB_CATALOG_SNAPSHOT_CHECK_SECONDS 之内切换到新快照。
+    必须连接主库: 文件头记录导出开始时的变更日志位置, 导出间隔应小于 BOOKHUB_BOOK_CHANGE_KEEP_DAYS, 否则快照会因为日志被清理而停用
+"""
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export the book catalog into a memory-mappable snapshot file.")
+    parser.add_argument("--output", default=None, help="defaults to BOOKHUB_CATALOG_SNAPSHOT_PATH")
+    parser.add_argument("--batch-size", type=int, default=10000)
+    parser.add_argument("--database-url", default=None, help="defaults to BOOKHUB_DATABASE_URL")
+    args = parser.parse_args(argv)
+
+    settings = get_settings()
+    output = args.output or settings.catalog_snapshot_path
+    if not output:
+        parser.error("--output is required when BOOKHUB_CATALOG_SNAPSHOT_PATH is not set")
+
+    engine = create_engine_from_settings(args.database_url or settings.database_url, settings)
+    try:
+        with Session(engine) as db:
+            stats = export_catalog_snapshot(db, output, args.batch_size)
+    finally:
+        engine.dispose()
+
+    print(json.dumps(stats))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,44 @@
+import argparse
+import json
+import sys
+from datetime import datetime
+
+from sqlalchemy.orm import Session
+
+from app.core.config import get_settings
+from app.core.fine_policy import FinePolicy
+from app.service.fine_svc import run_fine_job
+from app.storage.engine import create_engine_from_settings
+from app.storage.order.SQLAlchemyOrderRepository import SQLAlchemyOrderRepository
+
+
+""" 每日逾期罚款任务, 建议由 cron 在每天凌晨执行一次
+
+    python -m app.cli.fine_job
+    python -m app.cli.fine_job --chunk-size 50000 --now 2025-07-01T00:00:00 --database-url sqlite:///./bookhub.db
+
+    借期、续借天数与罚款标准读取 BOOKHUB_LOAN_DAYS / BOOKHUB_RENEW_DAYS / BOOKHUB_FINE_CENTS_PER_DAY / BOOKHUB_FINE_CAP_CENTS
+"""
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Recompute due dates and overdue fines for all open orders.")
+    parser.add_argument("--chunk-size", type=int, default=10000)
+    parser.add_argument("--now", type=datetime.fromisoformat, default=None, help="evaluation time (UTC), defaults to now")
+    parser.add_argument("--database-url", default=None, help="defaults to BOOKHUB_DATABASE_URL")
+    args = parser.parse_args(argv)
+
+    settings = get_settings()
+    engine = create_engine_from_settings(args.database_url or settings.database_url, settings)
+    try:
+        with Session(engine) as db:
+            stats = run_fine_job(SQLAlchemyOrderRepository(db), FinePolicy.from_settings(settings), args.now,
+                                 args.chunk_size, report=lambda msg: print(msg, file=sys.stderr))
+    finally:
+        engine.dispose()
+
+    print(json.dumps(stats))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,41 @@
+import argparse
+import json
+import sys
+
+from sqlalchemy.orm import Session
+
+from app.core.config import get_settings
+from app.storage.book.changes import prune_book_changes
+from app.storage.engine import create_engine_from_settings
+
+
+""" 清理图书变更日志 (book_changes) 中的旧记录, 建议由 cron 每天执行一次
+
+    python -m app.cli.prune_book_changes
+    python -m app.cli.prune_book_changes --keep-days 3 --database-url sqlite:///./bookhub.db
+
+    保留天数默认取 BOOKHUB_BOOK_CHANGE_KEEP_DAYS, 各 worker 进程判断 "落后太多需要全量重建" 时使用同一个值
+"""
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Delete old rows from the book change log.")
+    parser.add_argument("--keep-days", type=float, default=None, help="defaults to BOOKHUB_BOOK_CHANGE_KEEP_DAYS")
+    parser.add_argument("--database-url", default=None, help="defaults to BOOKHUB_DATABASE_URL")
+    args = parser.parse_args(argv)
+
+    settings = get_settings()
+    engine = create_engine_from_settings(args.database_url or settings.database_url, settings)
+    try:
+        with Session(engine) as db:
+            deleted = prune_book_changes(db, args.keep_days)
+            db.commit()
+    finally:
+        engine.dispose()
+
+    print(json.dumps({"deleted": deleted}))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,42 @@
+import argparse
+import json
+import sys
+
+from sqlalchemy.orm import Session
+
+from app.core.config import get_settings
+from app.storage.book.tag_index import TagIndex, build_tag_index, rebuild_book_tags
+from app.storage.engine import create_engine_from_settings
+
+
+""" 按 books.tags 重写规范化的标签表 (tags / book_tags), 首次上线时用它回填已有图书
+
+    python -m app.cli.rebuild_book_tags
+    python -m app.cli.rebuild_book_tags --batch-size 10000 --database-url sqlite:///./bookhub.db
+
+    运行中服务的内存标签索引不会感知, 完成之后需要重启服务
+"""
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Rebuild the normalized book tag tables from books.tags.")
+    parser.add_argument("--batch-size", type=int, default=5000)
+    parser.add_argument("--database-url", default=None, help="defaults to BOOKHUB_DATABASE_URL")
+    args = parser.parse_args(argv)
+
+    settings = get_settings()
+    engine = create_engine_from_settings(args.database_url or settings.database_url, settings)
+    try:
+        with Session(engine) as db:
+            books = rebuild_book_tags(db, args.batch_size)
+            index = TagIndex()
+            tagged = build_tag_index(db, index)
+    finally:
+        engine.dispose()
+
+    print(json.dumps({"books": books, "tagged": tagged, "tags": len(index)}))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,41 @@
+import argparse
+import json
+import sys
+
+from sqlalchemy.orm import Session
+
+from app.core.config import get_settings
+from app.service.availability_svc import reconcile
+from app.storage.availability.SQLAlchemyAvailabilityRepository import SQLAlchemyAvailabilityRepository
+from app.storage.engine import create_engine_from_settings
+
+
+""" 可借数量汇总表 (book_availability) 的对账任务, 建议由 cron 每天执行一次; 首次上线时用它从头构建汇总表
+
+    python -m app.cli.reconcile_availability
+    python -m app.cli.reconcile_availability --check-only --database-url sqlite:///./bookhub.db
+
+    存在不一致时以非 0 状态码退出 (--check-only 模式下), 便于接入告警
+"""
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Rebuild book availability aggregates and report drift.")
+    parser.add_argument("--check-only", action="store_true", help="report drift without fixing it")
+    parser.add_argument("--database-url", default=None, help="defaults to BOOKHUB_DATABASE_URL")
+    args = parser.parse_args(argv)
+
+    settings = get_settings()
+    engine = create_engine_from_settings(args.database_url or settings.database_url, settings)
+    try:
+        with Session(engine) as db:
+            report = reconcile(SQLAlchemyAvailabilityRepository(db), fix=not args.check_only)
+    finally:
+        engine.dispose()
+
+    print(json.dumps(report.model_dump()))
+    return 1 if args.check_only and report.drifted else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,9 +1,13 @@
 from fastapi.responses import JSONResponse
+from pydantic_core import to_json
 from typing import Any, Optional
 
 
 
 # 目前先不区分 code/status_code 区别，后续需要更复杂的业务逻辑时再区分
+# 序列化使用 pydantic-core 的 to_json: Pydantic 模型 (以及嵌套在 dict/list 中的模型) 直接由模型编译好的序列化器写成 bytes,
+# 不需要先 model_dump 成 dict 再交给标准库 json.dumps; datetime 等类型也能直接输出, 因此路由层可以直接把模型放进 data。
+# NaN/inf 不是合法的 JSON, 默认会被原样写成 NaN/Infinity, 这里统一输出为 null (与 JSONResponse 的 allow_nan=False 一样不产生非法 JSON)
 class BizResponse(JSONResponse):
     def __init__(
         self, data: Optional[Any] = None, msg: str = "success", status_code: int = 200, 
@@ -18,3 +22,5 @@ class BizResponse(JSONResponse):
         }
         super().__init__(content=content, status_code=status_code)
 
+    def render(self, content: Any) -> bytes:
+        return to_json(content, inf_nan_mode="null")
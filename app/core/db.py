@@ -1,7 +1,9 @@
 import logging
 
 from sqlalchemy.orm import Session
-from contextlib import contextmanager
+from sqlalchemy.ext.asyncio import AsyncSession
+from contextlib import contextmanager, asynccontextmanager
+from typing import Tuple, Type
 
 
 """ 此处涉及的几个要素:
@@ -25,12 +27,26 @@ from contextlib import contextmanager
 
 # 使用 Python上下文管理器来处理数据库事务, 在失败的时候自动回滚, 通过事务管理器来保证原子性
 # 成功时提交事务(commit),  commit 完成之后才能调用 refresh 获取最新状态;  失败时回滚事务, 打印异常调用栈，并且重新向上抛出异常!
+# expected 中的异常属于预期内的业务失败 (比如库存不足), 只回滚不打印调用栈, 避免高峰期日志被刷屏
 @contextmanager
-def transaction(db: Session):
+def transaction(db: Session, expected: Tuple[Type[Exception], ...] = ()):
     try:
         yield db
         db.commit()
     except Exception as e:
-        logging.exception(e)
+        if not isinstance(e, expected):
+            logging.exception(e)
         db.rollback()
-        raise
\ No newline at end of file
+        raise
+
+
+# 异步版本的事务管理器, 语义与 transaction 一致
+@asynccontextmanager
+async def async_transaction(db: AsyncSession):
+    try:
+        yield db
+        await db.commit()
+    except Exception as e:
+        logging.exception(e)
+        await db.rollback()
+        raise
@@ -0,0 +1,56 @@
+import numpy as np
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Optional, Sequence, Tuple
+
+from app.core.config import Settings, get_settings
+
+
+""" 借阅期限与逾期罚款规则
+
+    应还时间 = 借出时间 + 首次借期 + 已续借次数对应的累计延长天数 (每次续借的天数不等, 见 Settings.renew_days)
+    逾期天数 = ceil((当前时间 - 应还时间) / 1 天), 不足一天按一天计算, 未逾期为 0
+    罚款     = min(逾期天数 * 每日罚款, 单笔上限), 单位: 分
+
+    所有计算都以数组为单位 (单个订单传入长度为 1 的序列), 批处理任务与归还结算共用同一套规则
+"""
+
+
+DAY_US = 86_400 * 1_000_000
+
+
+@dataclass(frozen=True)
+class FinePolicy:
+    loan_days: int = 30
+    renew_days: Tuple[int, ...] = (30, 15)
+    fine_cents_per_day: int = 10
+    fine_cap_cents: int = 10000
+
+    @classmethod
+    def from_settings(cls, settings: Optional[Settings] = None) -> "FinePolicy":
+        settings = settings or get_settings()
+        return cls(settings.loan_days, tuple(settings.get_renew_days()), settings.fine_cents_per_day, settings.fine_cap_cents)
+
+    @property
+    def max_renewals(self) -> int:
+        return len(self.renew_days)
+
+    def due_times(self, borrow_times: np.ndarray, renew_counts: np.ndarray) -> np.ndarray:
+        # extension[k] 为续借 k 次后的总借期 (天)
+        extension = self.loan_days + np.concatenate(([0], np.cumsum(self.renew_days, dtype=np.int64)))
+        renewals = np.clip(renew_counts, 0, self.max_renewals)
+        return borrow_times + extension[renewals].astype("timedelta64[D]")
+
+    def overdue_days(self, due_times: np.ndarray, now: np.datetime64) -> np.ndarray:
+        late_us = (now - due_times).astype("timedelta64[us]").astype(np.int64)
+        return np.where(late_us > 0, -(-late_us // DAY_US), 0)
+
+    def fines(self, overdue_days: np.ndarray) -> np.ndarray:
+        return np.minimum(overdue_days * self.fine_cents_per_day, self.fine_cap_cents)
+
+    def compute(self, borrow_times: Sequence[datetime], renew_counts: Sequence[int], now: datetime) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """ 返回 (应还时间, 逾期天数, 罚款) 三个数组, 与输入一一对应 """
+        borrow = np.asarray(borrow_times, dtype="datetime64[us]")
+        due = self.due_times(borrow, np.asarray(renew_counts, dtype=np.int64))
+        overdue = self.overdue_days(due, np.datetime64(now, "us"))
+        return due, overdue, self.fines(overdue)
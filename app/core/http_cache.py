@@ -0,0 +1,40 @@
+from typing import Optional
+from fastapi import Response
+
+
+""" HTTP 条件请求 (ETag / If-None-Match)
+
+    资源的 ETag 由行版本号生成 (见 Book.version / User.version), 列表的 ETag 由这一页的 (主键, 版本号) 摘要生成;
+    客户端带着 If-None-Match 时路由先只查询版本号, 一致则直接返回 304, 不加载整行也不做序列化;
+    需要返回数据时, 行与版本号在同一次查询中读出 (get_with_version_by_*), ETag 与响应体不会分属两个版本。
+"""
+
+
+def make_etag(kind: str, version: str) -> str:
+    # 弱校验: 只保证语义相同, 不保证字节相同 (序列化方式调整不应该让所有客户端缓存失效)
+    return f'W/"{kind}-{version}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    # If-None-Match 使用弱比较, 忽略 W/ 前缀
+    target = etag.removeprefix("W/")
+    return any(tag.strip().removeprefix("W/") == target for tag in if_none_match.split(","))
+
+
+def cache_headers(etag: str, max_age: int = 0, private: bool = False) -> dict:
+    # max_age 为 0 时客户端每次都需要带着 ETag 重新校验, 数据未变时只花费一次 304 往返
+    scope = "private" if private else "public"
+    return {"ETag": etag, "Cache-Control": f"{scope}, max-age={max_age}, must-revalidate"}
+
+
+def not_modified(etag: str, max_age: int = 0, private: bool = False) -> Response:
+    return Response(status_code=304, headers=cache_headers(etag, max_age, private))
+
+
+def with_etag(response: Response, etag: str, max_age: int = 0, private: bool = False) -> Response:
+    response.headers.update(cache_headers(etag, max_age, private))
+    return response
@@ -0,0 +1,130 @@
+import os
+import threading
+import time
+from typing import Optional
+
+
+""" 时间有序的紧凑 ID 生成器 (snowflake 风格)
+
+    64 位整数, 最高位固定为 0:
+        | 41 位毫秒时间戳 (相对 EPOCH, 可用约 69 年) | 10 位 worker id (0~1023) | 12 位毫秒内序列号 (0~4095) |
+
+    - ID 随时间单调递增, 写入 InnoDB 聚簇索引时总是追加在最右侧的页, 不会像随机 UUID 那样把插入打散到整棵 B+ 树,
+      二级索引里携带的主键也从 32~36 字节缩短为 8 字节 (BIGINT) 或 13 字节 (编码后的字符串)
+    - 展示给用户的借阅单号使用 Crockford Base32 编码, 固定 13 位, 不含 I/L/O/U 等易混淆字符, 字典序与数值序一致
+    - 多进程安全: 每个进程必须使用不同的 worker id, 由哈希推导的 id 在 1024 个槽位里很容易撞车, 因此只接受显式分配:
+        1. BOOKHUB_WORKER_ID 显式配置 (单进程部署, 或者由编排系统为每个进程注入不同的值)
+        2. 未配置时, 应用启动 (lifespan) 时从数据库的 worker_leases 表领取租约并定期续约 (app/storage/worker_lease.py),
+           领不到时启动失败; 租约只在有效期内可用, 续约失败之后生成器拒绝继续发号, 不会与接管这个 id 的进程重复
+      没有分配到 worker id 时 next_id 抛出 WorkerIdUnavailable。租约属于领取它的进程, fork 出的子进程不会继承,
+      需要在子进程里重新领取 (uvicorn/gunicorn 的每个 worker 都会执行自己的 lifespan)
+"""
+
+
+EPOCH_MS = 1704067200000   # 2024-01-01 00:00:00 UTC
+
+WORKER_BITS = 10
+SEQUENCE_BITS = 12
+MAX_WORKER_ID = (1 << WORKER_BITS) - 1
+MAX_SEQUENCE = (1 << SEQUENCE_BITS) - 1
+
+CROCKFORD_ALPHABET = "0123456789ABCDEFGHJKMNPQRSTVWXYZ"
+_DECODE_MAP = {c: i for i, c in enumerate(CROCKFORD_ALPHABET)}
+ENCODED_LENGTH = 13
+
+
+def encode_id(value: int) -> str:
+    chars = []
+    for _ in range(ENCODED_LENGTH):
+        value, rem = divmod(value, 32)
+        chars.append(CROCKFORD_ALPHABET[rem])
+    return "".join(reversed(chars))
+
+
+def decode_id(text: str) -> int:
+    value = 0
+    for c in text.upper():
+        value = value * 32 + _DECODE_MAP[c]
+    return value
+
+
+class WorkerIdUnavailable(RuntimeError):
+    """ 没有配置 worker id 也没有领到 (或者已经失去) 租约 """
+
+
+def _check_worker_id(worker_id: int) -> None:
+    if not 0 <= worker_id <= MAX_WORKER_ID:
+        raise ValueError(f"worker_id must be in [0, {MAX_WORKER_ID}].")
+
+
+class SnowflakeIdGenerator:
+    def __init__(self, worker_id: Optional[int] = None):
+        if worker_id is not None:
+            _check_worker_id(worker_id)
+
+        self._fixed_worker_id = worker_id
+        self._reset()
+        os.register_at_fork(after_in_child=self._reset)
+
+    # 初始化, 以及 fork 出的子进程里丢弃父进程的租约、重建锁 (父进程的锁可能在 fork 时正被其它线程持有)
+    def _reset(self) -> None:
+        self.worker_id = self._fixed_worker_id
+        self._valid_until: Optional[float] = None    # 租约的截止时间 (time.monotonic), None 表示不过期
+        self._last_ms = -1
+        self._sequence = 0
+        self._lock = threading.Lock()
+
+    def assign(self, worker_id: Optional[int], valid_for: Optional[float] = None) -> None:
+        """ 设置 (或者用 None 撤销) worker id; valid_for 为租约剩余的有效秒数, 到期之前没有再次 assign 时停止发号 """
+        if worker_id is not None:
+            _check_worker_id(worker_id)
+        with self._lock:
+            self.worker_id = worker_id
+            self._valid_until = time.monotonic() + valid_for if valid_for is not None else None
+
+    def next_id(self) -> int:
+        with self._lock:
+            if self.worker_id is None:
+                raise WorkerIdUnavailable("worker id is not allocated, set BOOKHUB_WORKER_ID or start the app to lease one.")
+            if self._valid_until is not None and time.monotonic() >= self._valid_until:
+                raise WorkerIdUnavailable(f"worker id {self.worker_id} lease expired.")
+
+            now = int(time.time() * 1000) - EPOCH_MS
+
+            # 时钟回拨: 继续沿用上一次的时间戳, 靠序列号保证单调, 序列号用完后再等待时钟追上
+            if now < self._last_ms:
+                now = self._last_ms
+
+            if now == self._last_ms:
+                self._sequence = (self._sequence + 1) & MAX_SEQUENCE
+                if self._sequence == 0:
+                    # 同一毫秒内的 4096 个序列号用完, 自旋到下一毫秒
+                    while now <= self._last_ms:
+                        now = int(time.time() * 1000) - EPOCH_MS
+            else:
+                self._sequence = 0
+
+            self._last_ms = now
+            return (now << (WORKER_BITS + SEQUENCE_BITS)) | (self.worker_id << SEQUENCE_BITS) | self._sequence
+
+    def next_code(self) -> str:
+        return encode_id(self.next_id())
+
+    @staticmethod
+    def timestamp_ms(value: int) -> int:
+        """ 从 ID 中还原生成时的 Unix 毫秒时间戳 """
+        return (value >> (WORKER_BITS + SEQUENCE_BITS)) + EPOCH_MS
+
+
+_generator: Optional[SnowflakeIdGenerator] = None
+
+
+def get_id_generator() -> SnowflakeIdGenerator:
+    global _generator
+    if _generator is None:
+        from app.core.config import get_settings
+        _generator = SnowflakeIdGenerator(get_settings().worker_id)
+    return _generator
+
+
+__all__ = ["SnowflakeIdGenerator", "WorkerIdUnavailable", "get_id_generator", "encode_id", "decode_id"]
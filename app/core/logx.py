@@ -1,9 +1,15 @@
 import os
+import json
 import time
+import queue
+import atexit
+import weakref
+import functools
 import logging
+import logging.handlers
 import colorlog
 from types import MethodType
-from typing import TypeVar
+from typing import TypeVar, Optional
 
 try:
     from typing import Protocol 
@@ -36,9 +42,141 @@ class LoggerX(Protocol):
     def is_debug(self, enable=True):...
 
 
+class DailySizeRotatingFileHandler(logging.handlers.BaseRotatingHandler):
+    """按日期与大小滚动的文件 handler
+
+    文件名为 {directory}/{YYYYmmdd}.{pid}.log, 日期变化时切换到新日期的文件;
+    同一天内文件超过 max_bytes 时滚动为 .1, .2, ... (数字越大越旧), 最多保留 backup_count 个
+
+    每个进程只写、只滚动自己的文件: 多个 worker 进程共用同一个文件时, 一个进程 os.replace 改名之后,
+    其他进程仍然写在改名后的旧文件里, 还会各自再滚动一次把备份覆盖掉。fork 出的子进程在 fork 之后切换到自己的文件
+    """
+
+    def __init__(self, directory: str, max_bytes: int = 0, backup_count: int = 0, encoding: str = "utf-8"):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.pid = os.getpid()
+        self.current_date = time.strftime("%Y%m%d")
+        super().__init__(self._filename(self.current_date), mode="a", encoding=encoding, delay=True)
+        os.register_at_fork(after_in_child=functools.partial(_reopen_after_fork, weakref.ref(self)))
+
+    def _filename(self, date: str) -> str:
+        return os.path.join(self.directory, f"{date}.{self.pid}.log")
+
+    def _after_fork(self) -> None:
+        # 子进程继承了父进程打开的文件, 关闭之后 (每条日志写完都会 flush, 不会重复写出缓冲区) 改为打开自己的文件
+        self.pid = os.getpid()
+        if self.stream:
+            self.stream.close()
+            self.stream = None
+        self.baseFilename = os.path.abspath(self._filename(self.current_date))
+
+    def shouldRollover(self, record) -> bool:
+        if time.strftime("%Y%m%d", time.localtime(record.created)) != self.current_date:
+            return True
+        if self.max_bytes <= 0:
+            return False
+        if self.stream is None:
+            self.stream = self._open()
+        # 只看已经写入的长度, 不为了估算这一条的长度再格式化一次; 文件最多超出 max_bytes 一条日志
+        return self.stream.tell() >= self.max_bytes
+
+    def doRollover(self) -> None:
+        if self.stream:
+            self.stream.close()
+            self.stream = None
+
+        date = time.strftime("%Y%m%d")
+        if date != self.current_date:
+            # 新的一天写入新文件, 旧日期的文件保持原样
+            self.current_date = date
+            self.baseFilename = os.path.abspath(self._filename(date))
+            return
+
+        # 同一天内按大小滚动: xxx.log.(n-1) -> xxx.log.n, ..., xxx.log -> xxx.log.1
+        if self.backup_count > 0:
+            for i in range(self.backup_count - 1, 0, -1):
+                src, dst = f"{self.baseFilename}.{i}", f"{self.baseFilename}.{i + 1}"
+                if os.path.exists(src):
+                    os.replace(src, dst)
+            if os.path.exists(self.baseFilename):
+                os.replace(self.baseFilename, f"{self.baseFilename}.1")
+        else:
+            open(self.baseFilename, "w").close()
+
+
+def _reopen_after_fork(ref) -> None:
+    handler = ref()
+    if handler is not None:
+        handler._after_fork()
+
+
+class JsonFormatter(logging.Formatter):
+    """每条日志输出为一行 JSON, 便于日志采集系统直接解析"""
+
+    def format(self, record) -> str:
+        payload = {
+            "time": self.formatTime(record, self.datefmt),
+            "level": record.levelname,
+            "logger": record.name,
+            "file": record.pathname,
+            "line": record.lineno,
+            "thread": record.threadName,
+            "message": record.getMessage(),
+        }
+        if record.exc_info:
+            payload["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(payload, ensure_ascii=False)
+
+
+class NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    """请求线程里只做最少的工作: 合并 msg % args 之后入队, 格式化与写文件交给 QueueListener 的后台线程
+
+    标准库 QueueHandler.prepare 会在调用线程里完整格式化一次记录 (包括异常堆栈), 这里不这样做;
+    进程内的队列不需要序列化, 异常信息原样交给后台线程格式化
+    """
+
+    def prepare(self, record):
+        # args 可能是之后还会被修改的可变对象, 因此在入队前先合并成字符串
+        if record.args:
+            record.msg = record.getMessage()
+            record.args = None
+        return record
+
+    def enqueue(self, record) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            # 队列已满时丢弃日志, 不阻塞请求线程
+            pass
+
+
+_listener: Optional[logging.handlers.QueueListener] = None
+
+
+def _stop_listener() -> None:
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
 # 日志模块 log_level 控制记录何种级别的日志，低于这个级别的日志不被记录 debug < info < warning < error < critical
-def logger_initiate(log_level=logging.INFO, is_console=True, is_file=True, is_colorful=False) -> LoggerX:
-    """日志基础设置，支持本地控制台和彩色日志文件输出"""
+def logger_initiate(log_level=logging.INFO, is_console=True, is_file=True, is_colorful=False,
+                    is_async=False, file_format="text", max_bytes=0, backup_count=0,
+                    log_directory: Optional[str] = None, queue_size=10000, rotation="process") -> LoggerX:
+    """日志基础设置，支持本地控制台和彩色日志文件输出
+
+    is_async 为 True 时, logger 上只挂一个 QueueHandler, 控制台与文件 handler 由后台 QueueListener 调用;
+    file_format 为 json 时文件日志每行一个 JSON 对象, 控制台仍然使用文本格式;
+    rotation 为 process 时每个进程按日期与大小滚动自己的文件, 为 external 时所有进程写同一个 bookhub.log,
+    由 logrotate 等外部工具滚动 (WatchedFileHandler 发现文件被移走之后重新打开), max_bytes/backup_count 不再生效
+    """
+    global _listener
+    _stop_listener()
+
     # 统一日志格式
     log_format = "[%(asctime)s] %(levelname)s - %(pathname)s[line:%(lineno)d]: %(message)s"
     date_format = "%Y-%m-%d %H:%M:%S"
@@ -68,34 +206,47 @@ def logger_initiate(log_level=logging.INFO, is_console=True, is_file=True, is_co
         _logger.handlers.clear()
 
     _logger.setLevel(log_level)
+    handlers = []
 
     # 输出到控制台
     if is_console:
         console_handler = logging.StreamHandler()
         console_handler.setFormatter(colorful_formatter if is_colorful else formatter)
         console_handler.setLevel(log_level)
-        _logger.addHandler(console_handler)
+        handlers.append(console_handler)
 
     # 输出到文件，文件写入当前正在运行的目录
     if is_file:
-        current_time = time.strftime("%Y%m%d")
-        log_filename = f"{current_time}.log"
-
-        relative_log_directory = "logs"
-        current_path = os.getcwd()
-        log_directory = os.path.join(current_path, relative_log_directory)
+        if log_directory is None:
+            relative_log_directory = "logs"
+            current_path = os.getcwd()
+            log_directory = os.path.join(current_path, relative_log_directory)
 
-        if not os.path.exists(log_directory):
+        if rotation == "external":
             os.makedirs(log_directory, exist_ok=True)
-
-        file_handler = logging.FileHandler(f"{log_directory}/{log_filename}")
+            file_handler = logging.handlers.WatchedFileHandler(os.path.join(log_directory, "bookhub.log"), encoding="utf-8")
+        elif rotation == "process":
+            # 文件名随日期切换, 而不是固定为导入模块那一天的日期
+            file_handler = DailySizeRotatingFileHandler(log_directory, max_bytes=max_bytes, backup_count=backup_count)
+        else:
+            raise ValueError(f"Unknown log rotation: {rotation}, expected process or external.")
         file_handler.setLevel(log_level)
 
-        # 文件日志使用普通格式
-        file_handler.setFormatter(formatter)
+        # 文件日志使用普通格式或 JSON 行格式
+        file_handler.setFormatter(JsonFormatter(datefmt=date_format) if file_format == "json" else formatter)
+        handlers.append(file_handler)
 
-        # 每个 handler 处理一个日志，写入文件的这个handler也会打印于终端，需要手动禁用日志传播
-        _logger.addHandler(file_handler)
+    if is_async and handlers:
+        log_queue = queue.Queue(maxsize=queue_size)
+        _listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+        _listener.start()
+        _logger.addHandler(NonBlockingQueueHandler(log_queue))
+    else:
+        for handler in handlers:
+            _logger.addHandler(handler)
+
+    # 每个 handler 处理一个日志，写入文件的这个handler也会打印于终端，需要手动禁用日志传播
+    if is_file:
         _logger.propagate = False
 
     # 动态添加 highlight（等价于 debug）与 success（等价于 info）
@@ -105,8 +256,19 @@ def logger_initiate(log_level=logging.INFO, is_console=True, is_file=True, is_co
     return _logger
 
 
+atexit.register(_stop_listener)
+
+
+def logger_from_settings() -> LoggerX:
+    from app.core.config import get_settings
+    settings = get_settings()
+    return logger_initiate(log_level=logging.INFO, is_console=True, is_file=True, is_colorful=True,
+                           is_async=settings.log_async, file_format=settings.log_format,
+                           max_bytes=settings.log_max_bytes, backup_count=settings.log_backup_count, rotation=settings.log_rotation)
+
+
 # 初始化 logger
-logger = logger_initiate(log_level=logging.INFO, is_console=True, is_file=True, is_colorful=True)
+logger = logger_from_settings()
 
 
 # 动态绑定 is_debug 方法
@@ -123,8 +285,9 @@ def is_debug(self, enable=True):
     # 修改全局日志级别
     self.setLevel(new_level)
 
-    # 修改每个 handler 的日志级别
-    for handler in self.handlers:
+    # 修改每个 handler 的日志级别 (异步模式下真正输出的 handler 挂在 QueueListener 上)
+    handlers = list(self.handlers) + (list(_listener.handlers) if _listener is not None else [])
+    for handler in handlers:
         handler.setLevel(new_level)
 
 # 将 is_debug 方法绑定到 logger 对象
@@ -0,0 +1,295 @@
+import bisect
+import threading
+import time
+from contextvars import ContextVar
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+
+""" 轻量的 Prometheus 指标实现 (Counter / Gauge / Histogram + 文本格式导出), 不依赖 prometheus_client
+
+    - MetricsMiddleware: 纯 ASGI 中间件, 记录每个路由的延迟直方图、状态码计数与正在处理的请求数,
+      路由标签使用路由模板 (/api/v1/book/{isbn}) 而不是原始路径, 避免标签基数爆炸
+    - instrument_engine: 挂在 SQLAlchemy 引擎事件上, 统计查询次数、数据库耗时, 以及从连接池获取连接的等待时间;
+      每个请求的查询次数与数据库耗时通过 ContextVar 归属到当前请求
+    - /metrics (见 main.py) 调用 registry.render() 输出文本格式
+"""
+
+
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+LabelValues = Tuple[str, ...]
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = list(zip(names, values))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ""
+    escaped = (str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, v in pairs)
+    return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) and not value.is_integer() else str(int(value))
+
+
+class _Metric:
+    type_name = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> LabelValues:
+        return tuple(str(labels.get(n, "")) for n in self.labelnames)
+
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type_name}"]
+
+
+class Counter(_Metric):
+    type_name = "counter"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def collect(self) -> List[str]:
+        with self._lock:
+            items = list(self._values.items())
+        return self.header() + [f"{self.name}{_format_labels(self.labelnames, k)} {_format_value(v)}" for k, v in items]
+
+
+class Gauge(_Metric):
+    type_name = "gauge"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._values: Dict[LabelValues, float] = {}
+        self._callbacks: List[Callable[[], Iterable[Tuple[Dict[str, str], float]]]] = []
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, **labels) -> None:
+        self.inc(-amount, **labels)
+
+    def set(self, value: float, **labels) -> None:
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def set_function(self, callback: Callable[[], Iterable[Tuple[Dict[str, str], float]]]) -> None:
+        """ 导出时才取值的 gauge, callback 返回 [(labels, value), ...] """
+        self._callbacks.append(callback)
+
+    def collect(self) -> List[str]:
+        with self._lock:
+            items = list(self._values.items())
+        for callback in self._callbacks:
+            items.extend((self._key(labels), value) for labels, value in callback())
+        return self.header() + [f"{self.name}{_format_labels(self.labelnames, k)} {_format_value(v)}" for k, v in items]
+
+
+class Histogram(_Metric):
+    type_name = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # label -> [各个桶的计数 (非累积) ..., +Inf 桶计数, sum]
+        self._values: Dict[LabelValues, List[float]] = {}
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        idx = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [0.0] * (len(self.buckets) + 2)
+            state[idx] += 1
+            state[-1] += value
+
+    def collect(self) -> List[str]:
+        with self._lock:
+            items = [(k, list(v)) for k, v in self._values.items()]
+        lines = self.header()
+        for key, state in items:
+            cumulative = 0.0
+            for bound, count in zip(self.buckets + (float("inf"),), state[:-1]):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, ('le', _format_value(bound)))} {_format_value(cumulative)}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {_format_value(state[-1])}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {_format_value(cumulative)}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._collectors: List[Callable[[], List[str]]] = []
+        self._lock = threading.Lock()
+
+    def register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"metric {metric.name} already registered.")
+            self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self.register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def add_collector(self, collector: Callable[[], List[str]]) -> None:
+        """ 注册自定义导出函数, 用于把缓存、读写分离等已有的统计对象转换为指标文本 """
+        self._collectors.append(collector)
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in list(self._metrics.values()):
+            lines.extend(metric.collect())
+        for collector in self._collectors:
+            lines.extend(collector())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+# ---------------- HTTP ----------------
+
+http_requests_total = registry.counter("bookhub_http_requests_total", "HTTP requests by route, method and status code.", ("route", "method", "status"))
+http_request_seconds = registry.histogram("bookhub_http_request_duration_seconds", "HTTP request latency by route and method.", ("route", "method"))
+http_in_flight = registry.gauge("bookhub_http_requests_in_flight", "HTTP requests currently being processed.")
+
+# ---------------- 数据库 ----------------
+
+db_queries_total = registry.counter("bookhub_db_queries_total", "SQL statements executed, by engine role.", ("engine",))
+db_query_seconds = registry.histogram("bookhub_db_query_duration_seconds", "SQL statement execution time, by engine role.", ("engine",))
+db_request_queries = registry.histogram("bookhub_db_queries_per_request", "SQL statements issued per HTTP request.", ("route",),
+                                        buckets=(0, 1, 2, 3, 5, 10, 20, 50, 100))
+db_request_seconds = registry.histogram("bookhub_db_time_per_request_seconds", "Total SQL time per HTTP request.", ("route",))
+# 连接池的公开事件只有 checkout/checkin/connect 等 "已经发生" 的事件, 没有 "开始等待" 的事件, 排队等待的时间无法直接测量;
+# 改为暴露池的占用情况: 当前借出的连接数接近 pool_size + max_overflow、且连接持有时间变长时, 新的请求就在排队等待连接
+db_pool_checked_out = registry.gauge("bookhub_db_pool_checked_out", "Connections currently checked out of the pool.", ("engine",))
+db_pool_hold_seconds = registry.histogram("bookhub_db_pool_checkout_hold_seconds", "Time a pooled connection stays checked out.", ("engine",),
+                                          buckets=(0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 30.0))
+db_pool_connects_total = registry.counter("bookhub_db_pool_connects_total", "New DBAPI connections opened by the pool.", ("engine",))
+
+# ---------------- 单飞 ----------------
+
+singleflight_wait_seconds = registry.histogram("bookhub_singleflight_wait_seconds", "Time coalesced callers waited for an in-flight load, by repository method.",
+                                               ("method",), buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0))
+
+
+class RequestDBStats:
+    __slots__ = ("queries", "seconds")
+
+    def __init__(self):
+        self.queries = 0
+        self.seconds = 0.0
+
+
+# 当前请求的数据库统计; 同步路由在线程池中执行, anyio 会把 ContextVar 复制到工作线程, 指向的是同一个对象
+current_db_stats: ContextVar[Optional[RequestDBStats]] = ContextVar("bookhub_request_db_stats", default=None)
+
+
+def route_label(scope) -> str:
+    # 较新的 FastAPI 中 include_router 不再复制路由, scope["route"] 上是不带前缀的原始路由, 完整模板在 effective_route_context 里
+    route = (scope.get("fastapi") or {}).get("effective_route_context") or scope.get("route")
+    path = getattr(route, "path_format", None) or getattr(route, "path", None)
+    return path if path else "unmatched"
+
+
+class MetricsMiddleware:
+    def __init__(self, app, exclude_paths: Sequence[str] = ("/metrics",)):
+        self.app = app
+        self.exclude_paths = set(exclude_paths)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] in self.exclude_paths:
+            await self.app(scope, receive, send)
+            return
+
+        status_holder = {"status": 500}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status_holder["status"] = message["status"]
+            await send(message)
+
+        stats = RequestDBStats()
+        token = current_db_stats.set(stats)
+        http_in_flight.inc()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - start
+            http_in_flight.dec()
+            current_db_stats.reset(token)
+
+            route, method = route_label(scope), scope["method"]
+            http_request_seconds.observe(elapsed, route=route, method=method)
+            http_requests_total.inc(route=route, method=method, status=str(status_holder["status"]))
+            db_request_queries.observe(stats.queries, route=route)
+            db_request_seconds.observe(stats.seconds, route=route)
+
+
+def instrument_engine(engine, role: str) -> None:
+    """ 给同步引擎 (异步引擎传入 engine.sync_engine) 挂上查询耗时与连接池事件 """
+    from sqlalchemy import event
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("bookhub_query_start", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info["bookhub_query_start"].pop()
+        db_queries_total.inc(engine=role)
+        db_query_seconds.observe(elapsed, engine=role)
+        stats = current_db_stats.get()
+        if stats is not None:
+            stats.queries += 1
+            stats.seconds += elapsed
+
+    @event.listens_for(engine, "handle_error")
+    def _error(exception_context):
+        conn = exception_context.connection
+        if conn is not None and conn.info.get("bookhub_query_start"):
+            conn.info["bookhub_query_start"].pop()
+
+    @event.listens_for(engine.pool, "connect")
+    def _connect(dbapi_conn, record):
+        db_pool_connects_total.inc(engine=role)
+
+    @event.listens_for(engine.pool, "checkout")
+    def _checkout(dbapi_conn, record, proxy):
+        record.record_info["bookhub_checkout_at"] = time.perf_counter()
+        db_pool_checked_out.inc(engine=role)
+
+    @event.listens_for(engine.pool, "checkin")
+    def _checkin(dbapi_conn, record):
+        # 借出时间记在 record_info 上: 连接被作废 (invalidate) 时 info 会被清空, record_info 会保留, 计数不会漂移
+        start = record.record_info.pop("bookhub_checkout_at", None)
+        if start is None:
+            return
+        db_pool_checked_out.dec(engine=role)
+        db_pool_hold_seconds.observe(time.perf_counter() - start, engine=role)
@@ -0,0 +1,153 @@
+import re
+import sys
+import time
+from collections import Counter as ShapeCounter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Optional, Tuple
+from app.core.logx import logger
+
+
+""" SQL 剖析 (通过 BOOKHUB_SQL_PROFILE 开启), 基于 SQLAlchemy 的 cursor_execute 事件:
+
+    - 慢查询: 执行时间超过 slow_query_ms 的语句连同参数、调用它的仓库方法一起写入 logx
+    - N+1: 同一请求内同形 SQL (参数不同, 语句相同) 重复达到 n_plus_one_threshold 次时报告一次,
+      典型场景是遍历 Book.orders / User.orders 之类的懒加载关系
+    - 查询预算: 请求内的查询数超过 sql_query_budget 时告警; sql_profile_strict 下直接抛出 QueryBudgetExceeded,
+      让测试环境中的请求失败, 而不是只留下一行日志
+"""
+
+
+_IN_LIST = re.compile(r"\bIN\s*\((?:\s*(?:\?|%s|:\w+)\s*,)+\s*(?:\?|%s|:\w+)\s*\)", re.IGNORECASE)
+_WHITESPACE = re.compile(r"\s+")
+_MAX_PARAMS_LEN = 500
+
+
+class QueryBudgetExceeded(RuntimeError):
+    pass
+
+
+def statement_shape(statement: str) -> str:
+    """ 归一化 SQL: 合并空白, 把展开后的 IN (?, ?, ?) 折叠为 IN (?...), 使批量大小不同的查询视为同形 """
+    return _IN_LIST.sub("IN (?...)", _WHITESPACE.sub(" ", statement).strip())
+
+
+def find_caller(max_depth: int = 40) -> str:
+    """ 沿调用栈向上找到第一个仓库方法 (app/storage 下的 *Repository 类), 找不到时退而返回第一个 app 内的帧 """
+    frame = sys._getframe(1)
+    fallback = None
+    for _ in range(max_depth):
+        if frame is None:
+            break
+        filename = frame.f_code.co_filename.replace("\\", "/")
+        if "/app/" in filename and not filename.endswith("query_profiler.py"):
+            location = f"{frame.f_code.co_qualname}({filename.rsplit('/', 1)[-1]}:{frame.f_lineno})"
+            if "/app/storage/" in filename and "Repository." in frame.f_code.co_qualname:
+                return location
+            fallback = fallback or location
+        frame = frame.f_back
+    return fallback or "unknown"
+
+
+def _format_params(parameters) -> str:
+    text = repr(parameters)
+    return text if len(text) <= _MAX_PARAMS_LEN else text[:_MAX_PARAMS_LEN] + "..."
+
+
+class QueryProfile:
+    """ 一个请求 (或一段 profile_queries 代码块) 内的查询统计 """
+
+    def __init__(self, label: str, budget: int = 0, n_plus_one_threshold: int = 5, strict: bool = False):
+        self.label = label
+        self.budget = budget
+        self.n_plus_one_threshold = n_plus_one_threshold
+        self.strict = strict
+        self.queries = 0
+        self.seconds = 0.0
+        self.shapes: ShapeCounter = ShapeCounter()
+        # shape -> 第一次达到阈值时的调用方
+        self.n_plus_one: Dict[str, str] = {}
+
+    def record(self, statement: str, elapsed: float) -> None:
+        self.queries += 1
+        self.seconds += elapsed
+        shape = statement_shape(statement)
+        self.shapes[shape] += 1
+        if self.shapes[shape] == self.n_plus_one_threshold:
+            self.n_plus_one[shape] = find_caller()
+        if self.strict and self.budget and self.queries > self.budget:
+            raise QueryBudgetExceeded(f"{self.label} exceeded the query budget of {self.budget} queries.")
+
+    def report(self) -> None:
+        for shape, caller in self.n_plus_one.items():
+            logger.warning(f"[sql] possible N+1 in {self.label}: {self.shapes[shape]} x by {caller}: {shape}")
+        if self.budget and self.queries > self.budget:
+            logger.warning(f"[sql] {self.label} issued {self.queries} queries (budget {self.budget}), {self.seconds * 1000:.1f} ms in total")
+
+
+current_profile: ContextVar[Optional[QueryProfile]] = ContextVar("bookhub_query_profile", default=None)
+
+
+@contextmanager
+def profile_queries(label: str, budget: int = 0, n_plus_one_threshold: int = 5, strict: bool = False):
+    """ 在代码块内统计查询, 退出时报告 N+1 与超预算; 用于脚本或测试中包住一段调用 """
+    profile = QueryProfile(label, budget, n_plus_one_threshold, strict)
+    token = current_profile.set(profile)
+    try:
+        yield profile
+    finally:
+        current_profile.reset(token)
+        profile.report()
+
+
+class QueryProfileMiddleware:
+    """ 为每个 HTTP 请求开启一个 QueryProfile; 严格模式下超预算的异常由路由层转换为 500 响应 """
+
+    def __init__(self, app, budget: int = 0, n_plus_one_threshold: int = 5, strict: bool = False):
+        self.app = app
+        self.options = dict(budget=budget, n_plus_one_threshold=n_plus_one_threshold, strict=strict)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        with profile_queries(f"{scope['method']} {scope['path']}", **self.options):
+            await self.app(scope, receive, send)
+
+
+def profile_engine(engine, slow_query_ms: float = 200) -> None:
+    """ 给同步引擎 (异步引擎传入 engine.sync_engine) 挂上慢查询与 N+1 统计 """
+    from sqlalchemy import event
+
+    threshold = slow_query_ms / 1000
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("bookhub_profile_start", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info["bookhub_profile_start"].pop()
+        if elapsed >= threshold:
+            logger.warning(f"[sql] slow query {elapsed * 1000:.1f} ms by {find_caller()}: "
+                           f"{statement_shape(statement)} params={_format_params(parameters)}")
+        profile = current_profile.get()
+        if profile is not None:
+            profile.record(statement, elapsed)
+
+    @event.listens_for(engine, "handle_error")
+    def _error(exception_context):
+        conn = exception_context.connection
+        if conn is not None and conn.info.get("bookhub_profile_start"):
+            conn.info["bookhub_profile_start"].pop()
+
+
+def profile_engine_from_settings(engine, settings) -> None:
+    if settings.sql_profile:
+        profile_engine(engine, settings.slow_query_ms)
+
+
+def install_middleware(app, settings) -> None:
+    if settings.sql_profile:
+        app.add_middleware(QueryProfileMiddleware, budget=settings.sql_query_budget,
+                           n_plus_one_threshold=settings.n_plus_one_threshold, strict=settings.sql_profile_strict)
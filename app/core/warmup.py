@@ -0,0 +1,134 @@
+import time
+from contextlib import AsyncExitStack
+from typing import Any, Dict
+
+from fastapi import FastAPI
+from sqlalchemy import select
+from sqlalchemy.engine import Engine
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.orm import Session, configure_mappers
+
+from app.core.biz_reposone import BizResponse
+from app.core.config import Settings
+from app.models.book import Book
+from app.models.user import User
+
+
+""" 启动预热: 在 lifespan 里、开始接收请求之前完成, 把原本由第一个请求承担的开销提前
+
+    1. configure_mappers: 解析所有模型之间的 relationship/backref, 否则在第一次使用 ORM 时才做
+    2. 连接池: 每个引擎同时检出 warmup_connections 个连接 (不超过 pool_size) 再归还, 连接池里就有了已建立好的连接
+    3. 热点语句: 用用户/图书/可借数量的点查各执行一次, 让 SQLAlchemy 的编译缓存里有这些语句
+    4. 序列化: 用查到的真实数据渲染一次 BizResponse, 走一遍输出模型的序列化路径
+    5. 路由: 生成一次 OpenAPI 文档; FastAPI 会在这时解析各个路由的参数与依赖 (include_router 之后是按需构建的),
+       第一个请求就不用再为此付出十几毫秒, /openapi.json 也一并缓存下来
+
+    任何一步失败 (比如数据库暂时不可用) 都只记录在报告里, 不阻塞启动, 由第一个请求按原来的方式懒加载
+"""
+
+
+def _pool_capacity(engine: Engine, wanted: int) -> int:
+    size = getattr(engine.pool, "size", None)
+    return min(wanted, size()) if callable(size) else wanted
+
+
+def warm_pool(engine: Engine, connections: int) -> int:
+    """ 同时持有 n 个连接再一起归还; 逐个 connect/close 的话, 连接池里始终只会留下同一个连接 """
+    conns = []
+    try:
+        for _ in range(_pool_capacity(engine, connections)):
+            conn = engine.connect()
+            conns.append(conn)
+            conn.exec_driver_sql("SELECT 1")
+    finally:
+        for conn in conns:
+            conn.close()
+    return len(conns)
+
+
+async def warm_async_pool(engine: AsyncEngine, connections: int) -> int:
+    opened = 0
+    async with AsyncExitStack() as stack:
+        for _ in range(_pool_capacity(engine.sync_engine, connections)):
+            conn = await stack.enter_async_context(engine.connect())
+            await conn.exec_driver_sql("SELECT 1")
+            opened += 1
+    return opened
+
+
+def warm_statements(db: Session) -> int:
+    """ 执行一遍热点读路径, 返回执行的查找次数; 使用不带缓存的仓库, 不会往缓存里写入数据 """
+    from app.storage.availability.SQLAlchemyAvailabilityRepository import SQLAlchemyAvailabilityRepository
+    from app.storage.book.SQLAlchemyBookRepository import SQLAlchemyBookRepository
+    from app.storage.user.SQLAlchemyUserRepository import SQLAlchemyUserRepository
+
+    # 取一条真实数据, 空库时用一个查不到的键, 语句照样会被编译并缓存
+    isbn = db.execute(select(Book.isbn).limit(1)).scalar() or ""
+    student_id = db.execute(select(User.student_id).limit(1)).scalar() or ""
+
+    books, users = SQLAlchemyBookRepository(db), SQLAlchemyUserRepository(db)
+    book = books.get_by_isbn(isbn)
+    user = users.get_user_by_student_id(student_id)
+    books.get_version_by_isbn(isbn)
+    users.get_version_by_student_id(student_id)
+    availability = SQLAlchemyAvailabilityRepository(db).get_many([book.bid if book else 0])
+
+    for data in (book, user, availability):
+        BizResponse(data=data)
+    return 5
+
+
+def warm_routes(app: FastAPI) -> int:
+    return len(app.openapi().get("paths", {}))
+
+
+def _timed(report: Dict[str, Any], name: str, fn, *args):
+    start = time.perf_counter()
+    try:
+        report[name] = fn(*args)
+    except Exception as e:
+        report.setdefault("errors", []).append(f"{name}: {e}")
+    report[f"{name}_ms"] = round((time.perf_counter() - start) * 1000, 2)
+
+
+def warm_up(app: FastAPI, settings: Settings) -> Dict[str, Any]:
+    """ 同步引擎的预热 (借阅等路由在 async_mode 下也走同步引擎), 返回各步骤耗时, 由 /ready 展示 """
+    from app.storage.db import get_engines, get_sessionmaker, init_engines
+
+    def engines():
+        init_engines(settings)
+        return 1 + len(get_engines()[1])
+
+    report: Dict[str, Any] = {}
+    _timed(report, "mappers", configure_mappers)
+    _timed(report, "engines", engines)
+    if settings.warmup_connections > 0 and "errors" not in report:
+        primary, replicas = get_engines()
+        _timed(report, "connections", lambda: sum(warm_pool(e, settings.warmup_connections) for e in (primary, *replicas)))
+
+    def statements():
+        with get_sessionmaker()() as db:
+            return warm_statements(db)
+
+    if "errors" not in report:
+        _timed(report, "statements", statements)
+    _timed(report, "routes", warm_routes, app)
+    return report
+
+
+async def warm_up_async(settings: Settings, report: Dict[str, Any]) -> Dict[str, Any]:
+    """ async_mode 下额外预热异步引擎, 结果合并进同一个报告 """
+    from app.storage.async_db import get_async_engines, get_async_sessionmaker
+
+    start = time.perf_counter()
+    try:
+        primary, replicas = get_async_engines(settings)
+        if settings.warmup_connections > 0:
+            report["async_connections"] = sum([await warm_async_pool(e, settings.warmup_connections) for e in (primary, *replicas)])
+        async with get_async_sessionmaker()() as db:
+            report["async_statements"] = await db.run_sync(warm_statements)
+    except Exception as e:
+        report.setdefault("errors", []).append(f"async: {e}")
+    report["async_ms"] = round((time.perf_counter() - start) * 1000, 2)
+    return report
+
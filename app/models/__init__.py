@@ -1,9 +1,13 @@
 # 数据模型
 from .book import Book
 from .book_inventory import BookInventory
+from .book_availability import BookAvailability
+from .book_change import BookChange
+from .tag import Tag, BookTag
 
 from .user import User
 from .order import Order
+from .worker_lease import WorkerLease
 
 
-__all__ = ["Book", "BookInventory", "Order", "User"]
+__all__ = ["Book", "BookInventory", "BookAvailability", "BookChange", "Tag", "BookTag", "Order", "User", "WorkerLease"]
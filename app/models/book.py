@@ -13,9 +13,12 @@ class Book(Base):
             abstract TEXT,
             area VARCHAR(50),
             floor VARCHAR(50),
-            tags VARCHAR(255)
+            tags VARCHAR(255),
+            version INT NOT NULL DEFAULT 1      -- 行版本号, 每次更新自增, 用作 HTTP ETag
         );
 
+        已有的表: ALTER TABLE books ADD COLUMN version INT NOT NULL DEFAULT 1;
+
     """
     __tablename__ = "books"
 
@@ -30,6 +33,10 @@ class Book(Base):
 
     tags = Column(String, nullable=True)                 # 图书标签（多个标签用逗号分隔，例如：文学,历史,科幻）
 
+    # 行版本号: 通过 ORM 更新时由 SQLAlchemy 自动加一 (UPDATE ... WHERE version = 旧值), 并发修改时抛出 StaleDataError
+    version = Column(Integer, nullable=False, default=1, server_default="1")
+    __mapper_args__ = {"version_id_col": version}
+
 
     orders = relationship("Order", back_populates="book")
     
\ No newline at end of file
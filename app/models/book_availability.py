@@ -0,0 +1,25 @@
+from datetime import datetime
+from sqlalchemy import Column, Integer, DateTime, ForeignKey
+
+from .base import Base
+
+
+class BookAvailability(Base):
+    """ 图书可借数量的汇总表 (物化聚合), 每本书一行, 由 book_inventory 与未归还的 orders 推导而来:
+
+        CREATE TABLE book_availability (
+            book_id INT PRIMARY KEY,               -- 图书 ID
+            available INT NOT NULL DEFAULT 0,      -- 各馆当前可借数量之和 = SUM(book_inventory.quantity)
+            on_loan INT NOT NULL DEFAULT 0,        -- 借出未还的数量 = COUNT(orders WHERE status = 'borrowed')
+            updated_at DATETIME NOT NULL,
+            FOREIGN KEY (book_id) REFERENCES books(bid)
+        );
+
+        借阅/归还在同一个事务里增量维护这张表, 库存导入后按图书重算; 各馆明细仍以 book_inventory 为准
+    """
+    __tablename__ = "book_availability"
+
+    book_id = Column(Integer, ForeignKey("books.bid"), primary_key=True)
+    available = Column(Integer, nullable=False, default=0)
+    on_loan = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, nullable=False, default=datetime.utcnow)
@@ -0,0 +1,24 @@
+from sqlalchemy import BigInteger, Column, DateTime, Integer, func
+
+from .base import Base
+
+
+class BookChange(Base):
+    """ 图书变更日志, 每次新增/修改/删除图书 (包括批量导入) 在同一个事务里追加一行:
+
+        CREATE TABLE book_changes (
+            seq BIGINT PRIMARY KEY AUTO_INCREMENT,   -- 单调递增的序号, 各进程按它增量拉取变更
+            book_id INT NOT NULL,                    -- 不加外键, 删除的图书同样需要记录
+            changed_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            KEY ix_book_changes_changed_at (changed_at)
+        );
+
+        每个 worker 进程的内存索引 (检索、标签) 与目录快照通过它感知其他进程以及批量导入对图书的修改,
+        见 app/storage/book/changes.py; 旧记录由 python -m app.cli.prune_book_changes 定期清理
+    """
+    __tablename__ = "book_changes"
+
+    # SQLite 只有 INTEGER PRIMARY KEY 才会自增
+    seq = Column(BigInteger().with_variant(Integer, "sqlite"), primary_key=True, autoincrement=True)
+    book_id = Column(Integer, nullable=False)
+    changed_at = Column(DateTime, nullable=False, server_default=func.now(), index=True)
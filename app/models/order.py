@@ -1,5 +1,5 @@
 # 借阅订单, 需要拥有一个唯一单号，当用户归还之后会产生归还单号
-from sqlalchemy import Column, String, Integer, DateTime, ForeignKey
+from sqlalchemy import Column, String, Integer, DateTime, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from .base import Base
@@ -17,16 +17,23 @@ class Order(Base):
     """ 借阅订单 ORM 模型，对应 MySQL 之中的 Orders 表：
 
     CREATE TABLE IF NOT EXISTS Orders (
-        order_id VARCHAR(64) PRIMARY KEY,        		     -- 借阅单号（可以用 UUID 或系统生成编码）
+        order_id VARCHAR(64) PRIMARY KEY,        		     -- 借阅单号（时间有序的 13 位编码, 见 app/core/idgen.py）
         user_id INT NOT NULL,                     			 -- 借阅人 ID（可关联用户系统）
         book_id INT NOT NULL,                     			 -- 借阅书籍
         warehouse_name VARCHAR(100) NOT NULL,     			 -- 所借书所在图书馆/仓库
         status VARCHAR(20) NOT NULL DEFAULT 'borrowed',      -- 借阅状态
         borrow_time DATETIME NOT NULL,           			 -- 借出时间
         return_time DATETIME,                    		     -- 归还时间（可为空）
-
+        renew_count INT NOT NULL DEFAULT 0,                  -- 已续借次数 (最多两次)
+        due_time DATETIME,                                   -- 应还时间, 由借出时间与续借次数推算
+        fine INT NOT NULL DEFAULT 0,                         -- 逾期罚款 (单位: 分)
+        INDEX ix_orders_status_order_id (status, order_id)   -- 按状态分批扫描未归还订单
     );
 
+    已有的表:
+    ALTER TABLE Orders ADD COLUMN renew_count INT NOT NULL DEFAULT 0, ADD COLUMN due_time DATETIME,
+                       ADD COLUMN fine INT NOT NULL DEFAULT 0, ADD INDEX ix_orders_status_order_id (status, order_id);
+
     ALTER TABLE Orders
     ADD CONSTRAINT fk_orders_book_id
     FOREIGN KEY (book_id) REFERENCES Books(bid);
@@ -38,7 +45,8 @@ class Order(Base):
     """
     __tablename__ = "orders"
 
-    # 借阅订单号（UUID 或序列）
+    # 借阅订单号: 由 SnowflakeIdGenerator 生成的时间有序编码 (13 位 Crockford Base32), 插入总是落在聚簇索引的最右侧
+    # 如需更紧凑的存储, 可以把列改为 BIGINT 并直接存放 next_id() 的整数值, 展示时再用 encode_id 编码
     order_id = Column(String(64), primary_key=True)            
     
     # 用户 ID
@@ -56,6 +64,16 @@ class Order(Base):
     borrow_time = Column(DateTime, default=datetime.utcnow, nullable=False)  # 借书时间
     return_time = Column(DateTime, nullable=True)               # 归还时间（可为空）
 
+    # 续借次数、应还时间与逾期罚款 (分), 罚款由每日批处理任务统一计算 (见 app/service/fine_svc.py), 归还时结算
+    renew_count = Column(Integer, nullable=False, default=0, server_default="0")
+    due_time = Column(DateTime, nullable=True)
+    fine = Column(Integer, nullable=False, default=0, server_default="0")
+
+    # 罚款任务按 (status, order_id) 做键集分页, 只扫描未归还的订单
+    __table_args__ = (
+        Index("ix_orders_status_order_id", "status", "order_id"),
+    )
+
     
     # 关联到 Book 和 User
     book = relationship("Book", back_populates="orders")
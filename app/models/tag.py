@@ -0,0 +1,41 @@
+from sqlalchemy import Column, Integer, String, ForeignKey, Index
+
+from .base import Base
+
+
+class Tag(Base):
+    """ 标签字典表, 每个标签名只出现一次:
+
+        CREATE TABLE tags (
+            tid INT PRIMARY KEY AUTO_INCREMENT,
+            name VARCHAR(50) NOT NULL UNIQUE
+        );
+    """
+    __tablename__ = "tags"
+
+    tid = Column(Integer, primary_key=True, autoincrement=True)
+    name = Column(String(50), nullable=False, unique=True)
+
+
+class BookTag(Base):
+    """ 图书与标签的多对多关系, 由 books.tags (逗号分隔的字符串) 规范化而来, 在图书的新增/修改事务内同步维护:
+
+        CREATE TABLE book_tags (
+            book_id INT NOT NULL,
+            tag_id INT NOT NULL,
+            PRIMARY KEY (book_id, tag_id),
+            KEY ix_book_tags_tag_id (tag_id, book_id),
+            FOREIGN KEY (book_id) REFERENCES books(bid),
+            FOREIGN KEY (tag_id) REFERENCES tags(tid)
+        );
+
+        主键覆盖 "某本书有哪些标签", (tag_id, book_id) 索引覆盖 "某个标签下有哪些书"
+    """
+    __tablename__ = "book_tags"
+
+    book_id = Column(Integer, ForeignKey("books.bid"), primary_key=True)
+    tag_id = Column(Integer, ForeignKey("tags.tid"), primary_key=True)
+
+    __table_args__ = (
+        Index("ix_book_tags_tag_id", "tag_id", "book_id"),
+    )
@@ -12,9 +12,12 @@ class User(Base):
             name VARCHAR(100) NOT NULL,             -- 姓名
             student_id VARCHAR(20) NOT NULL UNIQUE, -- 业务唯一号码，学号，唯一，不同于底层使用的 uid
             email VARCHAR(50),     					-- 邮箱
-            phone VARCHAR(50) NOT NULL              -- 电话（可为空）
+            phone VARCHAR(50) NOT NULL,             -- 电话（可为空）
+            version INT NOT NULL DEFAULT 1          -- 行版本号, 每次更新自增, 用作 HTTP ETag
         );
 
+        已有的表: ALTER TABLE users ADD COLUMN version INT NOT NULL DEFAULT 1;
+
     """
 
     __tablename__ = "users"
@@ -27,5 +30,9 @@ class User(Base):
     email = Column(String(50), nullable=True)                           # 邮箱（可为空）
     phone = Column(String(50), nullable=False)                          # 电话
 
+    # 行版本号: 通过 ORM 更新时由 SQLAlchemy 自动加一, 与 Book.version 相同
+    version = Column(Integer, nullable=False, default=1, server_default="1")
+    __mapper_args__ = {"version_id_col": version}
+
     # 反向引用：该用户的所有借阅订单
     orders = relationship("Order", back_populates="user")
@@ -0,0 +1,21 @@
+from sqlalchemy import Column, DateTime, Integer, String
+
+from .base import Base
+
+
+class WorkerLease(Base):
+    """ 订单号生成器 worker id 的租约, 每个进程启动时领取一个未被占用 (或已过期) 的 id:
+
+        CREATE TABLE worker_leases (
+            worker_id INT PRIMARY KEY,           -- 0~1023, 主键保证同一个 id 只能被一个进程插入
+            owner VARCHAR(100) NOT NULL,         -- 主机名:pid:随机后缀
+            expires_at DATETIME NOT NULL         -- 持有者定期续约, 过期之后可以被其他进程接管
+        );
+
+        见 app/storage/worker_lease.py
+    """
+    __tablename__ = "worker_leases"
+
+    worker_id = Column(Integer, primary_key=True, autoincrement=False)
+    owner = Column(String(100), nullable=False)
+    expires_at = Column(DateTime, nullable=False)
@@ -0,0 +1,22 @@
+from pydantic import BaseModel
+from typing import List
+
+
+class WarehouseAvailability(BaseModel):
+    warehouse_name: str
+    quantity: int
+
+
+# 一本书的可借情况: 汇总数量来自 book_availability, 各馆明细来自 book_inventory (只列出 quantity > 0 的馆)
+class BookAvailabilityOut(BaseModel):
+    book_id: int
+    available: int
+    on_loan: int
+    warehouses: List[WarehouseAvailability] = []
+
+
+class ReconcileReport(BaseModel):
+    books: int              # 检查的图书数量
+    drifted: int            # 汇总表与重新计算结果不一致 (或缺失) 的图书数量
+    fixed: int              # 已重建的图书数量
+    elapsed_s: float
@@ -1,8 +1,83 @@
-from pydantic import BaseModel
-from typing import Optional
+import re
 
+from pydantic import BaseModel, ConfigDict, Field, field_validator
+from typing import Dict, Optional, List
 
-# 用户检索图书一般只用到 title 参数 (有待完善)
-class BookRetrieveReq(BaseModel):
+
+# 标签名的最大长度, 与 tags.name 的 VARCHAR(50) 一致
+TAG_MAX_LENGTH = 50
+
+_TAG_SPLIT_RE = re.compile(r"[,，;；、]")
+
+
+def parse_tags(tags: Optional[str]) -> List[str]:
+    """ "文学, 历史，科幻" -> ["文学", "历史", "科幻"], 去掉空白与重复, 保持原有顺序 """
+    if not tags:
+        return []
+    return list(dict.fromkeys(t.strip() for t in _TAG_SPLIT_RE.split(tags) if t.strip()))
+
+
+def check_tags(tags: Optional[str]) -> Optional[str]:
+    too_long = [t for t in parse_tags(tags) if len(t) > TAG_MAX_LENGTH]
+    if too_long:
+        raise ValueError(f"tag {too_long[0][:20]}... is longer than {TAG_MAX_LENGTH} characters")
+    return tags
+
+
+class BookOut(BaseModel):
+    bid: int
     title: str
-    isbn: Optional[str] = None 
\ No newline at end of file
+    author: str
+    isbn: str
+    abstract: Optional[str] = None
+    area: Optional[str] = None
+    floor: Optional[str] = None
+    tags: Optional[str] = None
+
+    model_config = ConfigDict(from_attributes=True)
+
+
+class BatchBooksOut(BaseModel):
+    total: int
+    count: int
+    books: List[BookOut]
+    facets: Optional[Dict[str, int]] = None    # 标签 -> 结果集中的图书数, 只在检索时指定 facets 才返回
+
+    model_config = ConfigDict(from_attributes=True)
+
+
+class BookCreate(BaseModel):
+    title: str
+    author: str
+    isbn: str
+    abstract: Optional[str] = None
+    area: Optional[str] = None
+    floor: Optional[str] = None
+    tags: Optional[str] = None
+
+    _check_tags = field_validator("tags")(check_tags)
+
+
+class BookUpdate(BaseModel):
+    title: Optional[str] = None
+    author: Optional[str] = None
+    abstract: Optional[str] = None
+    area: Optional[str] = None
+    floor: Optional[str] = None
+    tags: Optional[str] = None
+
+    _check_tags = field_validator("tags")(check_tags)
+
+
+# 用户检索图书一般只用到 title 参数, 检索词会同时匹配书名、作者、标签与简介; 指定 isbn 时退化为精确查询
+# 标签过滤: tags_all 全部包含 (AND), tags_any 至少包含一个 (OR), tags_not 都不包含 (NOT), 多个标签用逗号分隔;
+# facets=N 时返回结果集中图书数最多的 N 个标签及其数量
+class BookRetrieveReq(BaseModel):
+    title: str = ""
+    isbn: Optional[str] = None
+    tags_all: Optional[str] = None
+    tags_any: Optional[str] = None
+    tags_not: Optional[str] = None
+    facets: int = Field(default=0, ge=0, le=200)
+    page: int = Field(default=0, ge=0)
+    page_size: int = Field(default=10, ge=1, le=100)
@@ -0,0 +1,19 @@
+from pydantic import BaseModel, ConfigDict, Field
+from typing import Optional
+
+
+class InventoryOut(BaseModel):
+    inv_id: int
+    book_id: int
+    warehouse_name: str
+    quantity: int
+
+    model_config = ConfigDict(from_attributes=True)
+
+
+# 库存既可以用 book_id 指定图书, 也可以用 isbn 指定 (批量导入时通常只有 isbn)
+class InventoryCreate(BaseModel):
+    book_id: Optional[int] = None
+    isbn: Optional[str] = None
+    warehouse_name: str
+    quantity: int = Field(default=0, ge=0)
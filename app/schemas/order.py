@@ -0,0 +1,30 @@
+from pydantic import BaseModel, ConfigDict
+from typing import Optional
+from datetime import datetime
+
+
+class OrderOut(BaseModel):
+    order_id: str
+    user_id: int
+    book_id: int
+    warehouse_name: str
+    status: str
+    borrow_time: datetime
+    return_time: Optional[datetime] = None
+    renew_count: int = 0
+    due_time: Optional[datetime] = None
+    fine: int = 0                               # 逾期罚款, 单位: 分
+
+    model_config = ConfigDict(from_attributes=True)
+
+
+# 借阅请求: 学号 + 图书 + 借阅的图书馆
+class BorrowReq(BaseModel):
+    student_id: str
+    book_id: int
+    warehouse_name: str
+
+
+# 归还请求: 允许在另一个图书馆归还, 为空时归还到借出的图书馆
+class ReturnReq(BaseModel):
+    warehouse_name: Optional[str] = None
@@ -16,6 +16,7 @@ class BatchUsersOut(BaseModel):
     total: int
     count: int
     users: List[UserOut]
+    next_cursor: Optional[str] = None   # 下一页的游标, 为空表示已经是最后一页
 
     model_config = ConfigDict(from_attributes=True)
     
@@ -0,0 +1,59 @@
+from app.storage.book.book_interface import IAsyncBookRepository
+from app.schemas.book import (
+    BookRetrieveReq,
+    BookCreate,
+    BookUpdate,
+    BookOut,
+    BatchBooksOut
+)
+
+from typing import Optional, Dict, Tuple
+
+
+# 与 book_svc 一一对应的异步版本, 供 async def 路由调用
+
+
+# 根据 ISBN 获取图书
+async def get_book_by_isbn(repo: IAsyncBookRepository, isbn: str, to_dict: bool = True) -> Optional[Dict]:
+    book_info = await repo.get_by_isbn(isbn)
+    if not book_info:
+        return None
+    return book_info.model_dump() if to_dict else book_info
+
+
+# 图书的版本号 (用于 ETag), 不存在时返回 None
+async def get_book_version(repo: IAsyncBookRepository, isbn: str) -> Optional[str]:
+    return await repo.get_version_by_isbn(isbn)
+
+
+# 图书与它的版本号, 二者来自同一次读取; 不存在时返回 None
+async def get_book_with_version(repo: IAsyncBookRepository, isbn: str) -> Optional[Tuple[BookOut, str]]:
+    return await repo.get_with_version_by_isbn(isbn)
+
+
+# 根据技术主键 bid 获取图书
+async def get_book_by_bid(repo: IAsyncBookRepository, bid: int, to_dict: bool = True) -> Optional[Dict]:
+    book_info = await repo.get_by_bid(bid)
+    if not book_info:
+        return None
+    return book_info.model_dump() if to_dict else book_info
+
+
+# 检索图书
+async def search_book(repo: IAsyncBookRepository, req: BookRetrieveReq) -> BatchBooksOut:
+    return await repo.search_book(req)
+
+
+# 新增图书
+async def create_book(repo: IAsyncBookRepository, book_data: BookCreate) -> BookOut:
+    return await repo.create_book(book_data)
+
+
+# 更新图书信息
+async def update_book(repo: IAsyncBookRepository, isbn: str, book_data: BookUpdate) -> Optional[BookOut]:
+    return await repo.update_book(isbn, book_data)
+
+
+# 删除图书
+async def delete_book(repo: IAsyncBookRepository, isbn: str) -> Optional[BookOut]:
+    return await repo.delete_book(isbn)
@@ -0,0 +1,71 @@
+from app.storage.user.user_interface import IAsyncUserRepository
+from app.schemas.user import (
+    UserCreate, 
+    UserUpdate,
+    UserOut,
+    BatchUsersOut
+)
+
+from typing import Optional, Dict, List, Tuple
+
+
+# 与 user_svc 一一对应的异步版本, 供 async def 路由调用
+
+
+# 批量查询学生（可分页）, 深翻页请使用上一页返回的 next_cursor 作为 cursor
+async def get_batch_users(repo: IAsyncUserRepository, page: int = 0, page_size: int = 10, cursor: Optional[str] = None) -> BatchUsersOut: 
+    return await repo.get_batch_users(page=page, page_size=page_size, cursor=cursor)
+
+
+# 某一页与它的版本摘要 (用于列表的 ETag), 二者来自同一次读取
+async def get_batch_users_with_version(repo: IAsyncUserRepository, page: int = 0, page_size: int = 10, cursor: Optional[str] = None) -> Tuple[BatchUsersOut, str]:
+    return await repo.get_batch_users_with_version(page=page, page_size=page_size, cursor=cursor)
+
+
+# 某一页的版本摘要 (用于列表的 ETag), 与 get_batch_users 的参数一致
+async def get_batch_users_version(repo: IAsyncUserRepository, page: int = 0, page_size: int = 10, cursor: Optional[str] = None) -> str:
+    return await repo.get_batch_users_version(page=page, page_size=page_size, cursor=cursor)
+
+
+# 学生的版本号 (用于 ETag), 不存在时返回 None
+async def get_user_version(repo: IAsyncUserRepository, student_id: str) -> Optional[str]:
+    return await repo.get_version_by_student_id(student_id)
+
+
+# 学生与他的版本号, 二者来自同一次读取; 不存在时返回 None
+async def get_user_with_version(repo: IAsyncUserRepository, student_id: str) -> Optional[Tuple[UserOut, str]]:
+    return await repo.get_with_version_by_student_id(student_id)
+
+
+# 基于技术逐主键 uid 获取学生
+async def get_user_by_uid(repo: IAsyncUserRepository, uid: int, to_dict: bool = True) -> Optional[Dict]:
+    user_info = await repo.get_user_by_uid(uid)
+    if not user_info:
+        return None
+    return user_info.model_dump() if to_dict else user_info
+
+# 根据业务主键学号获取学生
+async def get_user_by_student_id(repo: IAsyncUserRepository, student_id: str, to_dict: bool = True) -> Optional[Dict]:
+    user_info = await repo.get_user_by_student_id(student_id)
+    if not user_info:
+        return None
+    return user_info.model_dump() if to_dict else user_info
+
+# 批量创建学生
+async def create_batch_users(repo: IAsyncUserRepository, users: List[UserCreate]) -> List[UserOut]:
+    return await repo.create_batch_users(users)
+
+
+# 创建学生
+async def create_user(repo: IAsyncUserRepository, user_data: UserCreate) -> UserOut:
+    return await repo.create_user(user_data)
+
+
+# 更新学生信息
+async def update_user(repo: IAsyncUserRepository, student_id: str, user_data: UserUpdate) -> Optional[UserOut]:
+    return await repo.update_user(student_id, user_data)
+
+
+# 删除学生
+async def delete_user(repo: IAsyncUserRepository, student_id: str) -> Optional[UserOut]:
+    return await repo.delete_user(student_id)
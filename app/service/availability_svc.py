@@ -0,0 +1,28 @@
+from typing import List
+
+from app.schemas.availability import BookAvailabilityOut, ReconcileReport
+from app.storage.availability.availability_interface import IAvailabilityRepository
+
+
+# 单次批量查询的 bid 上限, 保证 IN 列表与响应体都在可控范围内
+MAX_BATCH_BIDS = 500
+
+
+def parse_bids(raw: str) -> List[int]:
+    """ "1,2,3" -> [1, 2, 3], 去重并保持顺序 """
+    bids = list(dict.fromkeys(int(part) for part in raw.split(",") if part.strip()))
+    if not bids:
+        raise ValueError("bids must not be empty.")
+    if len(bids) > MAX_BATCH_BIDS:
+        raise ValueError(f"at most {MAX_BATCH_BIDS} bids per request, got {len(bids)}.")
+    return bids
+
+
+# 批量查询可借情况, 不论多少本书都只有两条 SQL
+def get_availability(repo: IAvailabilityRepository, bids: List[int], include_warehouses: bool = True) -> List[BookAvailabilityOut]:
+    return repo.get_many(bids, include_warehouses)
+
+
+# 对账: 从源数据重新计算并与汇总表比对; 全表扫描, 只由定时任务 (app/cli/reconcile_availability.py) 调用, 不通过 HTTP 暴露
+def reconcile(repo: IAvailabilityRepository, fix: bool = True) -> ReconcileReport:
+    return repo.reconcile(fix)
@@ -0,0 +1,56 @@
+from app.storage.book.book_interface import IBookRepository
+from app.schemas.book import (
+    BookRetrieveReq,
+    BookCreate,
+    BookUpdate,
+    BookOut,
+    BatchBooksOut
+)
+
+from typing import Optional, Dict, Tuple
+
+
+# 根据 ISBN 获取图书
+def get_book_by_isbn(repo: IBookRepository, isbn: str, to_dict: bool = True) -> Optional[Dict]:
+    book_info = repo.get_by_isbn(isbn)
+    if not book_info:
+        return None
+    return book_info.model_dump() if to_dict else book_info
+
+
+# 图书的版本号 (用于 ETag), 不存在时返回 None
+def get_book_version(repo: IBookRepository, isbn: str) -> Optional[str]:
+    return repo.get_version_by_isbn(isbn)
+
+
+# 图书与它的版本号, 二者来自同一次读取; 不存在时返回 None
+def get_book_with_version(repo: IBookRepository, isbn: str) -> Optional[Tuple[BookOut, str]]:
+    return repo.get_with_version_by_isbn(isbn)
+
+
+# 根据技术主键 bid 获取图书
+def get_book_by_bid(repo: IBookRepository, bid: int, to_dict: bool = True) -> Optional[Dict]:
+    book_info = repo.get_by_bid(bid)
+    if not book_info:
+        return None
+    return book_info.model_dump() if to_dict else book_info
+
+
+# 检索图书
+def search_book(repo: IBookRepository, req: BookRetrieveReq) -> BatchBooksOut:
+    return repo.search_book(req)
+
+
+# 新增图书
+def create_book(repo: IBookRepository, book_data: BookCreate) -> BookOut:
+    return repo.create_book(book_data)
+
+
+# 更新图书信息
+def update_book(repo: IBookRepository, isbn: str, book_data: BookUpdate) -> Optional[BookOut]:
+    return repo.update_book(isbn, book_data)
+
+
+# 删除图书
+def delete_book(repo: IBookRepository, isbn: str) -> Optional[BookOut]:
+    return repo.delete_book(isbn)
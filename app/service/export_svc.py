@@ -0,0 +1,63 @@
+import csv
+import io
+import zlib
+from datetime import datetime
+from typing import Iterator, Optional
+
+from pydantic_core import to_json
+
+from app.storage.export import EXPORT_SPECS, export_columns, stream_rows
+
+
+""" 流式导出: 把 stream_rows 逐批产出的行编码为 NDJSON 或 CSV, 可选地在流中做 gzip 压缩
+    每一批编码完成后立即产出, 不会把整张表拼成一个字符串
+"""
+
+
+FORMATS = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+
+
+def _encode_ndjson(columns, batches) -> Iterator[bytes]:
+    for batch in batches:
+        # pydantic-core 直接把 datetime 编码为 ISO 8601 字符串
+        yield b"".join(to_json(dict(zip(columns, row))) + b"\n" for row in batch)
+
+
+def _encode_csv(columns, batches) -> Iterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    for batch in batches:
+        writer.writerows(batch)
+        yield buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode("utf-8")
+
+
+def _gzip(chunks: Iterator[bytes], level: int = 6) -> Iterator[bytes]:
+    # wbits=31 输出带 gzip 头的流, 可以直接保存为 .gz 文件
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def export_stream(db, entity: str, fmt: str = "ndjson", compress: bool = False,
+                  since: Optional[datetime] = None, until: Optional[datetime] = None, batch_size: int = 5000) -> Iterator[bytes]:
+    if entity not in EXPORT_SPECS:
+        raise ValueError(f"Unknown export entity {entity}, expected one of {sorted(EXPORT_SPECS)}.")
+    if fmt not in FORMATS:
+        raise ValueError(f"Unsupported export format {fmt}, expected one of {sorted(FORMATS)}.")
+
+    columns = export_columns(entity)
+    batches = stream_rows(db, entity, since, until, batch_size)
+    chunks = _encode_ndjson(columns, batches) if fmt == "ndjson" else _encode_csv(columns, batches)
+    return _gzip(chunks) if compress else chunks
+
+
+def export_filename(entity: str, fmt: str, compress: bool) -> str:
+    return f"{entity}.{fmt}" + (".gz" if compress else "")
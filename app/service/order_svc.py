@@ -0,0 +1,29 @@
+from app.core.fine_policy import FinePolicy
+from app.storage.order.order_interface import IOrderRepository
+from app.storage.user.user_interface import IUserRepository
+from app.schemas.order import OrderOut, BorrowReq, ReturnReq
+
+from typing import Optional
+
+
+# 借阅: 学号先转换为技术主键 uid (走用户仓库, 有缓存时不访问数据库), 再由订单仓库在一个短事务内完成下单与扣减库存
+def borrow_book(order_repo: IOrderRepository, user_repo: IUserRepository, req: BorrowReq) -> OrderOut:
+    user = user_repo.get_user_by_student_id(req.student_id)
+    if not user:
+        raise ValueError(f"User with student_id {req.student_id} not found.")
+    return order_repo.borrow(user.uid, req.book_id, req.warehouse_name, FinePolicy.from_settings().loan_days)
+
+
+# 归还, 同时按归还时间结算逾期罚款
+def return_book(order_repo: IOrderRepository, order_id: str, req: Optional[ReturnReq] = None) -> OrderOut:
+    return order_repo.return_book(order_id, req.warehouse_name if req else None, FinePolicy.from_settings())
+
+
+# 续借, 借期与续借规则见 FinePolicy
+def renew_book(order_repo: IOrderRepository, order_id: str) -> OrderOut:
+    return order_repo.renew(order_id, FinePolicy.from_settings())
+
+
+# 查询订单
+def get_order(order_repo: IOrderRepository, order_id: str) -> Optional[OrderOut]:
+    return order_repo.get_order(order_id)
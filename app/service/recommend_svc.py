@@ -0,0 +1,269 @@
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+from scipy import sparse
+
+from app.core.config import get_settings
+from app.storage.loader import DataLoader
+from app.storage.order.order_interface import IOrderRepository
+from app.storage.user.user_interface import IUserRepository
+
+
+""" 基于物品的协同过滤 (item-based CF)
+
+    1. 从 orders 表读取 (user_id, book_id) 借阅记录, 构建 0/1 稀疏矩阵 X (用户 x 图书)
+    2. 共现矩阵 C = X^T X, 对角线是每本书被借阅的人数, 余弦相似度 sim(i, j) = C[i, j] / sqrt(C[i, i] * C[j, j])
+    3. 每本书只保留相似度最高的 top_k 个邻居, 组成稀疏矩阵 N
+    4. 用户打分 R = X N, 去掉已经借过的书, 每个用户保留前 top_n 本, 预先算好存进字典
+    请求时只做一次字典查询, 与用户数、图书数无关; 没有借阅记录的新用户返回全局最热门的图书
+
+    增量刷新: 只读取上次水位线之后的新借阅 ΔX, 利用 (X + ΔX)^T (X + ΔX) = C + X^T ΔX + ΔX^T X + ΔX^T ΔX 更新共现矩阵,
+    然后只重算受影响图书的邻居和受影响用户的推荐列表, 不需要整体重建。
+    borrow_time 在事务开始之前由应用服务器生成, 事务提交的顺序与它不一致, 各服务器的时钟也有偏差: 晚提交的订单可能早于水位线。
+    所以每次从 "水位线 - recommend_overlap_seconds" 开始重新读取 (读主库, 不受从库延迟影响), 重复读到的交互在 partial_fit 中去重;
+    超出重叠窗口的极端情况, 以及退还/删除的订单, 由每隔 recommend_rebuild_seconds 一次的全量重建兜底
+"""
+
+
+class ItemCFRecommender:
+    def __init__(self, top_k: int = 50, top_n: int = 20):
+        self.top_k = top_k
+        self.top_n = top_n
+
+        self.user_index: Dict[int, int] = {}    # uid -> 行号
+        self.book_index: Dict[int, int] = {}    # bid -> 列号
+        self.book_ids = np.zeros(0, dtype=np.int64)
+
+        self.X = sparse.csr_matrix((0, 0), dtype=np.float32)
+        self.C = sparse.csr_matrix((0, 0), dtype=np.float32)
+        self.N = sparse.csr_matrix((0, 0), dtype=np.float32)
+
+        self.item_neighbors: Dict[int, List[Tuple[int, float]]] = {}
+        self.user_recs: Dict[int, List[Tuple[int, float]]] = {}
+        self.popular: List[Tuple[int, float]] = []
+
+        self.watermark: Optional[datetime] = None
+        self.built_at: Optional[float] = None     # 最近一次构建或增量刷新的时间
+        self.fitted_at: Optional[float] = None    # 最近一次全量构建的时间
+        self._lock = threading.Lock()
+
+    # ---------------- 查询 ----------------
+
+    def recommend(self, uid: int) -> List[Tuple[int, float]]:
+        return self.user_recs.get(uid) or self.popular
+
+    def similar_books(self, bid: int) -> List[Tuple[int, float]]:
+        return self.item_neighbors.get(bid, [])
+
+    # ---------------- 构建 ----------------
+
+    def _index_pairs(self, pairs: Iterable[Tuple[int, int]]) -> Tuple[np.ndarray, np.ndarray]:
+        rows, cols = [], []
+        for uid, bid in pairs:
+            rows.append(self.user_index.setdefault(uid, len(self.user_index)))
+            col = self.book_index.get(bid)
+            if col is None:
+                col = self.book_index[bid] = len(self.book_index)
+            cols.append(col)
+        return np.asarray(rows, dtype=np.int64), np.asarray(cols, dtype=np.int64)
+
+    def _to_binary(self, rows: np.ndarray, cols: np.ndarray) -> sparse.csr_matrix:
+        shape = (len(self.user_index), len(self.book_index))
+        m = sparse.csr_matrix((np.ones(len(rows), dtype=np.float32), (rows, cols)), shape=shape)
+        m.data[:] = 1.0   # 重复借阅同一本书只计一次
+        return m
+
+    @staticmethod
+    def _resize(m: sparse.csr_matrix, shape: Tuple[int, int]) -> sparse.csr_matrix:
+        m = m.tocsr(copy=True)
+        m.resize(shape)
+        return m
+
+    def fit(self, interactions: Iterable[Tuple[int, int, datetime]]) -> "ItemCFRecommender":
+        """ 全量构建 """
+        with self._lock:
+            # 全量重建时清空上一次的结果, 否则不再出现在借阅记录里的图书/用户会一直保留旧的邻居和推荐列表
+            self.user_index, self.book_index = {}, {}
+            self.item_neighbors, self.user_recs = {}, {}
+            watermark = None
+
+            def pairs():
+                nonlocal watermark
+                for uid, bid, ts in interactions:
+                    if ts is not None and (watermark is None or ts > watermark):
+                        watermark = ts
+                    yield uid, bid
+
+            rows, cols = self._index_pairs(pairs())
+            self.X = self._to_binary(rows, cols)
+            self.C = (self.X.T @ self.X).tocsr()
+            self._refresh_book_ids()
+
+            self.N = sparse.csr_matrix((len(self.book_index), len(self.book_index)), dtype=np.float32)
+            self._update_neighbors(np.arange(len(self.book_index)))
+            self._update_user_recs(np.arange(len(self.user_index)))
+            self._update_popular()
+
+            self.watermark = watermark
+            self.built_at = self.fitted_at = time.time()
+        return self
+
+    def partial_fit(self, interactions: Iterable[Tuple[int, int, datetime]]) -> int:
+        """ 增量刷新, 返回新增的 (用户, 图书) 交互数量 """
+        with self._lock:
+            watermark = self.watermark
+            new_pairs = []
+            for uid, bid, ts in interactions:
+                if ts is not None and (watermark is None or ts > watermark):
+                    watermark = ts
+                new_pairs.append((uid, bid))
+
+            n_users_before = len(self.user_index)
+            rows, cols = self._index_pairs(new_pairs)
+            shape = (len(self.user_index), len(self.book_index))
+
+            X = self._resize(self.X, shape)
+            delta = self._to_binary(rows, cols)
+            # 只保留此前不存在的交互 (水位线边界上的记录可能被重复读到), 保证 0/1 矩阵的语义
+            delta = (delta - delta.multiply(X)).tocsr()
+            delta.eliminate_zeros()
+
+            self.watermark = watermark
+            if delta.nnz == 0:
+                return 0
+
+            C = self._resize(self.C, (shape[1], shape[1]))
+            cross = X.T @ delta
+            self.C = (C + cross + cross.T + delta.T @ delta).tocsr()
+            self.X = (X + delta).tocsr()
+            self.N = self._resize(self.N, (shape[1], shape[1]))
+            self._refresh_book_ids()
+
+            # 受影响的图书: 新交互涉及的图书, 以及与它们有共现的图书
+            touched_books = np.unique(delta.indices)
+            affected_books = np.unique(np.concatenate([touched_books, (self.C[touched_books] != 0).tocsr().indices]))
+            self._update_neighbors(affected_books)
+
+            # 受影响的用户: 新交互涉及的用户, 以及借过受影响图书的用户
+            affected_users = np.unique(np.concatenate([
+                np.unique(delta.tocoo().row),
+                np.arange(n_users_before, shape[0]),
+                self.X[:, affected_books].tocoo().row,
+            ]))
+            self._update_user_recs(affected_users)
+            self._update_popular()
+            self.built_at = time.time()
+            return int(delta.nnz)
+
+    def _refresh_book_ids(self) -> None:
+        book_ids = np.zeros(len(self.book_index), dtype=np.int64)
+        for bid, col in self.book_index.items():
+            book_ids[col] = bid
+        self.book_ids = book_ids
+
+    def _top(self, cols: np.ndarray, vals: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """ 取分数最高的 k 个, 分数相同时按 bid 升序, 保证全量构建与增量刷新的结果一致 """
+        if len(vals) > k:
+            # 先用 argpartition 粗筛出 >= 第 k 大分数的候选 (包含并列), 再对少量候选精确排序
+            threshold = vals[np.argpartition(-vals, k - 1)[k - 1]]
+            mask = vals >= threshold
+            cols, vals = cols[mask], vals[mask]
+        order = np.lexsort((self.book_ids[cols], -vals))[:k]
+        return cols[order], vals[order]
+
+    def _update_neighbors(self, items: np.ndarray) -> None:
+        """ 重算指定图书的 top_k 相似图书, 并写回邻居矩阵 N 对应的行 """
+        if len(items) == 0:
+            return
+
+        diag = self.C.diagonal()
+        norms = np.sqrt(np.maximum(diag, 1e-12))
+        sub = self.C[items].tocsr()
+
+        # 余弦相似度: 按行除以 norm_i, 按列除以 norm_j, 向量化完成
+        sims = sparse.diags(1.0 / norms[items]) @ sub @ sparse.diags(1.0 / norms)
+        sims = sims.tocsr()
+
+        new_rows, new_cols, new_vals = [], [], []
+        for pos, item in enumerate(items):
+            start, end = sims.indptr[pos], sims.indptr[pos + 1]
+            cols, vals = sims.indices[start:end], sims.data[start:end]
+            mask = cols != item
+            cols, vals = self._top(cols[mask], vals[mask], self.top_k)
+
+            self.item_neighbors[int(self.book_ids[item])] = [
+                (int(self.book_ids[c]), round(float(v), 4)) for c, v in zip(cols, vals)
+            ]
+            new_rows.append(np.full(len(cols), pos))
+            new_cols.append(cols)
+            new_vals.append(vals)
+
+        # 用新的行替换 N 中受影响的行: 先清空这些行, 再加上新算出的稀疏块
+        n_items = len(self.book_index)
+        keep_rows = np.ones(n_items, dtype=np.float32)
+        keep_rows[items] = 0
+        replaced = sparse.csr_matrix(
+            (np.concatenate(new_vals).astype(np.float32), (items[np.concatenate(new_rows).astype(np.int64)], np.concatenate(new_cols))),
+            shape=(n_items, n_items),
+        ) if new_vals else sparse.csr_matrix((n_items, n_items), dtype=np.float32)
+        self.N = (sparse.diags(keep_rows) @ self.N + replaced).tocsr()
+
+    def _update_user_recs(self, users: np.ndarray) -> None:
+        if len(users) == 0:
+            return
+
+        uids = np.zeros(len(self.user_index), dtype=np.int64)
+        for uid, row in self.user_index.items():
+            uids[row] = uid
+
+        # R = X N, 去掉用户已经借过的书
+        X_sub = self.X[users]
+        R = (X_sub @ self.N).tocsr()
+        R = (R - R.multiply(X_sub)).tocsr()
+        R.eliminate_zeros()
+
+        for pos, user in enumerate(users):
+            start, end = R.indptr[pos], R.indptr[pos + 1]
+            cols, vals = self._top(R.indices[start:end], R.data[start:end], self.top_n)
+            self.user_recs[int(uids[user])] = [(int(self.book_ids[c]), round(float(v), 4)) for c, v in zip(cols, vals)]
+
+    def _update_popular(self) -> None:
+        counts = np.asarray(self.X.sum(axis=0)).ravel()
+        top = np.argsort(-counts, kind="stable")[:self.top_n]
+        self.popular = [(int(self.book_ids[c]), float(counts[c])) for c in top if counts[c] > 0]
+
+
+# 进程级别的推荐模型, 启动时全量构建, 之后定期增量刷新 (见 main.py)
+recommender = ItemCFRecommender(top_k=get_settings().recommend_top_k, top_n=get_settings().recommend_top_n)
+
+
+def build_recommender(order_repo: IOrderRepository, model: ItemCFRecommender = recommender) -> ItemCFRecommender:
+    return model.fit(order_repo.iter_interactions())
+
+
+# 尚未构建或者距离上次全量构建超过 recommend_rebuild_seconds 时全量重建, 否则从水位线之前 recommend_overlap_seconds 开始增量刷新
+def refresh_recommender(order_repo: IOrderRepository, model: ItemCFRecommender = recommender) -> int:
+    settings = get_settings()
+    rebuild = settings.recommend_rebuild_seconds
+    if model.fitted_at is None or (rebuild and time.time() - model.fitted_at >= rebuild):
+        build_recommender(order_repo, model)
+        return int(model.X.nnz)
+    since = model.watermark - timedelta(seconds=settings.recommend_overlap_seconds) if model.watermark is not None else None
+    return model.partial_fit(order_repo.iter_interactions(since=since))
+
+
+# 为学生推荐图书, 返回 [{"bid": ..., "score": ...}], 只做字典查询;
+# 传入 books 加载器时附带图书详情, 逐条 load 只登记 bid, 第一次取值时所有推荐的图书合并为一次批量查询
+def recommend_for_student(user_repo: IUserRepository, student_id: str, model: ItemCFRecommender = recommender,
+                          books: Optional[DataLoader] = None) -> List[Dict]:
+    user = user_repo.get_user_by_student_id(student_id)
+    if not user:
+        raise ValueError(f"User with student_id {student_id} not found.")
+    if books is None:
+        return [{"bid": bid, "score": score} for bid, score in model.recommend(user.uid)]
+
+    pending = [(bid, score, books.load(bid)) for bid, score in model.recommend(user.uid)]
+    return [{"bid": bid, "score": score, "book": book.get()} for bid, score, book in pending]
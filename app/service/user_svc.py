@@ -2,18 +2,39 @@ from app.storage.user.user_interface import IUserRepository
 from app.schemas.user import (
     UserCreate, 
     UserUpdate,
-    UserOut
+    UserOut,
+    BatchUsersOut
 )
 
-from typing import Optional, Dict, List
+from typing import Optional, Dict, List, Tuple
 
 
-# 批量查询学生（可分页）
-def get_batch_users(repo: IUserRepository, page: int = 0, page_size: int = 10) -> List[UserOut]: 
-    user_infos = repo.get_batch_users(page=page, page_size=page_size)
+# 批量查询学生（可分页）, 深翻页请使用上一页返回的 next_cursor 作为 cursor
+def get_batch_users(repo: IUserRepository, page: int = 0, page_size: int = 10, cursor: Optional[str] = None) -> BatchUsersOut: 
+    user_infos = repo.get_batch_users(page=page, page_size=page_size, cursor=cursor)
     return user_infos
 
 
+# 某一页与它的版本摘要 (用于列表的 ETag), 二者来自同一次读取
+def get_batch_users_with_version(repo: IUserRepository, page: int = 0, page_size: int = 10, cursor: Optional[str] = None) -> Tuple[BatchUsersOut, str]:
+    return repo.get_batch_users_with_version(page=page, page_size=page_size, cursor=cursor)
+
+
+# 某一页的版本摘要 (用于列表的 ETag), 与 get_batch_users 的参数一致
+def get_batch_users_version(repo: IUserRepository, page: int = 0, page_size: int = 10, cursor: Optional[str] = None) -> str:
+    return repo.get_batch_users_version(page=page, page_size=page_size, cursor=cursor)
+
+
+# 学生的版本号 (用于 ETag), 不存在时返回 None
+def get_user_version(repo: IUserRepository, student_id: str) -> Optional[str]:
+    return repo.get_version_by_student_id(student_id)
+
+
+# 学生与他的版本号, 二者来自同一次读取; 不存在时返回 None
+def get_user_with_version(repo: IUserRepository, student_id: str) -> Optional[Tuple[UserOut, str]]:
+    return repo.get_with_version_by_student_id(student_id)
+
+
 # 基于技术逐主键 uid 获取学生
 def get_user_by_uid(repo: IUserRepository, uid: int, to_dict: bool = True) -> Optional[Dict]:
     user_info = repo.get_user_by_uid(uid)
@@ -0,0 +1,88 @@
+import threading
+from typing import Optional, List, Tuple
+from fastapi import Depends
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker
+from app.core.config import Settings, get_settings
+from app.core.metrics import instrument_engine
+from app.core.query_profiler import profile_engine_from_settings
+from app.storage.engine import create_async_engines
+from app.storage.routing import RoutingSession
+from app.storage.book.AsyncSQLAlchemyBookRepository import AsyncSQLAlchemyBookRepository
+from app.storage.book.book_interface import IAsyncBookRepository
+from app.storage.book.CachedBookRepository import AsyncCachedBookRepository
+from app.storage.book.SingleFlightBookRepository import AsyncSingleFlightBookRepository
+from app.storage.book.SnapshotBookRepository import AsyncSnapshotBookRepository
+from app.storage.book.catalog_snapshot import get_snapshot_handle
+from app.storage.cache.factory import get_cache_backend
+from app.storage.singleflight import enabled_methods
+from app.storage.user.AsyncSQLAlchemyUserRepository import AsyncSQLAlchemyUserRepository
+from app.storage.user.CachedUserRepository import AsyncCachedUserRepository
+from app.storage.user.SingleFlightUserRepository import AsyncSingleFlightUserRepository
+from app.storage.user.user_interface import IAsyncUserRepository
+
+
+# 异步引擎只在 async_mode 下才会用到, 因此延迟到第一次使用时再创建, 避免未安装 aiomysql/aiosqlite 时导入失败
+_async_engine: Optional[AsyncEngine] = None
+_async_replica_engines: List[AsyncEngine] = []
+_AsyncSessionLocal: Optional[async_sessionmaker] = None
+_async_engine_lock = threading.Lock()
+
+
+# 与 db.init_engines 相同的双重检查加锁: 启动预热在线程里调用, 也可能与事件循环上的第一个请求同时发生
+def get_async_engine(settings: Optional[Settings] = None) -> AsyncEngine:
+    global _async_engine, _async_replica_engines, _AsyncSessionLocal
+    if _async_engine is not None:
+        return _async_engine
+    with _async_engine_lock:
+        if _async_engine is None:
+            settings = settings or get_settings()
+            primary, replicas = create_async_engines(settings)
+            instrument_engine(primary.sync_engine, "async_primary")
+            for i, replica in enumerate(replicas):
+                instrument_engine(replica.sync_engine, f"async_replica{i}")
+            for e in (primary, *replicas):
+                profile_engine_from_settings(e.sync_engine, settings)
+            # 读写分离复用同步的 RoutingSession, 它的 get_bind 需要返回同步引擎 (AsyncEngine.sync_engine)
+            # 提交之后不让对象过期, 否则之后访问属性会触发隐式 IO, 这在 AsyncSession 中是不允许的
+            _AsyncSessionLocal = async_sessionmaker(
+                sync_session_class=RoutingSession, autoflush=False, expire_on_commit=False,
+                primary=primary.sync_engine, replicas=[e.sync_engine for e in replicas],
+            )
+            _async_replica_engines, _async_engine = replicas, primary
+    return _async_engine
+
+
+def get_async_engines(settings: Optional[Settings] = None) -> Tuple[AsyncEngine, List[AsyncEngine]]:
+    return get_async_engine(settings), _async_replica_engines
+
+
+def get_async_sessionmaker() -> async_sessionmaker:
+    get_async_engine()
+    return _AsyncSessionLocal
+
+
+async def get_async_db():
+    async with get_async_sessionmaker()() as db:
+        yield db
+
+
+# 与同步版本的组装顺序一致: 数据库 -> 单飞 -> 缓存 (与同步路由共用同一个缓存后端), 配置了单飞的方法在同一事件循环内合并并发的相同点查
+def get_async_user_repo(db: AsyncSession = Depends(get_async_db)) -> IAsyncUserRepository:
+    repo = AsyncSQLAlchemyUserRepository(db)
+    methods = enabled_methods()
+    if methods:
+        repo = AsyncSingleFlightUserRepository(repo, methods, db)
+    cache = get_cache_backend()
+    return AsyncCachedUserRepository(repo, cache) if cache is not None else repo
+
+
+def get_async_book_repo(db: AsyncSession = Depends(get_async_db)) -> IAsyncBookRepository:
+    repo = AsyncSQLAlchemyBookRepository(db)
+    methods = enabled_methods()
+    if methods:
+        repo = AsyncSingleFlightBookRepository(repo, methods, db)
+    snapshot = get_snapshot_handle()
+    if snapshot is not None:
+        repo = AsyncSnapshotBookRepository(repo, snapshot, db)
+    cache = get_cache_backend()
+    return AsyncCachedBookRepository(repo, cache) if cache is not None else repo
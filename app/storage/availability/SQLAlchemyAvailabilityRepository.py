@@ -0,0 +1,186 @@
+import time
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from sqlalchemy import delete, func, insert, literal, or_, select, update
+from sqlalchemy.orm import Session
+
+from app.core.db import transaction
+from app.models.book import Book
+from app.models.book_availability import BookAvailability
+from app.models.book_inventory import BookInventory
+from app.models.order import Order, OrderStatus
+from app.schemas.availability import BookAvailabilityOut, ReconcileReport, WarehouseAvailability
+from app.storage.availability.availability_interface import IAvailabilityRepository
+from app.storage.routing import read_only
+
+
+""" 可借数量汇总表 (book_availability) 的维护
+
+    - 借阅/归还: 在订单事务内对汇总行做 available -/+ 1, on_loan +/- 1 的条件增量更新 (apply_loan_delta),
+      与订单写入、库存扣减一起提交或回滚, 不会出现库存变了而汇总没变的中间状态;
+      汇总行还不存在时按源数据插入, 并发插入同一行时由 "冲突则忽略" 的插入兜底, 输的一方改为增量更新
+    - 查询: 汇总表里还没有的图书 (首次对账之前) 直接从源数据计算, 不会返回空结果
+    - 库存导入等直接改写 book_inventory 的操作: 在调用方的事务内按图书重算汇总行 (refresh_availability)
+    - 对账: 一条聚合查询从源数据重新计算所有图书, 与汇总表比对, 只重建不一致的图书
+
+    汇总表只是读优化, 源数据始终是 book_inventory 与 orders, 任何时候都可以从头重建
+"""
+
+
+CHUNK_SIZE = 1000
+
+
+def computed_availability(bids: Optional[List[int]] = None):
+    """ 从源数据重新计算的汇总: SELECT book_id, available, on_loan, 没有库存/借阅记录的图书记为 0 """
+    inventory = select(BookInventory.book_id, func.sum(BookInventory.quantity).label("available")).group_by(BookInventory.book_id)
+    loans = (
+        select(Order.book_id, func.count().label("on_loan"))
+        .where(Order.status == OrderStatus.borrowed.value)
+        .group_by(Order.book_id)
+    )
+    books = select(Book.bid)
+    if bids is not None:
+        inventory = inventory.where(BookInventory.book_id.in_(bids))
+        loans = loans.where(Order.book_id.in_(bids))
+        books = books.where(Book.bid.in_(bids))
+    inventory, loans, books = inventory.subquery(), loans.subquery(), books.subquery()
+
+    return (
+        select(books.c.bid.label("book_id"),
+               func.coalesce(inventory.c.available, 0).label("available"),
+               func.coalesce(loans.c.on_loan, 0).label("on_loan"))
+        .select_from(books)
+        .outerjoin(inventory, inventory.c.book_id == books.c.bid)
+        .outerjoin(loans, loans.c.book_id == books.c.bid)
+    )
+
+
+def refresh_availability(db, bids: List[int]) -> None:
+    """ 按源数据重算指定图书的汇总行 (先删后插); db 可以是 Session 或 Connection, 事务由调用方负责 """
+    bids = list(dict.fromkeys(bids))
+    for i in range(0, len(bids), CHUNK_SIZE):
+        chunk = bids[i:i + CHUNK_SIZE]
+        source = computed_availability(chunk).add_columns(literal(datetime.utcnow()).label("updated_at"))
+        db.execute(delete(BookAvailability).where(BookAvailability.book_id.in_(chunk)))
+        db.execute(insert(BookAvailability).from_select(["book_id", "available", "on_loan", "updated_at"], source))
+
+
+def _insert_ignore(dialect: str):
+    """ 主键冲突时什么也不做的 INSERT, 冲突时影响行数为 0 """
+    if dialect == "mysql":
+        from sqlalchemy.dialects.mysql import insert as mysql_insert
+        stmt = mysql_insert(BookAvailability)
+        return stmt.on_duplicate_key_update(book_id=stmt.inserted.book_id)
+    if dialect in ("sqlite", "postgresql"):
+        if dialect == "sqlite":
+            from sqlalchemy.dialects.sqlite import insert as dialect_insert
+        else:
+            from sqlalchemy.dialects.postgresql import insert as dialect_insert
+        return dialect_insert(BookAvailability).on_conflict_do_nothing(index_elements=["book_id"])
+    raise ValueError(f"Upsert is not supported for dialect {dialect}.")
+
+
+def _increment(db: Session, book_id: int, available: int, on_loan: int) -> int:
+    return db.execute(
+        update(BookAvailability)
+        .where(BookAvailability.book_id == book_id)
+        .values(available=BookAvailability.available + available,
+                on_loan=BookAvailability.on_loan + on_loan,
+                updated_at=datetime.utcnow())
+        .execution_options(synchronize_session=False)
+    ).rowcount
+
+
+def apply_loan_delta(db: Session, book_id: int, available: int, on_loan: int) -> None:
+    """ 借阅 (-1, +1) / 归还 (+1, -1) 时的增量更新, 必须在订单事务内调用 """
+    if _increment(db, book_id, available, on_loan):
+        return
+
+    # 汇总行还不存在 (比如上线前的历史图书, 对账任务还没跑过): 在同一事务内按源数据插入,
+    # 此时本事务已经写入的订单与库存变更对计算查询可见, 结果与增量更新一致;
+    # SELECT 末尾的 WHERE 不能省略, 否则 SQLite 会把 ON CONFLICT 解析成 JOIN 的 ON 子句
+    computed = computed_availability([book_id]).subquery()
+    source = select(computed.c.book_id, computed.c.available, computed.c.on_loan, literal(datetime.utcnow())).where(computed.c.book_id == book_id)
+    inserted = db.execute(_insert_ignore(db.get_bind().dialect.name)
+                          .from_select(["book_id", "available", "on_loan", "updated_at"], source)).rowcount
+
+    # 另一个事务抢先插入了这一行 (它的计算结果不包含本事务的变更), 在它的基础上做增量更新
+    if not inserted:
+        _increment(db, book_id, available, on_loan)
+
+
+class SQLAlchemyAvailabilityRepository(IAvailabilityRepository):
+    def __init__(self, db: Session):
+        self.db = db
+
+    # 两条 IN 查询拿到所有图书的汇总与各馆明细, 与 bids 的个数无关
+    @read_only
+    def get_many(self, bids: List[int], include_warehouses: bool = True) -> List[BookAvailabilityOut]:
+        bids = list(dict.fromkeys(bids))
+        if not bids:
+            return []
+
+        rows = self.db.execute(
+            select(BookAvailability.book_id, BookAvailability.available, BookAvailability.on_loan)
+            .where(BookAvailability.book_id.in_(bids))
+        ).all()
+
+        # 汇总表里还没有的图书 (对账任务还没有跑过) 直接从源数据计算, 首次对账之后不再走到这里
+        stored = {row.book_id for row in rows}
+        missing = [bid for bid in bids if bid not in stored]
+        if missing:
+            rows += self.db.execute(computed_availability(missing)).all()
+
+        warehouses: Dict[int, List[WarehouseAvailability]] = {}
+        if include_warehouses and rows:
+            for book_id, name, quantity in self.db.execute(
+                select(BookInventory.book_id, BookInventory.warehouse_name, BookInventory.quantity)
+                .where(BookInventory.book_id.in_([row.book_id for row in rows]), BookInventory.quantity > 0)
+                .order_by(BookInventory.book_id, BookInventory.warehouse_name)
+            ):
+                warehouses.setdefault(book_id, []).append(
+                    WarehouseAvailability.model_construct(warehouse_name=name, quantity=quantity)
+                )
+
+        # 按请求中的顺序返回
+        found = {
+            row.book_id: BookAvailabilityOut.model_construct(
+                book_id=row.book_id, available=row.available, on_loan=row.on_loan,
+                warehouses=warehouses.get(row.book_id, []),
+            )
+            for row in rows
+        }
+        return [found[bid] for bid in bids if bid in found]
+
+    def refresh(self, bids: List[int]) -> None:
+        with transaction(self.db):
+            refresh_availability(self.db, bids)
+
+    def reconcile(self, fix: bool = True) -> ReconcileReport:
+        start = time.perf_counter()
+        computed = computed_availability().subquery()
+        stored = BookAvailability.__table__
+
+        books = self.db.execute(select(func.count()).select_from(Book)).scalar_one()
+        drifted = self.db.execute(
+            select(computed.c.book_id)
+            .select_from(computed)
+            .outerjoin(stored, stored.c.book_id == computed.c.book_id)
+            .where(or_(stored.c.book_id.is_(None),
+                       stored.c.available != computed.c.available,
+                       stored.c.on_loan != computed.c.on_loan))
+            .order_by(computed.c.book_id)
+        ).scalars().all()
+
+        # 每个分块单独提交, 避免对账大表时长时间持有大量行锁
+        fixed = 0
+        if fix:
+            for i in range(0, len(drifted), CHUNK_SIZE):
+                chunk = drifted[i:i + CHUNK_SIZE]
+                with transaction(self.db):
+                    refresh_availability(self.db, chunk)
+                fixed += len(chunk)
+
+        return ReconcileReport(books=books, drifted=len(drifted), fixed=fixed,
+                               elapsed_s=round(time.perf_counter() - start, 3))
@@ -0,0 +1,16 @@
+from typing import Protocol, List
+from app.schemas.availability import BookAvailabilityOut, ReconcileReport
+
+
+class IAvailabilityRepository(Protocol):
+    # 批量查询多本书的可借情况, 不存在的 bid 不出现在结果中
+    def get_many(self, bids: List[int], include_warehouses: bool = True) -> List[BookAvailabilityOut]:
+        ...
+
+    # 从 book_inventory 与 orders 重新计算指定图书的汇总行
+    def refresh(self, bids: List[int]) -> None:
+        ...
+
+    # 全量对账: 找出汇总表与重新计算结果不一致的图书, fix 为 True 时重建这些图书的汇总行
+    def reconcile(self, fix: bool = True) -> ReconcileReport:
+        ...
@@ -0,0 +1,136 @@
+import asyncio
+from typing import Callable, Dict, Iterable, Optional, Tuple
+from sqlalchemy import delete
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from app.schemas.book import (
+    BookRetrieveReq, BookCreate, BookUpdate, 
+    BookOut, BatchBooksOut
+)
+from app.storage.book.book_interface import IAsyncBookRepository
+from app.storage.book.SQLAlchemyBookRepository import BOOK_BY_ISBN, BOOK_VERSION_BY_ISBN, BOOKS_BY_BIDS, BOOKS_BY_ISBNS
+from app.storage.book.changes import catalog_indexes, record_book_changes
+from app.storage.db import get_sessionmaker
+from app.storage.book.search_index import BookSearchIndex, book_search_index
+from app.storage.book.tag_index import TagIndex, book_tag_index, parse_tags, search_books, sync_book_tags
+from app.models.book import Book
+from app.models.book_availability import BookAvailability
+from app.models.tag import BookTag
+from app.core.db import async_transaction
+from app.storage.routing import read_only
+from app.storage.statements import in_chunks
+
+
+# AsyncSession 实现的图书仓库, 与 SQLAlchemyBookRepository 共用同一个进程内的检索索引;
+# 索引的构建与同步在工作线程里用同步会话执行 (index_sessions, 默认取同步的 sessionmaker), 全量重建不会卡住事件循环
+class AsyncSQLAlchemyBookRepository(IAsyncBookRepository):
+    def __init__(self, db: AsyncSession, index: BookSearchIndex = book_search_index, tags: TagIndex = book_tag_index,
+                 index_sessions: Optional[Callable[[], Session]] = None):
+        self.db = db
+        self.index = index
+        self.tags = tags
+        self.index_sessions = index_sessions
+
+    async def query_book(self, isbn: str) -> Optional[Book]:
+        result = await self.db.execute(BOOK_BY_ISBN, {"isbn": isbn})
+        return result.scalars().first()
+
+    @read_only
+    async def get_by_bid(self, bid: int) -> Optional[BookOut]:
+        book = await self.db.get(Book, bid)
+        return BookOut.model_validate(book) if book else None
+
+    @read_only
+    async def get_by_isbn(self, isbn: str) -> Optional[BookOut]:
+        book = await self.query_book(isbn)
+        return BookOut.model_validate(book) if book else None
+
+    @read_only
+    async def get_many_by_bid(self, bids: Iterable[int]) -> Dict[int, BookOut]:
+        return await self._get_many(BOOKS_BY_BIDS, bids, "bid")
+
+    @read_only
+    async def get_many_by_isbn(self, isbns: Iterable[str]) -> Dict[str, BookOut]:
+        return await self._get_many(BOOKS_BY_ISBNS, isbns, "isbn")
+
+    async def _get_many(self, statement, keys: Iterable, field: str) -> Dict:
+        books = {}
+        for chunk in in_chunks(keys):
+            for book in (await self.db.execute(statement, {"keys": chunk})).scalars():
+                books[getattr(book, field)] = BookOut.model_validate(book)
+        return books
+
+    @read_only
+    async def get_version_by_isbn(self, isbn: str) -> Optional[str]:
+        row = (await self.db.execute(BOOK_VERSION_BY_ISBN, {"isbn": isbn})).first()
+        return f"{row.bid}.{row.version}" if row else None
+
+    @read_only
+    async def get_with_version_by_isbn(self, isbn: str) -> Optional[Tuple[BookOut, str]]:
+        book = await self.query_book(isbn)
+        return (BookOut.model_validate(book), f"{book.bid}.{book.version}") if book else None
+
+    def _sync_indexes(self) -> None:
+        sessions = self.index_sessions or get_sessionmaker()
+        with sessions() as db:
+            catalog_indexes.sync(db)
+
+    # 检索本身是纯内存计算, 只有索引尚未构建或者需要同步变更日志时才访问数据库 (放到工作线程, 复用同步的逻辑)
+    @read_only
+    async def search_book(self, req: BookRetrieveReq) -> BatchBooksOut:
+        if req.isbn:
+            book = await self.get_by_isbn(req.isbn)
+            return BatchBooksOut(total=int(book is not None), count=int(book is not None), books=[book] if book else [])
+
+        if catalog_indexes.due():
+            await asyncio.to_thread(self._sync_indexes)
+        return search_books(req, self.index, self.tags)
+
+    async def create_book(self, book_data: BookCreate) -> Optional[BookOut]:
+        book = Book(**book_data.dict())
+
+        async with async_transaction(self.db):
+            self.db.add(book)
+            await self.db.flush()
+            await self.db.run_sync(sync_book_tags, {book.bid: parse_tags(book.tags)})
+            await self.db.run_sync(record_book_changes, [book.bid])
+
+        await self.db.refresh(book)
+        self.index.add(book)
+        self.tags.set(book.bid, parse_tags(book.tags))
+        return BookOut.model_validate(book) if book else None
+
+    async def update_book(self, isbn: str, book_data: BookUpdate) -> Optional[BookOut]:
+        book = await self.query_book(isbn)
+
+        if not book:
+            return None
+
+        changes = book_data.dict(exclude_unset=True)
+        async with async_transaction(self.db):
+            for field, value in changes.items():
+                setattr(book, field, value)
+            if "tags" in changes:
+                await self.db.run_sync(sync_book_tags, {book.bid: parse_tags(book.tags)})
+            await self.db.run_sync(record_book_changes, [book.bid])
+
+        await self.db.refresh(book)
+        self.index.add(book)
+        self.tags.set(book.bid, parse_tags(book.tags))
+        return BookOut.model_validate(book) if book else None
+
+    async def delete_book(self, isbn: str) -> Optional[BookOut]:
+        book = await self.query_book(isbn)
+        if not book: 
+            raise ValueError(f"Book with isbn {isbn} not found.")
+
+        async with async_transaction(self.db):
+            book_info = BookOut.model_validate(book)
+            await self.db.execute(delete(BookAvailability).where(BookAvailability.book_id == book_info.bid))
+            await self.db.execute(delete(BookTag).where(BookTag.book_id == book_info.bid))
+            await self.db.run_sync(record_book_changes, [book_info.bid])
+            await self.db.delete(book)
+
+        self.index.remove(book_info.bid)
+        self.tags.remove(book_info.bid)
+        return book_info
@@ -0,0 +1,212 @@
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
+
+from app.schemas.book import BookRetrieveReq, BookCreate, BookUpdate, BookOut, BatchBooksOut
+from app.storage.book.book_interface import IAsyncBookRepository, IBookRepository
+from app.storage.cache.cache_interface import ICacheBackend, pack_versioned, unpack_versioned
+from app.storage.cache.async_cache import AsyncCache
+
+
+# 读穿透缓存 (read-through): 读操作先查缓存, 未命中时回源到被包装的仓库并回填缓存; 写操作先落库, 再让相关缓存失效
+# 被包装的仓库可以是任意 IBookRepository 实现, 因此缓存层与具体的数据库工具解耦
+class CachedBookRepository(IBookRepository):
+    def __init__(self, repo: IBookRepository, cache: ICacheBackend, ttl: Optional[float] = None):
+        self.repo = repo
+        self.cache = cache
+        self.ttl = ttl
+
+    @staticmethod
+    def isbn_key(isbn: str) -> str:
+        return f"book:isbn:{isbn}"
+
+    @staticmethod
+    def bid_key(bid: int) -> str:
+        return f"book:bid:{bid}"
+
+    @staticmethod
+    def version_key(isbn: str) -> str:
+        return f"book:ver:{isbn}"
+
+    @staticmethod
+    def versioned_key(isbn: str) -> str:
+        return f"book:isbnv:{isbn}"
+
+    def _load(self, key: str, loader) -> Optional[BookOut]:
+        cached = self.cache.get(key)
+        if cached is not None:
+            return BookOut.model_validate_json(cached)
+
+        book = loader()
+        if book is not None:
+            self.cache.set(key, book.model_dump_json(), self.ttl)
+        return book
+
+    # 批量读取: 逐个键查缓存, 未命中的键合并成一次批量回源, 再逐个回填
+    def _load_many(self, keys: Iterable, key_of: Callable, loader: Callable[[List], Dict]) -> Dict:
+        books, misses = {}, []
+        for key in dict.fromkeys(keys):
+            cached = self.cache.get(key_of(key))
+            if cached is not None:
+                books[key] = BookOut.model_validate_json(cached)
+            else:
+                misses.append(key)
+
+        if misses:
+            loaded = loader(misses)
+            for key, book in loaded.items():
+                self.cache.set(key_of(key), book.model_dump_json(), self.ttl)
+            books.update(loaded)
+        return books
+
+    def _invalidate(self, isbn: str, bid: Optional[int] = None) -> None:
+        self.cache.delete(*book_cache_keys(isbn, bid))
+
+    def get_by_bid(self, bid: int) -> Optional[BookOut]:
+        return self._load(self.bid_key(bid), lambda: self.repo.get_by_bid(bid))
+
+    def get_by_isbn(self, isbn: str) -> Optional[BookOut]:
+        return self._load(self.isbn_key(isbn), lambda: self.repo.get_by_isbn(isbn))
+
+    def get_many_by_bid(self, bids: Iterable[int]) -> Dict[int, BookOut]:
+        return self._load_many(bids, self.bid_key, self.repo.get_many_by_bid)
+
+    def get_many_by_isbn(self, isbns: Iterable[str]) -> Dict[str, BookOut]:
+        return self._load_many(isbns, self.isbn_key, self.repo.get_many_by_isbn)
+
+    # 版本号本身就是字符串, 直接缓存, 条件请求命中缓存时完全不访问数据库
+    def get_version_by_isbn(self, isbn: str) -> Optional[str]:
+        key = self.version_key(isbn)
+        version = self.cache.get(key)
+        if version is None:
+            version = self.repo.get_version_by_isbn(isbn)
+            if version is not None:
+                self.cache.set(key, version, self.ttl)
+        return version
+
+    # 回源时图书与版本号来自同一次查询, 回填时顺便写入版本号的键, 之后的条件请求直接命中
+    def get_with_version_by_isbn(self, isbn: str) -> Optional[Tuple[BookOut, str]]:
+        key = self.versioned_key(isbn)
+        cached = self.cache.get(key)
+        if cached is not None:
+            return unpack_versioned(BookOut, cached)
+
+        loaded = self.repo.get_with_version_by_isbn(isbn)
+        if loaded is not None:
+            self.cache.set(key, pack_versioned(*loaded), self.ttl)
+            self.cache.set(self.version_key(isbn), loaded[1], self.ttl)
+        return loaded
+
+    # 检索结果组合太多, 命中率很低, 不做缓存
+    def search_book(self, req: BookRetrieveReq) -> BatchBooksOut:
+        return self.repo.search_book(req)
+
+    def create_book(self, data: BookCreate) -> BookOut:
+        return self.repo.create_book(data)
+
+    def update_book(self, isbn: str, data: BookUpdate) -> Optional[BookOut]:
+        book_info = self.repo.update_book(isbn, data)
+        self._invalidate(isbn, book_info.bid if book_info else None)
+        return book_info
+
+    def delete_book(self, isbn: str) -> Optional[BookOut]:
+        book_info = self.repo.delete_book(isbn)
+        self._invalidate(isbn, book_info.bid if book_info else None)
+        return book_info
+
+
+
+# 一本图书在缓存中的全部键: 仓库写入之后与批量导入 (app/cli/bulk_import.py) 每提交一块之后都按它删除
+def book_cache_keys(isbn: str, bid: Optional[int] = None) -> List[str]:
+    keys = [CachedBookRepository.isbn_key(isbn), CachedBookRepository.version_key(isbn), CachedBookRepository.versioned_key(isbn)]
+    if bid is not None:
+        keys.append(CachedBookRepository.bid_key(bid))
+    return keys
+
+# 异步版本, 缓存键、回填与失效策略与 CachedBookRepository 相同; 缓存后端的调用经过 AsyncCache, 远程后端不阻塞事件循环
+class AsyncCachedBookRepository(IAsyncBookRepository):
+    def __init__(self, repo: IAsyncBookRepository, cache: ICacheBackend, ttl: Optional[float] = None):
+        self.repo = repo
+        self.cache = AsyncCache(cache)
+        self.ttl = ttl
+
+    isbn_key = staticmethod(CachedBookRepository.isbn_key)
+    bid_key = staticmethod(CachedBookRepository.bid_key)
+    version_key = staticmethod(CachedBookRepository.version_key)
+    versioned_key = staticmethod(CachedBookRepository.versioned_key)
+
+    async def _load(self, key: str, loader: Callable[[], Awaitable]) -> Optional[BookOut]:
+        cached = await self.cache.get(key)
+        if cached is not None:
+            return BookOut.model_validate_json(cached)
+
+        book = await loader()
+        if book is not None:
+            await self.cache.set(key, book.model_dump_json(), self.ttl)
+        return book
+
+    async def _load_many(self, keys: Iterable, key_of: Callable, loader: Callable[[List], Awaitable[Dict]]) -> Dict:
+        books, misses = {}, []
+        for key in dict.fromkeys(keys):
+            cached = await self.cache.get(key_of(key))
+            if cached is not None:
+                books[key] = BookOut.model_validate_json(cached)
+            else:
+                misses.append(key)
+
+        if misses:
+            loaded = await loader(misses)
+            for key, book in loaded.items():
+                await self.cache.set(key_of(key), book.model_dump_json(), self.ttl)
+            books.update(loaded)
+        return books
+
+    async def _invalidate(self, isbn: str, bid: Optional[int] = None) -> None:
+        await self.cache.delete(*book_cache_keys(isbn, bid))
+
+    async def get_by_bid(self, bid: int) -> Optional[BookOut]:
+        return await self._load(self.bid_key(bid), lambda: self.repo.get_by_bid(bid))
+
+    async def get_by_isbn(self, isbn: str) -> Optional[BookOut]:
+        return await self._load(self.isbn_key(isbn), lambda: self.repo.get_by_isbn(isbn))
+
+    async def get_many_by_bid(self, bids: Iterable[int]) -> Dict[int, BookOut]:
+        return await self._load_many(bids, self.bid_key, self.repo.get_many_by_bid)
+
+    async def get_many_by_isbn(self, isbns: Iterable[str]) -> Dict[str, BookOut]:
+        return await self._load_many(isbns, self.isbn_key, self.repo.get_many_by_isbn)
+
+    async def get_version_by_isbn(self, isbn: str) -> Optional[str]:
+        key = self.version_key(isbn)
+        version = await self.cache.get(key)
+        if version is None:
+            version = await self.repo.get_version_by_isbn(isbn)
+            if version is not None:
+                await self.cache.set(key, version, self.ttl)
+        return version
+
+    async def get_with_version_by_isbn(self, isbn: str) -> Optional[Tuple[BookOut, str]]:
+        key = self.versioned_key(isbn)
+        cached = await self.cache.get(key)
+        if cached is not None:
+            return unpack_versioned(BookOut, cached)
+
+        loaded = await self.repo.get_with_version_by_isbn(isbn)
+        if loaded is not None:
+            await self.cache.set(key, pack_versioned(*loaded), self.ttl)
+            await self.cache.set(self.version_key(isbn), loaded[1], self.ttl)
+        return loaded
+
+    async def search_book(self, req: BookRetrieveReq) -> BatchBooksOut:
+        return await self.repo.search_book(req)
+
+    async def create_book(self, data: BookCreate) -> BookOut:
+        return await self.repo.create_book(data)
+
+    async def update_book(self, isbn: str, data: BookUpdate) -> Optional[BookOut]:
+        book_info = await self.repo.update_book(isbn, data)
+        await self._invalidate(isbn, book_info.bid if book_info else None)
+        return book_info
+
+    async def delete_book(self, isbn: str) -> Optional[BookOut]:
+        book_info = await self.repo.delete_book(isbn)
+        await self._invalidate(isbn, book_info.bid if book_info else None)
+        return book_info
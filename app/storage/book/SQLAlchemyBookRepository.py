@@ -1,41 +1,119 @@
 # app/storage/book/sqlalchemy_repo.py
-from typing import Optional, List
+from typing import Dict, Iterable, Optional, List, Tuple
+from sqlalchemy import delete
 from sqlalchemy.orm import Session
 from app.schemas.book import (
     BookRetrieveReq, BookCreate, BookUpdate, 
     BookOut, BatchBooksOut
 )
 from app.storage.book.book_interface import IBookRepository
+from app.storage.book.changes import catalog_indexes, record_book_changes
+from app.storage.book.search_index import BookSearchIndex, book_search_index
+from app.storage.book.tag_index import TagIndex, book_tag_index, parse_tags, search_books, sync_book_tags
 from app.models.book import Book
+from app.models.book_availability import BookAvailability
+from app.models.tag import BookTag
 from app.core.db import transaction
+from app.storage.projection import construct, construct_all, construct_versioned
+from app.storage.routing import read_only
+from app.storage.statements import core_column, core_columns, in_chunks, lookup, lookup_many
+
+
+# 可信投影读取时只查询 BookOut 需要的列 (见 app/storage/projection.py);
+# 热点点查预先构建为带绑定参数的语句 (见 app/storage/statements.py), 同步与异步仓库共用
+_BOOK_OUT = core_columns(Book, BookOut)
+_BID, _ISBN, _VERSION = core_column(Book.bid), core_column(Book.isbn), core_column(Book.version)
+
+BOOK_BY_ISBN = lookup([Book], Book.isbn)
+BOOK_OUT_BY_BID = lookup(_BOOK_OUT, _BID)
+BOOK_OUT_BY_ISBN = lookup(_BOOK_OUT, _ISBN)
+BOOK_VERSION_BY_ISBN = lookup([_BID, _VERSION], _ISBN)
+BOOK_OUT_VERSION_BY_ISBN = lookup([*_BOOK_OUT, _VERSION], _ISBN)
+
+BOOKS_BY_BIDS = lookup_many([Book], Book.bid)
+BOOKS_BY_ISBNS = lookup_many([Book], Book.isbn)
+BOOKS_OUT_BY_BIDS = lookup_many(_BOOK_OUT, _BID)
+BOOKS_OUT_BY_ISBNS = lookup_many(_BOOK_OUT, _ISBN)
 
 
 class SQLAlchemyBookRepository(IBookRepository):
-    def __init__(self, db: Session):
+    def __init__(self, db: Session, index: BookSearchIndex = book_search_index, trusted_reads: bool = True,
+                 tags: TagIndex = book_tag_index):
         self.db = db
+        self.index = index
+        self.tags = tags
+        self.trusted_reads = trusted_reads
         
     def query_book(self, isbn: str) -> Optional[Book]:
-        return self.db.query(Book).filter(Book.isbn == isbn).first()
+        return self.db.execute(BOOK_BY_ISBN, {"isbn": isbn}).scalars().first()
 
+    @read_only
     def get_by_bid(self, bid: int) -> Optional[BookOut]:
+        if self.trusted_reads:
+            return construct(BookOut, self.db.execute(BOOK_OUT_BY_BID, {"bid": bid}).first())
         book = self.db.get(Book, bid)
         return BookOut.model_validate(book) if book else None
 
+    @read_only
     def get_by_isbn(self, isbn: str) -> Optional[BookOut]:
+        if self.trusted_reads:
+            return construct(BookOut, self.db.execute(BOOK_OUT_BY_ISBN, {"isbn": isbn}).first())
         book = self.query_book(isbn)
         return BookOut.model_validate(book) if book else None
 
-    def search_book(self, req: BookRetrieveReq):
-        pass
+    @read_only
+    def get_many_by_bid(self, bids: Iterable[int]) -> Dict[int, BookOut]:
+        return self._get_many(BOOKS_OUT_BY_BIDS if self.trusted_reads else BOOKS_BY_BIDS, bids, "bid")
+
+    @read_only
+    def get_many_by_isbn(self, isbns: Iterable[str]) -> Dict[str, BookOut]:
+        return self._get_many(BOOKS_OUT_BY_ISBNS if self.trusted_reads else BOOKS_BY_ISBNS, isbns, "isbn")
+
+    def _get_many(self, statement, keys: Iterable, field: str) -> Dict:
+        books = {}
+        for chunk in in_chunks(keys):
+            result = self.db.execute(statement, {"keys": chunk})
+            outs = construct_all(BookOut, result) if self.trusted_reads else [BookOut.model_validate(b) for b in result.scalars()]
+            books.update((getattr(book, field), book) for book in outs)
+        return books
+
+    @read_only
+    def get_version_by_isbn(self, isbn: str) -> Optional[str]:
+        row = self.db.execute(BOOK_VERSION_BY_ISBN, {"isbn": isbn}).first()
+        return f"{row.bid}.{row.version}" if row else None
+
+    @read_only
+    def get_with_version_by_isbn(self, isbn: str) -> Optional[Tuple[BookOut, str]]:
+        if self.trusted_reads:
+            return construct_versioned(BookOut, self.db.execute(BOOK_OUT_VERSION_BY_ISBN, {"isbn": isbn}).first(), "bid")
+        book = self.query_book(isbn)
+        return (BookOut.model_validate(book), f"{book.bid}.{book.version}") if book else None
+
+    # 检索只访问内存中的倒排索引与标签位图, 不会对 books 表做 LIKE 全表扫描;
+    # 索引未就绪时先从数据库构建一次, 之后按变更日志定期同步其他进程的修改 (见 app/storage/book/changes.py)
+    @read_only
+    def search_book(self, req: BookRetrieveReq) -> BatchBooksOut:
+        if req.isbn:
+            book = self.get_by_isbn(req.isbn)
+            return BatchBooksOut(total=int(book is not None), count=int(book is not None), books=[book] if book else [])
+
+        catalog_indexes.sync(self.db)
+        return search_books(req, self.index, self.tags)
 
     def create_book(self, book_data: BookCreate) -> Optional[BookOut]:
         book = Book(**book_data.dict())
 
+        # 先 flush 拿到自增的 bid, 标签关系与图书在同一个事务里写入
         with transaction(self.db):
             self.db.add(book)
+            self.db.flush()
+            sync_book_tags(self.db, {book.bid: parse_tags(book.tags)})
+            record_book_changes(self.db, [book.bid])
         
         self.db.refresh(book)
-        return BookOut.model_validate(book).model_dump() if book else None
+        self.index.add(book)
+        self.tags.set(book.bid, parse_tags(book.tags))
+        return BookOut.model_validate(book) if book else None
 
     def update_book(self, isbn: str, book_data: BookUpdate) -> Optional[BookOut]:
         book = self.query_book(isbn)
@@ -43,12 +121,18 @@ class SQLAlchemyBookRepository(IBookRepository):
         if not book:
             return None
         
+        changes = book_data.dict(exclude_unset=True)
         with transaction(self.db):
-            for field, value in book_data.dict(exclude_unset=True).items():
+            for field, value in changes.items():
                 setattr(book, field, value)
+            if "tags" in changes:
+                sync_book_tags(self.db, {book.bid: parse_tags(book.tags)})
+            record_book_changes(self.db, [book.bid])
 
         self.db.refresh(book)
-        return BookOut.model_validate(book).model_dump() if book else None
+        self.index.add(book)
+        self.tags.set(book.bid, parse_tags(book.tags))
+        return BookOut.model_validate(book) if book else None
 
     def delete_book(self, isbn: str) -> Optional[BookOut]:
         book = self.query_book(isbn)
@@ -56,8 +140,13 @@ class SQLAlchemyBookRepository(IBookRepository):
             raise ValueError(f"Book with isbn {isbn} not found.")
         
         with transaction(self.db):
-            book_info = BookOut.model_validate(book).model_dump()
+            book_info = BookOut.model_validate(book)
+            self.db.execute(delete(BookAvailability).where(BookAvailability.book_id == book_info.bid))
+            self.db.execute(delete(BookTag).where(BookTag.book_id == book_info.bid))
+            record_book_changes(self.db, [book_info.bid])
             self.db.delete(book)
     
+        self.index.remove(book_info.bid)
+        self.tags.remove(book_info.bid)
         return book_info
         
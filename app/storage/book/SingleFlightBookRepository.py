@@ -0,0 +1,114 @@
+from typing import Awaitable, Callable, Dict, Hashable, Iterable, Optional, Set, Tuple, TypeVar
+
+from app.schemas.book import BookRetrieveReq, BookCreate, BookUpdate, BookOut, BatchBooksOut
+from app.storage.book.book_interface import IAsyncBookRepository, IBookRepository
+from app.storage.singleflight import FlightGroups, async_flights, enabled_methods, flights, in_write_transaction
+
+
+T = TypeVar("T")
+
+
+def _forget(groups: FlightGroups, isbn: str, book: Optional[BookOut]) -> None:
+    groups.forget("book.get_by_isbn", isbn)
+    groups.forget("book.get_version_by_isbn", isbn)
+    groups.forget("book.get_with_version_by_isbn", isbn)
+    if book is not None:
+        groups.forget("book.get_by_bid", book.bid)
+
+
+# 单飞层包在 SQL 仓库外、缓存层内: 缓存一起未命中时, 同一个 isbn/bid 的并发点查只有一次真正访问数据库, 其余调用共享它的结果
+# (见 app/storage/singleflight.py); 只有 methods 中列出的方法 (配置 singleflight_methods) 会合并, 其余方法直接透传;
+# db 为请求的会话, 会话里已经有写操作时不合并, 避免读到其他会话开始的、看不到本事务写入的那次加载
+class SingleFlightBookRepository(IBookRepository):
+    def __init__(self, repo: IBookRepository, methods: Optional[Set[str]] = None, db=None):
+        self.repo = repo
+        self.methods = enabled_methods() if methods is None else methods
+        self.db = db
+
+    def _do(self, method: str, key: Hashable, fn: Callable[[], T]) -> T:
+        if method not in self.methods or in_write_transaction(self.db):
+            return fn()
+        return flights.get(method).do(key, fn)
+
+    def get_by_bid(self, bid: int) -> Optional[BookOut]:
+        return self._do("book.get_by_bid", bid, lambda: self.repo.get_by_bid(bid))
+
+    def get_by_isbn(self, isbn: str) -> Optional[BookOut]:
+        return self._do("book.get_by_isbn", isbn, lambda: self.repo.get_by_isbn(isbn))
+
+    # 批量读取的键集合各不相同, 很难恰好重合, 不做合并
+    def get_many_by_bid(self, bids: Iterable[int]) -> Dict[int, BookOut]:
+        return self.repo.get_many_by_bid(bids)
+
+    def get_many_by_isbn(self, isbns: Iterable[str]) -> Dict[str, BookOut]:
+        return self.repo.get_many_by_isbn(isbns)
+
+    def get_version_by_isbn(self, isbn: str) -> Optional[str]:
+        return self._do("book.get_version_by_isbn", isbn, lambda: self.repo.get_version_by_isbn(isbn))
+
+    def get_with_version_by_isbn(self, isbn: str) -> Optional[Tuple[BookOut, str]]:
+        return self._do("book.get_with_version_by_isbn", isbn, lambda: self.repo.get_with_version_by_isbn(isbn))
+
+    def search_book(self, req: BookRetrieveReq) -> BatchBooksOut:
+        return self.repo.search_book(req)
+
+    def create_book(self, data: BookCreate) -> BookOut:
+        return self.repo.create_book(data)
+
+    # 写入之后释放对应的键, 之后的读取不会再加入写入之前开始的那次加载
+    def update_book(self, isbn: str, data: BookUpdate) -> Optional[BookOut]:
+        book = self.repo.update_book(isbn, data)
+        _forget(flights, isbn, book)
+        return book
+
+    def delete_book(self, isbn: str) -> Optional[BookOut]:
+        book = self.repo.delete_book(isbn)
+        _forget(flights, isbn, book)
+        return book
+
+
+# 异步版本: follower 在事件循环里等待 leader 的 Future, 不占用线程
+class AsyncSingleFlightBookRepository(IAsyncBookRepository):
+    def __init__(self, repo: IAsyncBookRepository, methods: Optional[Set[str]] = None, db=None):
+        self.repo = repo
+        self.methods = enabled_methods() if methods is None else methods
+        self.db = db
+
+    async def _do(self, method: str, key: Hashable, fn: Callable[[], Awaitable[T]]) -> T:
+        if method not in self.methods or in_write_transaction(self.db):
+            return await fn()
+        return await async_flights.get(method).do(key, fn)
+
+    async def get_by_bid(self, bid: int) -> Optional[BookOut]:
+        return await self._do("book.get_by_bid", bid, lambda: self.repo.get_by_bid(bid))
+
+    async def get_by_isbn(self, isbn: str) -> Optional[BookOut]:
+        return await self._do("book.get_by_isbn", isbn, lambda: self.repo.get_by_isbn(isbn))
+
+    async def get_many_by_bid(self, bids: Iterable[int]) -> Dict[int, BookOut]:
+        return await self.repo.get_many_by_bid(bids)
+
+    async def get_many_by_isbn(self, isbns: Iterable[str]) -> Dict[str, BookOut]:
+        return await self.repo.get_many_by_isbn(isbns)
+
+    async def get_version_by_isbn(self, isbn: str) -> Optional[str]:
+        return await self._do("book.get_version_by_isbn", isbn, lambda: self.repo.get_version_by_isbn(isbn))
+
+    async def get_with_version_by_isbn(self, isbn: str) -> Optional[Tuple[BookOut, str]]:
+        return await self._do("book.get_with_version_by_isbn", isbn, lambda: self.repo.get_with_version_by_isbn(isbn))
+
+    async def search_book(self, req: BookRetrieveReq) -> BatchBooksOut:
+        return await self.repo.search_book(req)
+
+    async def create_book(self, data: BookCreate) -> BookOut:
+        return await self.repo.create_book(data)
+
+    async def update_book(self, isbn: str, data: BookUpdate) -> Optional[BookOut]:
+        book = await self.repo.update_book(isbn, data)
+        _forget(async_flights, isbn, book)
+        return book
+
+    async def delete_book(self, isbn: str) -> Optional[BookOut]:
+        book = await self.repo.delete_book(isbn)
+        _forget(async_flights, isbn, book)
+        return book
@@ -0,0 +1,134 @@
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.schemas.book import BookRetrieveReq, BookCreate, BookUpdate, BookOut, BatchBooksOut
+from app.storage.book.book_interface import IAsyncBookRepository, IBookRepository
+from app.storage.book.catalog_snapshot import SnapshotHandle, SnapshotView
+
+
+def _split(view: Optional[SnapshotView], keys: Iterable, field: str) -> Tuple[Dict, List]:
+    """ 批量点查: 快照里能读到的直接返回, 其余的键 (快照之后新增或修改过的图书) 留给调用方一次性回源 """
+    get = getattr(view, f"get_by_{field}") if view is not None else None
+    books, misses = {}, []
+    for key in dict.fromkeys(keys):
+        book = get(key) if get is not None else None
+        if book is not None:
+            books[key] = book
+        else:
+            misses.append(key)
+    return books, misses
+
+
+def _touch(handle: SnapshotHandle, book: Optional[BookOut]) -> None:
+    if book is not None:
+        handle.touch(book.bid)
+
+
+# 按 isbn/bid 的点查先读目录快照 (进程间共享的 mmap 文件), 快照里没有的图书 (快照之后新增的) 以及变更日志里
+# 快照之后被修改过的图书回源到被包装的仓库; 版本号 (ETag) 不从快照读取, 总是交给被包装的仓库。
+# 读取前先让句柄按 check_seconds 拉取一次变更日志 (db 为当前请求的会话, 变更日志从主库读取)
+class SnapshotBookRepository(IBookRepository):
+    def __init__(self, repo: IBookRepository, handle: SnapshotHandle, db: Session):
+        self.repo = repo
+        self.handle = handle
+        self.db = db
+
+    def _view(self) -> Optional[SnapshotView]:
+        self.handle.sync(self.db)
+        return self.handle.view()
+
+    def get_by_bid(self, bid: int) -> Optional[BookOut]:
+        view = self._view()
+        book = view.get_by_bid(bid) if view else None
+        return book if book is not None else self.repo.get_by_bid(bid)
+
+    def get_by_isbn(self, isbn: str) -> Optional[BookOut]:
+        view = self._view()
+        book = view.get_by_isbn(isbn) if view else None
+        return book if book is not None else self.repo.get_by_isbn(isbn)
+
+    def get_many_by_bid(self, bids: Iterable[int]) -> Dict[int, BookOut]:
+        books, misses = _split(self._view(), bids, "bid")
+        return {**books, **self.repo.get_many_by_bid(misses)} if misses else books
+
+    def get_many_by_isbn(self, isbns: Iterable[str]) -> Dict[str, BookOut]:
+        books, misses = _split(self._view(), isbns, "isbn")
+        return {**books, **self.repo.get_many_by_isbn(misses)} if misses else books
+
+    def get_version_by_isbn(self, isbn: str) -> Optional[str]:
+        return self.repo.get_version_by_isbn(isbn)
+
+    # 图书与版本号必须来自同一次读取, 直接交给被包装的仓库
+    def get_with_version_by_isbn(self, isbn: str) -> Optional[Tuple[BookOut, str]]:
+        return self.repo.get_with_version_by_isbn(isbn)
+
+    def search_book(self, req: BookRetrieveReq) -> BatchBooksOut:
+        return self.repo.search_book(req)
+
+    def create_book(self, data: BookCreate) -> BookOut:
+        return self.repo.create_book(data)
+
+    def update_book(self, isbn: str, data: BookUpdate) -> Optional[BookOut]:
+        book = self.repo.update_book(isbn, data)
+        _touch(self.handle, book)
+        return book
+
+    def delete_book(self, isbn: str) -> Optional[BookOut]:
+        book = self.repo.delete_book(isbn)
+        _touch(self.handle, book)
+        return book
+
+
+# 异步版本: 快照查询是纯内存操作, 不需要 await; 只有到了拉取间隔才通过 run_sync 拉取变更日志
+class AsyncSnapshotBookRepository(IAsyncBookRepository):
+    def __init__(self, repo: IAsyncBookRepository, handle: SnapshotHandle, db: AsyncSession):
+        self.repo = repo
+        self.handle = handle
+        self.db = db
+
+    async def _view(self) -> Optional[SnapshotView]:
+        if self.handle.due():
+            await self.db.run_sync(self.handle.sync)
+        return self.handle.view()
+
+    async def get_by_bid(self, bid: int) -> Optional[BookOut]:
+        view = await self._view()
+        book = view.get_by_bid(bid) if view else None
+        return book if book is not None else await self.repo.get_by_bid(bid)
+
+    async def get_by_isbn(self, isbn: str) -> Optional[BookOut]:
+        view = await self._view()
+        book = view.get_by_isbn(isbn) if view else None
+        return book if book is not None else await self.repo.get_by_isbn(isbn)
+
+    async def get_many_by_bid(self, bids: Iterable[int]) -> Dict[int, BookOut]:
+        books, misses = _split(await self._view(), bids, "bid")
+        return {**books, **await self.repo.get_many_by_bid(misses)} if misses else books
+
+    async def get_many_by_isbn(self, isbns: Iterable[str]) -> Dict[str, BookOut]:
+        books, misses = _split(await self._view(), isbns, "isbn")
+        return {**books, **await self.repo.get_many_by_isbn(misses)} if misses else books
+
+    async def get_version_by_isbn(self, isbn: str) -> Optional[str]:
+        return await self.repo.get_version_by_isbn(isbn)
+
+    async def get_with_version_by_isbn(self, isbn: str) -> Optional[Tuple[BookOut, str]]:
+        return await self.repo.get_with_version_by_isbn(isbn)
+
+    async def search_book(self, req: BookRetrieveReq) -> BatchBooksOut:
+        return await self.repo.search_book(req)
+
+    async def create_book(self, data: BookCreate) -> BookOut:
+        return await self.repo.create_book(data)
+
+    async def update_book(self, isbn: str, data: BookUpdate) -> Optional[BookOut]:
+        book = await self.repo.update_book(isbn, data)
+        _touch(self.handle, book)
+        return book
+
+    async def delete_book(self, isbn: str) -> Optional[BookOut]:
+        book = await self.repo.delete_book(isbn)
+        _touch(self.handle, book)
+        return book
@@ -1,4 +1,4 @@
-from typing import Protocol, Optional, List, Union
+from typing import Protocol, Optional, List, Union, Dict, Iterable, Tuple
 from app.schemas.book import BookRetrieveReq, BookOut, BatchBooksOut, BookUpdate, BookCreate
 
 
@@ -10,6 +10,21 @@ class IBookRepository(Protocol):
     def get_by_isbn(self, isbn: str) -> Optional[BookOut]: 
         ...
 
+    # 批量点查: 返回 {键: 图书}, 不存在的键不出现在结果中; 键会被去重, 过长的列表按块拆成多条 IN 查询
+    def get_many_by_bid(self, bids: Iterable[int]) -> Dict[int, BookOut]:
+        ...
+
+    def get_many_by_isbn(self, isbns: Iterable[str]) -> Dict[str, BookOut]:
+        ...
+
+    # 只读取主键与版本号, 用于生成 ETag, 不加载整行数据; 图书不存在时返回 None
+    def get_version_by_isbn(self, isbn: str) -> Optional[str]:
+        ...
+
+    # 图书与版本号在同一次查询中读出, 保证响应体与 ETag 对应同一个版本; 图书不存在时返回 None
+    def get_with_version_by_isbn(self, isbn: str) -> Optional[Tuple[BookOut, str]]:
+        ...
+
     # 复杂检索（分页/排序/过滤/模糊）
     def search_book(self, req: BookRetrieveReq) -> BatchBooksOut: 
         ...
@@ -22,4 +37,37 @@ class IBookRepository(Protocol):
         ...
     
     def delete_book(self, isbn: int) -> Optional[BookOut]: 
-        ...
\ No newline at end of file
+        ...
+
+
+# 异步版本的图书仓库协议, 方法与 IBookRepository 一一对应
+class IAsyncBookRepository(Protocol):
+    async def get_by_bid(self, bid: int) -> Optional[BookOut]: 
+        ...
+    
+    async def get_by_isbn(self, isbn: str) -> Optional[BookOut]: 
+        ...
+
+    async def get_many_by_bid(self, bids: Iterable[int]) -> Dict[int, BookOut]:
+        ...
+
+    async def get_many_by_isbn(self, isbns: Iterable[str]) -> Dict[str, BookOut]:
+        ...
+
+    async def get_version_by_isbn(self, isbn: str) -> Optional[str]:
+        ...
+
+    async def get_with_version_by_isbn(self, isbn: str) -> Optional[Tuple[BookOut, str]]:
+        ...
+
+    async def search_book(self, req: BookRetrieveReq) -> BatchBooksOut: 
+        ...
+
+    async def create_book(self, data: BookCreate) -> BookOut: 
+        ...
+    
+    async def update_book(self, isbn: str, data: BookUpdate) -> Optional[BookOut]: 
+        ...
+    
+    async def delete_book(self, isbn: str) -> Optional[BookOut]: 
+        ...
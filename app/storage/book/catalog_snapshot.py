@@ -0,0 +1,322 @@
+import mmap
+import os
+import struct
+import threading
+import time
+import zlib
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Dict, FrozenSet, Iterable, Optional, Tuple
+
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.core.config import get_settings
+from app.models.book import Book
+from app.schemas.book import BookOut
+from app.storage.book.changes import ChangeCursor
+from app.storage.routing import primary_context
+
+
+""" 图书目录的只读快照文件 (列式存储 + mmap)
+
+    books 表基本是静态的。导出任务把整张表写成一个紧凑的列式文件,
+    每个 worker 进程用 mmap 只读映射同一个文件: 数据只在操作系统的页缓存里存一份, 多个进程共享, 打开时不做反序列化,
+    查询时只读取命中的那一行用到的字节。
+
+    文件布局 (小端, 每个段按 8 字节对齐):
+
+        header   : magic "BHCS" | 格式版本 u32 | 快照版本 u64 | 生成时间 f64 | 变更日志起点 seq u64 | 起点时的数据库时间 f64 |
+                   行数 u64 | 哈希桶数 u64 | 段数 u32
+        sections : 段数 x (offset u64, length u64)
+        bid       i8[n]      按 bid 升序, get_by_bid 用二分查找
+        index     i4[buckets] ISBN -> 行号的开放寻址哈希表 (crc32, 线性探测, -1 表示空桶), 桶数为 2 的幂且不少于 2n
+        每个字符串列 (BookOut 中 bid 以外的字段) 各三段: offsets i8[n+1] | data (UTF-8) | nulls u1[n]
+
+    替换: 导出任务先写临时文件, fsync 之后 os.replace 到目标路径 (原子替换目录项)。
+    已经映射旧文件的进程不受影响 (旧 inode 在最后一个映射释放前不会被回收), SnapshotHandle 定期检查文件是否被替换,
+    发现新版本时打开新文件并替换引用, worker 不需要重启
+
+    库存与可借数量变化频繁, 不写进快照, 以 book_availability 为准。
+
+    一致性: 导出开始读取之前先记下变更日志 (book_changes) 的位置, 写在文件头里。各进程从这个位置起拉取变更日志,
+    导出之后 (包括导出期间) 被任何进程或批量导入修改过的图书都不再从快照读取; 快照只提供图书内容,
+    版本号 (ETag) 总是从数据库读取。快照位于缓存之下 (数据库 -> 单飞 -> 快照 -> 缓存), 缓存的失效方式与没有快照时相同
+"""
+
+
+MAGIC = b"BHCS"
+FORMAT_VERSION = 3
+STRING_COLUMNS = tuple(name for name in BookOut.model_fields if name != "bid")
+
+_HEADER = struct.Struct("<4sIQdQdQQI")
+_EPOCH = datetime(1970, 1, 1)
+_SECTION = struct.Struct("<QQ")
+_SECTION_NAMES = ("bid", "index",
+                  *(f"{name}.{part}" for name in STRING_COLUMNS for part in ("offsets", "data", "nulls")))
+
+
+def _hash(key: bytes) -> int:
+    # 不能用内置 hash(): 每个进程的字符串哈希种子不同, 而哈希表要在导出进程与所有 worker 之间保持一致
+    return zlib.crc32(key)
+
+
+def _bucket_count(rows: int) -> int:
+    buckets = 8
+    while buckets < rows * 2:
+        buckets *= 2
+    return buckets
+
+
+def build_sections(books: Iterable[Tuple]) -> Tuple[int, int, Dict[str, bytes]]:
+    """ books: 按 bid 升序的 (bid, title, author, isbn, abstract, area, floor, tags) """
+    bids = []
+    strings = {name: ([0], bytearray(), bytearray()) for name in STRING_COLUMNS}
+    isbns = []
+
+    for row in books:
+        bid, *values = row
+        bids.append(bid)
+        for name, value in zip(STRING_COLUMNS, values):
+            offsets, data, nulls = strings[name]
+            if value is not None:
+                data += value.encode()
+            offsets.append(len(data))
+            nulls.append(value is None)
+        isbns.append(values[STRING_COLUMNS.index("isbn")].encode())
+
+    rows, buckets = len(isbns), _bucket_count(len(isbns))
+    index = np.full(buckets, -1, dtype="<i4")
+    mask = buckets - 1
+    for row, isbn in enumerate(isbns):
+        slot = _hash(isbn) & mask
+        while index[slot] != -1:
+            slot = (slot + 1) & mask
+        index[slot] = row
+
+    sections = {"bid": np.asarray(bids, dtype="<i8").tobytes(), "index": index.tobytes()}
+    for name, (offsets, data, nulls) in strings.items():
+        sections[f"{name}.offsets"] = np.asarray(offsets, dtype="<i8").tobytes()
+        sections[f"{name}.data"] = bytes(data)
+        sections[f"{name}.nulls"] = bytes(nulls)
+    return rows, buckets, sections
+
+
+def write_snapshot(path: str, books: Iterable[Tuple], version: int, cursor: ChangeCursor) -> Dict:
+    """ cursor: 读取 books 之前创建的变更日志位置, 读取快照的进程从这里开始拉取变更 """
+    rows, buckets, sections = build_sections(books)
+    created_at = time.time()
+
+    # 先算出每个段的偏移, 段之间按 8 字节对齐, 保证数值列可以直接作为 numpy 数组映射
+    offset = _HEADER.size + _SECTION.size * len(_SECTION_NAMES)
+    layout = []
+    for name in _SECTION_NAMES:
+        offset += -offset % 8
+        layout.append((offset, len(sections[name])))
+        offset += len(sections[name])
+
+    tmp_path = f"{path}.tmp.{os.getpid()}"
+    with open(tmp_path, "wb") as f:
+        f.write(_HEADER.pack(MAGIC, FORMAT_VERSION, version, created_at, cursor.stable,
+                             (cursor.polled_at - _EPOCH).total_seconds(), rows, buckets, len(_SECTION_NAMES)))
+        for section_offset, length in layout:
+            f.write(_SECTION.pack(section_offset, length))
+        for name, (section_offset, _) in zip(_SECTION_NAMES, layout):
+            f.write(b"\0" * (section_offset - f.tell()))
+            f.write(sections[name])
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+    return {"path": path, "version": version, "rows": rows, "bytes": offset}
+
+
+def read_version(path: str) -> int:
+    """ 已有快照的版本号, 文件不存在或格式不对时返回 0 """
+    try:
+        with open(path, "rb") as f:
+            magic, _, version, *_ = _HEADER.unpack(f.read(_HEADER.size))
+        return version if magic == MAGIC else 0
+    except (OSError, struct.error):
+        return 0
+
+
+# 图书按 bid 升序流式读出, 全程一条 SQL;
+# 变更日志的位置在读取之前记下, 读取期间提交的修改会在各进程拉取变更时被标记
+def export_catalog_snapshot(db: Session, path: str, batch_size: int = 10000) -> Dict:
+    with primary_context():
+        cursor = ChangeCursor.start(db)
+    statement = (
+        select(Book.bid, *(getattr(Book, name) for name in STRING_COLUMNS))
+        .order_by(Book.bid)
+        .execution_options(yield_per=batch_size)
+    )
+    return write_snapshot(path, (tuple(row) for row in db.execute(statement)), read_version(path) + 1, cursor)
+
+
+class CatalogSnapshot:
+    """ 一个已映射的快照版本; 只读, 可以被多个线程同时查询 """
+
+    def __init__(self, path: str):
+        with open(path, "rb") as f:
+            self.file_id = _file_id(os.fstat(f.fileno()))
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, fmt, self.version, self.created_at, self.change_seq, changes_at, self.rows, buckets, count = _HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC or fmt != FORMAT_VERSION or count != len(_SECTION_NAMES):
+            raise ValueError(f"{path} is not a catalog snapshot (format {FORMAT_VERSION}).")
+        self.changes_at = _EPOCH + timedelta(seconds=changes_at)
+
+        layout = [_SECTION.unpack_from(self._mm, _HEADER.size + i * _SECTION.size) for i in range(count)]
+        sections = dict(zip(_SECTION_NAMES, layout))
+
+        # 数值列直接以 mmap 为缓冲区构造 numpy 数组, 不复制数据
+        def array(name, dtype):
+            offset, length = sections[name]
+            return np.frombuffer(self._mm, dtype=dtype, count=length // np.dtype(dtype).itemsize, offset=offset)
+
+        self._bid = array("bid", "<i8")
+        self._index = array("index", "<i4")
+        self._mask = len(self._index) - 1
+        self._strings = {
+            name: (array(f"{name}.offsets", "<i8"), sections[f"{name}.data"][0], array(f"{name}.nulls", "u1"))
+            for name in STRING_COLUMNS
+        }
+
+    def _string(self, name: str, row: int) -> Optional[str]:
+        offsets, base, nulls = self._strings[name]
+        if nulls[row]:
+            return None
+        return self._mm[base + int(offsets[row]):base + int(offsets[row + 1])].decode()
+
+    def row_of_isbn(self, isbn: str) -> int:
+        key = isbn.encode()
+        offsets, base, _ = self._strings["isbn"]
+        slot = _hash(key) & self._mask
+        while True:
+            row = int(self._index[slot])
+            if row < 0:
+                return -1
+            if self._mm[base + int(offsets[row]):base + int(offsets[row + 1])] == key:
+                return row
+            slot = (slot + 1) & self._mask
+
+    def row_of_bid(self, bid: int) -> int:
+        row = int(np.searchsorted(self._bid, bid))
+        return row if row < self.rows and self._bid[row] == bid else -1
+
+    def book(self, row: int) -> BookOut:
+        return BookOut.model_construct(bid=int(self._bid[row]), **{name: self._string(name, row) for name in STRING_COLUMNS})
+
+    def get_by_isbn(self, isbn: str) -> Optional[BookOut]:
+        row = self.row_of_isbn(isbn)
+        return self.book(row) if row >= 0 else None
+
+    def get_by_bid(self, bid: int) -> Optional[BookOut]:
+        row = self.row_of_bid(bid)
+        return self.book(row) if row >= 0 else None
+
+    def change_cursor(self) -> ChangeCursor:
+        """ 导出开始时的变更日志位置, 从这里拉取的变更覆盖了快照之后的所有修改 """
+        return ChangeCursor(self.change_seq, self.changes_at)
+
+
+def _file_id(st: os.stat_result) -> Tuple[int, int, int]:
+    return st.st_ino, st.st_mtime_ns, st.st_size
+
+
+@dataclass(frozen=True)
+class SnapshotView:
+    """ 一个快照与它之后被修改过的图书 (stale); 两者一起替换, 读取方不会拿到不匹配的组合 """
+    snapshot: CatalogSnapshot
+    stale: FrozenSet[int]
+
+    def get_by_bid(self, bid: int) -> Optional[BookOut]:
+        return self.snapshot.get_by_bid(bid) if bid not in self.stale else None
+
+    def get_by_isbn(self, isbn: str) -> Optional[BookOut]:
+        book = self.snapshot.get_by_isbn(isbn)
+        return book if book is not None and book.bid not in self.stale else None
+
+
+class SnapshotHandle:
+    """ 持有当前快照, 并按变更日志维护快照之后被修改过的图书
+
+        - 每隔 check_seconds 由某一个请求执行一次 sync: 检查文件是否被替换, 再从主库拉取变更日志; 其他请求不等待
+        - 新映射的快照从文件头记录的位置开始拉取, 拉取成功之前不使用
+        - 变更日志已被清理到快照的位置之后 (无法确认哪些图书被改过), 或者改过的图书超过 max_stale 时, 快照停用,
+          直到导出任务生成新的快照
+        - 本进程的写操作立即标记对应的图书, 不等下一次拉取
+
+        旧快照不主动 close: 其它线程可能还在读它, 而且 numpy 数组引用着 mmap 的缓冲区;
+        最后一个引用释放后映射随对象一起回收
+    """
+
+    def __init__(self, path: str, check_seconds: float = 5, max_stale: int = 100000):
+        self.path = path
+        self.check_seconds = check_seconds
+        self.max_stale = max_stale
+        self._snapshot: Optional[CatalogSnapshot] = None
+        self._cursor: Optional[ChangeCursor] = None      # 为 None 时当前快照不可用
+        self._stale: FrozenSet[int] = frozenset()
+        self._view: Optional[SnapshotView] = None
+        self._checked_at = float("-inf")
+        self._sync_lock = threading.Lock()
+        self._stale_lock = threading.Lock()
+        self.reloads = 0
+
+    def view(self) -> Optional[SnapshotView]:
+        return self._view
+
+    def due(self) -> bool:
+        return time.monotonic() - self._checked_at >= self.check_seconds
+
+    def touch(self, *bids: int) -> None:
+        with self._stale_lock:
+            self._stale = self._stale | frozenset(bids)
+            if self._view is not None:
+                self._view = SnapshotView(self._view.snapshot, self._stale)
+
+    def sync(self, db) -> None:
+        if not self.due() or not self._sync_lock.acquire(blocking=False):
+            return
+        try:
+            self._checked_at = time.monotonic()
+            self._reload_file()
+            if self._cursor is None:
+                return
+            with primary_context():
+                bids = self._cursor.poll(db, max(self.max_stale - len(self._stale), 0))
+            with self._stale_lock:
+                if bids is None:
+                    self._cursor, self._view = None, None
+                    return
+                self._stale = self._stale | frozenset(bids)
+                self._view = SnapshotView(self._snapshot, self._stale)
+        finally:
+            self._sync_lock.release()
+
+    def _reload_file(self) -> None:
+        try:
+            file_id = _file_id(os.stat(self.path))
+        except FileNotFoundError:
+            return
+        if self._snapshot is not None and file_id == self._snapshot.file_id:
+            return
+        snapshot = CatalogSnapshot(self.path)
+        with self._stale_lock:
+            self._snapshot, self._cursor = snapshot, snapshot.change_cursor()
+            self._stale, self._view = frozenset(), None
+        self.reloads += 1
+
+
+# 快照句柄是进程级别的单例, 与缓存后端一样在模块级别持有; 未配置 catalog_snapshot_path 时为 None
+_handle: Optional[SnapshotHandle] = None
+
+
+def get_snapshot_handle() -> Optional[SnapshotHandle]:
+    global _handle
+    settings = get_settings()
+    if _handle is None and settings.catalog_snapshot_path:
+        _handle = SnapshotHandle(settings.catalog_snapshot_path, settings.catalog_snapshot_check_seconds)
+    return _handle
@@ -0,0 +1,181 @@
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Callable, Iterable, List, Optional, Set
+
+from sqlalchemy import delete, func, insert, select
+
+from app.core.config import get_settings
+from app.models.book_change import BookChange
+from app.storage.routing import primary_context
+
+
+""" 图书变更日志 (book_changes) 与进程内存索引的跨进程同步
+
+    检索索引、标签索引与目录快照都是每个 worker 进程各自持有的内存结构, 进程内的写操作可以直接更新它们,
+    但其他 worker 与批量导入 (CLI) 的写入只有数据库能看到。所有修改图书的事务都在 book_changes 追加一行
+    (record_book_changes), 各进程按 seq 增量拉取 (ChangeCursor), 重新加载修改过的图书。
+
+    自增 seq 在插入时分配, 但事务的提交顺序可能不同: seq 较小的事务可能更晚提交, 只按 "seq > 上次读到的最大值" 拉取会永久漏掉它。
+    所以游标只把 "changed_at 早于 OVERLAP_SECONDS 之前" 的位置当作稳定位置, 每次从稳定位置重新读取, 用已处理过的 seq 去重;
+    这里假设修改图书的事务不会持续超过 OVERLAP_SECONDS。changed_at 由数据库生成, 比较时也用数据库的当前时间, 不受应用服务器时钟影响。
+
+    变更日志的读取总是走主库 (primary_context), 避免从库延迟导致读到旧数据后又把位置推进过去
+"""
+
+
+# 写事务的最长持续时间 (秒), 见上文
+OVERLAP_SECONDS = 60
+
+
+def record_book_changes(db, bids: Iterable[int]) -> None:
+    """ 在调用方的事务里为这些图书追加变更记录; db 可以是 Session 或 Connection """
+    rows = [{"book_id": bid} for bid in dict.fromkeys(bids)]
+    if rows:
+        db.execute(insert(BookChange), rows)
+
+
+def prune_book_changes(db, keep_days: Optional[float] = None) -> int:
+    """ 删除 keep_days (默认 book_change_keep_days) 天之前的变更记录, 返回删除的行数; 超过这个时间没有同步过的进程会改为全量重建 """
+    keep_days = get_settings().book_change_keep_days if keep_days is None else keep_days
+    cutoff = _db_now(db) - timedelta(days=keep_days)
+    result = db.execute(delete(BookChange).where(BookChange.changed_at < cutoff))
+    return result.rowcount
+
+
+def _db_now(db):
+    return db.execute(select(func.current_timestamp())).scalar_one()
+
+
+def _stable_seq(db, now: datetime) -> int:
+    """ changed_at 早于 OVERLAP_SECONDS 之前的最大 seq: 不大于它的变更都已经提交 (或回滚), 之后不会再出现新的 """
+    cutoff = now - timedelta(seconds=OVERLAP_SECONDS)
+    return db.execute(select(func.coalesce(func.max(BookChange.seq), 0)).where(BookChange.changed_at < cutoff)).scalar_one()
+
+
+class ChangeCursor:
+    """ 变更日志的读取位置. 应在读取数据 (全量构建索引、导出快照) 之前创建, 这样构建期间的修改会在之后的 poll 中再次出现 """
+
+    def __init__(self, stable: int, polled_at: datetime):
+        self.stable = stable            # 不大于它的变更都已处理
+        self.polled_at = polled_at      # 上一次读取时数据库的当前时间
+        self._seen: Set[int] = set()
+
+    @classmethod
+    def start(cls, db) -> "ChangeCursor":
+        now = _db_now(db)
+        return cls(_stable_seq(db, now), now)
+
+    def _pruned(self, db, now: datetime) -> bool:
+        """ 稳定位置之后的记录是否可能已被清理
+
+            日志开头缺了一段 seq 时, 缺的部分可能是尚未提交的事务 (稍后会出现), 也可能是回滚或者已被清理 (永远不会出现)。
+            第一条记录早于 OVERLAP_SECONDS 时缺口不会再被填上; 否则只有距离上次读取超过了保留期, 缺的记录才可能是被清理掉的
+        """
+        first = db.execute(select(BookChange.seq, BookChange.changed_at).order_by(BookChange.seq).limit(1)).first()
+        if first is None or first.seq <= self.stable + 1:
+            return False
+        keep = timedelta(days=get_settings().book_change_keep_days)
+        return first.changed_at < now - timedelta(seconds=OVERLAP_SECONDS) or now - self.polled_at >= keep
+
+    def poll(self, db, limit: Optional[int] = None) -> Optional[List[int]]:
+        """ 返回稳定位置之后新出现的变更涉及的 bid (去重, 按 seq 顺序);
+
+            日志已经被清理到稳定位置之后 (中间的记录缺失), 或者新的变更超过 limit 条时返回 None, 调用方应改为全量重建
+        """
+        now = _db_now(db)
+        if self._pruned(db, now):
+            return None
+
+        statement = select(BookChange.seq, BookChange.book_id).where(BookChange.seq > self.stable).order_by(BookChange.seq)
+        if limit is not None:
+            statement = statement.limit(limit + len(self._seen) + 1)
+        rows = [row for row in db.execute(statement) if row.seq not in self._seen]
+        if limit is not None and len(rows) > limit:
+            return None
+
+        self._seen.update(row.seq for row in rows)
+        self.polled_at = now
+        stable = _stable_seq(db, now)
+        if stable > self.stable:
+            self.stable = stable
+            self._seen = {seq for seq in self._seen if seq > stable}
+        return list(dict.fromkeys(row.book_id for row in rows))
+
+
+class IndexSync:
+    """ 进程内存索引与数据库的同步: 第一次使用时全量构建, 之后每隔 check_seconds 按变更日志重新加载修改过的图书
+
+        每个索引注册一对函数: build(db) 全量构建并原子替换索引内容, reload(db, bids) 重新加载 (或删除) 这些图书。
+        同一时刻只有一个线程在构建或拉取: 索引还没有构建时其他线程等待构建完成; 已经可用时其他线程直接使用当前内容,
+        因此其他进程的写入最多滞后 check_seconds 被本进程看到。异步仓库同样在工作线程里调用 sync, 等待线程锁不会卡住事件循环
+    """
+
+    def __init__(self, check_seconds: Optional[float] = None, max_reload: int = 10000):
+        self._check_seconds = check_seconds
+        self.max_reload = max_reload
+        self._targets: List[tuple] = []
+        self._cursor: Optional[ChangeCursor] = None
+        self._checked_at = float("-inf")
+        self._lock = threading.Lock()
+        self.rebuilds = 0
+
+    @property
+    def check_seconds(self) -> float:
+        return self._check_seconds if self._check_seconds is not None else get_settings().catalog_sync_seconds
+
+    @property
+    def ready(self) -> bool:
+        return self._cursor is not None
+
+    def register(self, build: Callable, reload: Callable[..., None]) -> None:
+        self._targets.append((build, reload))
+
+    def due(self) -> bool:
+        return not self.ready or time.monotonic() - self._checked_at >= self.check_seconds
+
+    def reset(self) -> None:
+        """ 下次使用时全量重建 (测试或者手工修复数据之后使用) """
+        with self._lock:
+            self._cursor = None
+
+    def sync(self, db) -> None:
+        if not self.due():
+            return
+        if not self.ready:
+            with self._lock:
+                if not self.ready:
+                    self._rebuild(db)
+            return
+        # 已经可用: 拉取变更的线程只需要一个, 其他线程不等待
+        if not self._lock.acquire(blocking=False):
+            return
+        try:
+            if self.due():
+                self._poll(db)
+        finally:
+            self._lock.release()
+
+    def _rebuild(self, db) -> None:
+        with primary_context():
+            cursor = ChangeCursor.start(db)
+            for build, _ in self._targets:
+                build(db)
+        self._cursor = cursor
+        self._checked_at = time.monotonic()
+        self.rebuilds += 1
+
+    def _poll(self, db) -> None:
+        with primary_context():
+            bids = self._cursor.poll(db, self.max_reload)
+            if bids is None:
+                self._rebuild(db)
+                return
+            if bids:
+                for _, reload in self._targets:
+                    reload(db, bids)
+        self._checked_at = time.monotonic()
+
+
+# 图书检索索引与标签索引共用的同步器, 各索引在自己的模块里注册
+catalog_indexes = IndexSync()
@@ -0,0 +1,238 @@
+import heapq
+import math
+import re
+import threading
+from array import array
+from bisect import bisect_left
+from collections import defaultdict
+from typing import Container, Dict, Iterable, List, Optional, Tuple
+
+from app.schemas.book import BookOut
+from app.storage.book.changes import catalog_indexes
+
+
+""" 图书全文检索的倒排索引
+
+    - 分词: 拉丁字母/数字按单词切分并转小写; 中文 (CJK) 连续片段切分为单字 + 二元组 (bigram),
+      查询时长度 >= 2 的中文片段只使用二元组, 单字查询才使用单字, 这样不需要额外的中文分词词典
+    - 字段加权: title > author = tags > abstract, 同一个词在标题中命中的贡献更高
+    - 存储: 每个 token 的倒排链是两条按 bid 升序排列的紧凑数组 (bid: array('i'), 加权词频: array('f')),
+      百万级图书的倒排链只占几十到上百 MB; 删除时根据存储的字段重新分词定位倒排链, 不额外保存正排 token 列表
+    - 打分: BM25, 文档长度为加权后的词频总和
+    - 查询: 多个词之间是 AND 关系, 遍历最短的倒排链, 在其余倒排链上二分查找, 只对交集内的文档打分,
+      最后用堆取出当前页需要的 top-k
+
+    索引在进程内存中维护, 存储了渲染 BookOut 所需的字段, 检索全程不访问 books 表。
+    多个 worker 进程各自维护一份索引: 本进程内的 create/update/delete 直接增量更新, 其他进程与批量导入的修改
+    通过 book_changes 变更日志同步过来 (见 app/storage/book/changes.py); 全量重建时先在新对象上构建, 完成后整体替换, 检索不会读到构建到一半的索引
+"""
+
+
+FIELD_WEIGHTS = {"title": 3.0, "author": 2.0, "tags": 2.0, "abstract": 1.0}
+STORED_FIELDS = ("bid", "title", "author", "isbn", "abstract", "area", "floor", "tags")
+
+_WORD_RE = re.compile(r"[a-z0-9]+|[\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff]+")
+_CJK_RE = re.compile(r"[\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff]")
+
+
+def tokenize(text: Optional[str], for_query: bool = False) -> List[str]:
+    if not text:
+        return []
+
+    tokens = []
+    for piece in _WORD_RE.findall(text.lower()):
+        if not _CJK_RE.match(piece):
+            tokens.append(piece)
+            continue
+
+        # 中文片段: 建索引时单字与二元组都写入, 查询时优先使用区分度更高的二元组
+        if not for_query or len(piece) == 1:
+            tokens.extend(piece)
+        tokens.extend(piece[i:i + 2] for i in range(len(piece) - 1))
+    return tokens
+
+
+def _field_weights(stored: tuple) -> Dict[str, float]:
+    doc = dict(zip(STORED_FIELDS, stored))
+    weights: Dict[str, float] = defaultdict(float)
+    for field, weight in FIELD_WEIGHTS.items():
+        for token in tokenize(doc[field]):
+            weights[token] += weight
+    return weights
+
+
+class BookSearchIndex:
+    def __init__(self, k1: float = 1.2, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+
+        self._postings: Dict[str, Tuple[array, array]] = {}  # token -> (升序 bid 数组, 对应的加权词频数组)
+        self._doc_len = array("f")                           # 以 bid 为下标的文档长度, bid 是自增主键, 数组基本是稠密的
+        self._stored: Dict[int, tuple] = {}                  # bid -> STORED_FIELDS 对应的元组
+        self._total_len = 0.0
+        self._lock = threading.RLock()
+        self.ready = False
+
+    def __len__(self) -> int:
+        return len(self._stored)
+
+    def add(self, book) -> None:
+        """ 新增或覆盖一本书, book 可以是 ORM 对象、BookOut、Row 或任意带有对应属性的对象 """
+        stored = tuple(getattr(book, f) for f in STORED_FIELDS)
+        bid = stored[0]
+        weights = _field_weights(stored)
+
+        with self._lock:
+            self._remove_locked(bid)
+
+            for token, tf in weights.items():
+                posting = self._postings.get(token)
+                if posting is None:
+                    self._postings[token] = (array("i", (bid,)), array("f", (tf,)))
+                    continue
+
+                bids, tfs = posting
+                # 批量构建与新增图书时 bid 递增, 直接追加; 只有更新旧书时才需要二分插入
+                if bid > bids[-1]:
+                    bids.append(bid)
+                    tfs.append(tf)
+                else:
+                    i = bisect_left(bids, bid)
+                    bids.insert(i, bid)
+                    tfs.insert(i, tf)
+
+            if bid >= len(self._doc_len):
+                self._doc_len.extend([0.0] * (bid + 1 - len(self._doc_len)))
+            self._doc_len[bid] = sum(weights.values())
+            self._total_len += self._doc_len[bid]
+            self._stored[bid] = stored
+
+    def add_many(self, books: Iterable) -> int:
+        count = 0
+        for book in books:
+            self.add(book)
+            count += 1
+        return count
+
+    def remove(self, bid: int) -> None:
+        with self._lock:
+            self._remove_locked(bid)
+
+    def _remove_locked(self, bid: int) -> None:
+        stored = self._stored.pop(bid, None)
+        if stored is None:
+            return
+
+        for token in _field_weights(stored):
+            bids, tfs = self._postings[token]
+            i = bisect_left(bids, bid)
+            del bids[i]
+            del tfs[i]
+            if not bids:
+                del self._postings[token]
+
+        self._total_len -= self._doc_len[bid]
+        self._doc_len[bid] = 0.0
+
+    def clear(self) -> None:
+        with self._lock:
+            self._postings = {}
+            self._doc_len = array("f")
+            self._stored = {}
+            self._total_len = 0.0
+            self.ready = False
+
+    def swap(self, other: "BookSearchIndex") -> None:
+        """ 用另一个 (已经构建好的) 索引的内容整体替换当前内容, 持锁期间只交换引用 """
+        with self._lock:
+            self._postings, self._doc_len, self._stored, self._total_len = other._postings, other._doc_len, other._stored, other._total_len
+            self.ready = True
+
+    def bids(self) -> List[int]:
+        with self._lock:
+            return list(self._stored)
+
+    def render(self, bids: Iterable[int]) -> List[BookOut]:
+        """ 按给定顺序渲染存储的字段, 期间已被删除的图书跳过 """
+        with self._lock:
+            stored = [self._stored.get(bid) for bid in bids]
+        return [BookOut.model_construct(**dict(zip(STORED_FIELDS, s))) for s in stored if s is not None]
+
+    def search_hits(self, query: str, allowed: Optional[Container[int]] = None) -> List[Tuple[float, int]]:
+        """ 返回全部命中的 (-分数, bid), 未排序; allowed 不为 None 时只保留其中的 bid (例如标签过滤得到的位图) """
+        terms = list(dict.fromkeys(tokenize(query, for_query=True)))
+        if not terms:
+            return []
+
+        with self._lock:
+            postings = [self._postings.get(t) for t in terms]
+            if not all(postings):
+                return []
+
+            n_docs = len(self._stored)
+            avg_len = self._total_len / n_docs if n_docs else 1.0
+            k1, b = self.k1, self.b
+            doc_len = self._doc_len
+
+            # BM25: idf * tf * (k1 + 1) / (tf + k1 * (1 - b + b * len / avg_len)), 常数项提前算好, 循环内只剩查表与四则运算
+            postings.sort(key=lambda p: len(p[0]))
+            weighted = [(math.log(1 + (n_docs - len(p[0]) + 0.5) / (len(p[0]) + 0.5)) * (k1 + 1), p) for p in postings]
+            c1, c2 = k1 * (1 - b), k1 * b / avg_len
+            (w0, (bids0, tfs0)), others = weighted[0], weighted[1:]
+
+            # 遍历最短的倒排链, 在其余倒排链上二分查找求交集, 交集内的文档顺便完成打分
+            scores = []
+            for bid, tf in zip(bids0, tfs0):
+                if allowed is not None and bid not in allowed:
+                    continue
+                norm = c1 + c2 * doc_len[bid]
+                score = w0 * tf / (tf + norm)
+                for w, (bids, tfs) in others:
+                    i = bisect_left(bids, bid)
+                    if i == len(bids) or bids[i] != bid:
+                        break
+                    score += w * tfs[i] / (tfs[i] + norm)
+                else:
+                    scores.append((-score, bid))
+        return scores
+
+    def search(self, query: str, offset: int = 0, limit: int = 10, allowed: Optional[Container[int]] = None) -> Tuple[int, List[BookOut]]:
+        """ 返回 (命中总数, 当前页结果), 结果按 BM25 分数降序, 分数相同按 bid 升序 """
+        scores = self.search_hits(query, allowed)
+        top = heapq.nsmallest(offset + limit, scores)[offset:]
+        return len(scores), self.render(bid for _, bid in top)
+
+
+# 进程级别的全局索引, 在应用启动时构建 (见 main.py), 之后由图书仓库的写操作与变更日志增量维护
+book_search_index = BookSearchIndex()
+
+
+def _select_stored(batch_size: int):
+    from sqlalchemy import select
+    from app.models.book import Book
+
+    return select(*(getattr(Book, f) for f in STORED_FIELDS)).execution_options(yield_per=batch_size)
+
+
+def build_book_search_index(db, index: BookSearchIndex = book_search_index, batch_size: int = 5000) -> int:
+    """ 从数据库流式加载所有图书, 在新对象上构建完成后整体替换 index 的内容, 返回索引的图书数量 """
+    fresh = BookSearchIndex(index.k1, index.b)
+    count = fresh.add_many(db.execute(_select_stored(batch_size)))
+    index.swap(fresh)
+    return count
+
+
+def reload_search_index(db, bids: List[int], index: BookSearchIndex = book_search_index) -> None:
+    """ 按数据库的当前内容重新加载这些图书, 已删除的从索引中移除 """
+    from app.models.book import Book
+    from app.storage.statements import in_chunks
+
+    for chunk in in_chunks(bids):
+        rows = db.execute(_select_stored(len(chunk)).where(Book.bid.in_(chunk))).all()
+        for row in rows:
+            index.add(row)
+        for bid in set(chunk) - {row.bid for row in rows}:
+            index.remove(bid)
+
+
+catalog_indexes.register(build_book_search_index, reload_search_index)
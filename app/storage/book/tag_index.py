@@ -0,0 +1,415 @@
+import heapq
+import threading
+from collections import defaultdict
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+from sqlalchemy import delete, insert, select
+from sqlalchemy.exc import IntegrityError
+
+from app.models.tag import BookTag, Tag
+from app.schemas.book import TAG_MAX_LENGTH, BatchBooksOut, BookRetrieveReq, parse_tags
+from app.storage.book.changes import catalog_indexes
+from app.storage.book.search_index import BookSearchIndex, book_search_index
+
+
+""" 图书标签的位图索引
+
+    books.tags 是逗号分隔的字符串, 按标签筛选只能 LIKE 全表扫描。这里分两层:
+
+    - 数据库: tags / book_tags 两张规范化的表 (见 app/models/tag.py), 在图书新增/修改/删除的事务内同步 (sync_book_tags)
+    - 内存: 每个标签一个 bid 位图 (Bitmap), 与检索索引一起注册在 catalog_indexes 上: 第一次使用时从 book_tags 构建 (在新对象上构建后整体替换),
+      本进程的写操作直接增量维护, 其他进程与批量导入的修改按变更日志重新加载。
+      AND / OR / NOT 就是位图的 & | -, 只有 NOT 条件时以索引维护的全部图书位图为被减数;
+      分面计数 (每个标签在结果集中有多少本书) 从结果集出发, 在 bid -> 标签编号的 CSR 数组上 bincount
+
+    位图的压缩方式: bid 按高 16 位分块, 每块是一个 65536 位的 Python int, 只保存非空的块。
+    自增主键下热门标签的块是稠密的, 一次 & 运算处理 65536 个 bid; 冷门标签只占少数几个块, 不会为整个 bid 空间分配内存。
+    单个 bid 的位运算要复制整块, 所以批量构建 (Bitmap.of) 与展开 (迭代/分页) 用 numpy 一次处理一整块
+"""
+
+
+CHUNK_BITS = 16
+CHUNK_MASK = (1 << CHUNK_BITS) - 1
+
+
+class Bitmap:
+    __slots__ = ("_chunks",)
+
+    def __init__(self, chunks: Optional[Dict[int, int]] = None):
+        self._chunks: Dict[int, int] = chunks if chunks is not None else {}
+
+    @classmethod
+    def of(cls, bids: Iterable[int]) -> "Bitmap":
+        bids = np.unique(np.fromiter(bids, dtype=np.int64))
+        his = bids >> CHUNK_BITS
+        chunks = {}
+        for hi in np.unique(his):
+            bits = np.zeros(1 << CHUNK_BITS, dtype=np.uint8)
+            bits[bids[his == hi] & CHUNK_MASK] = 1
+            chunks[int(hi)] = int.from_bytes(np.packbits(bits, bitorder="little").tobytes(), "little")
+        return cls(chunks)
+
+    def add(self, bid: int) -> None:
+        hi = bid >> CHUNK_BITS
+        self._chunks[hi] = self._chunks.get(hi, 0) | (1 << (bid & CHUNK_MASK))
+
+    def discard(self, bid: int) -> None:
+        hi = bid >> CHUNK_BITS
+        chunk = self._chunks.get(hi, 0) & ~(1 << (bid & CHUNK_MASK))
+        if chunk:
+            self._chunks[hi] = chunk
+        else:
+            self._chunks.pop(hi, None)
+
+    def copy(self) -> "Bitmap":
+        return Bitmap(dict(self._chunks))
+
+    def __contains__(self, bid: int) -> bool:
+        return bool(self._chunks.get(bid >> CHUNK_BITS, 0) >> (bid & CHUNK_MASK) & 1)
+
+    def __len__(self) -> int:
+        return sum(chunk.bit_count() for chunk in self._chunks.values())
+
+    def __bool__(self) -> bool:
+        return bool(self._chunks)
+
+    def __and__(self, other: "Bitmap") -> "Bitmap":
+        small, large = sorted((self._chunks, other._chunks), key=len)
+        chunks = {}
+        for hi, chunk in small.items():
+            both = chunk & large.get(hi, 0)
+            if both:
+                chunks[hi] = both
+        return Bitmap(chunks)
+
+    def __or__(self, other: "Bitmap") -> "Bitmap":
+        chunks = dict(self._chunks)
+        for hi, chunk in other._chunks.items():
+            chunks[hi] = chunks.get(hi, 0) | chunk
+        return Bitmap(chunks)
+
+    def __sub__(self, other: "Bitmap") -> "Bitmap":
+        chunks = {}
+        for hi, chunk in self._chunks.items():
+            rest = chunk & ~other._chunks.get(hi, 0)
+            if rest:
+                chunks[hi] = rest
+        return Bitmap(chunks)
+
+    @staticmethod
+    def _decode(hi: int, chunk: int) -> np.ndarray:
+        """ 一块展开为升序的 bid 数组; 只展开非 0 的字节, 稀疏的块不需要处理全部 65536 位 """
+        data = np.frombuffer(chunk.to_bytes(1 << (CHUNK_BITS - 3), "little"), dtype=np.uint8)
+        nonzero = np.flatnonzero(data)
+        rows, bits = np.nonzero(np.unpackbits(data[nonzero, None], axis=1, bitorder="little"))
+        return (nonzero[rows] << 3) + bits + (hi << CHUNK_BITS)
+
+    def to_array(self) -> np.ndarray:
+        """ 全部 bid, 升序的 int64 数组 """
+        if not self._chunks:
+            return np.zeros(0, dtype=np.int64)
+        return np.concatenate([self._decode(hi, self._chunks[hi]) for hi in sorted(self._chunks)])
+
+    def __iter__(self) -> Iterator[int]:
+        for hi in sorted(self._chunks):
+            yield from self._decode(hi, self._chunks[hi]).tolist()
+
+    def page(self, offset: int, limit: int) -> List[int]:
+        """ 按 bid 升序取 [offset, offset + limit), offset 之前的块只数 1 的个数, 不展开 """
+        result = []
+        for hi in sorted(self._chunks):
+            chunk = self._chunks[hi]
+            count = chunk.bit_count()
+            if offset >= count:
+                offset -= count
+                continue
+            result.extend(self._decode(hi, chunk)[offset:offset + limit - len(result)].tolist())
+            offset = 0
+            if len(result) >= limit:
+                break
+        return result
+
+
+class TagIndex:
+    def __init__(self, compact_ratio: float = 0.05):
+        self._bitmaps: Dict[str, Bitmap] = {}             # 标签 -> bid 位图
+        self._book_tags: Dict[int, Tuple[str, ...]] = {}  # bid -> 标签, 修改/删除时用来定位旧标签
+        self._counts: Dict[str, int] = {}                 # 标签 -> 图书数
+        self._universe = Bitmap()                         # 全部图书 (包括没有标签的), 只有 NOT 条件时作为被减数
+        self._lock = threading.RLock()
+        self.ready = False
+
+        # 分面计数用的 CSR 快照: bid -> 标签编号, 第 bid 本书的标签是 _tag_col[_indptr[bid]:_indptr[bid + 1]];
+        # 快照之后修改过的图书记在 _dirty 里, 计数时改从 _book_tags 读取, 脏数据超过 compact_ratio 时重建快照
+        self.compact_ratio = compact_ratio
+        self._codes: Dict[str, int] = {}
+        self._names: List[str] = []
+        self._indptr = np.zeros(1, dtype=np.int64)
+        self._tag_col = np.zeros(0, dtype=np.int32)
+        self._dirty: set = set()
+
+    def __len__(self) -> int:
+        return len(self._bitmaps)
+
+    def set(self, bid: int, tags: Sequence[str]) -> None:
+        with self._lock:
+            self._remove_locked(bid)
+            self._universe.add(bid)
+            for tag in tags:
+                self._bitmaps.setdefault(tag, Bitmap()).add(bid)
+                self._counts[tag] = self._counts.get(tag, 0) + 1
+            if tags:
+                self._book_tags[bid] = tuple(tags)
+            self._mark_dirty_locked(bid)
+
+    def load(self, book_tags: Dict[int, Sequence[str]], bids: Optional[Iterable[int]] = None) -> None:
+        """ 整体替换索引内容; bids 为全部图书 (默认只有 book_tags 中的图书)。每个标签的位图用 Bitmap.of 一次构建, 比逐本 set 快得多 """
+        tag_bids: Dict[str, List[int]] = defaultdict(list)
+        for bid, tags in book_tags.items():
+            for tag in tags:
+                tag_bids[tag].append(bid)
+        bitmaps = {tag: Bitmap.of(bids) for tag, bids in tag_bids.items()}
+        universe = Bitmap.of(bids if bids is not None else book_tags)
+
+        with self._lock:
+            self._bitmaps = bitmaps
+            self._universe = universe
+            self._book_tags = {bid: tuple(tags) for bid, tags in book_tags.items() if tags}
+            self._counts = {tag: len(bids) for tag, bids in tag_bids.items()}
+            self._compact_locked()
+
+    def remove(self, bid: int) -> None:
+        with self._lock:
+            self._remove_locked(bid)
+            self._universe.discard(bid)
+            self._mark_dirty_locked(bid)
+
+    def _remove_locked(self, bid: int) -> None:
+        for tag in self._book_tags.pop(bid, ()):
+            bitmap = self._bitmaps[tag]
+            bitmap.discard(bid)
+            self._counts[tag] -= 1
+            if not bitmap:
+                del self._bitmaps[tag]
+                del self._counts[tag]
+
+    def _mark_dirty_locked(self, bid: int) -> None:
+        self._dirty.add(bid)
+        if len(self._dirty) > max(1000, self.compact_ratio * len(self._book_tags)):
+            self._compact_locked()
+
+    def _compact_locked(self) -> None:
+        for tag in self._counts:
+            if tag not in self._codes:
+                self._codes[tag] = len(self._names)
+                self._names.append(tag)
+
+        bids = np.fromiter(self._book_tags, dtype=np.int64, count=len(self._book_tags))
+        sizes = np.fromiter((len(t) for t in self._book_tags.values()), dtype=np.int64, count=len(bids))
+        per_bid = np.zeros(int(bids.max()) + 2 if bids.size else 1, dtype=np.int64)
+        per_bid[bids + 1] = sizes
+        # 按 dict 的插入顺序写入标签编号, 再按 bid 重排到 CSR 的位置上
+        codes = np.fromiter((self._codes[t] for tags in self._book_tags.values() for t in tags), dtype=np.int32, count=int(sizes.sum()))
+        indptr = np.cumsum(per_bid)
+        order = np.argsort(np.repeat(bids, sizes), kind="stable")
+
+        self._indptr, self._tag_col = indptr, codes[order]
+        self._dirty = set()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._bitmaps.clear()
+            self._book_tags.clear()
+            self._counts.clear()
+            self._universe = Bitmap()
+            self._compact_locked()
+            self.ready = False
+
+    def swap(self, other: "TagIndex") -> None:
+        """ 用另一个 (已经构建好的) 索引的内容整体替换当前内容, 持锁期间只交换引用 """
+        with other._lock, self._lock:
+            self._bitmaps, self._book_tags, self._counts, self._universe = other._bitmaps, other._book_tags, other._counts, other._universe
+            self._codes, self._names, self._indptr, self._tag_col, self._dirty = other._codes, other._names, other._indptr, other._tag_col, other._dirty
+            self.ready = True
+
+    def filter(self, all_of: Sequence[str] = (), any_of: Sequence[str] = (), none_of: Sequence[str] = ()) -> Bitmap:
+        """ (tag1 AND tag2 ...) AND (tag3 OR tag4 ...) AND NOT (tag5 OR ...)
+
+            只给了 NOT 条件时以全部图书为被减数
+        """
+        empty = Bitmap()
+        with self._lock:
+            result = self._universe.copy() if none_of and not all_of and not any_of else None
+            for tag in all_of:
+                bitmap = self._bitmaps.get(tag, empty)
+                result = bitmap.copy() if result is None else result & bitmap
+            if any_of:
+                union = Bitmap()
+                for tag in any_of:
+                    union = union | self._bitmaps.get(tag, empty)
+                result = union if result is None else result & union
+            if result is None:
+                return empty
+            for tag in none_of:
+                result = result - self._bitmaps.get(tag, empty)
+        return result
+
+    def facets(self, hits: Optional[Bitmap] = None, limit: int = 20) -> Dict[str, int]:
+        """ 结果集中每个标签的图书数, 按数量降序取前 limit 个; hits 为 None 时统计全部图书
+
+            逐个标签做位图交集的代价是 标签数 x bid 空间, 这里改为从结果集出发: 展开 hits 得到 bid 数组,
+            在 CSR 快照上一次取出这些书的全部标签编号再 bincount, 代价只与结果集大小有关
+        """
+        with self._lock:
+            if hits is None:
+                counts = self._counts.items()
+            else:
+                counts = self._hit_counts_locked(hits.to_array())
+        top = sorted((-n, tag) for tag, n in counts if n)[:limit]
+        return {tag: -n for n, tag in top}
+
+    def _hit_counts_locked(self, bids: np.ndarray) -> List[Tuple[str, int]]:
+        dirty = bids[np.isin(bids, np.fromiter(self._dirty, dtype=np.int64, count=len(self._dirty)))] if self._dirty else bids[:0]
+        if dirty.size:
+            bids = np.setdiff1d(bids, dirty, assume_unique=True)
+        bids = bids[bids < len(self._indptr) - 1]
+
+        starts = self._indptr[bids]
+        sizes = self._indptr[bids + 1] - starts
+        offsets = np.repeat(starts - (np.cumsum(sizes) - sizes), sizes) + np.arange(int(sizes.sum()))
+        counts = np.bincount(self._tag_col[offsets], minlength=len(self._names)).tolist()
+
+        extra: Dict[str, int] = defaultdict(int)
+        for bid in dirty.tolist():
+            for tag in self._book_tags.get(bid, ()):
+                if tag in self._codes:
+                    counts[self._codes[tag]] += 1
+                else:
+                    extra[tag] += 1
+        return [*zip(self._names, counts), *extra.items()]
+
+
+# 进程级别的全局标签索引, 与检索索引一样注册在 catalog_indexes 上, 由图书仓库的写操作与变更日志增量维护
+book_tag_index = TagIndex()
+
+
+def _select_book_tags(batch_size: int):
+    return select(BookTag.book_id, Tag.name).join(Tag, Tag.tid == BookTag.tag_id).execution_options(yield_per=batch_size)
+
+
+def build_tag_index(db, index: TagIndex = book_tag_index, batch_size: int = 10000) -> int:
+    """ 从 book_tags 流式加载 (bid, 标签), 在新对象上构建完成后整体替换 index 的内容, 返回有标签的图书数量 """
+    from app.models.book import Book
+
+    book_tags: Dict[int, List[str]] = defaultdict(list)
+    for book_id, name in db.execute(_select_book_tags(batch_size)):
+        book_tags[book_id].append(name)
+    bids = db.execute(select(Book.bid).execution_options(yield_per=batch_size)).scalars()
+
+    fresh = TagIndex(index.compact_ratio)
+    fresh.load(book_tags, bids)
+    index.swap(fresh)
+    return len(book_tags)
+
+
+def reload_tag_index(db, bids: List[int], index: TagIndex = book_tag_index) -> None:
+    """ 按数据库的当前内容重新加载这些图书的标签, 已删除的从索引中移除 """
+    from app.models.book import Book
+    from app.storage.statements import in_chunks
+
+    for chunk in in_chunks(bids):
+        existing = set(db.execute(select(Book.bid).where(Book.bid.in_(chunk))).scalars())
+        book_tags: Dict[int, List[str]] = defaultdict(list)
+        for book_id, name in db.execute(_select_book_tags(len(chunk)).where(BookTag.book_id.in_(chunk))):
+            book_tags[book_id].append(name)
+        for bid in chunk:
+            if bid in existing:
+                index.set(bid, book_tags.get(bid, []))
+            else:
+                index.remove(bid)
+
+
+catalog_indexes.register(build_tag_index, reload_tag_index)
+
+
+def _insert_tags(db, names: List[str]) -> None:
+    """ 写入缺少的标签。并发的事务可能刚刚提交了同名标签, 唯一键冲突时回滚到 SAVEPOINT, 逐个重试并跳过已存在的 """
+    try:
+        with db.begin_nested():
+            db.execute(insert(Tag), [{"name": name} for name in names])
+        return
+    except IntegrityError:
+        pass
+    for name in names:
+        try:
+            with db.begin_nested():
+                db.execute(insert(Tag), [{"name": name}])
+        except IntegrityError:
+            pass
+
+
+def sync_book_tags(db, book_tags: Dict[int, List[str]]) -> None:
+    """ 按 {bid: [标签, ...]} 重写这些图书在 book_tags 中的行, 缺少的标签先写入 tags; db 可以是 Session 或 Connection, 事务由调用方负责 """
+    if not book_tags:
+        return
+    names = list(dict.fromkeys(tag for tags in book_tags.values() for tag in tags))
+    too_long = [name for name in names if len(name) > TAG_MAX_LENGTH]
+    if too_long:
+        raise ValueError(f"tag {too_long[0][:20]}... is longer than {TAG_MAX_LENGTH} characters")
+
+    db.execute(delete(BookTag).where(BookTag.book_id.in_(list(book_tags))))
+    if not names:
+        return
+    tag_ids = dict(db.execute(select(Tag.name, Tag.tid).where(Tag.name.in_(names))).all())
+    missing = [name for name in names if name not in tag_ids]
+    if missing:
+        _insert_tags(db, missing)
+        # 加锁读取: MySQL 可重复读隔离级别下普通 SELECT 看不到本事务开始之后其他事务提交的标签
+        tag_ids.update(db.execute(select(Tag.name, Tag.tid).where(Tag.name.in_(missing)).with_for_update(read=True)).all())
+
+    db.execute(insert(BookTag), [{"book_id": bid, "tag_id": tag_ids[tag]} for bid, tags in book_tags.items() for tag in tags])
+
+
+def rebuild_book_tags(db, batch_size: int = 5000) -> int:
+    """ 按 books.tags 重写整张 book_tags, 首次上线或数据被其他途径修改后使用; 每批单独提交, 返回处理的图书数量 """
+    from app.models.book import Book
+
+    count, after = 0, 0
+    while True:
+        rows = db.execute(select(Book.bid, Book.tags).where(Book.bid > after).order_by(Book.bid).limit(batch_size)).all()
+        if not rows:
+            return count
+        sync_book_tags(db, {bid: parse_tags(tags) for bid, tags in rows})
+        db.commit()
+        count, after = count + len(rows), rows[-1].bid
+
+
+def search_books(req: BookRetrieveReq, search_index: BookSearchIndex = book_search_index,
+                 tag_index: TagIndex = book_tag_index) -> BatchBooksOut:
+    """ 全文检索与标签过滤的组合, 同步与异步仓库共用
+
+        - 有检索词: 先用标签条件求出允许的 bid 位图, 打分循环里只保留位图内的文档, 结果按分数排序
+        - 只有标签条件: 直接对位图分页, 结果按 bid 升序
+        - facets > 0 时附带整个结果集 (不只是当前页) 上各标签的图书数
+    """
+    all_of, any_of, none_of = parse_tags(req.tags_all), parse_tags(req.tags_any), parse_tags(req.tags_not)
+    offset, limit = req.page * req.page_size, req.page_size
+
+    if req.title.strip():
+        allowed = tag_index.filter(all_of, any_of) if all_of or any_of else None
+        scores = search_index.search_hits(req.title, allowed)
+        if none_of:
+            excluded = tag_index.filter(any_of=none_of)
+            scores = [s for s in scores if s[1] not in excluded]
+        top = heapq.nsmallest(offset + limit, scores)[offset:]
+        total, books = len(scores), search_index.render(bid for _, bid in top)
+        hits = Bitmap.of(bid for _, bid in scores) if req.facets else None
+    elif all_of or any_of or none_of:
+        hits = tag_index.filter(all_of, any_of, none_of)
+        total, books = len(hits), search_index.render(hits.page(offset, limit))
+    else:
+        return BatchBooksOut(total=0, count=0, books=[], facets={} if req.facets else None)
+
+    facets = tag_index.facets(hits, req.facets) if req.facets else None
+    return BatchBooksOut(total=total, count=len(books), books=books, facets=facets)
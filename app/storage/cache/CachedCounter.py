@@ -0,0 +1,51 @@
+import threading
+import time
+from typing import Callable, Optional
+
+from app.core.config import get_settings
+
+
+# 缓存的计数器: 第一次读取时执行一次 COUNT(*), 之后在 TTL 内由写操作增量维护 (新增 +n, 删除 -n),
+# 过期之后重新执行 COUNT(*) 校准, 多个 worker 进程之间的计数漂移最多持续一个 TTL
+class CachedCounter:
+    def __init__(self, name: str, ttl: Optional[float] = 60):
+        self.name = name
+        self.ttl = ttl
+        self._value: Optional[int] = None
+        self._loaded_at = 0.0
+        self._lock = threading.Lock()
+
+    def peek(self) -> Optional[int]:
+        """ 返回仍在有效期内的计数, 过期或尚未加载时返回 None (异步仓库先 peek, 未命中再 await COUNT(*) 之后 set) """
+        with self._lock:
+            if self._value is not None and (not self.ttl or time.monotonic() - self._loaded_at < self.ttl):
+                return self._value
+            return None
+
+    def set(self, value: int) -> None:
+        with self._lock:
+            self._value = value
+            self._loaded_at = time.monotonic()
+
+    def get(self, loader: Callable[[], int]) -> int:
+        value = self.peek()
+        if value is not None:
+            return value
+
+        # COUNT(*) 放在锁外执行, 避免慢查询阻塞其它线程的增量更新
+        value = loader()
+        self.set(value)
+        return value
+
+    def add(self, delta: int) -> None:
+        with self._lock:
+            if self._value is not None:
+                self._value = max(0, self._value + delta)
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._value = None
+
+
+# users 表的总数, SQLAlchemy 与 SQLModel 两种仓库实现共用
+user_counter = CachedCounter("users", ttl=get_settings().count_cache_ttl_seconds)
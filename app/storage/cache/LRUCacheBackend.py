@@ -0,0 +1,70 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+from app.storage.cache.cache_interface import CacheStats, ICacheBackend
+
+
+# 进程内 LRU + TTL 缓存, OrderedDict 保存访问顺序, 尾部是最近使用的条目, 头部是最久未使用的条目
+# uvicorn 的同步路由运行在线程池之中, 因此所有操作都需要加锁
+class LRUCacheBackend(ICacheBackend):
+    def __init__(self, max_entries: int = 10000, default_ttl: Optional[float] = 300):
+        if max_entries <= 0:
+            raise ValueError("max_entries must be positive.")
+
+        self.max_entries = max_entries
+        self.default_ttl = default_ttl
+        self.stats = CacheStats()
+
+        # key -> (value, expire_at), expire_at 为 None 表示永不过期
+        self._data: "OrderedDict[str, Tuple[str, Optional[float]]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                self.stats.misses += 1
+                return None
+
+            value, expire_at = item
+            if expire_at is not None and expire_at <= time.monotonic():
+                del self._data[key]
+                self.stats.expirations += 1
+                self.stats.misses += 1
+                return None
+
+            self._data.move_to_end(key)
+            self.stats.hits += 1
+            return value
+
+    def set(self, key: str, value: str, ttl: Optional[float] = None) -> None:
+        ttl = self.default_ttl if ttl is None else ttl
+        expire_at = time.monotonic() + ttl if ttl else None
+
+        with self._lock:
+            self._data[key] = (value, expire_at)
+            self._data.move_to_end(key)
+            self.stats.sets += 1
+
+            # 超出容量时从头部淘汰最久未使用的条目
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+                self.stats.evictions += 1
+
+    def delete(self, *keys: str) -> int:
+        removed = 0
+        with self._lock:
+            for key in keys:
+                if self._data.pop(key, None) is not None:
+                    removed += 1
+            self.stats.invalidations += removed
+        return removed
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
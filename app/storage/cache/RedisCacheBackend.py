@@ -0,0 +1,53 @@
+from typing import Optional, Any
+
+from app.storage.cache.cache_interface import CacheStats, ICacheBackend
+
+
+# 基于 Redis 协议的缓存后端, 只依赖 GET/SET EX/DEL/FLUSHDB 几个命令, 任何兼容 RESP 协议的服务都可以作为后端
+# (Redis, KeyDB, 本地测试用的替身服务等)。client 可以直接注入, 未注入时通过 redis-py 按 url 建立连接
+class RedisCacheBackend(ICacheBackend):
+    def __init__(self, url: str = "redis://localhost:6379/0", default_ttl: Optional[float] = 300,
+                 client: Any = None, prefix: str = "bookhub:"):
+        if client is None:
+            try:
+                import redis
+            except ImportError as e:
+                raise RuntimeError("RedisCacheBackend requires the 'redis' package, or an injected client.") from e
+            client = redis.Redis.from_url(url, decode_responses=True)
+
+        self.client = client
+        self.default_ttl = default_ttl
+        self.prefix = prefix
+        self.stats = CacheStats()
+
+    def _key(self, key: str) -> str:
+        return self.prefix + key
+
+    def get(self, key: str) -> Optional[str]:
+        value = self.client.get(self._key(key))
+        if value is None:
+            self.stats.misses += 1
+            return None
+
+        self.stats.hits += 1
+        return value.decode() if isinstance(value, bytes) else value
+
+    def set(self, key: str, value: str, ttl: Optional[float] = None) -> None:
+        ttl = self.default_ttl if ttl is None else ttl
+
+        # Redis 的过期时间 (EX) 以秒为单位, 淘汰策略交给服务端的 maxmemory-policy (推荐 allkeys-lru)
+        if ttl:
+            self.client.set(self._key(key), value, ex=max(1, int(ttl)))
+        else:
+            self.client.set(self._key(key), value)
+        self.stats.sets += 1
+
+    def delete(self, *keys: str) -> int:
+        if not keys:
+            return 0
+        removed = self.client.delete(*(self._key(k) for k in keys))
+        self.stats.invalidations += removed
+        return removed
+
+    def clear(self) -> None:
+        self.client.flushdb()
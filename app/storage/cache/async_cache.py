@@ -0,0 +1,26 @@
+import asyncio
+from typing import Optional
+
+from app.storage.cache.cache_interface import ICacheBackend
+from app.storage.cache.LRUCacheBackend import LRUCacheBackend
+
+
+# 缓存后端只有同步接口, 异步仓库通过这个适配器调用:
+# 进程内的 LRU 只是加锁读写字典, 直接在事件循环上调用; Redis 等远程后端每次调用都有一次网络往返,
+# 放到线程池里执行, 否则一次往返会让整个事件循环上的请求一起等待
+class AsyncCache:
+    def __init__(self, backend: ICacheBackend, offload: Optional[bool] = None):
+        self.backend = backend
+        self.offload = not isinstance(backend, LRUCacheBackend) if offload is None else offload
+
+    async def _call(self, fn, *args):
+        return await asyncio.to_thread(fn, *args) if self.offload else fn(*args)
+
+    async def get(self, key: str) -> Optional[str]:
+        return await self._call(self.backend.get, key)
+
+    async def set(self, key: str, value: str, ttl: Optional[float] = None) -> None:
+        await self._call(self.backend.set, key, value, ttl)
+
+    async def delete(self, *keys: str) -> int:
+        return await self._call(self.backend.delete, *keys)
@@ -0,0 +1,54 @@
+from dataclasses import dataclass, asdict
+from typing import Protocol, Optional, Dict, Tuple, Type, TypeVar
+
+from pydantic import BaseModel
+
+
+SchemaT = TypeVar("SchemaT", bound=BaseModel)
+
+
+# 缓存命中统计, 所有后端都维护同一套计数器, 便于在接口层统一暴露
+@dataclass
+class CacheStats:
+    hits: int = 0
+    misses: int = 0
+    sets: int = 0
+    evictions: int = 0       # 因容量上限被淘汰的条目
+    expirations: int = 0     # 因 TTL 到期被清除的条目
+    invalidations: int = 0   # 因写操作 (update/delete) 主动失效的条目
+
+    @property
+    def hit_ratio(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def to_dict(self) -> Dict:
+        return {**asdict(self), "hit_ratio": round(self.hit_ratio, 4)}
+
+
+# 缓存后端协议, value 统一使用 str (JSON 文本), 这样进程内缓存与 Redis 缓存可以互相替换
+class ICacheBackend(Protocol):
+    stats: CacheStats
+
+    def get(self, key: str) -> Optional[str]:
+        ...
+
+    def set(self, key: str, value: str, ttl: Optional[float] = None) -> None:
+        ...
+
+    def delete(self, *keys: str) -> int:
+        ...
+
+    def clear(self) -> None:
+        ...
+
+
+# 带版本号的条目: 版本号与序列化后的模型存在同一个值里 ("版本号\nJSON"), 二者总是同时写入、同时失效,
+# 读出的 ETag 与响应体一定对应同一个版本
+def pack_versioned(model: BaseModel, version: str) -> str:
+    return f"{version}\n{model.model_dump_json()}"
+
+
+def unpack_versioned(schema: Type[SchemaT], value: str) -> Tuple[SchemaT, str]:
+    version, payload = value.split("\n", 1)
+    return schema.model_validate_json(payload), version
@@ -0,0 +1,35 @@
+from typing import Optional
+
+from app.core.config import Settings, get_settings
+from app.storage.cache.cache_interface import ICacheBackend
+from app.storage.cache.LRUCacheBackend import LRUCacheBackend
+from app.storage.cache.RedisCacheBackend import RedisCacheBackend
+
+
+# 缓存后端是进程级别的单例 (仓库对象是请求级别的, 每个请求都会新建), 所以需要在模块级别持有
+_cache_backend: Optional[ICacheBackend] = None
+
+
+def build_cache_backend(settings: Settings) -> Optional[ICacheBackend]:
+    if settings.cache_backend == "none":
+        return None
+    if settings.cache_ttl_seconds <= 0:
+        raise ValueError(f"cache_ttl_seconds must be positive, got {settings.cache_ttl_seconds}.")
+    if settings.cache_backend == "memory":
+        return LRUCacheBackend(max_entries=settings.cache_max_entries, default_ttl=settings.cache_ttl_seconds)
+    if settings.cache_backend == "redis":
+        return RedisCacheBackend(url=settings.redis_url, default_ttl=settings.cache_ttl_seconds)
+    raise ValueError(f"Unknown cache backend: {settings.cache_backend}")
+
+
+def get_cache_backend() -> Optional[ICacheBackend]:
+    global _cache_backend
+    if _cache_backend is None:
+        _cache_backend = build_cache_backend(get_settings())
+    return _cache_backend
+
+
+def set_cache_backend(backend: Optional[ICacheBackend]) -> None:
+    """ 替换全局缓存后端, 主要用于测试或者运行时切换 """
+    global _cache_backend
+    _cache_backend = backend
@@ -0,0 +1,65 @@
+from typing import Any, Dict, List, Tuple
+
+from sqlalchemy import create_engine
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
+
+from app.core.config import Settings, to_async_url
+
+
+# 根据配置创建引擎: 连接池大小、溢出、超时、回收、pre-ping 与 SQL 日志都来自 Settings, 不再在代码里写死
+def engine_options(url: str, settings: Settings) -> Dict[str, Any]:
+    options: Dict[str, Any] = {
+        "echo": settings.db_echo,
+        "pool_pre_ping": settings.db_pool_pre_ping,
+    }
+
+    # 服务端预编译: psycopg 3 在同一连接上执行同一条语句达到 prepare_threshold 次后自动 PREPARE, 之后只传参数;
+    # asyncpg 默认缓存预编译语句; PyMySQL/aiomysql 不支持, 保持客户端参数替换
+    parsed = make_url(url)
+    if parsed.drivername == "postgresql+psycopg" and settings.db_prepare_threshold > 0:
+        options["connect_args"] = {"prepare_threshold": settings.db_prepare_threshold}
+
+    # SQLite 内存库使用 SingletonThreadPool/StaticPool, 不支持 QueuePool 的参数
+    if parsed.get_backend_name() == "sqlite" and parsed.database in (None, "", ":memory:"):
+        return options
+
+    options.update(
+        pool_size=settings.db_pool_size,
+        max_overflow=settings.db_max_overflow,
+        pool_timeout=settings.db_pool_timeout,
+        pool_recycle=settings.db_pool_recycle,
+    )
+    return options
+
+
+def create_engine_from_settings(url: str, settings: Settings) -> Engine:
+    return create_engine(url, **engine_options(url, settings))
+
+
+def create_async_engine_from_settings(url: str, settings: Settings) -> AsyncEngine:
+    return create_async_engine(url, **engine_options(url, settings))
+
+
+# 主库 + 从库列表
+def create_engines(settings: Settings) -> Tuple[Engine, List[Engine]]:
+    primary = create_engine_from_settings(settings.database_url, settings)
+    replicas = [create_engine_from_settings(url, settings) for url in settings.get_replica_urls()]
+    return primary, replicas
+
+
+def create_async_engines(settings: Settings) -> Tuple[AsyncEngine, List[AsyncEngine]]:
+    primary = create_async_engine_from_settings(settings.get_async_database_url(), settings)
+    replicas = [create_async_engine_from_settings(to_async_url(url), settings) for url in settings.get_replica_urls()]
+    return primary, replicas
+
+
+# 各个连接池的状态, 用于 /db/stats 与监控
+def pool_status(engine: Engine) -> Dict[str, Any]:
+    pool = engine.pool
+    status = {"url": engine.url.render_as_string(hide_password=True), "pool": type(pool).__name__}
+    for name in ("size", "checkedin", "checkedout", "overflow"):
+        method = getattr(pool, name, None)
+        if callable(method):
+            status[name] = method()
+    return status
@@ -0,0 +1,66 @@
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from sqlalchemy import Table, select
+from sqlalchemy.orm import Session
+
+from app.models import Book, BookInventory, Order, User
+from app.storage.routing import read_only
+
+
+""" 全表流式导出的读取部分
+
+    使用服务端游标 (yield_per 隐含 stream_results): MySQL 下 PyMySQL 使用 SSCursor 逐批从网络读取,
+    Python 进程内同一时刻只保留一批 (batch_size 行), 内存占用与表的行数无关; 配置了从库时走从库 (@read_only)
+"""
+
+
+MAX_BATCH_SIZE = 50000
+
+
+@dataclass
+class ExportSpec:
+    table: Table
+    time_column: Optional[str] = None   # 支持 since/until 过滤的时间列, 例如导出一个学期的订单
+    public: bool = False                # 是否允许通过 HTTP 接口导出; 含个人信息的表 (学生名单、借阅记录) 只能用命令行导出
+
+
+EXPORT_SPECS: Dict[str, ExportSpec] = {
+    "users": ExportSpec(User.__table__),
+    "books": ExportSpec(Book.__table__, public=True),
+    "book_inventory": ExportSpec(BookInventory.__table__, public=True),
+    "orders": ExportSpec(Order.__table__, time_column="borrow_time"),
+}
+
+
+def export_columns(entity: str) -> List[str]:
+    return [c.name for c in EXPORT_SPECS[entity].table.columns]
+
+
+@read_only
+def stream_rows(db: Session, entity: str, since: Optional[datetime] = None, until: Optional[datetime] = None,
+                batch_size: int = 5000) -> Iterator[List[Tuple]]:
+    """ 按主键顺序逐批产出行 (元组, 列顺序与 export_columns 一致) """
+    if entity not in EXPORT_SPECS:
+        raise ValueError(f"Unknown export entity {entity}, expected one of {sorted(EXPORT_SPECS)}.")
+    if not 1 <= batch_size <= MAX_BATCH_SIZE:
+        raise ValueError(f"batch_size must be in [1, {MAX_BATCH_SIZE}], got {batch_size}.")
+
+    spec = EXPORT_SPECS[entity]
+    stmt = select(*spec.table.columns).order_by(*spec.table.primary_key.columns)
+    if spec.time_column is not None:
+        column = spec.table.c[spec.time_column]
+        if since is not None:
+            stmt = stmt.where(column >= since)
+        if until is not None:
+            stmt = stmt.where(column < until)
+    elif since is not None or until is not None:
+        raise ValueError(f"{entity} does not support since/until filters.")
+
+    result = db.execute(stmt, execution_options={"yield_per": batch_size})
+    try:
+        for partition in result.partitions():
+            yield [tuple(row) for row in partition]
+    finally:
+        result.close()
@@ -0,0 +1,92 @@
+from dataclasses import dataclass, asdict
+from typing import Callable, Dict, Generic, Hashable, Iterable, List, Optional, TypeVar
+
+
+""" 请求级别的批量加载器 (DataLoader)
+
+    渲染一组订单时, 业务代码习惯逐条写 "查这个订单的用户、查这本书", 每个键一次往返。加载器把一次请求内的单键查询收集起来,
+    合并成一次 get_many_by_* 批量查询 (仓库内部再按 IN_CHUNK_SIZE 分块), 同一个键在一次请求内只查一次。
+
+    - load(key) 只登记键并返回一个 Pending, 第一次对任意 Pending 调用 get() 时把所有已登记的键一次性查询;
+      load_many(keys) 直接登记并查询
+    - 查询结果 (包括不存在的键, 记为 None) 缓存到请求结束, 加载器随请求创建 (见 app/storage/db.py 的 get_loaders), 不跨请求共享,
+      因此不会读到其他请求写入之前的旧数据
+"""
+
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+
+@dataclass
+class LoaderStats:
+    loads: int = 0        # 调用方请求的键次数 (包括重复的键)
+    keys: int = 0         # 实际发往数据库的键数 (去重、去掉已缓存的之后)
+    batches: int = 0      # 批量查询的次数
+
+    def to_dict(self) -> Dict:
+        return asdict(self)
+
+
+class Pending(Generic[K, V]):
+    __slots__ = ("_loader", "_key")
+
+    def __init__(self, loader: "DataLoader[K, V]", key: K):
+        self._loader = loader
+        self._key = key
+
+    def get(self) -> Optional[V]:
+        return self._loader._resolve(self._key)
+
+
+class DataLoader(Generic[K, V]):
+    def __init__(self, batch_fn: Callable[[List[K]], Dict[K, V]]):
+        self.batch_fn = batch_fn
+        self.stats = LoaderStats()
+        self._cache: Dict[K, Optional[V]] = {}
+        self._queue: Dict[K, None] = {}      # 待查询的键, dict 作为有序集合
+
+    def load(self, key: K) -> Pending[K, V]:
+        self.stats.loads += 1
+        if key not in self._cache:
+            self._queue[key] = None
+        return Pending(self, key)
+
+    def load_many(self, keys: Iterable[K]) -> List[Optional[V]]:
+        pending = [self.load(key) for key in keys]
+        return [p.get() for p in pending]
+
+    def get(self, key: K) -> Optional[V]:
+        return self.load(key).get()
+
+    def prime(self, key: K, value: Optional[V]) -> None:
+        """ 预先放入已知的结果, 例如写操作刚返回的对象 """
+        self._cache[key] = value
+        self._queue.pop(key, None)
+
+    def dispatch(self) -> None:
+        if not self._queue:
+            return
+        keys, self._queue = list(self._queue), {}
+        self.stats.keys += len(keys)
+        self.stats.batches += 1
+        found = self.batch_fn(keys)
+        for key in keys:
+            self._cache[key] = found.get(key)
+
+    def _resolve(self, key: K) -> Optional[V]:
+        if key not in self._cache:
+            self.dispatch()
+        return self._cache.get(key)
+
+
+# 一次请求内共用的加载器集合; 仓库由依赖注入提供, 因此缓存层、目录快照等包装同样生效
+class RequestLoaders:
+    def __init__(self, users, books):
+        self.user_by_uid = DataLoader(users.get_many_by_uid)
+        self.user_by_student_id = DataLoader(users.get_many_by_student_id)
+        self.book_by_bid = DataLoader(books.get_many_by_bid)
+        self.book_by_isbn = DataLoader(books.get_many_by_isbn)
+
+    def stats(self) -> Dict[str, Dict]:
+        return {name: loader.stats.to_dict() for name, loader in vars(self).items()}
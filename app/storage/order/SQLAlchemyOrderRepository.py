@@ -0,0 +1,196 @@
+from datetime import datetime, timedelta
+from typing import Optional, Iterator, Tuple, List, Dict
+
+from sqlalchemy import bindparam, insert, update, select
+from sqlalchemy.orm import Session
+
+from app.core.db import transaction
+from app.core.fine_policy import FinePolicy
+from app.core.idgen import SnowflakeIdGenerator, get_id_generator
+from app.models.book_inventory import BookInventory
+from app.models.order import Order, OrderStatus
+from app.schemas.order import OrderOut
+from app.storage.availability.SQLAlchemyAvailabilityRepository import apply_loan_delta
+from app.storage.order.order_interface import IOrderRepository
+from app.storage.routing import read_only
+
+
+class OutOfStockError(ValueError):
+    pass
+
+
+# 续借次数已用完或者已经逾期, 需要先归还 (并结算罚款)
+class RenewalRefused(ValueError):
+    pass
+
+
+""" 借阅/归还的并发控制
+
+    期末高峰期大量学生会同时借同一本书 (同一个 (book_id, warehouse_name) 库存行), 这里不做 "先读库存, 再判断, 再写回" 的
+    read-modify-write (并发下会超卖), 而是由数据库在一条条件更新里完成判断与扣减:
+
+        UPDATE book_inventory SET quantity = quantity - 1
+        WHERE book_id = ? AND warehouse_name = ? AND quantity > 0
+
+    影响行数为 0 即表示库存不足, 整个事务回滚。InnoDB 在执行这条 UPDATE 时对库存行加排他锁, 直到事务提交才释放,
+    所以事务里先 INSERT 订单、最后再扣减库存, 让热点行的持锁时间只覆盖 "UPDATE -> COMMIT" 这一小段。
+    全程使用 Core 语句, 不把 ORM 实体加载进 identity map。可借数量汇总 (book_availability) 在同一个事务里增量更新
+"""
+
+
+# 每日罚款任务的批量写回: 同一条语句以 executemany 方式执行, 参数为 [{b_id, b_due, b_fine}, ...];
+# 状态条件跳过读出这一批之后才归还的订单, 不会覆盖归还时结算的罚款
+UPDATE_OPEN_ORDER_FINE = (
+    update(Order)
+    .where(Order.order_id == bindparam("b_id"), Order.status == OrderStatus.borrowed.value)
+    .values(due_time=bindparam("b_due"), fine=bindparam("b_fine"))
+)
+
+
+class SQLAlchemyOrderRepository(IOrderRepository):
+    def __init__(self, db: Session, id_generator: Optional[SnowflakeIdGenerator] = None):
+        self.db = db
+        self.id_generator = id_generator or get_id_generator()
+
+    @read_only
+    def get_order(self, order_id: str) -> Optional[OrderOut]:
+        order = self.db.get(Order, order_id)
+        return OrderOut.model_validate(order) if order else None
+
+    # 推荐模型按水位线增量读取, 从库的复制延迟会让水位线越过尚未复制的订单, 因此这里不标记只读, 始终读主库
+    def iter_interactions(self, since: Optional[datetime] = None, batch_size: int = 10000) -> Iterator[Tuple[int, int, datetime]]:
+        statement = select(Order.user_id, Order.book_id, Order.borrow_time)
+        if since is not None:
+            statement = statement.where(Order.borrow_time >= since)
+        yield from self.db.execute(statement.execution_options(yield_per=batch_size))
+
+    # 时间有序的 13 位借阅单号, 既是主键也是展示给用户的单号
+    def new_order_id(self) -> str:
+        return self.id_generator.next_code()
+
+    def borrow(self, user_id: int, book_id: int, warehouse_name: str, loan_days: int = 30) -> OrderOut:
+        borrow_time = datetime.utcnow()
+        order = {
+            "order_id": self.new_order_id(),
+            "user_id": user_id,
+            "book_id": book_id,
+            "warehouse_name": warehouse_name,
+            "status": OrderStatus.borrowed.value,
+            "borrow_time": borrow_time,
+            "return_time": None,
+            "renew_count": 0,
+            "due_time": borrow_time + timedelta(days=loan_days),
+            "fine": 0,
+        }
+
+        with transaction(self.db, expected=(OutOfStockError,)):
+            self.db.execute(insert(Order).values(**order))
+            result = self.db.execute(
+                update(BookInventory)
+                .where(
+                    BookInventory.book_id == book_id,
+                    BookInventory.warehouse_name == warehouse_name,
+                    BookInventory.quantity > 0,
+                )
+                .values(quantity=BookInventory.quantity - 1)
+                .execution_options(synchronize_session=False)
+            )
+            if result.rowcount == 0:
+                raise OutOfStockError(f"Book {book_id} is out of stock in {warehouse_name}.")
+            apply_loan_delta(self.db, book_id, available=-1, on_loan=1)
+
+        return OrderOut(**order)
+
+    def return_book(self, order_id: str, warehouse_name: Optional[str] = None, policy: Optional[FinePolicy] = None) -> OrderOut:
+        row = self.db.execute(
+            select(Order.book_id, Order.warehouse_name, Order.borrow_time, Order.renew_count).where(Order.order_id == order_id)
+        ).first()
+        if row is None:
+            raise ValueError(f"Order {order_id} not found.")
+
+        # 归还时按归还时间结算最终罚款, 之后的每日任务不再扫描这个订单
+        return_time = datetime.utcnow()
+        values = {"status": OrderStatus.returned.value, "return_time": return_time}
+        if policy is not None:
+            due, _, fines = policy.compute([row.borrow_time], [row.renew_count], return_time)
+            values.update(due_time=due[0].item(), fine=int(fines[0]))
+
+        with transaction(self.db):
+            # 状态条件保证同一个订单并发重复归还时, 只有一次能成功
+            result = self.db.execute(
+                update(Order)
+                .where(Order.order_id == order_id, Order.status == OrderStatus.borrowed.value)
+                .values(**values)
+                .execution_options(synchronize_session=False)
+            )
+            if result.rowcount == 0:
+                raise ValueError(f"Order {order_id} is not in borrowed status.")
+
+            result = self.db.execute(
+                update(BookInventory)
+                .where(BookInventory.book_id == row.book_id,
+                       BookInventory.warehouse_name == (warehouse_name or row.warehouse_name))
+                .values(quantity=BookInventory.quantity + 1)
+                .execution_options(synchronize_session=False)
+            )
+            if result.rowcount == 0:
+                raise ValueError(f"Book {row.book_id} has no inventory in {warehouse_name or row.warehouse_name}.")
+            apply_loan_delta(self.db, row.book_id, available=1, on_loan=-1)
+
+        self.db.expire_all()
+        return self.get_order(order_id)
+
+    # 续借: 每次续借的天数见 FinePolicy.renew_days, 次数用完或者已经逾期时抛出 RenewalRefused
+    def renew(self, order_id: str, policy: FinePolicy) -> OrderOut:
+        row = self.db.execute(
+            select(Order.borrow_time, Order.renew_count).where(Order.order_id == order_id, Order.status == OrderStatus.borrowed.value)
+        ).first()
+        if row is None:
+            raise ValueError(f"Order {order_id} not found or not in borrowed status.")
+        if row.renew_count >= policy.max_renewals:
+            raise RenewalRefused(f"Order {order_id} has already been renewed {row.renew_count} times.")
+
+        now = datetime.utcnow()
+        _, overdue, _ = policy.compute([row.borrow_time], [row.renew_count], now)
+        if overdue[0] > 0:
+            raise RenewalRefused(f"Order {order_id} is {int(overdue[0])} days overdue, return it first.")
+        due, _, _ = policy.compute([row.borrow_time], [row.renew_count + 1], now)
+
+        with transaction(self.db):
+            # 以读到的续借次数为条件, 同一个订单并发续借时只有一次能成功
+            result = self.db.execute(
+                update(Order)
+                .where(Order.order_id == order_id, Order.status == OrderStatus.borrowed.value, Order.renew_count == row.renew_count)
+                .values(renew_count=row.renew_count + 1, due_time=due[0].item(), fine=0)
+                .execution_options(synchronize_session=False)
+            )
+            if result.rowcount == 0:
+                raise ValueError(f"Order {order_id} was returned or renewed concurrently.")
+
+        self.db.expire_all()
+        return self.get_order(order_id)
+
+    # 键集分页: WHERE status = 'borrowed' AND order_id > 上一批最后一个 ORDER BY order_id LIMIT n, 走 (status, order_id) 索引;
+    # 不使用服务端游标, 因为每一批读完之后要在同一个连接上写回, 而 MySQL 的流式结果集未读完时不能执行其它语句
+    def iter_open_orders(self, chunk_size: int = 10000) -> Iterator[List[Tuple]]:
+        statement = (
+            select(Order.order_id, Order.borrow_time, Order.renew_count, Order.due_time, Order.fine)
+            .where(Order.status == OrderStatus.borrowed.value)
+            .order_by(Order.order_id)
+            .limit(chunk_size)
+        )
+        last_id = None
+        while True:
+            page = statement if last_id is None else statement.where(Order.order_id > last_id)
+            rows = [tuple(row) for row in self.db.execute(page)]
+            if not rows:
+                return
+            yield rows
+            last_id = rows[-1][0]
+
+    # 返回实际写入的行数, 已经归还的订单不计入
+    def bulk_update_fines(self, changes: List[Dict]) -> int:
+        params = [{"b_id": c["order_id"], "b_due": c["due_time"], "b_fine": c["fine"]} for c in changes]
+        with transaction(self.db):
+            result = self.db.connection().execute(UPDATE_OPEN_ORDER_FINE, params)
+        return result.rowcount
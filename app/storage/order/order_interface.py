@@ -0,0 +1,33 @@
+from datetime import datetime
+from typing import Protocol, Optional, Iterator, Tuple, List, Dict
+from app.core.fine_policy import FinePolicy
+from app.schemas.order import OrderOut
+
+
+class IOrderRepository(Protocol):
+    def get_order(self, order_id: str) -> Optional[OrderOut]:
+        ...
+
+    # 借阅: 创建订单并扣减库存, 库存不足时抛出 OutOfStockError
+    def borrow(self, user_id: int, book_id: int, warehouse_name: str, loan_days: int = 30) -> OrderOut:
+        ...
+
+    # 归还: 订单状态置为 returned 并归还库存, 传入 policy 时同时结算罚款; 订单不存在或已归还时抛出 ValueError
+    def return_book(self, order_id: str, warehouse_name: Optional[str] = None, policy: Optional[FinePolicy] = None) -> OrderOut:
+        ...
+
+    # 续借: 应还时间顺延, 续借次数加一; 次数用完或已逾期时抛出 RenewalRefused, 订单不存在或已归还时抛出 ValueError
+    def renew(self, order_id: str, policy: FinePolicy) -> OrderOut:
+        ...
+
+    # 流式读取借阅记录 (user_id, book_id, borrow_time), since 不为空时只读取该时间之后的记录, 用于推荐模型构建与增量刷新
+    def iter_interactions(self, since: Optional[datetime] = None) -> Iterator[Tuple[int, int, datetime]]:
+        ...
+
+    # 按 order_id 分批读取未归还的订单 [(order_id, borrow_time, renew_count, due_time, fine), ...], 用于每日罚款任务
+    def iter_open_orders(self, chunk_size: int = 10000) -> Iterator[List[Tuple]]:
+        ...
+
+    # 按主键批量写回应还时间与罚款 [{order_id, due_time, fine}, ...], 只写回仍未归还的订单, 返回写入的行数
+    def bulk_update_fines(self, changes: List[Dict]) -> int:
+        ...
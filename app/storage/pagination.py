@@ -0,0 +1,47 @@
+import base64
+import hashlib
+import json
+from typing import Any, Iterable, Tuple
+
+
+""" 游标分页 (keyset pagination)
+
+    OFFSET 分页需要数据库先扫描并丢弃前 page * page_size 行, 翻页越深越慢;
+    游标分页记住上一页最后一行的排序键, 下一页直接 WHERE key > last ORDER BY key LIMIT n, 可以走主键索引, 耗时与页码无关。
+
+    游标对调用方是不透明的字符串 (base64url 编码的 JSON), 调用方只需要把上一页返回的 next_cursor 原样传回
+"""
+
+
+# 接口层允许的最大 page_size, 与 BookRetrieveReq 一致
+MAX_PAGE_SIZE = 100
+
+
+class InvalidCursor(ValueError):
+    """ 游标无法解码, 或者排序键的类型不对; 接口层返回 400 """
+
+
+def encode_cursor(key: str, value: Any) -> str:
+    raw = json.dumps({key: value}, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, key: str, kind: type = int) -> Any:
+    """ 取出游标中的排序键并检查类型 (默认为整数主键), 伪造的游标不会被原样传给 SQL """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        value = json.loads(base64.urlsafe_b64decode(padded.encode()))[key]
+    except Exception as e:
+        raise InvalidCursor(f"invalid cursor: {cursor}") from e
+    # bool 是 int 的子类, 单独排除
+    if not isinstance(value, kind) or isinstance(value, bool):
+        raise InvalidCursor(f"invalid cursor: {cursor}")
+    return value
+
+
+def page_fingerprint(total: int, keys: Iterable[Tuple[Any, int]]) -> str:
+    """ 一页数据的版本: 由总数以及这一页每行的 (主键, 版本号) 计算摘要, 任意一行被修改、增删或换页都会改变结果 """
+    digest = hashlib.blake2b(str(total).encode(), digest_size=12)
+    for key, version in keys:
+        digest.update(f"|{key}.{version}".encode())
+    return digest.hexdigest()
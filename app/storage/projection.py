@@ -0,0 +1,36 @@
+from typing import Iterable, List, Optional, Tuple, Type, TypeVar
+from pydantic import BaseModel
+
+
+""" 可信投影读取 (trusted projection):
+
+    读接口只 SELECT 输出模型需要的列, 拿到的是 Core Row 而不是 ORM 实体, 不进入 Session 的 identity map;
+    再用 model_construct 直接构造输出模型, 跳过校验 (例如每一行的 EmailStr 解析)。
+    这些行来自我们自己的数据库, 写入时已经校验过, 因此读出时无需再次校验; 外部输入仍然走 model_validate。
+"""
+
+
+SchemaT = TypeVar("SchemaT", bound=BaseModel)
+
+
+def projection_columns(model, schema: Type[BaseModel]) -> list:
+    """ 输出模型的每个字段对应 ORM 模型上的同名列, 例如 (User, UserOut) -> [User.uid, User.name, ...] """
+    return [getattr(model, name) for name in schema.model_fields]
+
+
+def construct(schema: Type[SchemaT], row) -> Optional[SchemaT]:
+    return schema.model_construct(**row._mapping) if row is not None else None
+
+
+def construct_versioned(schema: Type[SchemaT], row, key: str) -> Optional[Tuple[SchemaT, str]]:
+    """ 行中除输出模型的字段之外还多一列 version, 返回 (输出模型, "主键.版本号"), 与 get_version_by_* 的格式相同 """
+    if row is None:
+        return None
+    fields = dict(row._mapping)
+    version = fields.pop("version")
+    return schema.model_construct(**fields), f"{fields[key]}.{version}"
+
+
+def construct_all(schema: Type[SchemaT], rows: Iterable) -> List[SchemaT]:
+    build = schema.model_construct
+    return [build(**row._mapping) for row in rows]
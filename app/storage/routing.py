@@ -0,0 +1,138 @@
+import functools
+import inspect
+import itertools
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, List, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+
+""" 读写分离
+
+    仓库的读方法 (get_*, search_book, get_batch_users) 使用 @read_only 装饰, 在方法执行期间标记当前上下文为只读;
+    RoutingSession.get_bind 根据这个标记选择引擎:
+        - 正在 flush、或者当前会话已经写过数据 (保证同一个请求内读到自己刚写入的数据) -> 主库
+        - 只读上下文并且配置了从库 -> 从库 (多个从库在进程内全局轮询, 而不是每个会话从第一个从库开始)
+        - 其余情况 -> 主库
+    标记存放在 ContextVar 中, 线程池中的同步路由与事件循环中的异步路由都互不干扰
+"""
+
+
+_read_only: ContextVar[bool] = ContextVar("bookhub_read_only", default=False)
+
+
+# 路由计数, 会在 /db/stats 与 /metrics 中暴露
+class RoutingStats:
+    def __init__(self):
+        self._counts = {"primary": 0, "replica": 0}
+        self._lock = threading.Lock()
+
+    def incr(self, target: str) -> None:
+        with self._lock:
+            self._counts[target] += 1
+
+    def to_dict(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._counts)
+
+
+routing_stats = RoutingStats()
+
+
+# 从库轮询的计数器是进程级别的: 会话是请求级别的, 每个会话各自轮询时每个请求的第一次读都会落在第一个从库上
+_replica_counter = itertools.count()
+_replica_lock = threading.Lock()
+
+
+def next_replica(replicas: List[Engine]) -> Engine:
+    with _replica_lock:
+        i = next(_replica_counter)
+    return replicas[i % len(replicas)]
+
+
+@contextmanager
+def read_only_context():
+    token = _read_only.set(True)
+    try:
+        yield
+    finally:
+        _read_only.reset(token)
+
+
+# 与 read_only_context 相反: 即使外层处于只读上下文, 块内的查询也走主库 (例如同步变更日志, 不能读到滞后的从库)
+@contextmanager
+def primary_context():
+    token = _read_only.set(False)
+    try:
+        yield
+    finally:
+        _read_only.reset(token)
+
+
+def read_only(func):
+    """ 标记仓库方法为只读, 同时支持同步方法、生成器方法 (流式读取) 与 async 方法 """
+    if inspect.isgeneratorfunction(func):
+        # 流式响应会在不同的工作线程 (各自复制的 Context) 中推进生成器, 因此每一步单独进入/退出只读上下文,
+        # 而不是在整个生成器的生命周期内持有同一个 ContextVar token
+        @functools.wraps(func)
+        def gen_wrapper(*args, **kwargs):
+            gen = func(*args, **kwargs)
+            try:
+                while True:
+                    with read_only_context():
+                        try:
+                            item = next(gen)
+                        except StopIteration:
+                            return
+                    yield item
+            finally:
+                gen.close()
+        return gen_wrapper
+
+    if inspect.iscoroutinefunction(func):
+        @functools.wraps(func)
+        async def async_wrapper(*args, **kwargs):
+            with read_only_context():
+                return await func(*args, **kwargs)
+        return async_wrapper
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        with read_only_context():
+            return func(*args, **kwargs)
+    return wrapper
+
+
+class RoutingSession(Session):
+    def __init__(self, primary: Engine = None, replicas: Optional[List[Engine]] = None, **kwargs):
+        # AsyncSession 会显式传入 bind=None, 因此不能用 setdefault
+        if kwargs.get("bind") is None:
+            kwargs["bind"] = primary
+        super().__init__(**kwargs)
+        self.primary = kwargs["bind"]
+        self.replicas = list(replicas or [])
+
+    def get_bind(self, mapper=None, clause=None, **kwargs):
+        if self.replicas and _read_only.get() and not self._flushing and not self.info.get("has_writes"):
+            routing_stats.incr("replica")
+            return next_replica(self.replicas)
+
+        routing_stats.incr("primary")
+        return self.primary
+
+
+# 会话一旦产生过写操作, 之后的读都留在主库, 避免主从延迟导致读不到刚写入的数据。
+# 写操作有两种来源: ORM 对象的 flush, 以及直接 db.execute(insert/update/delete) 的 Core DML (不经过 flush)
+@event.listens_for(RoutingSession, "after_flush")
+def _mark_has_writes(session, flush_context):
+    session.info["has_writes"] = True
+
+
+@event.listens_for(RoutingSession, "do_orm_execute")
+def _mark_dml_writes(orm_execute_state):
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        orm_execute_state.session.info["has_writes"] = True
@@ -0,0 +1,237 @@
+import asyncio
+import copy
+import threading
+import time
+import weakref
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Set
+
+from app.core.config import get_settings
+from app.core.metrics import singleflight_wait_seconds
+
+
+""" 单飞 (single-flight): 合并同一个键上并发的相同读取
+
+    新书上架时几百个请求同时查同一个 isbn, 缓存一起未命中, 每个请求都会执行同一条 SELECT。单飞让每个键同一时刻只有一次
+    加载 (leader) 真正访问数据库, 在它执行期间到达的调用 (follower) 等待并共享它的结果或异常; 加载结束后键立即释放,
+    之后的调用重新加载, 因此这里只合并 "同时" 的读取, 不是缓存, 不会延长数据的陈旧时间。
+
+    - SingleFlight 用于同步仓库 (线程池中的请求), follower 阻塞在 threading.Event 上
+    - AsyncSingleFlight 用于异步仓库, follower 等待 leader 的 Future; Future 按事件循环分开, 多个事件循环 (线程) 之间不共享加载。
+      leader 被取消 (客户端断开) 时 follower 重新竞争 leader, 不会把取消传染给其他请求
+    - follower 收到的异常是 leader 异常的副本 (__cause__ 指向原异常), 同一个异常对象在多处抛出会互相改写 __traceback__
+    - 写操作之后调用 forget(key), 让之后的读取不再加入写入之前开始的那次加载;
+      会话里已经有写操作时 (in_write_transaction) 仓库包装层不走单飞, 读取要看到本事务自己的写入
+    - 按仓库方法分组 (见 FlightGroups), 每组统计 调用数 / 实际加载数 / 合并数 与 follower 的等待时间
+"""
+
+
+class FlightStats:
+    __slots__ = ("calls", "loads", "coalesced", "errors", "wait_seconds", "max_wait_seconds")
+
+    def __init__(self):
+        self.calls = 0              # 全部调用
+        self.loads = 0              # 作为 leader 真正执行加载的次数
+        self.coalesced = 0          # 作为 follower 共享结果的次数
+        self.errors = 0             # 加载抛出异常的次数 (异常同样共享给 follower)
+        self.wait_seconds = 0.0     # follower 等待时间之和
+        self.max_wait_seconds = 0.0
+
+    @property
+    def coalescing_ratio(self) -> float:
+        return self.coalesced / self.calls if self.calls else 0.0
+
+    def to_dict(self) -> Dict:
+        return {
+            "calls": self.calls,
+            "loads": self.loads,
+            "coalesced": self.coalesced,
+            "errors": self.errors,
+            "coalescing_ratio": round(self.coalescing_ratio, 4),
+            "avg_wait_ms": round(self.wait_seconds / self.coalesced * 1000, 3) if self.coalesced else 0.0,
+            "max_wait_ms": round(self.max_wait_seconds * 1000, 3),
+        }
+
+
+def _shared_error(error: BaseException) -> BaseException:
+    """ 交给 follower 抛出的异常: 能复制就复制一份, 否则包装成 RuntimeError; 调用方用 raise ... from error 关联原异常 """
+    try:
+        return copy.copy(error)
+    except Exception:
+        return RuntimeError(f"shared load failed: {error!r}")
+
+
+def in_write_transaction(db) -> bool:
+    """ 会话已经产生过写操作 (见 app/storage/routing.py 的 has_writes) """
+    return db is not None and bool(db.info.get("has_writes"))
+
+
+class _Call:
+    __slots__ = ("done", "result", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error: Optional[BaseException] = None
+
+
+class SingleFlight:
+    def __init__(self, name: str = ""):
+        self.name = name
+        self.stats = FlightStats()
+        self._calls: Dict[Hashable, _Call] = {}
+        self._lock = threading.Lock()
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Any:
+        with self._lock:
+            self.stats.calls += 1
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self.stats.loads += 1
+            else:
+                self.stats.coalesced += 1
+
+        if leader:
+            try:
+                call.result = fn()
+            except BaseException as e:
+                call.error = e
+                raise
+            finally:
+                with self._lock:
+                    if self._calls.get(key) is call:
+                        del self._calls[key]
+                    if call.error is not None:
+                        self.stats.errors += 1
+                call.done.set()
+            return call.result
+
+        start = time.perf_counter()
+        call.done.wait()
+        self._record_wait(time.perf_counter() - start)
+        if call.error is not None:
+            raise _shared_error(call.error) from call.error
+        return call.result
+
+    def forget(self, key: Hashable) -> None:
+        """ 正在进行的加载照常完成并返回给已经在等待的调用, 但之后的调用会开始新的加载 """
+        with self._lock:
+            self._calls.pop(key, None)
+
+    def _record_wait(self, waited: float) -> None:
+        with self._lock:
+            self.stats.wait_seconds += waited
+            self.stats.max_wait_seconds = max(self.stats.max_wait_seconds, waited)
+        singleflight_wait_seconds.observe(waited, method=self.name)
+
+
+# leader 被取消时交给 follower 的标记, follower 收到后重新竞争 leader
+_RETRY = object()
+
+
+class AsyncSingleFlight:
+    def __init__(self, name: str = ""):
+        self.name = name
+        self.stats = FlightStats()
+        # 事件循环 -> {键: Future}; Future 只能在创建它的事件循环里等待
+        self._loops: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[Hashable, asyncio.Future]]" = weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+
+    def _calls(self) -> Dict[Hashable, asyncio.Future]:
+        loop = asyncio.get_running_loop()
+        calls = self._loops.get(loop)
+        if calls is None:
+            with self._lock:
+                calls = self._loops.setdefault(loop, {})
+        return calls
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        self.stats.calls += 1
+        start = time.perf_counter()
+        calls = self._calls()
+        while True:
+            future = calls.get(key)
+            if future is None:
+                return await self._lead(calls, key, fn)
+
+            # shield: 当前请求被取消时只取消自己的等待, 不影响 leader 与其他 follower
+            try:
+                result = await asyncio.shield(future)
+            except asyncio.CancelledError:
+                raise
+            except BaseException as e:
+                self._record_wait(time.perf_counter() - start)
+                raise _shared_error(e) from e
+            if result is not _RETRY:
+                self._record_wait(time.perf_counter() - start)
+                return result
+
+    async def _lead(self, calls: Dict[Hashable, asyncio.Future], key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        future = calls[key] = asyncio.get_running_loop().create_future()
+        self.stats.loads += 1
+        try:
+            result = await fn()
+        except asyncio.CancelledError:
+            future.set_result(_RETRY)
+            raise
+        except BaseException as e:
+            self.stats.errors += 1
+            future.set_exception(e)
+            future.exception()      # 没有 follower 时避免 "exception was never retrieved" 警告
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            if calls.get(key) is future:
+                del calls[key]
+
+    def forget(self, key: Hashable) -> None:
+        with self._lock:
+            loops = list(self._loops.values())
+        for calls in loops:
+            calls.pop(key, None)
+
+    # 只在拿到共享的结果 (或异常) 时计一次合并; leader 被取消后重新竞争的等待时间累计在同一次调用里
+    def _record_wait(self, waited: float) -> None:
+        self.stats.coalesced += 1
+        self.stats.wait_seconds += waited
+        self.stats.max_wait_seconds = max(self.stats.max_wait_seconds, waited)
+        singleflight_wait_seconds.observe(waited, method=self.name)
+
+
+class FlightGroups:
+    """ 每个仓库方法 ("book.get_by_isbn") 一个 SingleFlight, 进程内共享; 哪些方法走单飞由仓库包装层按配置决定 (见 SingleFlightBookRepository) """
+
+    def __init__(self, factory: Callable[[str], Any]):
+        self._factory = factory
+        self._groups: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+
+    def get(self, method: str):
+        group = self._groups.get(method)
+        if group is None:
+            with self._lock:
+                group = self._groups.setdefault(method, self._factory(method))
+        return group
+
+    def forget(self, method: str, key: Hashable) -> None:
+        group = self._groups.get(method)
+        if group is not None:
+            group.forget(key)
+
+    def stats(self) -> Dict[str, Dict]:
+        return {method: group.stats.to_dict() for method, group in sorted(self._groups.items())}
+
+
+flights = FlightGroups(SingleFlight)
+async_flights = FlightGroups(AsyncSingleFlight)
+
+
+def enabled_methods() -> Set[str]:
+    return set(get_settings().get_singleflight_methods())
+
+
+def flight_stats() -> Dict[str, Dict]:
+    return {"sync": flights.stats(), "async": async_flights.stats()}
@@ -0,0 +1,68 @@
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple, Type
+
+from pydantic import BaseModel
+from sqlalchemy import bindparam, select
+from sqlalchemy.sql import Select
+
+from app.storage.pagination import decode_cursor
+
+
+""" 热点查询的预构建语句
+
+    每次调用都写 db.query(User).filter(User.student_id == sid) 或 select(...).where(...) 时, SQLAlchemy 要先构造一棵新的语句树,
+    再遍历它生成缓存键, 命中编译缓存之后才能交给驱动。热点点查与分页改为在模块加载时构建一次、用 bindparam 占位的语句,
+    执行时只传参数: 语句对象不变, 缓存键只算一次就被记住, 每次查询省掉的是纯 Python 开销。
+
+    - 投影读取使用 Table 上的 Core 列 (core_columns), 不带 ORM 注解的语句在 Session.execute 中不需要建立 ORM 编译上下文
+    - 需要 ORM 实体的写路径 (更新/删除之前的查询) 仍然用 select(Model), 同样预先构建
+    - 服务端预编译 (prepare) 取决于驱动: psycopg 3 通过 prepare_threshold 开启 (见 app/storage/engine.py), asyncpg 默认开启;
+      PyMySQL/aiomysql 不支持服务端预编译, 语句在客户端完成参数替换
+    - 批量点查 (lookup_many) 使用 expanding 参数 IN :keys, 执行时才按列表长度展开; 键先去重再按 IN_CHUNK_SIZE 切分,
+      避免过长的 IN 列表超出驱动/数据库的参数上限或让优化器放弃索引
+"""
+
+
+IN_CHUNK_SIZE = 500
+
+
+def core_column(attr):
+    """ ORM 属性 (User.uid) -> 对应的 Table 列 (users.c.uid) """
+    column = attr.property.columns[0]
+    return column.table.c[column.key]
+
+
+def core_columns(model, schema: Type[BaseModel]) -> list:
+    """ 与 projection_columns 相同的列, 但取 Table 上的 Core 列, 并以输出模型的字段名作为标签 """
+    return [core_column(getattr(model, name)).label(name) for name in schema.model_fields]
+
+
+def lookup(columns, key, name: Optional[str] = None) -> Select:
+    """ SELECT columns WHERE key = :name, 参数名默认与列名相同 """
+    return select(*columns).where(key == bindparam(name or key.key))
+
+
+def lookup_many(columns, key) -> Select:
+    """ SELECT columns WHERE key IN (:keys), 执行时传入 {"keys": [...]} """
+    return select(*columns).where(key.in_(bindparam("keys", expanding=True)))
+
+
+def in_chunks(keys: Iterable, size: int = IN_CHUNK_SIZE) -> Iterator[List]:
+    """ 去重 (保持首次出现的顺序) 之后按 size 切分 """
+    unique = list(dict.fromkeys(keys))
+    for i in range(0, len(unique), size):
+        yield unique[i:i + size]
+
+
+class PageQuery:
+    """ 按主键排序的分页: OFFSET 分页与游标分页各预先构建一条语句, LIMIT/OFFSET 也作为绑定参数, 多取一行用于判断是否还有下一页 """
+
+    def __init__(self, columns, key):
+        self.key = key.key
+        base = select(*columns).order_by(key).limit(bindparam("limit"))
+        self.by_offset = base.offset(bindparam("offset"))
+        self.by_cursor = base.where(key > bindparam("after"))
+
+    def bind(self, page: int, page_size: int, cursor: Optional[str] = None) -> Tuple[Select, Dict[str, Any]]:
+        if cursor is not None:
+            return self.by_cursor, {"after": decode_cursor(cursor, self.key), "limit": page_size + 1}
+        return self.by_offset, {"offset": page * page_size, "limit": page_size + 1}
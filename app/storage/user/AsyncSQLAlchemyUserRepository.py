@@ -0,0 +1,155 @@
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.db import async_transaction
+from app.models.user import User
+from app.schemas.user import UserCreate, UserUpdate, UserOut, BatchUsersOut
+from app.storage.user.user_interface import IAsyncUserRepository
+from app.storage.user.SQLAlchemyUserRepository import (
+    USER_BY_STUDENT_ID, USER_COUNT, USER_PAGE, USER_VERSION_BY_STUDENT_ID, USER_VERSION_PAGE,
+    USERS_BY_STUDENT_IDS, USERS_BY_UIDS,
+)
+from app.storage.cache.CachedCounter import CachedCounter, user_counter
+from app.storage.pagination import encode_cursor, page_fingerprint
+from app.storage.routing import read_only
+from app.storage.statements import in_chunks
+
+
+from typing import Dict, Iterable, Optional, List, Tuple
+
+
+# SQLAlchemy AsyncSession 实现的用户仓库, 逻辑与 SQLAlchemyUserRepository 保持一致, 所有数据库 IO 都通过 await 让出事件循环
+# 注意: AsyncSession 不支持隐式的懒加载 IO, 因此这里只访问列属性, 不触碰 User.orders 等关系属性
+class AsyncSQLAlchemyUserRepository(IAsyncUserRepository):
+    def __init__(self, db: AsyncSession, counter: CachedCounter = user_counter):
+        self.db = db
+        self.counter = counter
+
+    async def query_student(self, student_id: str) -> Optional[User]:
+        result = await self.db.execute(USER_BY_STUDENT_ID, {"student_id": student_id})
+        return result.scalars().first()
+
+    @read_only
+    async def get_user_by_uid(self, uid: int) -> Optional[UserOut]:
+        user = await self.db.get(User, uid)
+        return UserOut.model_validate(user) if user else None
+
+    @read_only
+    async def get_user_by_student_id(self, student_id: str) -> Optional[UserOut]:
+        user = await self.query_student(student_id)
+        return UserOut.model_validate(user) if user else None
+
+
+    @read_only
+    async def get_many_by_uid(self, uids: Iterable[int]) -> Dict[int, UserOut]:
+        return await self._get_many(USERS_BY_UIDS, uids, "uid")
+
+
+    @read_only
+    async def get_many_by_student_id(self, student_ids: Iterable[str]) -> Dict[str, UserOut]:
+        return await self._get_many(USERS_BY_STUDENT_IDS, student_ids, "student_id")
+
+
+    async def _get_many(self, statement, keys: Iterable, field: str) -> Dict:
+        users = {}
+        for chunk in in_chunks(keys):
+            for user in (await self.db.execute(statement, {"keys": chunk})).scalars():
+                users[getattr(user, field)] = UserOut.model_validate(user)
+        return users
+
+
+    @read_only
+    async def get_batch_users(self, page: int, page_size: int, cursor: Optional[str] = None) -> Optional[BatchUsersOut]:
+        return (await self.get_batch_users_with_version(page, page_size, cursor))[0]
+
+
+    @read_only
+    async def get_batch_users_with_version(self, page: int, page_size: int, cursor: Optional[str] = None) -> Tuple[BatchUsersOut, str]:
+        users = (await self.db.execute(*USER_PAGE.bind(page, page_size, cursor))).scalars().all()
+        has_more = len(users) > page_size
+        users = users[:page_size]
+        next_cursor = encode_cursor("uid", users[-1].uid) if has_more and users else None
+
+        total = await self._total()
+
+        batch = BatchUsersOut(total=total, count=len(users), users=[UserOut.model_validate(u) for u in users], next_cursor=next_cursor)
+        return batch, page_fingerprint(total, [(u.uid, u.version) for u in users])
+
+
+    @read_only
+    async def get_batch_users_version(self, page: int, page_size: int, cursor: Optional[str] = None) -> str:
+        rows = (await self.db.execute(*USER_VERSION_PAGE.bind(page, page_size, cursor))).all()[:page_size]
+        return page_fingerprint(await self._total(), rows)
+
+
+    @read_only
+    async def get_version_by_student_id(self, student_id: str) -> Optional[str]:
+        row = (await self.db.execute(USER_VERSION_BY_STUDENT_ID, {"student_id": student_id})).first()
+        return f"{row.uid}.{row.version}" if row else None
+
+    @read_only
+    async def get_with_version_by_student_id(self, student_id: str) -> Optional[Tuple[UserOut, str]]:
+        user = await self.query_student(student_id)
+        return (UserOut.model_validate(user), f"{user.uid}.{user.version}") if user else None
+
+
+    async def _total(self) -> int:
+        total = self.counter.peek()
+        if total is None:
+            total = (await self.db.execute(USER_COUNT)).scalar_one()
+            self.counter.set(total)
+        return total
+
+
+    async def create_user(self, user_data: UserCreate) -> UserOut:
+        user = User(**user_data.dict())
+
+        async with async_transaction(self.db):
+            self.db.add(user)
+
+        await self.db.refresh(user)
+        self.counter.add(1)
+        return UserOut.model_validate(user)
+
+
+    async def create_batch_users(self, users: List[UserCreate]) -> List[UserOut]:
+        user_orms = [User(**u.dict()) for u in users]
+        student_ids = [u.student_id for u in users]
+
+        async with async_transaction(self.db):
+            self.db.add_all(user_orms)
+
+        # 分批 IN 查询加载所有新用户的 uid, 避免逐个 refresh
+        for chunk in in_chunks(student_ids):
+            await self.db.execute(select(User).where(User.student_id.in_(chunk)))
+
+        self.counter.add(len(user_orms))
+        return [UserOut.model_validate(user) for user in user_orms]
+
+
+    async def update_user(self, student_id: str, user_data: UserUpdate) -> Optional[UserOut]:
+        user = await self.query_student(student_id)
+
+        if not user:
+            return None
+
+        async with async_transaction(self.db):
+            for field, value in user_data.dict(exclude_unset=True).items():
+                setattr(user, field, value)
+
+        await self.db.refresh(user)
+        return UserOut.model_validate(user)
+
+
+    async def delete_user(self, student_id: str) -> Optional[UserOut]:
+        user = await self.query_student(student_id)
+
+        if not user:
+            raise ValueError(f"User with student_id {student_id} not found.")
+
+        async with async_transaction(self.db):
+            user_info = UserOut.model_validate(user)
+            await self.db.delete(user)
+
+        self.counter.add(-1)
+        return user_info
@@ -0,0 +1,229 @@
+from typing import Awaitable, Callable, Dict, Iterable, Optional, List, Tuple
+
+from app.schemas.user import UserCreate, UserUpdate, UserOut, BatchUsersOut
+from app.storage.user.user_interface import IAsyncUserRepository, IUserRepository
+from app.storage.cache.cache_interface import ICacheBackend, pack_versioned, unpack_versioned
+from app.storage.cache.async_cache import AsyncCache
+
+
+# 用户仓库的读穿透缓存, 与 CachedBookRepository 的策略保持一致: 单键查询走缓存, 写操作之后失效对应的缓存
+class CachedUserRepository(IUserRepository):
+    def __init__(self, repo: IUserRepository, cache: ICacheBackend, ttl: Optional[float] = None):
+        self.repo = repo
+        self.cache = cache
+        self.ttl = ttl
+
+    @staticmethod
+    def uid_key(uid: int) -> str:
+        return f"user:uid:{uid}"
+
+    @staticmethod
+    def student_id_key(student_id: str) -> str:
+        return f"user:sid:{student_id}"
+
+    @staticmethod
+    def version_key(student_id: str) -> str:
+        return f"user:ver:{student_id}"
+
+    @staticmethod
+    def versioned_key(student_id: str) -> str:
+        return f"user:sidv:{student_id}"
+
+    def _load(self, key: str, loader) -> Optional[UserOut]:
+        cached = self.cache.get(key)
+        if cached is not None:
+            return UserOut.model_validate_json(cached)
+
+        user = loader()
+        if user is not None:
+            self.cache.set(key, user.model_dump_json(), self.ttl)
+        return user
+
+    # 批量读取: 逐个键查缓存, 未命中的键合并成一次批量回源, 再逐个回填
+    def _load_many(self, keys: Iterable, key_of: Callable, loader: Callable[[List], Dict]) -> Dict:
+        users, misses = {}, []
+        for key in dict.fromkeys(keys):
+            cached = self.cache.get(key_of(key))
+            if cached is not None:
+                users[key] = UserOut.model_validate_json(cached)
+            else:
+                misses.append(key)
+
+        if misses:
+            loaded = loader(misses)
+            for key, user in loaded.items():
+                self.cache.set(key_of(key), user.model_dump_json(), self.ttl)
+            users.update(loaded)
+        return users
+
+    def _invalidate(self, student_id: str, uid: Optional[int] = None) -> None:
+        self.cache.delete(*user_cache_keys(student_id, uid))
+
+    def get_user_by_uid(self, uid: int) -> Optional[UserOut]:
+        return self._load(self.uid_key(uid), lambda: self.repo.get_user_by_uid(uid))
+
+    def get_user_by_student_id(self, student_id: str) -> Optional[UserOut]:
+        return self._load(self.student_id_key(student_id), lambda: self.repo.get_user_by_student_id(student_id))
+
+    def get_many_by_uid(self, uids: Iterable[int]) -> Dict[int, UserOut]:
+        return self._load_many(uids, self.uid_key, self.repo.get_many_by_uid)
+
+    def get_many_by_student_id(self, student_ids: Iterable[str]) -> Dict[str, UserOut]:
+        return self._load_many(student_ids, self.student_id_key, self.repo.get_many_by_student_id)
+
+    # 分页结果随写入变化频繁, 直接回源
+    def get_batch_users(self, page: int, page_size: int, cursor: Optional[str] = None) -> Optional[BatchUsersOut]:
+        return self.repo.get_batch_users(page, page_size, cursor)
+
+    def get_batch_users_with_version(self, page: int, page_size: int, cursor: Optional[str] = None) -> Tuple[BatchUsersOut, str]:
+        return self.repo.get_batch_users_with_version(page, page_size, cursor)
+
+    def get_batch_users_version(self, page: int, page_size: int, cursor: Optional[str] = None) -> str:
+        return self.repo.get_batch_users_version(page, page_size, cursor)
+
+    def get_version_by_student_id(self, student_id: str) -> Optional[str]:
+        key = self.version_key(student_id)
+        version = self.cache.get(key)
+        if version is None:
+            version = self.repo.get_version_by_student_id(student_id)
+            if version is not None:
+                self.cache.set(key, version, self.ttl)
+        return version
+
+    # 回源时用户与版本号来自同一次查询, 回填时顺便写入版本号的键, 之后的条件请求直接命中
+    def get_with_version_by_student_id(self, student_id: str) -> Optional[Tuple[UserOut, str]]:
+        key = self.versioned_key(student_id)
+        cached = self.cache.get(key)
+        if cached is not None:
+            return unpack_versioned(UserOut, cached)
+
+        loaded = self.repo.get_with_version_by_student_id(student_id)
+        if loaded is not None:
+            self.cache.set(key, pack_versioned(*loaded), self.ttl)
+            self.cache.set(self.version_key(student_id), loaded[1], self.ttl)
+        return loaded
+
+    def create_user(self, user_data: UserCreate) -> UserOut:
+        return self.repo.create_user(user_data)
+
+    def create_batch_users(self, users: List[UserCreate]) -> List[UserOut]:
+        return self.repo.create_batch_users(users)
+
+    def update_user(self, student_id: str, user_data: UserUpdate) -> Optional[UserOut]:
+        user_info = self.repo.update_user(student_id, user_data)
+        self._invalidate(student_id, user_info.uid if user_info else None)
+        return user_info
+
+    def delete_user(self, student_id: str) -> Optional[UserOut]:
+        user_info = self.repo.delete_user(student_id)
+        self._invalidate(student_id, user_info.uid if user_info else None)
+        return user_info
+
+
+
+# 一个用户在缓存中的全部键: 仓库写入之后与批量导入 (app/cli/bulk_import.py) 每提交一块之后都按它删除
+def user_cache_keys(student_id: str, uid: Optional[int] = None) -> List[str]:
+    keys = [CachedUserRepository.student_id_key(student_id), CachedUserRepository.version_key(student_id),
+            CachedUserRepository.versioned_key(student_id)]
+    if uid is not None:
+        keys.append(CachedUserRepository.uid_key(uid))
+    return keys
+
+# 异步版本, 缓存键、回填与失效策略与 CachedUserRepository 相同; 缓存后端的调用经过 AsyncCache, 远程后端不阻塞事件循环
+class AsyncCachedUserRepository(IAsyncUserRepository):
+    def __init__(self, repo: IAsyncUserRepository, cache: ICacheBackend, ttl: Optional[float] = None):
+        self.repo = repo
+        self.cache = AsyncCache(cache)
+        self.ttl = ttl
+
+    uid_key = staticmethod(CachedUserRepository.uid_key)
+    student_id_key = staticmethod(CachedUserRepository.student_id_key)
+    version_key = staticmethod(CachedUserRepository.version_key)
+    versioned_key = staticmethod(CachedUserRepository.versioned_key)
+
+    async def _load(self, key: str, loader: Callable[[], Awaitable]) -> Optional[UserOut]:
+        cached = await self.cache.get(key)
+        if cached is not None:
+            return UserOut.model_validate_json(cached)
+
+        user = await loader()
+        if user is not None:
+            await self.cache.set(key, user.model_dump_json(), self.ttl)
+        return user
+
+    async def _load_many(self, keys: Iterable, key_of: Callable, loader: Callable[[List], Awaitable[Dict]]) -> Dict:
+        users, misses = {}, []
+        for key in dict.fromkeys(keys):
+            cached = await self.cache.get(key_of(key))
+            if cached is not None:
+                users[key] = UserOut.model_validate_json(cached)
+            else:
+                misses.append(key)
+
+        if misses:
+            loaded = await loader(misses)
+            for key, user in loaded.items():
+                await self.cache.set(key_of(key), user.model_dump_json(), self.ttl)
+            users.update(loaded)
+        return users
+
+    async def _invalidate(self, student_id: str, uid: Optional[int] = None) -> None:
+        await self.cache.delete(*user_cache_keys(student_id, uid))
+
+    async def get_user_by_uid(self, uid: int) -> Optional[UserOut]:
+        return await self._load(self.uid_key(uid), lambda: self.repo.get_user_by_uid(uid))
+
+    async def get_user_by_student_id(self, student_id: str) -> Optional[UserOut]:
+        return await self._load(self.student_id_key(student_id), lambda: self.repo.get_user_by_student_id(student_id))
+
+    async def get_many_by_uid(self, uids: Iterable[int]) -> Dict[int, UserOut]:
+        return await self._load_many(uids, self.uid_key, self.repo.get_many_by_uid)
+
+    async def get_many_by_student_id(self, student_ids: Iterable[str]) -> Dict[str, UserOut]:
+        return await self._load_many(student_ids, self.student_id_key, self.repo.get_many_by_student_id)
+
+    async def get_batch_users(self, page: int, page_size: int, cursor: Optional[str] = None) -> Optional[BatchUsersOut]:
+        return await self.repo.get_batch_users(page, page_size, cursor)
+
+    async def get_batch_users_with_version(self, page: int, page_size: int, cursor: Optional[str] = None) -> Tuple[BatchUsersOut, str]:
+        return await self.repo.get_batch_users_with_version(page, page_size, cursor)
+
+    async def get_batch_users_version(self, page: int, page_size: int, cursor: Optional[str] = None) -> str:
+        return await self.repo.get_batch_users_version(page, page_size, cursor)
+
+    async def get_version_by_student_id(self, student_id: str) -> Optional[str]:
+        key = self.version_key(student_id)
+        version = await self.cache.get(key)
+        if version is None:
+            version = await self.repo.get_version_by_student_id(student_id)
+            if version is not None:
+                await self.cache.set(key, version, self.ttl)
+        return version
+
+    async def get_with_version_by_student_id(self, student_id: str) -> Optional[Tuple[UserOut, str]]:
+        key = self.versioned_key(student_id)
+        cached = await self.cache.get(key)
+        if cached is not None:
+            return unpack_versioned(UserOut, cached)
+
+        loaded = await self.repo.get_with_version_by_student_id(student_id)
+        if loaded is not None:
+            await self.cache.set(key, pack_versioned(*loaded), self.ttl)
+            await self.cache.set(self.version_key(student_id), loaded[1], self.ttl)
+        return loaded
+
+    async def create_user(self, user_data: UserCreate) -> UserOut:
+        return await self.repo.create_user(user_data)
+
+    async def create_batch_users(self, users: List[UserCreate]) -> List[UserOut]:
+        return await self.repo.create_batch_users(users)
+
+    async def update_user(self, student_id: str, user_data: UserUpdate) -> Optional[UserOut]:
+        user_info = await self.repo.update_user(student_id, user_data)
+        await self._invalidate(student_id, user_info.uid if user_info else None)
+        return user_info
+
+    async def delete_user(self, student_id: str) -> Optional[UserOut]:
+        user_info = await self.repo.delete_user(student_id)
+        await self._invalidate(student_id, user_info.uid if user_info else None)
+        return user_info
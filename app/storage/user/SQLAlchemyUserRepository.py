@@ -1,48 +1,147 @@
+from sqlalchemy import func, select
 from sqlalchemy.orm import Session
 
 from app.core.db import transaction
 from app.models.user import User
 from app.schemas.user import UserCreate, UserUpdate, UserOut, BatchUsersOut
 from app.storage.user.user_interface import IUserRepository
+from app.storage.cache.CachedCounter import CachedCounter, user_counter
+from app.storage.pagination import encode_cursor, page_fingerprint
+from app.storage.projection import construct, construct_all, construct_versioned
+from app.storage.routing import read_only
+from app.storage.statements import PageQuery, core_column, core_columns, in_chunks, lookup, lookup_many
 
 
-from typing import Optional, List
+from typing import Dict, Iterable, Optional, List, Tuple
 
 
     
 
+# 可信投影读取时只查询 UserOut 需要的列 (见 app/storage/projection.py);
+# 热点点查与分页预先构建为带绑定参数的语句 (见 app/storage/statements.py), 同步与异步仓库共用
+_USER_OUT = core_columns(User, UserOut)
+_UID, _STUDENT_ID, _VERSION = core_column(User.uid), core_column(User.student_id), core_column(User.version)
+
+USER_BY_STUDENT_ID = lookup([User], User.student_id)
+USER_OUT_BY_UID = lookup(_USER_OUT, _UID)
+USER_OUT_BY_STUDENT_ID = lookup(_USER_OUT, _STUDENT_ID)
+USER_VERSION_BY_STUDENT_ID = lookup([_UID, _VERSION], _STUDENT_ID)
+USER_OUT_VERSION_BY_STUDENT_ID = lookup([*_USER_OUT, _VERSION], _STUDENT_ID)
+USER_COUNT = select(func.count(_UID))
+
+USERS_BY_UIDS = lookup_many([User], User.uid)
+USERS_BY_STUDENT_IDS = lookup_many([User], User.student_id)
+USERS_OUT_BY_UIDS = lookup_many(_USER_OUT, _UID)
+USERS_OUT_BY_STUDENT_IDS = lookup_many(_USER_OUT, _STUDENT_ID)
+
+USER_PAGE = PageQuery([User], User.uid)
+USER_OUT_PAGE = PageQuery([*_USER_OUT, _VERSION], _UID)   # 多取 version 一列用于列表的 ETag, model_construct 会忽略它
+USER_VERSION_PAGE = PageQuery([_UID, _VERSION], _UID)
+
+
 # 这是 PySQL+SQLAlchemy 实现的用户仓库(业务逻辑传入的参数是一个 IUserRepository 类型，而不是具体的子类)
 # 因而可以很方便地替换为其他子类实现，比如基于 PGSQL、MongoDB 用户仓库，或是换成 MySQL 其它三方库, e.g. SQLModel 实现
+# trusted_reads 为 True 时, 读接口跳过 ORM 实体与 UserOut 校验, 直接由列数据构造输出; 写接口不受影响
 class SQLAlchemyUserRepository(IUserRepository):
-    def __init__(self, db: Session):
+    def __init__(self, db: Session, counter: CachedCounter = user_counter, trusted_reads: bool = True):
         self.db = db
+        self.counter = counter
+        self.trusted_reads = trusted_reads
 
     def query_student(self, student_id: str) -> User:
-        return self.db.query(User).filter(User.student_id == student_id).first()
+        return self.db.execute(USER_BY_STUDENT_ID, {"student_id": student_id}).scalars().first()
 
+    @read_only
     def get_user_by_uid(self, uid: int) -> Optional[UserOut]:
-        user = self.db.query(User).filter(User.uid == uid).first()
+        if self.trusted_reads:
+            return construct(UserOut, self.db.execute(USER_OUT_BY_UID, {"uid": uid}).first())
+        user = self.db.get(User, uid)
         return UserOut.model_validate(user) if user else None
 
+    @read_only
     def get_user_by_student_id(self, student_id: str) -> Optional[UserOut]:
+        if self.trusted_reads:
+            return construct(UserOut, self.db.execute(USER_OUT_BY_STUDENT_ID, {"student_id": student_id}).first())
         user = self.query_student(student_id)
         return UserOut.model_validate(user) if user else None
 
 
-    def get_batch_users(self, page: int, page_size: int) -> Optional[BatchUsersOut]:
-        # 获取用户列表
-        users = (
-            self.db.query(User)
-            .offset(page * page_size)
-            .limit(page_size)
-            .all()
-        )
-        # 获取总记录数
-        total = self.db.query(User).count()
+    @read_only
+    def get_many_by_uid(self, uids: Iterable[int]) -> Dict[int, UserOut]:
+        return self._get_many(USERS_OUT_BY_UIDS if self.trusted_reads else USERS_BY_UIDS, uids, "uid")
+
+
+    @read_only
+    def get_many_by_student_id(self, student_ids: Iterable[str]) -> Dict[str, UserOut]:
+        return self._get_many(USERS_OUT_BY_STUDENT_IDS if self.trusted_reads else USERS_BY_STUDENT_IDS, student_ids, "student_id")
+
+
+    def _get_many(self, statement, keys: Iterable, field: str) -> Dict:
+        users = {}
+        for chunk in in_chunks(keys):
+            result = self.db.execute(statement, {"keys": chunk})
+            users.update((getattr(user, field), user) for user in self._to_out(result if self.trusted_reads else result.scalars()))
+        return users
+
+
+    @read_only
+    def get_batch_users(self, page: int, page_size: int, cursor: Optional[str] = None) -> Optional[BatchUsersOut]:
+        return self.get_batch_users_with_version(page, page_size, cursor)[0]
+
+
+    # 一页用户与这一页的版本摘要 (列表接口的 ETag), 摘要由返回的这些行计算, 二者来自同一次读取
+    @read_only
+    def get_batch_users_with_version(self, page: int, page_size: int, cursor: Optional[str] = None) -> Tuple[BatchUsersOut, str]:
+        # 获取用户列表: 有游标时按 uid 走主键索引定位, 否则退化为 OFFSET 分页; 多取一行用于判断是否还有下一页
+        users = self._page(USER_OUT_PAGE if self.trusted_reads else USER_PAGE, page, page_size, cursor)
+        has_more = len(users) > page_size
+        users = users[:page_size]
+        next_cursor = encode_cursor("uid", users[-1].uid) if has_more and users else None
+
+        # 获取总记录数, 使用缓存的计数, 避免每次请求都对整张表做 COUNT(*)
+        total = self.counter.get(self._count)
 
         # 返回分页后的用户信息, 由于BatchUsersOut 是一个嵌套的 Pydantic BaseModel, 若是使用 JsonResponse, 
         # 通常需要手动调用一下 model_dump 方法来做序列的, 为了对齐协议的返回值约定, 我们把这个 model_dump 逻辑转到了 BizResponse 之中
-        return BatchUsersOut(total=total, count=len(users), users=[UserOut.model_validate(u) for u in users])
+        batch = BatchUsersOut(total=total, count=len(users), users=self._to_out(users), next_cursor=next_cursor)
+        return batch, page_fingerprint(total, [(u.uid, u.version) for u in users])
+
+
+    # 只在条件请求 (带 If-None-Match) 时使用: 只查询 uid 与 version 两列, 与 get_batch_users_with_version 的摘要相同
+    @read_only
+    def get_batch_users_version(self, page: int, page_size: int, cursor: Optional[str] = None) -> str:
+        rows = self._page(USER_VERSION_PAGE, page, page_size, cursor)[:page_size]
+        total = self.counter.get(self._count)
+        return page_fingerprint(total, rows)
+
+
+    @read_only
+    def get_version_by_student_id(self, student_id: str) -> Optional[str]:
+        row = self.db.execute(USER_VERSION_BY_STUDENT_ID, {"student_id": student_id}).first()
+        return f"{row.uid}.{row.version}" if row else None
+
+
+    @read_only
+    def get_with_version_by_student_id(self, student_id: str) -> Optional[Tuple[UserOut, str]]:
+        if self.trusted_reads:
+            row = self.db.execute(USER_OUT_VERSION_BY_STUDENT_ID, {"student_id": student_id}).first()
+            return construct_versioned(UserOut, row, "uid")
+        user = self.query_student(student_id)
+        return (UserOut.model_validate(user), f"{user.uid}.{user.version}") if user else None
+
+
+    def _page(self, query: PageQuery, page: int, page_size: int, cursor: Optional[str]) -> list:
+        statement, params = query.bind(page, page_size, cursor)
+        result = self.db.execute(statement, params)
+        return result.scalars().all() if query is USER_PAGE else result.all()
+
+
+    def _count(self) -> int:
+        return self.db.execute(USER_COUNT).scalar_one()
+
+
+    def _to_out(self, users) -> List[UserOut]:
+        return construct_all(UserOut, users) if self.trusted_reads else [UserOut.model_validate(u) for u in users]
 
 
     def create_user(self, user_data: UserCreate) -> UserOut:
@@ -55,20 +154,24 @@ class SQLAlchemyUserRepository(IUserRepository):
         
         # 获取并更新用户的最新状态（比如自增的 uid）
         self.db.refresh(user)  
+        self.counter.add(1)
         return UserOut.model_validate(user)
 
 
     def create_batch_users(self, users: List[UserCreate]) -> List[UserOut]:
         user_orms = [User(**u.dict()) for u in users]
+        # student_id 在提交之前从入参取出: 提交之后实体已过期, 逐个访问属性会为每个实体触发一次 SELECT
+        student_ids = [u.student_id for u in users]
         
         # 使用事务管理器批量添加用户
         with transaction(self.db):
             self.db.add_all(user_orms)
         
-        # 调用 refresh 处理的实体，必须是已经在库内的实体(因而创建操作需要先做commit 才能刷新)
-        for user in user_orms:
-            self.db.refresh(user)  
+        # 逐个 refresh 同样会产生 N 次 SELECT; 这里按 IN_CHUNK_SIZE 分批用 IN 查询把所有实体的最新状态 (比如自增的 uid) 加载回来
+        for chunk in in_chunks(student_ids):
+            self.db.query(User).filter(User.student_id.in_(chunk)).all()
 
+        self.counter.add(len(user_orms))
         return [UserOut.model_validate(user) for user in user_orms]
 
 
@@ -99,4 +202,5 @@ class SQLAlchemyUserRepository(IUserRepository):
             user_info = UserOut.model_validate(user)
             self.db.delete(user)
 
+        self.counter.add(-1)
         return user_info
\ No newline at end of file
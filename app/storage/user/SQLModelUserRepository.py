@@ -1,10 +1,14 @@
 from app.models.user import User  
 from app.schemas.user import UserCreate, UserUpdate, UserOut, BatchUsersOut
 from app.storage.user.user_interface import IUserRepository
+from app.storage.cache.CachedCounter import CachedCounter, user_counter
+from app.storage.pagination import encode_cursor, decode_cursor, page_fingerprint
+from app.storage.routing import read_only
+from app.storage.statements import in_chunks
 
 from contextlib import contextmanager
-from typing import Optional, List
-from sqlmodel import Session, select
+from typing import Dict, Iterable, Optional, List, Tuple
+from sqlmodel import Session, select, func
 
 
 @contextmanager
@@ -20,26 +24,84 @@ def transaction(db: Session):
 
 # SQLModel ORM 模型与 Pydantic 模型无需经过一层转化，直接使用 SQLModel 模型即可 (以下代码未经过测试, 有待验证)
 class SQLModelUserRepository(IUserRepository):
-    def __init__(self, db: Session):
+    def __init__(self, db: Session, counter: CachedCounter = user_counter):
         self.db = db
+        self.counter = counter
 
+    @read_only
     def get_user_by_uid(self, uid: int) -> Optional[UserOut]:
         user = self.db.get(User, uid)
         return UserOut.model_validate(user) if user else None
 
+    @read_only
     def get_user_by_student_id(self, student_id: str) -> Optional[UserOut]:
         statement = select(User).where(User.student_id == student_id)
         result = self.db.exec(statement).first()
         return UserOut.model_validate(result) if result else None
 
 
-    def get_batch_users(self, page: int, page_size: int) -> Optional[BatchUsersOut]:
-        statement = select(User).offset(page * page_size).limit(page_size)
+    @read_only
+    def get_many_by_uid(self, uids: Iterable[int]) -> Dict[int, UserOut]:
+        users = {}
+        for chunk in in_chunks(uids):
+            users.update((u.uid, UserOut.model_validate(u)) for u in self.db.exec(select(User).where(User.uid.in_(chunk))))
+        return users
+
+
+    @read_only
+    def get_many_by_student_id(self, student_ids: Iterable[str]) -> Dict[str, UserOut]:
+        users = {}
+        for chunk in in_chunks(student_ids):
+            users.update((u.student_id, UserOut.model_validate(u)) for u in self.db.exec(select(User).where(User.student_id.in_(chunk))))
+        return users
+
+
+    @read_only
+    def get_batch_users(self, page: int, page_size: int, cursor: Optional[str] = None) -> Optional[BatchUsersOut]:
+        return self.get_batch_users_with_version(page, page_size, cursor)[0]
+
+
+    @read_only
+    def get_batch_users_with_version(self, page: int, page_size: int, cursor: Optional[str] = None) -> Tuple[BatchUsersOut, str]:
+        statement = select(User).order_by(User.uid)
+        if cursor is not None:
+            statement = statement.where(User.uid > decode_cursor(cursor, "uid"))
+        else:
+            statement = statement.offset(page * page_size)
         
-        users = self.db.exec(statement).all()
-        total = self.db.exec(select(User)).count()
+        users = self.db.exec(statement.limit(page_size + 1)).all()
+        has_more = len(users) > page_size
+        users = users[:page_size]
+        next_cursor = encode_cursor("uid", users[-1].uid) if has_more and users else None
+
+        total = self.counter.get(lambda: self.db.exec(select(func.count(User.uid))).one())
         
-        return BatchUsersOut(total=total, count=len(users), users=[UserOut.model_validate(u) for u in users])
+        batch = BatchUsersOut(total=total, count=len(users), users=[UserOut.model_validate(u) for u in users], next_cursor=next_cursor)
+        return batch, page_fingerprint(total, [(u.uid, u.version) for u in users])
+
+
+    @read_only
+    def get_batch_users_version(self, page: int, page_size: int, cursor: Optional[str] = None) -> str:
+        statement = select(User.uid, User.version).order_by(User.uid)
+        if cursor is not None:
+            statement = statement.where(User.uid > decode_cursor(cursor, "uid"))
+        else:
+            statement = statement.offset(page * page_size)
+
+        rows = self.db.exec(statement.limit(page_size)).all()
+        total = self.counter.get(lambda: self.db.exec(select(func.count(User.uid))).one())
+        return page_fingerprint(total, rows)
+
+
+    @read_only
+    def get_version_by_student_id(self, student_id: str) -> Optional[str]:
+        row = self.db.exec(select(User.uid, User.version).where(User.student_id == student_id)).first()
+        return f"{row.uid}.{row.version}" if row else None
+
+    @read_only
+    def get_with_version_by_student_id(self, student_id: str) -> Optional[Tuple[UserOut, str]]:
+        user = self.db.exec(select(User).where(User.student_id == student_id)).first()
+        return (UserOut.model_validate(user), f"{user.uid}.{user.version}") if user else None
 
 
     def create_user(self, user_data: UserCreate) -> UserOut:
@@ -49,6 +111,7 @@ class SQLModelUserRepository(IUserRepository):
         with transaction(self.db):
             self.db.refresh(user)
         
+        self.counter.add(1)
         return UserOut.model_validate(user)
 
 
@@ -60,6 +123,7 @@ class SQLModelUserRepository(IUserRepository):
             for user in user_orms:
                 self.db.refresh(user)
 
+        self.counter.add(len(user_orms))
         return [UserOut.model_validate(user) for user in user_orms]
 
 
@@ -90,4 +154,5 @@ class SQLModelUserRepository(IUserRepository):
             user_info = UserOut.model_validate(user)
             self.db.delete(user)
             
+        self.counter.add(-1)
         return user_info
\ No newline at end of file
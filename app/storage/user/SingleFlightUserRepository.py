@@ -0,0 +1,129 @@
+from typing import Awaitable, Callable, Dict, Hashable, Iterable, List, Optional, Set, Tuple, TypeVar
+
+from app.schemas.user import UserCreate, UserUpdate, UserOut, BatchUsersOut
+from app.storage.singleflight import FlightGroups, async_flights, enabled_methods, flights, in_write_transaction
+from app.storage.user.user_interface import IAsyncUserRepository, IUserRepository
+
+
+T = TypeVar("T")
+
+
+def _forget(groups: FlightGroups, student_id: str, user: Optional[UserOut]) -> None:
+    groups.forget("user.get_user_by_student_id", student_id)
+    groups.forget("user.get_version_by_student_id", student_id)
+    groups.forget("user.get_with_version_by_student_id", student_id)
+    if user is not None:
+        groups.forget("user.get_user_by_uid", user.uid)
+
+
+# 用户仓库的单飞层, 与 SingleFlightBookRepository 的策略保持一致: 只合并配置中列出的单键查询, 写操作之后释放对应的键
+class SingleFlightUserRepository(IUserRepository):
+    def __init__(self, repo: IUserRepository, methods: Optional[Set[str]] = None, db=None):
+        self.repo = repo
+        self.methods = enabled_methods() if methods is None else methods
+        self.db = db
+
+    def _do(self, method: str, key: Hashable, fn: Callable[[], T]) -> T:
+        if method not in self.methods or in_write_transaction(self.db):
+            return fn()
+        return flights.get(method).do(key, fn)
+
+    def get_user_by_uid(self, uid: int) -> Optional[UserOut]:
+        return self._do("user.get_user_by_uid", uid, lambda: self.repo.get_user_by_uid(uid))
+
+    def get_user_by_student_id(self, student_id: str) -> Optional[UserOut]:
+        return self._do("user.get_user_by_student_id", student_id, lambda: self.repo.get_user_by_student_id(student_id))
+
+    def get_many_by_uid(self, uids: Iterable[int]) -> Dict[int, UserOut]:
+        return self.repo.get_many_by_uid(uids)
+
+    def get_many_by_student_id(self, student_ids: Iterable[str]) -> Dict[str, UserOut]:
+        return self.repo.get_many_by_student_id(student_ids)
+
+    def get_batch_users(self, page: int, page_size: int, cursor: Optional[str] = None) -> Optional[BatchUsersOut]:
+        return self.repo.get_batch_users(page, page_size, cursor)
+
+    def get_batch_users_with_version(self, page: int, page_size: int, cursor: Optional[str] = None) -> Tuple[BatchUsersOut, str]:
+        return self.repo.get_batch_users_with_version(page, page_size, cursor)
+
+    def get_batch_users_version(self, page: int, page_size: int, cursor: Optional[str] = None) -> str:
+        return self.repo.get_batch_users_version(page, page_size, cursor)
+
+    def get_version_by_student_id(self, student_id: str) -> Optional[str]:
+        return self._do("user.get_version_by_student_id", student_id, lambda: self.repo.get_version_by_student_id(student_id))
+
+    def get_with_version_by_student_id(self, student_id: str) -> Optional[Tuple[UserOut, str]]:
+        return self._do("user.get_with_version_by_student_id", student_id,
+                        lambda: self.repo.get_with_version_by_student_id(student_id))
+
+    def create_user(self, user_data: UserCreate) -> UserOut:
+        return self.repo.create_user(user_data)
+
+    def create_batch_users(self, users: List[UserCreate]) -> List[UserOut]:
+        return self.repo.create_batch_users(users)
+
+    def update_user(self, student_id: str, user_data: UserUpdate) -> Optional[UserOut]:
+        user = self.repo.update_user(student_id, user_data)
+        _forget(flights, student_id, user)
+        return user
+
+    def delete_user(self, student_id: str) -> Optional[UserOut]:
+        user = self.repo.delete_user(student_id)
+        _forget(flights, student_id, user)
+        return user
+
+
+class AsyncSingleFlightUserRepository(IAsyncUserRepository):
+    def __init__(self, repo: IAsyncUserRepository, methods: Optional[Set[str]] = None, db=None):
+        self.repo = repo
+        self.methods = enabled_methods() if methods is None else methods
+        self.db = db
+
+    async def _do(self, method: str, key: Hashable, fn: Callable[[], Awaitable[T]]) -> T:
+        if method not in self.methods or in_write_transaction(self.db):
+            return await fn()
+        return await async_flights.get(method).do(key, fn)
+
+    async def get_user_by_uid(self, uid: int) -> Optional[UserOut]:
+        return await self._do("user.get_user_by_uid", uid, lambda: self.repo.get_user_by_uid(uid))
+
+    async def get_user_by_student_id(self, student_id: str) -> Optional[UserOut]:
+        return await self._do("user.get_user_by_student_id", student_id, lambda: self.repo.get_user_by_student_id(student_id))
+
+    async def get_many_by_uid(self, uids: Iterable[int]) -> Dict[int, UserOut]:
+        return await self.repo.get_many_by_uid(uids)
+
+    async def get_many_by_student_id(self, student_ids: Iterable[str]) -> Dict[str, UserOut]:
+        return await self.repo.get_many_by_student_id(student_ids)
+
+    async def get_batch_users(self, page: int, page_size: int, cursor: Optional[str] = None) -> Optional[BatchUsersOut]:
+        return await self.repo.get_batch_users(page, page_size, cursor)
+
+    async def get_batch_users_with_version(self, page: int, page_size: int, cursor: Optional[str] = None) -> Tuple[BatchUsersOut, str]:
+        return await self.repo.get_batch_users_with_version(page, page_size, cursor)
+
+    async def get_batch_users_version(self, page: int, page_size: int, cursor: Optional[str] = None) -> str:
+        return await self.repo.get_batch_users_version(page, page_size, cursor)
+
+    async def get_version_by_student_id(self, student_id: str) -> Optional[str]:
+        return await self._do("user.get_version_by_student_id", student_id, lambda: self.repo.get_version_by_student_id(student_id))
+
+    async def get_with_version_by_student_id(self, student_id: str) -> Optional[Tuple[UserOut, str]]:
+        return await self._do("user.get_with_version_by_student_id", student_id,
+                              lambda: self.repo.get_with_version_by_student_id(student_id))
+
+    async def create_user(self, user_data: UserCreate) -> UserOut:
+        return await self.repo.create_user(user_data)
+
+    async def create_batch_users(self, users: List[UserCreate]) -> List[UserOut]:
+        return await self.repo.create_batch_users(users)
+
+    async def update_user(self, student_id: str, user_data: UserUpdate) -> Optional[UserOut]:
+        user = await self.repo.update_user(student_id, user_data)
+        _forget(async_flights, student_id, user)
+        return user
+
+    async def delete_user(self, student_id: str) -> Optional[UserOut]:
+        user = await self.repo.delete_user(student_id)
+        _forget(async_flights, student_id, user)
+        return user
@@ -1,4 +1,4 @@
-from typing import Protocol, Optional, List, Union, Dict
+from typing import Protocol, Optional, List, Union, Dict, Iterable, Tuple
 from app.schemas.user import UserCreate, UserUpdate, UserOut, BatchUsersOut
 
 # 这是一个接口协议(也可以使用Python ABC抽象基类实现, 此处使用Protocol会更简洁)
@@ -8,8 +8,32 @@ class IUserRepository(Protocol):
 
     def get_user_by_student_id(self, student_id: str) -> Optional[UserOut]: 
         ...
+
+    # 批量点查: 返回 {键: 用户}, 不存在的键不出现在结果中; 键会被去重, 过长的列表按块拆成多条 IN 查询
+    def get_many_by_uid(self, uids: Iterable[int]) -> Dict[int, UserOut]:
+        ...
+
+    def get_many_by_student_id(self, student_ids: Iterable[str]) -> Dict[str, UserOut]:
+        ...
     
-    def get_batch_users(self, page: int, page_size: int) -> Optional[BatchUsersOut]: 
+    # 传入 cursor 时使用游标分页 (忽略 page), 否则使用 page 偏移分页; 两种方式都会返回下一页的 next_cursor
+    def get_batch_users(self, page: int, page_size: int, cursor: Optional[str] = None) -> Optional[BatchUsersOut]: 
+        ...
+
+    # 版本查询只读取主键与版本号, 用于生成 ETag, 不加载整行数据; 学生不存在时返回 None
+    def get_version_by_student_id(self, student_id: str) -> Optional[str]:
+        ...
+
+    # 用户与版本号在同一次查询中读出, 保证响应体与 ETag 对应同一个版本; 学生不存在时返回 None
+    def get_with_version_by_student_id(self, student_id: str) -> Optional[Tuple[UserOut, str]]:
+        ...
+
+    # 一页用户与这一页的版本摘要在同一次查询中读出, 列表的 ETag 与响应体对应同一份数据
+    def get_batch_users_with_version(self, page: int, page_size: int, cursor: Optional[str] = None) -> Tuple[BatchUsersOut, str]:
+        ...
+
+    # 只读取这一页的主键与版本号, 用于条件请求的 ETag 比较, 结果与 get_batch_users_with_version 的摘要相同
+    def get_batch_users_version(self, page: int, page_size: int, cursor: Optional[str] = None) -> str:
         ...
     
     def create_user(self, user_data: UserCreate) -> UserOut: 
@@ -25,3 +49,45 @@ class IUserRepository(Protocol):
     
     def delete_user(self, student_id: str) -> Optional[UserOut]: 
         ...
+
+
+# 异步版本的用户仓库协议, 方法与 IUserRepository 一一对应, 供 async def 路由使用
+class IAsyncUserRepository(Protocol):
+    async def get_user_by_uid(self, uid: int) -> Optional[UserOut]:
+        ...
+
+    async def get_user_by_student_id(self, student_id: str) -> Optional[UserOut]: 
+        ...
+
+    async def get_many_by_uid(self, uids: Iterable[int]) -> Dict[int, UserOut]:
+        ...
+
+    async def get_many_by_student_id(self, student_ids: Iterable[str]) -> Dict[str, UserOut]:
+        ...
+    
+    async def get_batch_users(self, page: int, page_size: int, cursor: Optional[str] = None) -> Optional[BatchUsersOut]: 
+        ...
+
+    async def get_version_by_student_id(self, student_id: str) -> Optional[str]:
+        ...
+
+    async def get_with_version_by_student_id(self, student_id: str) -> Optional[Tuple[UserOut, str]]:
+        ...
+
+    async def get_batch_users_with_version(self, page: int, page_size: int, cursor: Optional[str] = None) -> Tuple[BatchUsersOut, str]:
+        ...
+
+    async def get_batch_users_version(self, page: int, page_size: int, cursor: Optional[str] = None) -> str:
+        ...
+    
+    async def create_user(self, user_data: UserCreate) -> UserOut: 
+        ...
+
+    async def create_batch_users(self, users: List[UserCreate]) -> List[UserOut]: 
+        ...
+    
+    async def update_user(self, student_id: str, user_data: UserUpdate) -> Optional[UserOut]: 
+        ...
+    
+    async def delete_user(self, student_id: str) -> Optional[UserOut]: 
+        ...
@@ -0,0 +1,95 @@
+import os
+import socket
+import time
+import uuid
+from datetime import timedelta
+from typing import Optional
+
+from sqlalchemy import delete, func, insert, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import sessionmaker
+
+from app.core.db import transaction
+from app.core.idgen import MAX_WORKER_ID, SnowflakeIdGenerator, WorkerIdUnavailable
+from app.models.worker_lease import WorkerLease
+
+
+""" 订单号生成器 worker id 的数据库租约
+
+    进程启动时在 worker_leases 表里领取一个 id: 优先接管已经过期的租约, 否则插入一个尚未出现过的 id,
+    两个进程同时插入同一个 id 时主键冲突的一方重新领取。持有者每隔 lease_seconds / 3 续约一次, 进程退出时主动释放。
+
+    过期时间用数据库的当前时间计算, 各进程的时钟偏差不影响判断; 本进程这一侧按发起请求之前的单调时钟计算截止时间,
+    总是不晚于数据库中的 expires_at, 所以租约过期被其他进程接管之前, 本进程的生成器一定已经停止发号
+"""
+
+
+ACQUIRE_ATTEMPTS = 5
+
+
+def _db_now(db):
+    return db.execute(select(func.current_timestamp())).scalar_one()
+
+
+class WorkerIdLease:
+    def __init__(self, Session: sessionmaker, generator: SnowflakeIdGenerator, lease_seconds: float = 60, owner: Optional[str] = None):
+        if lease_seconds <= 0:
+            raise ValueError(f"lease_seconds must be positive, got {lease_seconds}.")
+        self.Session = Session
+        self.generator = generator
+        self.lease_seconds = lease_seconds
+        self.owner = owner or f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.worker_id: Optional[int] = None
+
+    def acquire(self) -> int:
+        """ 领取一个 worker id 并交给生成器; 所有 id 都被占用时抛出 WorkerIdUnavailable """
+        for _ in range(ACQUIRE_ATTEMPTS):
+            started = time.monotonic()
+            try:
+                with self.Session() as db, transaction(db, expected=(IntegrityError,)):
+                    worker_id = self._claim(db)
+            except IntegrityError:
+                # 另一个进程抢先插入了同一个 id, 重新读取之后再试
+                continue
+            if worker_id is not None:
+                self.worker_id = worker_id
+                self.generator.assign(worker_id, self._remaining(started))
+                return worker_id
+        raise WorkerIdUnavailable(f"no free worker id in [0, {MAX_WORKER_ID}] after {ACQUIRE_ATTEMPTS} attempts.")
+
+    def _claim(self, db) -> Optional[int]:
+        now = _db_now(db)
+        values = {"owner": self.owner, "expires_at": now + timedelta(seconds=self.lease_seconds)}
+        leases = dict(db.execute(select(WorkerLease.worker_id, WorkerLease.expires_at)).all())
+
+        for worker_id in sorted(i for i, expires_at in leases.items() if expires_at <= now):
+            result = db.execute(update(WorkerLease).where(WorkerLease.worker_id == worker_id, WorkerLease.expires_at <= now).values(**values))
+            if result.rowcount == 1:
+                return worker_id
+
+        worker_id = next((i for i in range(MAX_WORKER_ID + 1) if i not in leases), None)
+        if worker_id is not None:
+            db.execute(insert(WorkerLease).values(worker_id=worker_id, **values))
+        return worker_id
+
+    def renew(self) -> bool:
+        """ 续约; 租约已经被其他进程接管时返回 False, 生成器停止发号, 调用方应重新 acquire """
+        started = time.monotonic()
+        with self.Session() as db, transaction(db):
+            expires_at = _db_now(db) + timedelta(seconds=self.lease_seconds)
+            result = db.execute(update(WorkerLease)
+                                .where(WorkerLease.worker_id == self.worker_id, WorkerLease.owner == self.owner)
+                                .values(expires_at=expires_at))
+        if result.rowcount != 1:
+            self.generator.assign(None)
+            return False
+        self.generator.assign(self.worker_id, self._remaining(started))
+        return True
+
+    def release(self) -> None:
+        self.generator.assign(None)
+        with self.Session() as db, transaction(db):
+            db.execute(delete(WorkerLease).where(WorkerLease.worker_id == self.worker_id, WorkerLease.owner == self.owner))
+
+    def _remaining(self, started: float) -> float:
+        return self.lease_seconds - (time.monotonic() - started)
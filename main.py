@@ -1,17 +1,224 @@
-from fastapi import FastAPI
-from app.api.v1.endpoints import book, user
+from fastapi import APIRouter, FastAPI, Request
+from fastapi.responses import JSONResponse, PlainTextResponse
+from app.core.config import Settings, get_settings
+from app.core.logx import logger
+from app.core.metrics import MetricsMiddleware, registry
+from app.core import query_profiler, warmup
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from typing import Optional
+from fastapi.concurrency import run_in_threadpool
+from app.api.v1.endpoints import availability, export, order, recommend
+from app.core.idgen import get_id_generator
+from app.service import recommend_svc
+from app.storage.cache.factory import get_cache_backend
+from app.storage.book.changes import catalog_indexes
+from app.storage.book.search_index import book_search_index
+from app.storage.book.tag_index import book_tag_index
+from app.storage.engine import pool_status
+from app.storage.routing import routing_stats
+from app.storage.singleflight import flight_stats
+from app.storage.worker_lease import WorkerIdLease
 
-app = FastAPI()
-app.include_router(book.router, prefix="/api/v1")
-app.include_router(user.router, prefix="/api/v1")
- 
+""" 应用工厂: create_app(settings) 组装中间件与路由, 启动/关闭逻辑放在 lifespan 里
 
-@app.get("/")
+    启动顺序: 订单号 worker id (未配置时领取数据库租约, 领不到则启动失败) -> 预热 (连接池、ORM 映射、热点语句与序列化, 见 app/core/warmup.py)
+    -> 图书检索索引与标签索引 -> 推荐模型后台刷新;
+    lifespan 的启动阶段完成之前 uvicorn 不会开始接收请求, 所以第一个请求不再承担这些开销。
+    导入本模块只构建路由, 不会创建数据库引擎或连接
+"""
+
+
+# 启动时构建图书检索的倒排索引与标签位图索引; 数据库暂不可用时不阻塞启动, 首次检索时会再次尝试构建。
+# 两种模式都在线程池里用同步会话构建 (与异步仓库的检索路径一致), 不占用事件循环
+def sync_catalog_indexes():
+    from app.storage.db import get_sessionmaker
+    with get_sessionmaker()() as db:
+        catalog_indexes.sync(db)
+
+
+async def build_search_index(settings: Settings):
+    try:
+        await run_in_threadpool(sync_catalog_indexes)
+        logger.info(f"book search index built: {len(book_search_index)} books, {len(book_tag_index)} tags")
+    except Exception as e:
+        logger.warning(f"book search index build skipped: {e}")
+
+
+# 推荐模型: 启动时全量构建, 之后按 recommend_refresh_seconds 在线程池里做增量刷新 (每隔 recommend_rebuild_seconds 全量重建一次), 不阻塞事件循环
+def refresh_recommender():
+    from app.storage.db import get_sessionmaker
+    from app.storage.order.SQLAlchemyOrderRepository import SQLAlchemyOrderRepository
+    with get_sessionmaker()() as db:
+        return recommend_svc.refresh_recommender(SQLAlchemyOrderRepository(db))
+
+
+async def recommender_refresh_loop(settings: Settings):
+    while True:
+        try:
+            count = await run_in_threadpool(refresh_recommender)
+            logger.info(f"recommender refreshed: {count} new interactions")
+        except Exception as e:
+            logger.warning(f"recommender refresh failed: {e}")
+        if not settings.recommend_refresh_seconds:
+            return
+        await asyncio.sleep(settings.recommend_refresh_seconds)
+
+
+# 订单号生成器的 worker id: 显式配置 (BOOKHUB_WORKER_ID) 时直接使用, 否则领取数据库租约; 所有 id 都被占用时抛出异常, 终止启动
+def lease_worker_id(settings: Settings) -> Optional[WorkerIdLease]:
+    if settings.worker_id is not None:
+        return None
+    from app.storage.db import get_sessionmaker
+    lease = WorkerIdLease(get_sessionmaker(), get_id_generator(), settings.worker_lease_seconds)
+    worker_id = lease.acquire()
+    logger.info(f"worker id {worker_id} leased by {lease.owner}")
+    return lease
+
+
+# 每隔三分之一有效期续约一次; 租约被接管 (例如进程长时间停顿) 时改为重新领取, 期间借阅会因为没有 worker id 而失败
+async def worker_lease_loop(lease: WorkerIdLease):
+    while True:
+        await asyncio.sleep(lease.lease_seconds / 3)
+        try:
+            if not await run_in_threadpool(lease.renew):
+                logger.error(f"worker id {lease.worker_id} lease lost, acquiring a new one")
+                await run_in_threadpool(lease.acquire)
+        except Exception as e:
+            logger.warning(f"worker id lease renewal failed: {e}")
+
+
+async def warm_up(app: FastAPI, settings: Settings) -> dict:
+    if not settings.warmup:
+        return {"skipped": True}
+    start = time.perf_counter()
+    report = await run_in_threadpool(warmup.warm_up, app, settings)
+    if settings.async_mode:
+        report = await warmup.warm_up_async(settings, report)
+    report["total_ms"] = round((time.perf_counter() - start) * 1000, 2)
+    if report.get("errors"):
+        logger.warning(f"warm-up incomplete: {report['errors']}")
+    else:
+        logger.info(f"warm-up done in {report['total_ms']} ms")
+    return report
+
+
+def create_app(settings: Optional[Settings] = None) -> FastAPI:
+    settings = settings or get_settings()
+
+    @asynccontextmanager
+    async def lifespan(app: FastAPI):
+        lease = await run_in_threadpool(lease_worker_id, settings)
+        lease_task = asyncio.create_task(worker_lease_loop(lease)) if lease is not None else None
+        app.state.warmup = await warm_up(app, settings)
+        await build_search_index(settings)
+        app.state.recommender_task = asyncio.create_task(recommender_refresh_loop(settings))
+        app.state.ready = True
+        try:
+            yield
+        finally:
+            app.state.ready = False
+            app.state.recommender_task.cancel()
+            if lease is not None:
+                lease_task.cancel()
+                try:
+                    await run_in_threadpool(lease.release)
+                except Exception as e:
+                    logger.warning(f"worker id lease release failed: {e}")
+
+    app = FastAPI(lifespan=lifespan)
+    app.state.ready = False
+    app.state.warmup = None
+    app.add_middleware(MetricsMiddleware)
+    query_profiler.install_middleware(app, settings)   # BOOKHUB_SQL_PROFILE=1 时才生效
+
+    # async_mode 开启时挂载 async def 路由 (AsyncSession + 异步仓库), 否则挂载同步路由 (线程池 + Session)
+    if settings.async_mode:
+        from app.api.v1.endpoints import async_book as book, async_user as user
+    else:
+        from app.api.v1.endpoints import book, user
+
+    app.include_router(book.router, prefix="/api/v1")
+    app.include_router(user.router, prefix="/api/v1")
+    app.include_router(order.router, prefix="/api/v1")   # 借阅路由目前只有同步实现, 两种模式下共用
+    app.include_router(recommend.router, prefix="/api/v1")
+    app.include_router(export.router, prefix="/api/v1")
+    app.include_router(availability.router, prefix="/api/v1")
+    app.include_router(ops_router)
+    return app
+
+
+# 健康检查、就绪检查与运维接口, 不带 /api/v1 前缀
+ops_router = APIRouter()
+
+
+@ops_router.get("/")
 def health():
     return {"code": 0, "data": "Hello World!"}
- 
+
+
+# 就绪检查: lifespan 启动阶段 (预热、索引构建) 完成后返回 200, 同时给出预热各步骤的耗时
+@ops_router.get("/ready")
+def ready(request: Request):
+    state = request.app.state
+    status_code = 200 if state.ready else 503
+    return JSONResponse({"code": status_code, "data": {"ready": state.ready, "warmup": state.warmup}}, status_code=status_code)
+
+
+# 缓存命中/未命中/淘汰计数, 未启用缓存时返回 None
+@ops_router.get("/cache/stats")
+def cache_stats():
+    cache = get_cache_backend()
+    return {"code": 0, "data": cache.stats.to_dict() if cache is not None else None}
+
+
+# 读写分离的路由计数、各个连接池的状态, 以及单飞的合并情况 (按仓库方法)
+@ops_router.get("/db/stats")
+def db_stats():
+    from app.storage.db import get_engines
+    engine, replica_engines = get_engines()
+    return {
+        "code": 0,
+        "data": {
+            "routing": routing_stats.to_dict(),
+            "primary": pool_status(engine),
+            "replicas": [pool_status(e) for e in replica_engines],
+            "singleflight": flight_stats(),
+        },
+    }
+
+
+# 缓存与读写分离的已有计数, 在 /metrics 导出时转换为指标文本
+def _export_stats():
+    lines = ["# TYPE bookhub_db_routing_total counter"]
+    lines += [f'bookhub_db_routing_total{{target="{k}"}} {v}' for k, v in routing_stats.to_dict().items()]
+    cache = get_cache_backend()
+    if cache is not None:
+        lines.append("# TYPE bookhub_cache_events_total counter")
+        for k, v in cache.stats.to_dict().items():
+            if k != "hit_ratio":
+                lines.append(f'bookhub_cache_events_total{{event="{k}"}} {v}')
+    lines.append("# TYPE bookhub_singleflight_events_total counter")
+    for mode, groups in flight_stats().items():
+        for method, stats in groups.items():
+            for k in ("calls", "loads", "coalesced", "errors"):
+                lines.append(f'bookhub_singleflight_events_total{{mode="{mode}",method="{method}",event="{k}"}} {stats[k]}')
+    return lines
+
+
+registry.add_collector(_export_stats)
+
+
+# Prometheus 文本格式的指标: 路由延迟、状态码、正在处理的请求数、SQL 次数与耗时、连接池等待时间
+@ops_router.get("/metrics", response_class=PlainTextResponse)
+def metrics():
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+
+app = create_app()
 
 
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run("main:app", host="127.0.0.1", port=8000, reload=True)
\ No newline at end of file
+    uvicorn.run("main:app", host="127.0.0.1", port=8000, reload=True)
@@ -0,0 +1,65 @@
+# 批量点查压测: 逐个键查询 (get_by_bid / get_user_by_uid) 与 get_many_by_* 批量查询、请求级加载器的耗时与 SQL 条数对比
+# 用法: python -m testcases.bench_batch_lookups [--keys 200] [--rounds 50] [--database-url mysql+pymysql://...]
+# 模拟渲染一页借阅记录: 每条记录对应一个用户与一本书, 键之间有重复; 默认使用临时 SQLite 文件, 网络往返越慢差距越大
+import argparse
+import json
+import random
+import tempfile
+import time
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+from app.storage.book.SQLAlchemyBookRepository import SQLAlchemyBookRepository
+from app.storage.loader import RequestLoaders
+from app.storage.user.SQLAlchemyUserRepository import SQLAlchemyUserRepository
+from testcases.seed import seed
+
+
+def one_by_one(users, books, orders):
+    return [(users.get_user_by_uid(uid), books.get_by_bid(bid)) for uid, bid in orders]
+
+
+def batched(users, books, orders):
+    user_map = users.get_many_by_uid(uid for uid, _ in orders)
+    book_map = books.get_many_by_bid(bid for _, bid in orders)
+    return [(user_map.get(uid), book_map.get(bid)) for uid, bid in orders]
+
+
+def with_loader(users, books, orders):
+    loaders = RequestLoaders(users, books)
+    pending = [(loaders.user_by_uid.load(uid), loaders.book_by_bid.load(bid)) for uid, bid in orders]
+    return [(user.get(), book.get()) for user, book in pending]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--keys", type=int, default=200)
+    parser.add_argument("--rounds", type=int, default=50)
+    parser.add_argument("--database-url", default=None)
+    args = parser.parse_args()
+
+    engine = create_engine(args.database_url or f"sqlite:///{tempfile.mkdtemp()}/bench_batch.db")
+    seed(engine, users=args.rows, books=args.rows)
+    statements = [0]
+    event.listen(engine, "before_cursor_execute", lambda *_: statements.__setitem__(0, statements[0] + 1))
+
+    # 学生常常借同一作者的多本书, 一页记录里的用户与图书有重复
+    orders = [(random.randint(1, args.keys // 2), random.randint(1, args.rows)) for _ in range(args.keys)]
+    result = {}
+    with sessionmaker(bind=engine)() as db:
+        users, books = SQLAlchemyUserRepository(db), SQLAlchemyBookRepository(db)
+        for name, fn in {"one_by_one": one_by_one, "get_many": batched, "loader": with_loader}.items():
+            fn(users, books, orders)
+            statements[0] = 0
+            start = time.perf_counter()
+            for _ in range(args.rounds):
+                fn(users, books, orders)
+            result[name] = {"ms_per_page": round((time.perf_counter() - start) / args.rounds * 1000, 2),
+                            "statements_per_page": statements[0] // args.rounds}
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
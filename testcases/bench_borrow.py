@@ -0,0 +1,94 @@
+# 借阅热点压测: N 个并发借阅者争抢同一个 (book_id, warehouse_name) 库存行, 统计吞吐、p50/p99 延迟, 并校验没有超卖
+# 用法: python -m testcases.bench_borrow --concurrency 200 --stock 2000 [--database-url mysql+pymysql://...]
+# 未指定数据库时使用临时 SQLite 文件 (SQLite 是库级写锁, 只能验证正确性, 吞吐数据请以 MySQL 为准)
+# 造数前会重建表结构 (testcases/seed.py), 不要指向有业务数据的数据库
+import argparse
+import json
+import os
+import statistics
+import tempfile
+import threading
+import time
+
+from sqlalchemy import create_engine, func, select
+from sqlalchemy.orm import Session
+
+from app.core.idgen import SnowflakeIdGenerator
+from app.models import BookInventory, Order
+from app.storage.order.SQLAlchemyOrderRepository import OutOfStockError, SQLAlchemyOrderRepository
+from testcases.seed import seed
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--database-url", default=None)
+    parser.add_argument("--concurrency", type=int, default=200)
+    parser.add_argument("--stock", type=int, default=2000)
+    parser.add_argument("--attempts", type=int, default=20, help="borrow attempts per worker")
+    args = parser.parse_args()
+
+    url = args.database_url or f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench_borrow.db')}"
+    connect_args = {"timeout": 60} if url.startswith("sqlite") else {}
+    engine = create_engine(url, pool_size=args.concurrency, max_overflow=0, connect_args=connect_args)
+    seed(engine, users=args.concurrency, books=1, stock=args.stock)
+    book_id, uids = 1, list(range(1, args.concurrency + 1))
+
+    latencies, outcomes = [], {"ok": 0, "out_of_stock": 0, "error": 0}
+    lock = threading.Lock()
+    barrier = threading.Barrier(args.concurrency)
+
+    # 单进程压测, 所有线程共用一个固定 worker id 的生成器
+    id_generator = SnowflakeIdGenerator(worker_id=1)
+
+    def worker(uid: int):
+        local_latencies, local = [], {"ok": 0, "out_of_stock": 0, "error": 0}
+        with Session(engine) as db:
+            repo = SQLAlchemyOrderRepository(db, id_generator)
+            barrier.wait()
+            for _ in range(args.attempts):
+                start = time.perf_counter()
+                try:
+                    repo.borrow(uid, book_id, "主馆")
+                    local["ok"] += 1
+                except OutOfStockError:
+                    local["out_of_stock"] += 1
+                except Exception:
+                    local["error"] += 1
+                local_latencies.append(time.perf_counter() - start)
+        with lock:
+            latencies.extend(local_latencies)
+            for k, v in local.items():
+                outcomes[k] += v
+
+    threads = [threading.Thread(target=worker, args=(uid,)) for uid in uids]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - start
+
+    with Session(engine) as db:
+        remaining = db.scalar(select(BookInventory.quantity).where(BookInventory.book_id == book_id))
+        orders = db.scalar(select(func.count()).select_from(Order).where(Order.book_id == book_id))
+
+    latencies.sort()
+    report = {
+        "database": engine.url.get_backend_name(),
+        "concurrency": args.concurrency,
+        "requests": len(latencies),
+        "elapsed_s": round(elapsed, 3),
+        "throughput_rps": round(len(latencies) / elapsed, 1),
+        "p50_ms": round(statistics.median(latencies) * 1000, 2),
+        "p99_ms": round(latencies[int(len(latencies) * 0.99) - 1] * 1000, 2),
+        **outcomes,
+        "stock_initial": args.stock,
+        "stock_remaining": remaining,
+        "orders_created": orders,
+        "oversold": orders + remaining != args.stock or remaining < 0,
+    }
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+# 目录快照压测: 导出耗时与文件大小、映射 (打开) 耗时, 以及按 isbn/bid 点查时快照与 SQL 仓库的吞吐对比
+# 用法: python -m testcases.bench_catalog_snapshot [图书数] [--lookups 50000] [--database-url mysql+pymysql://...]
+# 默认使用临时 SQLite 文件; 快照文件写在同一个临时目录下
+import argparse
+import json
+import os
+import random
+import tempfile
+import time
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.storage.book.catalog_snapshot import CatalogSnapshot, export_catalog_snapshot
+from app.storage.book.SQLAlchemyBookRepository import SQLAlchemyBookRepository
+from testcases.seed import isbn_of, seed
+
+
+def throughput(fn, keys) -> float:
+    start = time.perf_counter()
+    for key in keys:
+        assert fn(key) is not None
+    return round(len(keys) / (time.perf_counter() - start))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("books", nargs="?", type=int, default=100000)
+    parser.add_argument("--lookups", type=int, default=50000)
+    parser.add_argument("--database-url", default=None)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp()
+    engine = create_engine(args.database_url or f"sqlite:///{workdir}/bench_snapshot.db")
+    seed(engine, books=args.books, stock=3, tags="文学,历史")
+    Session = sessionmaker(bind=engine)
+    path = os.path.join(workdir, "catalog.snap")
+
+    with Session() as db:
+        start = time.perf_counter()
+        stats = export_catalog_snapshot(db, path)
+        export_s = time.perf_counter() - start
+
+        start = time.perf_counter()
+        snapshot = CatalogSnapshot(path)
+        open_ms = (time.perf_counter() - start) * 1000
+
+        bids = [random.randint(1, args.books) for _ in range(args.lookups)]
+        isbns = [isbn_of(bid) for bid in bids]
+        repo = SQLAlchemyBookRepository(db)
+        result = {
+            "books": stats["rows"],
+            "file_mb": round(stats["bytes"] / 2 ** 20, 2),
+            "export_s": round(export_s, 2),
+            "open_ms": round(open_ms, 3),
+            "isbn_lookups_per_s": {"snapshot": throughput(snapshot.get_by_isbn, isbns), "sql": throughput(repo.get_by_isbn, isbns[:5000])},
+            "bid_lookups_per_s": {"snapshot": throughput(snapshot.get_by_bid, bids), "sql": throughput(repo.get_by_bid, bids[:5000])},
+        }
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
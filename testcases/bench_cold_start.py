@@ -0,0 +1,68 @@
+# 冷启动测量: 每一轮在新的子进程里 import main、跑完 lifespan 启动阶段, 再依次请求几个热点接口, 记录每个接口第一次与第二次的延迟
+# 用法: python -m testcases.bench_cold_start [--rounds 5] [--database-url mysql+pymysql://...]
+# 分别在 BOOKHUB_WARMUP=1 与 BOOKHUB_WARMUP=0 下测量, 输出各项耗时的中位数; 默认使用临时 SQLite 文件, 用于跟踪启动相关的回归
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+from sqlalchemy import create_engine
+
+from testcases.seed import isbn_of, seed, student_id_of
+
+
+PATHS = [f"/api/v1/book/{isbn_of(1)}", f"/api/v1/users/{student_id_of(1)}", "/api/v1/availability?bids=1,2,3"]
+
+# 子进程里执行的测量代码: 只有这里的 import main 计入导入耗时
+CHILD = """
+import json, sys, time
+start = time.perf_counter()
+import main
+imported = time.perf_counter()
+from fastapi.testclient import TestClient
+result = {"import_ms": (imported - start) * 1000}
+started = time.perf_counter()
+with TestClient(main.app) as client:
+    result["startup_ms"] = (time.perf_counter() - started) * 1000
+    for path in json.loads(sys.argv[1]):
+        for attempt in ("first", "second"):
+            t = time.perf_counter()
+            assert client.get(path).status_code == 200, path
+            result[f"{attempt} {path}"] = (time.perf_counter() - t) * 1000
+print(json.dumps(result))
+"""
+
+
+def seed_database(url: str, rows: int = 1000):
+    engine = create_engine(url)
+    seed(engine, users=rows, books=rows, stock=5)
+    engine.dispose()
+
+
+def measure(url: str, warmup: bool, rounds: int) -> dict:
+    env = dict(os.environ, BOOKHUB_DATABASE_URL=url, BOOKHUB_WARMUP=str(int(warmup)), BOOKHUB_RECOMMEND_REFRESH_SECONDS="0")
+    samples = []
+    for _ in range(rounds):
+        out = subprocess.run([sys.executable, "-c", CHILD, json.dumps(PATHS)], env=env, check=True,
+                             capture_output=True, text=True).stdout
+        samples.append(json.loads(out.strip().splitlines()[-1]))
+    return {key: round(statistics.median(s[key] for s in samples), 2) for key in samples[0]}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--database-url", default=None)
+    args = parser.parse_args()
+
+    url = args.database_url or f"sqlite:///{tempfile.mkdtemp()}/bench_cold_start.db"
+    seed_database(url)
+    print(json.dumps({"warmup": measure(url, True, args.rounds), "no_warmup": measure(url, False, args.rounds)},
+                     ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
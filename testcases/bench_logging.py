@@ -0,0 +1,65 @@
+# 日志写入压测: 对比同步 FileHandler 与队列模式 (QueueHandler + 后台 QueueListener) 在请求线程上的单次调用开销
+# 用法: python -m testcases.bench_logging [条数] [--threads 8]
+# 只统计调用 logger.info 本身的耗时 (p50/p99/平均), 队列模式下另外统计后台线程把队列写空所需的时间
+import argparse
+import json
+import shutil
+import tempfile
+import threading
+import time
+
+from app.core.logx import logger_initiate, _stop_listener
+
+
+def run(name: str, calls: int, threads: int, **options):
+    directory = tempfile.mkdtemp()
+    logger = logger_initiate(is_console=False, is_file=True, log_directory=directory, max_bytes=20 * 1024 * 1024, backup_count=3, **options)
+    samples = [[] for _ in range(threads)]
+
+    def worker(out):
+        perf = time.perf_counter
+        for i in range(calls // threads):
+            start = perf()
+            logger.info("borrow order=%s student=%s book=%d", "0ABCDEF123456", "s2024001", i)
+            out.append(perf() - start)
+
+    start = time.perf_counter()
+    pool = [threading.Thread(target=worker, args=(out,)) for out in samples]
+    for t in pool:
+        t.start()
+    for t in pool:
+        t.join()
+    request_side = time.perf_counter() - start
+    _stop_listener()   # 队列模式下等待后台线程写完剩余记录
+    total = time.perf_counter() - start
+    shutil.rmtree(directory, ignore_errors=True)
+
+    latencies = sorted(x for out in samples for x in out)
+    n = len(latencies)
+    return {
+        "mode": name, "calls": n, "threads": threads,
+        "avg_us": round(sum(latencies) / n * 1e6, 2),
+        "p50_us": round(latencies[n // 2] * 1e6, 2),
+        "p99_us": round(latencies[int(n * 0.99)] * 1e6, 2),
+        "request_side_s": round(request_side, 3),
+        "drained_s": round(total, 3),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("calls", nargs="?", type=int, default=200_000)
+    parser.add_argument("--threads", type=int, default=8)
+    args = parser.parse_args()
+
+    results = [
+        run("sync_text", args.calls, args.threads),
+        run("queue_text", args.calls, args.threads, is_async=True, queue_size=0),
+        run("sync_json", args.calls, args.threads, file_format="json"),
+        run("queue_json", args.calls, args.threads, is_async=True, file_format="json", queue_size=0),
+    ]
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
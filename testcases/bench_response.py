@@ -0,0 +1,54 @@
+# 响应序列化压测: 一页 1000 个用户 (BatchUsersOut) 从模型到 HTTP body 的耗时
+# 用法: python -m testcases.bench_response [每页用户数] [--rounds 500]
+# 对比 model_dump 成 dict 后交给标准库 json.dumps (JSONResponse 原来的路径) 与 BizResponse 的 pydantic-core 直接序列化
+import argparse
+import json
+import time
+
+from fastapi.responses import JSONResponse
+
+from app.core.biz_reposone import BizResponse
+from app.schemas.user import BatchUsersOut, UserOut
+
+
+def make_page(size: int) -> BatchUsersOut:
+    users = [UserOut(uid=i, name=f"学生{i}", student_id=f"2024{i:06d}", email=f"s{i}@example.com", phone=f"138{i:08d}")
+             for i in range(1, size + 1)]
+    return BatchUsersOut(total=size * 100, count=size, users=users, next_cursor="eyJ1aWQiOiAxMDAwfQ")
+
+
+def timeit(fn, rounds: int) -> float:
+    fn()
+    start = time.perf_counter()
+    for _ in range(rounds):
+        fn()
+    return (time.perf_counter() - start) / rounds
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("size", nargs="?", type=int, default=1000)
+    parser.add_argument("--rounds", type=int, default=500)
+    args = parser.parse_args()
+
+    page = make_page(args.size)
+    cases = {
+        "model_dump+json.dumps": lambda: JSONResponse({"data": page.model_dump(), "msg": "success", "code": 200}),
+        "BizResponse(model)": lambda: BizResponse(data=page),
+        "BizResponse(model_dump dict)": lambda: BizResponse(data=page.model_dump()),
+    }
+    # 两条路径输出的 JSON 语义一致
+    assert json.loads(cases["model_dump+json.dumps"]().body) == json.loads(cases["BizResponse(model)"]().body)
+
+    baseline = None
+    results = []
+    for name, fn in cases.items():
+        seconds = timeit(fn, args.rounds)
+        baseline = baseline or seconds
+        results.append({"path": name, "users": args.size, "ms_per_response": round(seconds * 1000, 3),
+                        "speedup": round(baseline / seconds, 2)})
+    print(json.dumps(results, indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
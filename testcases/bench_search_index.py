@@ -0,0 +1,53 @@
+# 倒排索引检索压测: 生成一批模拟图书 (默认 100 万本), 统计建索引耗时以及不同检索词的查询延迟
+# 用法: python -m testcases.bench_search_index [图书数量]
+import random
+import sys
+import time
+from types import SimpleNamespace
+
+from app.storage.book.search_index import BookSearchIndex
+
+
+WORDS = ["数据", "结构", "算法", "历史", "中国", "文学", "科幻", "三体", "机器", "学习", "网络", "系统",
+         "python", "java", "database", "design", "linux", "kernel", "distributed", "compiler"]
+
+# 真实书目的词汇量远大于上面的常用词, 用随机汉字二元组与拼音单词补足一个长尾词表, 常用词只以较低概率出现
+_CHARS = [chr(c) for c in range(0x4E00, 0x4E00 + 3000)]
+_rng = random.Random(7)
+LONG_TAIL = ["".join(_rng.sample(_CHARS, 2)) for _ in range(20000)] + [f"term{i}" for i in range(5000)]
+TAGS = ["文学", "历史", "科幻", "计算机", "哲学", "经济", "艺术", "数学"]
+AUTHORS = ["刘慈欣", "余华", "钱钟书", "Knuth", "Tanenbaum", "Kleppmann", "鲁迅", "老舍"]
+
+
+def make_book(bid: int, rng: random.Random):
+    return SimpleNamespace(
+        bid=bid,
+        title="".join(rng.sample(LONG_TAIL, 2)) + rng.choice(WORDS) + f" 第{bid % 97}卷",
+        author=rng.choice(AUTHORS),
+        isbn=f"978{bid:010d}",
+        abstract=" ".join(rng.sample(LONG_TAIL, 8) + rng.sample(WORDS, 2)),
+        area=None,
+        floor=None,
+        tags=",".join(rng.sample(TAGS, 2)),
+    )
+
+
+def main(n_books: int = 1_000_000):
+    rng = random.Random(42)
+    index = BookSearchIndex()
+
+    start = time.perf_counter()
+    index.add_many(make_book(bid, rng) for bid in range(1, n_books + 1))
+    print(f"indexed {len(index)} books in {time.perf_counter() - start:.1f}s")
+
+    for query in ["三体", "数据结构", "python 算法", "刘慈欣 科幻", "distributed 系统 历史", LONG_TAIL[3], "term42", "不存在的词"]:
+        latencies = []
+        for page in range(5):
+            start = time.perf_counter()
+            total, books = index.search(query, offset=page * 10, limit=10)
+            latencies.append((time.perf_counter() - start) * 1000)
+        print(f"{query!r:>24}: total={total:>8} first_page={latencies[0]:8.2f}ms avg={sum(latencies) / len(latencies):8.2f}ms")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000)
@@ -0,0 +1,105 @@
+# 单飞压测: 模拟新书上架时大量并发请求同时点查同一个 isbn (缓存未命中), 对比开启/关闭单飞时实际执行的 SQL 条数、耗时与合并率
+# 用法: python -m testcases.bench_singleflight [并发数] [--rounds 20] [--latency-ms 5] [--database-url mysql+pymysql://...]
+# 默认使用临时 SQLite 文件; --latency-ms 在每条语句上叠加的模拟数据库往返时延, 同步版本用线程, 异步版本用 asyncio.gather
+import argparse
+import asyncio
+import json
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.storage.book.AsyncSQLAlchemyBookRepository import AsyncSQLAlchemyBookRepository
+from app.storage.book.SQLAlchemyBookRepository import SQLAlchemyBookRepository
+from app.storage.book.SingleFlightBookRepository import AsyncSingleFlightBookRepository, SingleFlightBookRepository
+from app.storage.singleflight import flight_stats
+from testcases.seed import isbn_of, seed
+
+
+METHODS = {"book.get_by_isbn"}
+
+
+def count_statements(engine, latency: float) -> list:
+    counter = [0]
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def before(conn, cursor, statement, parameters, context, executemany):
+        counter[0] += 1
+        if latency:
+            time.sleep(latency)
+    return counter
+
+
+def run_sync(Session, counter, concurrency: int, rounds: int, singleflight: bool) -> dict:
+    def request(isbn: str, barrier: threading.Barrier):
+        with Session() as db:
+            repo = SQLAlchemyBookRepository(db)
+            repo = SingleFlightBookRepository(repo, METHODS) if singleflight else repo
+            barrier.wait()
+            assert repo.get_by_isbn(isbn) is not None
+
+    counter[0] = 0
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for r in range(rounds):
+            barrier = threading.Barrier(concurrency)
+            list(pool.map(lambda _: request(isbn_of(r + 1), barrier), range(concurrency)))
+    return {"statements": counter[0], "seconds": round(time.perf_counter() - start, 3)}
+
+
+async def run_async(Session, counter, concurrency: int, rounds: int, singleflight: bool) -> dict:
+    async def request(isbn: str):
+        async with Session() as db:
+            repo = AsyncSQLAlchemyBookRepository(db)
+            repo = AsyncSingleFlightBookRepository(repo, METHODS) if singleflight else repo
+            assert await repo.get_by_isbn(isbn) is not None
+
+    counter[0] = 0
+    start = time.perf_counter()
+    for r in range(rounds):
+        await asyncio.gather(*(request(isbn_of(r + 1)) for _ in range(concurrency)))
+    return {"statements": counter[0], "seconds": round(time.perf_counter() - start, 3)}
+
+
+async def bench_async(url: str, latency: float, concurrency: int, rounds: int) -> dict:
+    engine = create_async_engine(url)
+    counter = count_statements(engine.sync_engine, latency)
+    Session = async_sessionmaker(engine, expire_on_commit=False)
+    try:
+        return {"singleflight" if singleflight else "plain": await run_async(Session, counter, concurrency, rounds, singleflight)
+                for singleflight in (False, True)}
+    finally:
+        await engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("concurrency", nargs="?", type=int, default=64)
+    parser.add_argument("--rounds", type=int, default=20)
+    parser.add_argument("--latency-ms", type=float, default=5)
+    parser.add_argument("--database-url", default=None)
+    args = parser.parse_args()
+
+    url = args.database_url or f"sqlite:///{tempfile.mkdtemp()}/bench_singleflight.db"
+    engine = create_engine(url, pool_size=args.concurrency, max_overflow=0) if not url.startswith("sqlite") else create_engine(url)
+    seed(engine, books=args.rounds)
+    latency = args.latency_ms / 1000
+    counter = count_statements(engine, latency)
+    Session = sessionmaker(bind=engine)
+
+    result = {"concurrency": args.concurrency, "rounds": args.rounds}
+    result["sync"] = {"singleflight" if singleflight else "plain": run_sync(Session, counter, args.concurrency, args.rounds, singleflight)
+                      for singleflight in (False, True)}
+    async_url = url.replace("sqlite://", "sqlite+aiosqlite://").replace("mysql+pymysql://", "mysql+aiomysql://")
+    result["async"] = asyncio.run(bench_async(async_url, latency, args.concurrency, args.rounds))
+
+    result["flights"] = flight_stats()
+    print(json.dumps(result, indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+# 热点查询的 Python 开销: 每次调用现场构造语句 (db.query(...).filter(...) / select(...).where(...)) 与预构建语句 + 绑定参数的对比
+# 用法: python -m testcases.bench_statements [--rounds 20000] [--database-url mysql+pymysql://...]
+# 默认使用 SQLite 内存库, 数据库本身的耗时很小, 每次查找的微秒数基本就是 SQLAlchemy 与仓库代码的开销
+import argparse
+import json
+import time
+
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import sessionmaker
+
+from app.models import Book, User
+from app.schemas.book import BookOut
+from app.schemas.user import UserOut
+from app.storage.book.SQLAlchemyBookRepository import SQLAlchemyBookRepository
+from app.storage.cache.CachedCounter import CachedCounter
+from app.storage.pagination import encode_cursor
+from app.storage.projection import construct, construct_all, projection_columns
+from app.storage.user.SQLAlchemyUserRepository import USER_OUT_PAGE, SQLAlchemyUserRepository
+from testcases.seed import isbn_of, seed, student_id_of
+
+
+USER_COLUMNS = projection_columns(User, UserOut)
+BOOK_COLUMNS = projection_columns(Book, BookOut)
+
+
+# 改造之前的写法: 每次调用都构造一条新语句
+def adhoc_lookups(db):
+    return {
+        "book by isbn": lambda i: construct(BookOut, db.execute(select(*BOOK_COLUMNS).where(Book.isbn == isbn_of(i))).first()),
+        "book by bid": lambda i: construct(BookOut, db.execute(select(*BOOK_COLUMNS).where(Book.bid == i)).first()),
+        "user by student_id": lambda i: construct(UserOut, db.execute(select(*USER_COLUMNS).where(User.student_id == student_id_of(i))).first()),
+        "user by uid": lambda i: construct(UserOut, db.execute(select(*USER_COLUMNS).where(User.uid == i)).first()),
+        "user page (cursor)": lambda i: construct_all(UserOut, db.query(*USER_COLUMNS).order_by(User.uid).filter(User.uid > i).limit(21).all()),
+        "orm query_book": lambda i: db.query(Book).filter(Book.isbn == isbn_of(i)).first(),
+    }
+
+
+def prepared_lookups(db):
+    books = SQLAlchemyBookRepository(db)
+    users = SQLAlchemyUserRepository(db, counter=CachedCounter("bench_statements", ttl=3600))
+    return {
+        "book by isbn": lambda i: books.get_by_isbn(isbn_of(i)),
+        "book by bid": lambda i: books.get_by_bid(i),
+        "user by student_id": lambda i: users.get_user_by_student_id(student_id_of(i)),
+        "user by uid": lambda i: users.get_user_by_uid(i),
+        "user page (cursor)": lambda i: users._page(USER_OUT_PAGE, 0, 20, encode_cursor("uid", i)),
+        "orm query_book": lambda i: books.query_book(isbn_of(i)),
+    }
+
+
+def run(Session, build, rows: int, rounds: int) -> dict:
+    result = {}
+    with Session() as db:
+        for name, fn in build(db).items():
+            for i in range(1, 200):
+                fn(i)
+            start = time.perf_counter()
+            for n in range(rounds):
+                fn(n % rows + 1)
+            result[name] = round((time.perf_counter() - start) / rounds * 1e6, 1)
+            db.expunge_all()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=1000)
+    parser.add_argument("--rounds", type=int, default=20000)
+    parser.add_argument("--database-url", default="sqlite://")
+    args = parser.parse_args()
+
+    engine = create_engine(args.database_url)
+    seed(engine, users=args.rows, books=args.rows)
+    Session = sessionmaker(bind=engine)
+
+    before, after = run(Session, adhoc_lookups, args.rows, args.rounds), run(Session, prepared_lookups, args.rows, args.rounds)
+    print(json.dumps({name: {"adhoc_us": before[name], "prepared_us": after[name], "speedup": round(before[name] / after[name], 2)}
+                      for name in before}, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+# 标签位图索引压测: 构建耗时与 AND / OR / NOT 过滤、分面计数的单次耗时, 不访问数据库
+# 用法: python -m testcases.bench_tag_index [图书数] [--tags 500] [--rounds 200]
+# 标签按 Zipf 分布随机分配给图书 (每本 1~5 个), 少数热门标签覆盖大部分图书, 与真实馆藏接近
+import argparse
+import json
+import random
+import time
+
+from app.storage.book.tag_index import TagIndex
+
+
+def timed(fn, rounds: int) -> float:
+    start = time.perf_counter()
+    for _ in range(rounds):
+        fn()
+    return round((time.perf_counter() - start) / rounds * 1e6, 1)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("books", nargs="?", type=int, default=1000000)
+    parser.add_argument("--tags", type=int, default=500)
+    parser.add_argument("--rounds", type=int, default=200)
+    args = parser.parse_args()
+
+    random.seed(7)
+    names = [f"标签{i}" for i in range(args.tags)]
+    weights = [1 / (i + 1) for i in range(args.tags)]
+
+    book_tags = {bid: list(dict.fromkeys(random.choices(names, weights, k=random.randint(1, 5)))) for bid in range(1, args.books + 1)}
+    index = TagIndex()
+    start = time.perf_counter()
+    index.load(book_tags)
+    build_s = time.perf_counter() - start
+
+    hot, warm, cold = names[0], names[5], names[200]
+    hits, narrow = index.filter(any_of=[warm]), index.filter([warm, cold])
+    result = {
+        "books": args.books,
+        "build_s": round(build_s, 2),
+        "us_per_op": {
+            f"AND {hot}, {warm}": timed(lambda: index.filter([hot, warm]), args.rounds),
+            f"OR {warm}, {cold}": timed(lambda: index.filter(any_of=[warm, cold]), args.rounds),
+            f"{hot} NOT {warm}": timed(lambda: index.filter([hot], none_of=[warm]), args.rounds),
+            f"NOT {hot} (全集)": timed(lambda: index.filter(none_of=[hot]), args.rounds),
+            f"facets top20 of {warm} ({len(hits)} hits)": timed(lambda: index.facets(hits, 20), args.rounds),
+            f"facets top20 of {warm} AND {cold} ({len(narrow)} hits)": timed(lambda: index.facets(narrow, 20), args.rounds),
+            "facets top20 of all": timed(lambda: index.facets(None, 20), args.rounds),
+            "page 50 of AND": timed(lambda: index.filter([hot, warm]).page(5000, 50), args.rounds),
+            "set (update one book)": timed(lambda: index.set(args.books // 2, [hot, cold]), args.rounds),
+        },
+    }
+    print(json.dumps(result, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
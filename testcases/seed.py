@@ -0,0 +1,48 @@
+# 压测脚本与 pytest 共用的造数函数: 重建表结构, 批量写入用户/图书/库存
+# 图书的 isbn 为 978 + 10 位 bid, 用户的 student_id 为 2024 + 7 位序号, 两者的主键都从 1 开始连续分配
+from typing import Iterable, Optional
+
+from sqlalchemy import insert
+
+from app.models.base import Base
+from app.models import Book, BookInventory, User
+
+
+BATCH = 5000
+
+
+def isbn_of(bid: int) -> str:
+    return f"978{bid:010d}"
+
+
+def student_id_of(i: int) -> str:
+    return f"2024{i:07d}"
+
+
+def reset_schema(engine) -> None:
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+
+
+def _insert(conn, model, rows: Iterable[dict]) -> None:
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= BATCH:
+            conn.execute(insert(model), batch)
+            batch = []
+    if batch:
+        conn.execute(insert(model), batch)
+
+
+def seed(engine, users: int = 0, books: int = 0, stock: Optional[int] = None, tags: Optional[str] = None, reset: bool = True) -> None:
+    """ 写入 users 个用户与 books 本图书; stock 不为 None 时每本书在 "主馆" 有 stock 本库存 """
+    if reset:
+        reset_schema(engine)
+    with engine.begin() as conn:
+        _insert(conn, User, ({"name": f"学生{i}", "student_id": student_id_of(i), "email": f"s{i}@example.com", "phone": f"138{i:08d}"}
+                             for i in range(1, users + 1)))
+        _insert(conn, Book, ({"title": f"图书{i}", "author": f"作者{i % 997}", "isbn": isbn_of(i), "abstract": "简介" * (i % 20),
+                              "area": "A", "floor": f"{i % 5 + 1}F", "tags": tags} for i in range(1, books + 1)))
+        if stock is not None:
+            _insert(conn, BookInventory, ({"book_id": i, "warehouse_name": "主馆", "quantity": stock} for i in range(1, books + 1)))
@@ -0,0 +1,35 @@
+import os
+import sys
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.storage.book.changes import catalog_indexes  # noqa: E402
+from app.storage.book.search_index import book_search_index  # noqa: E402
+from app.storage.book.tag_index import book_tag_index  # noqa: E402
+from testcases.seed import reset_schema  # noqa: E402
+
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path}/bookhub.db")
+    reset_schema(engine)
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def Session(engine):
+    return sessionmaker(bind=engine, autoflush=False)
+
+
+# 进程级别的内存索引在用例之间清空, 避免上一个用例的数据库内容残留在索引里
+@pytest.fixture(autouse=True)
+def fresh_indexes():
+    catalog_indexes.reset()
+    book_search_index.clear()
+    book_tag_index.clear()
+    yield
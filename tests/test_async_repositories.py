@@ -0,0 +1,123 @@
+import asyncio
+import threading
+
+import pytest
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from app.schemas.book import BookCreate, BookRetrieveReq, BookUpdate
+from app.schemas.user import UserCreate, UserUpdate
+from app.storage.book.AsyncSQLAlchemyBookRepository import AsyncSQLAlchemyBookRepository
+from app.storage.book.CachedBookRepository import AsyncCachedBookRepository
+from app.storage.book.changes import catalog_indexes
+from app.storage.cache.CachedCounter import CachedCounter
+from app.storage.cache.LRUCacheBackend import LRUCacheBackend
+from app.storage.user.AsyncSQLAlchemyUserRepository import AsyncSQLAlchemyUserRepository
+from app.storage.user.CachedUserRepository import AsyncCachedUserRepository
+from testcases.seed import isbn_of, seed, student_id_of
+
+
+# 异步仓库跑在 aiosqlite 上, 与同步用例共用 engine fixture 建好的 SQLite 文件; 每个用例一个事件循环, 引擎在循环内释放
+@pytest.fixture
+def run(engine):
+    url = engine.url.set(drivername="sqlite+aiosqlite")
+
+    def run(fn):
+        async def main():
+            async_engine = create_async_engine(url)
+            try:
+                return await fn(async_sessionmaker(async_engine, expire_on_commit=False, autoflush=False))
+            finally:
+                await async_engine.dispose()
+        return asyncio.run(main())
+    return run
+
+
+def test_user_crud_and_pages(engine, run):
+    seed(engine, users=12, reset=False)
+
+    async def scenario(Session):
+        async with Session() as db:
+            repo = AsyncSQLAlchemyUserRepository(db, counter=CachedCounter("users"))
+            created = await repo.create_batch_users([UserCreate(name=f"新生{i}", student_id=f"2025{i:07d}", phone="13800000000") for i in range(3)])
+            assert [u.student_id for u in created] == [f"2025{i:07d}" for i in range(3)] and all(u.uid for u in created)
+
+            first = await repo.get_batch_users(0, 10)
+            rest = await repo.get_batch_users(0, 10, first.next_cursor)
+            assert first.total == 15 and rest.next_cursor is None
+            assert [u.uid for u in first.users + rest.users] == list(range(1, 16))
+
+            version = await repo.get_version_by_student_id(student_id_of(1))
+            updated = await repo.update_user(student_id_of(1), UserUpdate(name="改名"))
+            assert updated.name == "改名" and await repo.get_version_by_student_id(student_id_of(1)) != version
+
+            many = await repo.get_many_by_uid([2, 3, 999])
+            assert sorted(many) == [2, 3]
+            await repo.delete_user(student_id_of(2))
+            assert await repo.get_user_by_student_id(student_id_of(2)) is None
+
+    run(scenario)
+
+
+def test_book_crud_and_search(engine, Session, run, monkeypatch):
+    seed(engine, books=5, reset=False)
+    sync_threads = []
+    sync = catalog_indexes.sync
+
+    def recording_sync(db):
+        sync_threads.append(threading.get_ident())
+        sync(db)
+
+    monkeypatch.setattr(catalog_indexes, "sync", recording_sync)
+    sync_sessions = Session
+
+    async def scenario(Session):
+        async with Session() as db:
+            repo = AsyncSQLAlchemyBookRepository(db, index_sessions=sync_sessions)
+            assert (await repo.search_book(BookRetrieveReq(title="图书3"))).total == 1
+            # 索引构建在工作线程里执行, 不占用事件循环所在的线程
+            assert sync_threads and threading.get_ident() not in sync_threads
+
+            created = await repo.create_book(BookCreate(title="异步编程", author="作者", isbn="9780000000999", tags="python,async"))
+            found = await repo.search_book(BookRetrieveReq(title="异步", tags_all="python"))
+            assert [b.bid for b in found.books] == [created.bid]
+
+            await repo.update_book(isbn_of(1), BookUpdate(title="改过的书名"))
+            assert (await repo.get_by_isbn(isbn_of(1))).title == "改过的书名"
+            assert sorted(await repo.get_many_by_isbn([isbn_of(1), isbn_of(2)])) == [isbn_of(1), isbn_of(2)]
+
+            await repo.delete_book(isbn_of(2))
+            assert await repo.get_by_bid(2) is None
+            assert (await repo.search_book(BookRetrieveReq(title="图书2"))).total == 0
+
+    run(scenario)
+
+
+def test_cached_repositories_invalidate_on_write(engine, run):
+    seed(engine, users=2, books=2, reset=False)
+    cache = LRUCacheBackend()
+
+    async def scenario(Session):
+        async with Session() as db:
+            users = AsyncCachedUserRepository(AsyncSQLAlchemyUserRepository(db, counter=CachedCounter("users")), cache)
+            books = AsyncCachedBookRepository(AsyncSQLAlchemyBookRepository(db), cache)
+
+            assert (await users.get_user_by_student_id(student_id_of(1))).name == "学生1"
+            assert (await books.get_by_isbn(isbn_of(1))).title == "图书1"
+            version = await books.get_version_by_isbn(isbn_of(1))
+            hits = cache.stats.hits
+            await users.get_user_by_student_id(student_id_of(1))
+            await books.get_by_isbn(isbn_of(1))
+            assert cache.stats.hits == hits + 2
+
+            await users.update_user(student_id_of(1), UserUpdate(name="新名字"))
+            await books.update_book(isbn_of(1), BookUpdate(title="新书名"))
+            assert (await users.get_user_by_student_id(student_id_of(1))).name == "新名字"
+            assert (await books.get_by_isbn(isbn_of(1))).title == "新书名"
+            assert await books.get_version_by_isbn(isbn_of(1)) != version
+
+            book, version = await books.get_with_version_by_isbn(isbn_of(1))
+            assert book.title == "新书名" and version == await books.get_version_by_isbn(isbn_of(1))
+            user, version = await users.get_with_version_by_student_id(student_id_of(1))
+            assert user.name == "新名字" and version == await users.get_version_by_student_id(student_id_of(1))
+
+    run(scenario)
@@ -0,0 +1,86 @@
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import select
+
+from app.api.v1.endpoints import availability
+from app.core.idgen import SnowflakeIdGenerator
+from app.models import BookAvailability
+from app.storage.availability.SQLAlchemyAvailabilityRepository import SQLAlchemyAvailabilityRepository, apply_loan_delta
+from app.storage.db import get_availability_repo
+from app.storage.order.SQLAlchemyOrderRepository import OutOfStockError, SQLAlchemyOrderRepository
+from testcases.seed import seed
+
+
+@pytest.fixture
+def db(engine, Session):
+    seed(engine, books=3, stock=2, reset=False)
+    with Session() as db:
+        yield db
+
+
+@pytest.fixture
+def client(Session, db):
+    def repo():
+        with Session() as session:
+            yield SQLAlchemyAvailabilityRepository(session)
+
+    app = FastAPI()
+    app.include_router(availability.router)
+    app.dependency_overrides[get_availability_repo] = repo
+    return TestClient(app)
+
+
+def summary(db, book_id):
+    db.expire_all()
+    return db.execute(select(BookAvailability.available, BookAvailability.on_loan).where(BookAvailability.book_id == book_id)).first()
+
+
+def test_served_from_source_before_first_reconcile(client, db):
+    assert summary(db, 1) is None
+    data = client.get("/availability", params={"bids": "2,1,999"}).json()["data"]
+    assert [(b["book_id"], b["available"], b["on_loan"]) for b in data] == [(2, 2, 0), (1, 2, 0)]
+    assert data[0]["warehouses"] == [{"warehouse_name": "主馆", "quantity": 2}]
+
+
+def test_borrow_and_return_keep_summary_in_step(client, db):
+    orders = SQLAlchemyOrderRepository(db, id_generator=SnowflakeIdGenerator(worker_id=1))
+
+    # 第一次借阅时汇总行还不存在, 按源数据插入; 之后的借阅/归还做增量更新
+    first = orders.borrow(1, 1, "主馆")
+    assert tuple(summary(db, 1)) == (1, 1)
+    orders.borrow(1, 1, "主馆")
+    assert tuple(summary(db, 1)) == (0, 2)
+    with pytest.raises(OutOfStockError):
+        orders.borrow(1, 1, "主馆")
+    assert tuple(summary(db, 1)) == (0, 2)
+
+    orders.return_book(first.order_id)
+    assert tuple(summary(db, 1)) == (1, 1)
+    data = client.get("/availability", params={"bids": "1"}).json()["data"]
+    assert (data[0]["available"], data[0]["on_loan"]) == (1, 1)
+    assert SQLAlchemyAvailabilityRepository(db).reconcile(fix=False).drifted == 2   # 图书 2、3 还没有汇总行, 图书 1 没有偏差
+
+
+def test_lost_insert_race_falls_back_to_increment(db, monkeypatch):
+    # 模拟另一个事务在本事务的 UPDATE 之后、INSERT 之前插入了汇总行: INSERT 冲突被忽略, 改为在它的基础上增量更新
+    from app.storage.availability import SQLAlchemyAvailabilityRepository as module
+    increment = module._increment
+    calls = []
+
+    def racing_increment(session, book_id, available, on_loan):
+        calls.append(book_id)
+        if len(calls) == 1:
+            session.add(BookAvailability(book_id=book_id, available=5, on_loan=0))
+            session.flush()
+            return 0
+        return increment(session, book_id, available, on_loan)
+
+    monkeypatch.setattr(module, "_increment", racing_increment)
+    apply_loan_delta(db, 1, available=-1, on_loan=1)
+    assert calls == [1, 1]
+    assert tuple(summary(db, 1)) == (4, 1)
+
+
+def test_reconcile_is_not_exposed_over_http(client):
+    assert client.post("/availability/reconcile").status_code in (404, 405)
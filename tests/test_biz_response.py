@@ -0,0 +1,38 @@
+import json
+from datetime import datetime
+from typing import List
+
+from pydantic import BaseModel
+
+from app.core.biz_reposone import BizResponse
+
+
+class Author(BaseModel):
+    name: str
+    born: datetime
+
+
+class Shelf(BaseModel):
+    title: str
+    score: float
+    authors: List[Author]
+
+
+# json.loads 默认接受 NaN/Infinity, 严格解析时遇到它们直接失败
+def reject_constant(name):
+    raise ValueError(f"invalid JSON constant {name}")
+
+
+def test_renders_nested_models_datetimes_and_nan_as_valid_json():
+    shelf = Shelf(title="算法", score=float("nan"), authors=[Author(name="Knuth", born=datetime(1938, 1, 10, 8, 30))])
+    response = BizResponse(data={"shelf": shelf, "ratios": [float("inf"), 0.5]})
+
+    body = json.loads(response.body, parse_constant=reject_constant)
+    assert body == {
+        "data": {
+            "shelf": {"title": "算法", "score": None, "authors": [{"name": "Knuth", "born": "1938-01-10T08:30:00"}]},
+            "ratios": [None, 0.5],
+        },
+        "msg": "success",
+        "code": 200,
+    }
@@ -0,0 +1,78 @@
+import csv
+
+import pytest
+from sqlalchemy import select
+
+from app.cli.bulk_import import bulk_import
+from app.models import Book, BookAvailability, BookInventory, User
+from app.storage.cache.CachedCounter import user_counter
+from app.storage.cache.LRUCacheBackend import LRUCacheBackend
+from app.storage.user.CachedUserRepository import user_cache_keys
+from testcases.seed import isbn_of, seed, student_id_of
+
+
+def write_csv(path, rows):
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=list(rows[0]))
+        writer.writeheader()
+        writer.writerows(rows)
+    return str(path)
+
+
+def quiet(message):
+    pass
+
+
+def test_users_insert_then_conflict_update_bumps_version(engine, tmp_path):
+    rows = [{"name": f"学生{i}", "student_id": student_id_of(i), "phone": "13800000000"} for i in range(5)]
+    assert bulk_import(engine.connect, "users", write_csv(tmp_path / "a.csv", rows), chunk_size=2, report=quiet) == 5
+
+    rows[0]["name"] = "改名"
+    bulk_import(engine.connect, "users", write_csv(tmp_path / "b.csv", rows[:2]), report=quiet)
+
+    with engine.connect() as conn:
+        users = {sid: (name, version) for sid, name, version in conn.execute(select(User.student_id, User.name, User.version))}
+    assert len(users) == 5
+    assert users[student_id_of(0)] == ("改名", 2)
+    assert users[student_id_of(1)] == ("学生1", 2)
+    assert users[student_id_of(2)] == ("学生2", 1)
+
+
+def test_users_import_invalidates_cached_keys_and_total(engine, tmp_path):
+    seed(engine, users=3)
+    with engine.connect() as conn:
+        uid = conn.execute(select(User.uid).where(User.student_id == student_id_of(1))).scalar_one()
+
+    cache = LRUCacheBackend()
+    for key in user_cache_keys(student_id_of(1), uid):
+        cache.set(key, "stale")
+    user_counter.set(3)
+
+    rows = [{"name": "新生", "student_id": student_id_of(i), "phone": "13800000000"} for i in range(1, 6)]
+    bulk_import(engine.connect, "users", write_csv(tmp_path / "users.csv", rows), report=quiet, cache=cache)
+
+    assert all(cache.get(key) is None for key in user_cache_keys(student_id_of(1), uid))
+    assert user_counter.peek() is None
+
+
+def test_books_and_inventory_resolve_isbn(engine, tmp_path):
+    books = [{"title": f"书{i}", "author": "作者", "isbn": isbn_of(i)} for i in range(1, 4)]
+    bulk_import(engine.connect, "books", write_csv(tmp_path / "books.csv", books), report=quiet)
+
+    inventory = [{"isbn": isbn_of(i), "warehouse_name": "总馆", "quantity": i} for i in range(1, 4)]
+    bulk_import(engine.connect, "inventory", write_csv(tmp_path / "inv.csv", inventory), report=quiet)
+    inventory[0]["quantity"] = 10
+    bulk_import(engine.connect, "inventory", write_csv(tmp_path / "inv2.csv", inventory[:1]), report=quiet)
+
+    with engine.connect() as conn:
+        bids = dict(conn.execute(select(Book.isbn, Book.bid)).all())
+        stock = dict(conn.execute(select(BookInventory.book_id, BookInventory.quantity)).all())
+        available = dict(conn.execute(select(BookAvailability.book_id, BookAvailability.available)).all())
+    assert stock == {bids[isbn_of(1)]: 10, bids[isbn_of(2)]: 2, bids[isbn_of(3)]: 3}
+    assert available == stock
+
+
+def test_inventory_with_unknown_isbn_is_rejected(engine, tmp_path):
+    path = write_csv(tmp_path / "inv.csv", [{"isbn": isbn_of(99), "warehouse_name": "总馆", "quantity": 1}])
+    with pytest.raises(ValueError, match="not found"):
+        bulk_import(engine.connect, "inventory", path, report=quiet)
@@ -0,0 +1,62 @@
+import pytest
+
+from app.schemas.book import BookUpdate
+from app.storage.book.CachedBookRepository import CachedBookRepository
+from app.storage.book.SQLAlchemyBookRepository import SQLAlchemyBookRepository
+from app.storage.cache import LRUCacheBackend as lru_module
+from app.storage.cache.LRUCacheBackend import LRUCacheBackend
+from testcases.seed import isbn_of, seed
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(lru_module.time, "monotonic", lambda: now[0])
+    return now
+
+
+def test_entries_expire_after_ttl(clock):
+    cache = LRUCacheBackend(default_ttl=10)
+    cache.set("a", "1")
+    cache.set("b", "2", ttl=30)
+    clock[0] += 10
+    assert cache.get("a") is None and cache.get("b") == "2"
+    assert cache.stats.expirations == 1 and len(cache) == 1
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = LRUCacheBackend(max_entries=2)
+    cache.set("a", "1")
+    cache.set("b", "2")
+    assert cache.get("a") == "1"     # a 变为最近使用, 淘汰的是 b
+    cache.set("c", "3")
+    assert cache.get("b") is None and cache.get("a") == "1" and cache.get("c") == "3"
+    assert cache.stats.evictions == 1
+
+
+@pytest.fixture
+def books(engine, Session):
+    seed(engine, books=2, reset=False)
+    cache = LRUCacheBackend()
+    with Session() as db:
+        yield CachedBookRepository(SQLAlchemyBookRepository(db), cache), cache
+
+
+def test_update_invalidates_every_key_of_the_book(books):
+    repo, cache = books
+    assert repo.get_by_isbn(isbn_of(1)).title == "图书1"
+    assert repo.get_by_bid(1).title == "图书1"
+    etag = repo.get_with_version_by_isbn(isbn_of(1))[1]
+    assert len(cache) == 4
+
+    repo.update_book(isbn_of(1), BookUpdate(title="新书名"))
+    assert len(cache) == 0
+    assert repo.get_by_isbn(isbn_of(1)).title == "新书名" and repo.get_by_bid(1).title == "新书名"
+    assert repo.get_version_by_isbn(isbn_of(1)) != etag
+
+
+def test_delete_invalidates_cached_book(books):
+    repo, cache = books
+    assert repo.get_by_isbn(isbn_of(2)) is not None and repo.get_by_bid(2) is not None
+    repo.delete_book(isbn_of(2))
+    assert repo.get_by_isbn(isbn_of(2)) is None and repo.get_by_bid(2) is None
@@ -0,0 +1,130 @@
+from datetime import timedelta
+
+import pytest
+from sqlalchemy import delete, update
+
+from app.cli.bulk_import import bulk_import
+from app.models import Book
+from app.models.book_change import BookChange
+from app.schemas.book import BookUpdate
+from app.storage.book.catalog_snapshot import CatalogSnapshot, SnapshotHandle, export_catalog_snapshot, write_snapshot
+from app.storage.book.changes import ChangeCursor, _db_now, record_book_changes
+from app.storage.book.SnapshotBookRepository import SnapshotBookRepository
+from app.storage.book.SQLAlchemyBookRepository import SQLAlchemyBookRepository
+from testcases.seed import isbn_of, seed
+
+
+class CountingRepo:
+    """ 记录回源次数的包装, 用来区分结果来自快照还是数据库 """
+
+    def __init__(self, repo):
+        self.repo = repo
+        self.calls = []
+
+    def __getattr__(self, name):
+        method = getattr(self.repo, name)
+
+        def call(*args):
+            self.calls.append(name)
+            return method(*args)
+        return call
+
+
+@pytest.fixture
+def path(engine, Session, tmp_path):
+    seed(engine, books=3, stock=2, reset=False)
+    path = str(tmp_path / "catalog.snap")
+    with Session() as db:
+        export_catalog_snapshot(db, path)
+    return path
+
+
+@pytest.fixture
+def db(Session):
+    with Session() as db:
+        yield db
+
+
+@pytest.fixture
+def handle(path):
+    return SnapshotHandle(path, check_seconds=0)
+
+
+def snapshot_repo(db, handle):
+    return SnapshotBookRepository(CountingRepo(SQLAlchemyBookRepository(db)), handle, db)
+
+
+def test_header_records_change_position_at_export_start(engine, Session, tmp_path):
+    seed(engine, books=2, reset=False)
+    with Session() as db:
+        record_book_changes(db, [1])
+        db.commit()
+        export_catalog_snapshot(db, str(tmp_path / "catalog.snap"))
+    snapshot = CatalogSnapshot(str(tmp_path / "catalog.snap"))
+    assert snapshot.rows == 2 and snapshot.get_by_isbn(isbn_of(2)).title == "图书2"
+    # 刚写入的变更还在重叠窗口内, 起点停在它之前, 各进程拉取时会再次看到它
+    assert snapshot.change_seq == 0
+
+
+def test_reads_come_from_snapshot_but_versions_from_database(db, handle):
+    repo = snapshot_repo(db, handle)
+    assert repo.get_by_isbn(isbn_of(1)).title == "图书1"
+    assert repo.get_many_by_bid([1, 2]).keys() == {1, 2}
+    assert repo.repo.calls == []
+
+    assert repo.get_version_by_isbn(isbn_of(1)) == SQLAlchemyBookRepository(db).get_version_by_isbn(isbn_of(1))
+    assert repo.repo.calls == ["get_version_by_isbn"]
+
+
+def test_changes_from_other_processes_bypass_the_snapshot(engine, db, handle, tmp_path):
+    repo = snapshot_repo(db, handle)
+    assert repo.get_by_isbn(isbn_of(1)).title == "图书1"
+
+    # 另一个 worker 修改图书 1, 批量导入修改图书 2: 都只写数据库和变更日志, 本进程的快照句柄不知道
+    with engine.begin() as conn:
+        conn.execute(update(Book).where(Book.bid == 1).values(title="改过的书名", version=Book.version + 1))
+        record_book_changes(conn, [1])
+    books = tmp_path / "books.csv"
+    books.write_text(f"title,author,isbn\n导入的书名,作者,{isbn_of(2)}\n", encoding="utf-8")
+    bulk_import(engine.connect, "books", str(books), report=lambda msg: None)
+
+    assert repo.get_by_isbn(isbn_of(1)).title == "改过的书名"
+    assert repo.get_by_bid(2).title == "导入的书名"
+    assert repo.get_by_bid(3).title == "图书3" and repo.repo.calls == ["get_by_isbn", "get_by_bid"]
+
+
+def test_local_writes_bypass_the_snapshot_immediately(db, path):
+    handle = SnapshotHandle(path, check_seconds=3600)
+    repo = snapshot_repo(db, handle)
+    assert repo.get_by_bid(1).title == "图书1"
+    repo.update_book(isbn_of(1), BookUpdate(title="新书名"))
+    assert repo.get_by_bid(1).title == "新书名" and handle.view().stale == {1}
+
+
+def test_pruned_change_log_disables_the_snapshot(engine, db, tmp_path):
+    seed(engine, books=2, reset=False)
+    with engine.begin() as conn:
+        record_book_changes(conn, [1, 2])
+    db.execute(delete(BookChange).where(BookChange.seq == 1))
+    db.commit()
+
+    # 快照的起点停在 seq 0, 距今超过了变更日志的保留期, 而 seq 1 已经不在日志里: 无法确认哪些图书被改过
+    path = str(tmp_path / "old.snap")
+    write_snapshot(path, [(1, "图书1", "作者1", isbn_of(1), "", "A", "1F", None)], 1,
+                   ChangeCursor(0, _db_now(db) - timedelta(days=30)))
+    handle = SnapshotHandle(path, check_seconds=0)
+    repo = snapshot_repo(db, handle)
+    assert repo.get_by_isbn(isbn_of(1)).title == "图书1"
+    assert handle.view() is None and repo.repo.calls == ["get_by_isbn"]
+
+
+def test_new_file_is_picked_up_after_stale_reads(engine, Session, db, handle, path):
+    repo = snapshot_repo(db, handle)
+    assert repo.get_by_bid(1).title == "图书1"
+    repo.update_book(isbn_of(1), BookUpdate(title="新书名"))
+    assert handle.view().stale == {1}
+
+    with Session() as export_db:
+        export_catalog_snapshot(export_db, path)
+    assert repo.get_by_bid(1).title == "新书名"
+    assert handle.reloads == 2 and handle.view().snapshot.get_by_bid(1).title == "新书名"
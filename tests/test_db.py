@@ -0,0 +1,39 @@
+import threading
+import time
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.storage import db
+from app.storage.routing import RoutingSession
+
+
+def test_concurrent_first_use_creates_one_engine(monkeypatch, tmp_path):
+    created = []
+
+    def slow_create_engines(settings):
+        time.sleep(0.05)
+        created.append(create_engine(f"sqlite:///{tmp_path}/lazy.db"))
+        return created[-1], []
+
+    monkeypatch.setattr(db, "create_engines", slow_create_engines)
+    monkeypatch.setattr(db, "engine", None)
+    monkeypatch.setattr(db, "replica_engines", [])
+    monkeypatch.setattr(db, "SessionLocal", sessionmaker(class_=RoutingSession))
+
+    barrier = threading.Barrier(8)
+    results = []
+
+    def first_request():
+        barrier.wait()
+        results.append(db.get_sessionmaker().kw["primary"])
+
+    threads = [threading.Thread(target=first_request) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert len(created) == 1
+    assert all(primary is created[0] for primary in results)
+    created[0].dispose()
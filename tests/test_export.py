@@ -0,0 +1,35 @@
+import json
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.api.v1.endpoints import export
+from app.storage.export import MAX_BATCH_SIZE
+from testcases.seed import isbn_of, seed
+
+
+@pytest.fixture
+def client(engine, Session, monkeypatch):
+    seed(engine, users=2, books=3, reset=False)
+    monkeypatch.setattr(export, "get_sessionmaker", lambda: Session)
+    app = FastAPI()
+    app.include_router(export.router)
+    return TestClient(app)
+
+
+def test_books_export_streams_every_row(client):
+    response = client.get("/export/books", params={"batch_size": 2})
+    assert response.status_code == 200
+    assert [json.loads(line)["isbn"] for line in response.text.splitlines()] == [isbn_of(i) for i in range(1, 4)]
+
+
+@pytest.mark.parametrize("entity", ["users", "orders"])
+def test_personal_data_is_cli_only(client, entity):
+    response = client.get(f"/export/{entity}")
+    assert response.status_code == 403 and "CLI" in response.json()["msg"]
+
+
+@pytest.mark.parametrize("batch_size", [0, -1, MAX_BATCH_SIZE + 1])
+def test_batch_size_out_of_range(client, batch_size):
+    assert client.get("/export/books", params={"batch_size": batch_size}).status_code == 422
@@ -0,0 +1,110 @@
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+
+from app.api.v1.endpoints import book, user
+from app.cli.bulk_import import bulk_import
+from app.storage.book.CachedBookRepository import CachedBookRepository
+from app.storage.book.SQLAlchemyBookRepository import SQLAlchemyBookRepository
+from app.storage.cache.CachedCounter import CachedCounter
+from app.storage.cache.LRUCacheBackend import LRUCacheBackend
+from app.storage.db import get_book_repo, get_user_repo
+from app.storage.user.CachedUserRepository import CachedUserRepository
+from app.storage.user.SQLAlchemyUserRepository import SQLAlchemyUserRepository
+from testcases.seed import isbn_of, seed, student_id_of
+
+
+@pytest.fixture
+def cache():
+    return LRUCacheBackend()
+
+
+@pytest.fixture
+def statements(engine):
+    executed = []
+    event.listen(engine, "before_cursor_execute", lambda conn, cursor, sql, *args: executed.append(sql))
+    return executed
+
+
+@pytest.fixture
+def client(engine, Session, cache):
+    seed(engine, users=3, books=3, reset=False)
+
+    def book_repo():
+        with Session() as db:
+            yield CachedBookRepository(SQLAlchemyBookRepository(db), cache)
+
+    def user_repo():
+        with Session() as db:
+            yield CachedUserRepository(SQLAlchemyUserRepository(db, counter=CachedCounter("users")), cache)
+
+    app = FastAPI()
+    app.include_router(book.router)
+    app.include_router(user.router)
+    app.dependency_overrides[get_book_repo] = book_repo
+    app.dependency_overrides[get_user_repo] = user_repo
+    return TestClient(app)
+
+
+def test_book_body_and_etag_come_from_one_query(client, statements):
+    response = client.get(f"/book/{isbn_of(1)}")
+    assert response.status_code == 200 and response.json()["data"]["title"] == "图书1"
+    assert len(statements) == 1
+
+    # 第二次完全命中缓存, 条件请求只读版本号的键
+    statements.clear()
+    assert client.get(f"/book/{isbn_of(1)}").headers["ETag"] == response.headers["ETag"]
+    assert client.get(f"/book/{isbn_of(1)}", headers={"If-None-Match": response.headers["ETag"]}).status_code == 304
+    assert statements == []
+
+
+def test_user_not_modified(client):
+    response = client.get(f"/users/{student_id_of(1)}")
+    etag = response.headers["ETag"]
+    assert response.json()["data"]["name"] == "学生1" and "private" in response.headers["Cache-Control"]
+
+    response = client.get(f"/users/{student_id_of(1)}", headers={"If-None-Match": etag})
+    assert response.status_code == 304 and response.headers["ETag"] == etag
+    assert client.get(f"/users/{student_id_of(1)}", headers={"If-None-Match": 'W/"user-0.0"'}).status_code == 200
+
+
+def test_user_list_etag_comes_from_the_body_rows(client, statements):
+    response = client.get("/users", params={"page_size": 2})
+    etag = response.headers["ETag"]
+    assert [u["student_id"] for u in response.json()["data"]["users"]] == [student_id_of(1), student_id_of(2)]
+    # 普通请求只有分页查询与一次 COUNT(*), 不再为 ETag 单独查询版本
+    assert len(statements) == 2
+
+    statements.clear()
+    response = client.get("/users", params={"page_size": 2}, headers={"If-None-Match": etag})
+    assert response.status_code == 304 and response.headers["ETag"] == etag
+    # 条件请求只查询 uid/version 两列 (夹具里每个请求都新建计数器, 所以还有一次 COUNT(*))
+    assert len(statements) == 2 and statements[0].startswith("SELECT users.uid, users.version \nFROM")
+
+    next_page = client.get("/users", params={"page_size": 2, "cursor": client.get("/users", params={"page_size": 2}).json()["data"]["next_cursor"]})
+    assert next_page.headers["ETag"] != etag
+    assert client.get("/users", params={"page_size": 2}, headers={"If-None-Match": next_page.headers["ETag"]}).status_code == 200
+
+
+def test_missing_book_with_if_none_match(client):
+    assert client.get("/book/9789999999999", headers={"If-None-Match": "*"}).status_code == 404
+
+
+def test_bulk_import_invalidates_cached_versions(client, engine, cache, tmp_path):
+    book_etag = client.get(f"/book/{isbn_of(1)}").headers["ETag"]
+    user_etag = client.get(f"/users/{student_id_of(1)}").headers["ETag"]
+
+    books = tmp_path / "books.csv"
+    books.write_text(f"title,author,isbn\n新书名,作者,{isbn_of(1)}\n", encoding="utf-8")
+    users = tmp_path / "users.csv"
+    users.write_text(f"name,student_id,phone\n新名字,{student_id_of(1)},13800000000\n", encoding="utf-8")
+    bulk_import(engine.connect, "books", str(books), report=lambda msg: None, cache=cache)
+    bulk_import(engine.connect, "users", str(users), report=lambda msg: None, cache=cache)
+
+    response = client.get(f"/book/{isbn_of(1)}", headers={"If-None-Match": book_etag})
+    assert response.status_code == 200 and response.json()["data"]["title"] == "新书名"
+    assert response.headers["ETag"] != book_etag
+
+    response = client.get(f"/users/{student_id_of(1)}", headers={"If-None-Match": user_etag})
+    assert response.status_code == 200 and response.json()["data"]["name"] == "新名字"
@@ -0,0 +1,98 @@
+import pytest
+from sqlalchemy import event
+
+from app.storage.book.SQLAlchemyBookRepository import SQLAlchemyBookRepository
+from app.storage.cache.CachedCounter import CachedCounter
+from app.storage.loader import DataLoader, RequestLoaders
+from app.storage.statements import IN_CHUNK_SIZE
+from app.storage.user.SQLAlchemyUserRepository import SQLAlchemyUserRepository
+from testcases.seed import isbn_of, seed, student_id_of
+
+
+BOOKS = IN_CHUNK_SIZE * 2 + 1
+
+
+@pytest.fixture
+def selects(engine):
+    executed = []
+
+    def record(conn, cursor, sql, *args):
+        if sql.lstrip().upper().startswith("SELECT"):
+            executed.append(sql)
+
+    seed(engine, users=5, books=BOOKS, reset=False)
+    event.listen(engine, "before_cursor_execute", record)
+    return executed
+
+
+@pytest.fixture
+def db(Session):
+    with Session() as db:
+        yield db
+
+
+@pytest.mark.parametrize("trusted_reads", [True, False])
+def test_get_many_chunks_dedupes_and_skips_missing(db, selects, trusted_reads):
+    repo = SQLAlchemyBookRepository(db, trusted_reads=trusted_reads)
+
+    # 重复的键只查一次, 不存在的键不出现在结果里; 去重后超过一个分块时按 IN_CHUNK_SIZE 分成多条查询
+    bids = [1, 1, 2, BOOKS + 7] + list(range(1, BOOKS + 1))
+    books = repo.get_many_by_bid(bids)
+    assert sorted(books) == list(range(1, BOOKS + 1))
+    assert books[BOOKS].isbn == isbn_of(BOOKS)
+    assert len(selects) == 3
+
+    selects.clear()
+    books = repo.get_many_by_isbn([isbn_of(3), isbn_of(3), "9780000000000"])
+    assert list(books) == [isbn_of(3)] and books[isbn_of(3)].bid == 3
+    assert len(selects) == 1
+
+    selects.clear()
+    assert repo.get_many_by_bid([]) == {} and selects == []
+
+
+@pytest.mark.parametrize("trusted_reads", [True, False])
+def test_user_get_many(db, selects, trusted_reads):
+    repo = SQLAlchemyUserRepository(db, counter=CachedCounter("users"), trusted_reads=trusted_reads)
+
+    users = repo.get_many_by_student_id([student_id_of(1), student_id_of(1), student_id_of(99)])
+    assert list(users) == [student_id_of(1)] and users[student_id_of(1)].name == "学生1"
+    assert sorted(repo.get_many_by_uid([5, 4, 4, 100])) == [4, 5]
+    assert len(selects) == 2
+
+
+def test_loader_batches_pending_loads_into_one_query(db, selects):
+    loaders = RequestLoaders(SQLAlchemyUserRepository(db, counter=CachedCounter("users")), SQLAlchemyBookRepository(db))
+
+    pending = [loaders.book_by_bid.load(bid) for bid in (1, 2, 2, 3, BOOKS + 1)]
+    assert selects == []
+    assert [p.get().bid if p.get() else None for p in pending] == [1, 2, 2, 3, None]
+    assert len(selects) == 1
+
+    # 已查询过的键 (包括不存在的) 留在请求内的缓存里, 不再发往数据库; 新的键只查询一次
+    selects.clear()
+    assert loaders.book_by_bid.get(BOOKS + 1) is None and loaders.book_by_bid.get(2).bid == 2
+    assert [b.bid for b in loaders.book_by_bid.load_many([3, 4, 4])] == [3, 4, 4]
+    assert len(selects) == 1
+    assert loaders.stats()["book_by_bid"] == {"loads": 10, "keys": 5, "batches": 2}
+
+    # 每个加载器各自一批
+    selects.clear()
+    assert loaders.user_by_uid.get(1).student_id == student_id_of(1)
+    assert loaders.book_by_isbn.get(isbn_of(9)).bid == 9
+    assert len(selects) == 2
+
+
+def test_loader_splits_large_batches_into_chunks(db, selects):
+    loader = DataLoader(SQLAlchemyBookRepository(db).get_many_by_bid)
+    books = loader.load_many(range(1, BOOKS + 1))
+    assert [b.bid for b in books] == list(range(1, BOOKS + 1))
+    assert loader.stats.batches == 1 and len(selects) == 3
+
+
+def test_prime_skips_the_query():
+    calls = []
+    loader = DataLoader(lambda keys: calls.append(keys) or {k: k * 10 for k in keys})
+    loader.prime(1, "primed")
+    assert loader.load_many([1, 2]) == ["primed", 20]
+    assert calls == [[2]]
@@ -0,0 +1,48 @@
+import logging
+import os
+
+from app.core.logx import DailySizeRotatingFileHandler
+
+
+class CountingFormatter(logging.Formatter):
+    calls = 0
+
+    def format(self, record):
+        CountingFormatter.calls += 1
+        return super().format(record)
+
+
+def emit(handler, n):
+    for i in range(n):
+        handler.handle(logging.LogRecord("t", logging.INFO, __file__, 1, "x" * 50 + str(i), None, None))
+
+
+def test_rolls_by_size_without_reformatting(tmp_path):
+    handler = DailySizeRotatingFileHandler(str(tmp_path), max_bytes=200, backup_count=2)
+    handler.setFormatter(CountingFormatter("%(message)s"))
+    emit(handler, 20)
+    handler.close()
+
+    assert CountingFormatter.calls == 20
+    base = handler.baseFilename
+    assert os.path.basename(base).endswith(f".{os.getpid()}.log")
+    assert sorted(os.listdir(tmp_path)) == sorted(os.path.basename(p) for p in (base, base + ".1", base + ".2"))
+    assert os.path.getsize(base + ".1") <= 200 + 60
+
+
+def test_forked_child_writes_its_own_file(tmp_path, monkeypatch):
+    handler = DailySizeRotatingFileHandler(str(tmp_path))
+    handler.setFormatter(logging.Formatter("%(message)s"))
+    emit(handler, 1)
+    parent_file = handler.baseFilename
+
+    monkeypatch.setattr(os, "getpid", lambda: 424242)
+    handler._after_fork()
+    emit(handler, 1)
+    handler.close()
+
+    assert handler.baseFilename != parent_file and handler.baseFilename.endswith(".424242.log")
+    with open(parent_file) as f:
+        assert len(f.readlines()) == 1
+    with open(handler.baseFilename) as f:
+        assert len(f.readlines()) == 1
@@ -0,0 +1,29 @@
+from sqlalchemy import create_engine, text
+
+from app.core.metrics import instrument_engine, registry
+
+
+def sample(name: str, role: str) -> float:
+    prefix = f'{name}{{engine="{role}"}} '
+    return float(next(line[len(prefix):] for line in registry.render().splitlines() if line.startswith(prefix)))
+
+
+def test_pool_metrics_use_pool_events(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path}/metrics.db")
+    instrument_engine(engine, "test_pool")
+    assert "_do_get" not in vars(engine.pool)
+
+    for _ in range(3):
+        with engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+            assert sample("bookhub_db_pool_checked_out", "test_pool") == 1
+
+    # 作废的连接归还时同样计数, 借出数不会漂移
+    conn = engine.connect()
+    conn.invalidate()
+    conn.close()
+
+    assert sample("bookhub_db_pool_checked_out", "test_pool") == 0
+    assert sample("bookhub_db_pool_checkout_hold_seconds_count", "test_pool") == 4
+    assert sample("bookhub_db_pool_connects_total", "test_pool") == 1
+    engine.dispose()
@@ -0,0 +1,80 @@
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import update
+
+from app.core.fine_policy import FinePolicy
+from app.core.idgen import SnowflakeIdGenerator
+from app.models import Order
+from app.service.fine_svc import assess_chunk, run_fine_job
+from app.storage.order.SQLAlchemyOrderRepository import RenewalRefused, SQLAlchemyOrderRepository
+from testcases.seed import seed
+
+
+POLICY = FinePolicy(loan_days=30, renew_days=(30, 15), fine_cents_per_day=10, fine_cap_cents=10000)
+
+
+@pytest.fixture
+def orders(engine, Session):
+    seed(engine, users=2, books=2, stock=3, reset=False)
+    with Session() as db:
+        yield SQLAlchemyOrderRepository(db, id_generator=SnowflakeIdGenerator(worker_id=1))
+
+
+def backdate(orders, order_id, days):
+    orders.db.execute(update(Order).where(Order.order_id == order_id).values(borrow_time=datetime.utcnow() - timedelta(days=days)))
+    orders.db.commit()
+
+
+def test_fine_job_charges_overdue_orders(orders):
+    late = orders.borrow(1, 1, "主馆").order_id
+    on_time = orders.borrow(2, 2, "主馆").order_id
+    backdate(orders, late, 34.5)
+
+    # 未逾期的订单在借出时已经写好应还时间, 只有逾期的订单需要写回
+    stats = run_fine_job(orders, POLICY)
+    assert stats["scanned"] == 2 and stats["updated"] == 1
+    assert orders.get_order(late).fine == 50 and orders.get_order(on_time).fine == 0
+
+    # 第二次运行时没有变化, 不再写回
+    assert run_fine_job(orders, POLICY)["updated"] == 0
+
+
+def test_fine_job_skips_orders_returned_after_the_scan(orders):
+    order_id = orders.borrow(1, 1, "主馆").order_id
+    backdate(orders, order_id, 40)
+    changes = assess_chunk(POLICY, next(orders.iter_open_orders()), datetime.utcnow() + timedelta(days=30))
+
+    # 任务读出这一批之后订单被归还并结算, 迟到的写回不能覆盖结算的罚款
+    settled = orders.return_book(order_id, policy=POLICY)
+    assert orders.bulk_update_fines(changes) == 0
+    assert changes[0]["fine"] > settled.fine > 0
+    assert orders.get_order(order_id).fine == settled.fine
+
+
+def test_renew_extends_due_time_until_the_limit(orders):
+    order = orders.borrow(1, 1, "主馆")
+
+    first = orders.renew(order.order_id, POLICY)
+    assert first.renew_count == 1 and first.due_time == order.borrow_time + timedelta(days=60)
+    second = orders.renew(order.order_id, POLICY)
+    assert second.renew_count == 2 and second.due_time == order.borrow_time + timedelta(days=75)
+
+    with pytest.raises(RenewalRefused):
+        orders.renew(order.order_id, POLICY)
+
+    # 罚款任务按续借次数计算应还时间, 不会把续借过的订单算成逾期
+    run_fine_job(orders, POLICY)
+    assert orders.get_order(order.order_id).fine == 0
+
+
+def test_overdue_or_returned_orders_cannot_be_renewed(orders):
+    late = orders.borrow(1, 1, "主馆").order_id
+    backdate(orders, late, 31)
+    with pytest.raises(RenewalRefused, match="overdue"):
+        orders.renew(late, POLICY)
+
+    returned = orders.borrow(2, 2, "主馆").order_id
+    orders.return_book(returned, policy=POLICY)
+    with pytest.raises(ValueError, match="not in borrowed status"):
+        orders.renew(returned, POLICY)
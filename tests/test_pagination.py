@@ -0,0 +1,67 @@
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.api.v1.endpoints import user
+from app.storage.cache.CachedCounter import CachedCounter
+from app.storage.db import get_user_repo
+from app.storage.pagination import InvalidCursor, decode_cursor, encode_cursor
+from app.storage.user.SQLAlchemyUserRepository import SQLAlchemyUserRepository
+from testcases.seed import seed, student_id_of
+
+
+@pytest.fixture
+def client(engine, Session):
+    seed(engine, users=25, reset=False)
+
+    def repo():
+        with Session() as db:
+            yield SQLAlchemyUserRepository(db, counter=CachedCounter("users"))
+
+    app = FastAPI()
+    app.include_router(user.router)
+    app.dependency_overrides[get_user_repo] = repo
+    return TestClient(app)
+
+
+def test_cursor_walks_every_user_once(client):
+    seen, cursor = [], None
+    while True:
+        params = {"page_size": 10} if cursor is None else {"page_size": 10, "cursor": cursor}
+        data = client.get("/users", params=params).json()["data"]
+        seen += [u["student_id"] for u in data["users"]]
+        cursor = data["next_cursor"]
+        if cursor is None:
+            break
+    assert seen == [student_id_of(i) for i in range(1, 26)]
+
+
+def test_offset_page_matches_cursor_page(client):
+    first = client.get("/users", params={"page_size": 10}).json()["data"]
+    by_offset = client.get("/users", params={"page": 1, "page_size": 10}).json()["data"]
+    by_cursor = client.get("/users", params={"page_size": 10, "cursor": first["next_cursor"]}).json()["data"]
+    assert by_offset["users"] == by_cursor["users"]
+    assert first["total"] == 25
+
+
+def test_empty_last_page_has_no_cursor(client):
+    data = client.get("/users", params={"page": 5, "page_size": 10}).json()["data"]
+    assert data["users"] == [] and data["next_cursor"] is None
+
+
+@pytest.mark.parametrize("page_size", [0, -1, 101])
+def test_page_size_out_of_range(client, page_size):
+    assert client.get("/users", params={"page_size": page_size}).status_code == 422
+
+
+@pytest.mark.parametrize("cursor", ["not-a-cursor", encode_cursor("uid", "1 OR 1=1"), encode_cursor("uid", True), encode_cursor("sid", 3)])
+def test_bad_cursor_is_rejected(client, cursor):
+    response = client.get("/users", params={"cursor": cursor})
+    assert response.status_code == 400
+    assert "invalid cursor" in response.json()["msg"]
+
+
+def test_decode_cursor_checks_type():
+    assert decode_cursor(encode_cursor("uid", 7), "uid") == 7
+    with pytest.raises(InvalidCursor):
+        decode_cursor(encode_cursor("uid", 7.5), "uid")
@@ -0,0 +1,57 @@
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy import select
+
+from app.core import query_profiler
+from app.core.query_profiler import QueryBudgetExceeded, profile_engine, profile_queries, statement_shape
+from app.models import User
+from testcases.seed import seed
+
+
+@pytest.fixture
+def logged(monkeypatch):
+    messages = []
+    monkeypatch.setattr(query_profiler, "logger", SimpleNamespace(warning=messages.append))
+    return messages
+
+
+def test_statement_shape_folds_in_lists():
+    assert statement_shape("SELECT * FROM users\n  WHERE uid IN (?, ?, ?)") == "SELECT * FROM users WHERE uid IN (?...)"
+    assert statement_shape("SELECT * FROM users WHERE uid IN (%s, %s)") == statement_shape("SELECT * FROM users WHERE uid IN (%s,%s,%s)")
+    assert statement_shape("SELECT * FROM users WHERE uid IN (:uid_1, :uid_2)") == "SELECT * FROM users WHERE uid IN (?...)"
+    # 单个参数的 IN 不是展开后的批量查询, 保持原样
+    assert statement_shape("SELECT * FROM users WHERE uid IN (?)") == "SELECT * FROM users WHERE uid IN (?)"
+
+
+def test_reports_n_plus_one_at_threshold(engine, Session, logged):
+    seed(engine, users=6, reset=False)
+    profile_engine(engine, slow_query_ms=1e9)
+
+    with Session() as db, profile_queries("below", n_plus_one_threshold=6) as profile:
+        for uid in range(1, 6):
+            db.execute(select(User).where(User.uid == uid)).all()
+    assert profile.queries == 5 and profile.n_plus_one == {}
+    assert logged == []
+
+    with Session() as db, profile_queries("at", n_plus_one_threshold=5) as profile:
+        for uid in range(1, 7):
+            db.execute(select(User).where(User.uid == uid)).all()
+    assert list(profile.shapes.values()) == [6]
+    assert len(profile.n_plus_one) == 1
+    assert len(logged) == 1 and "possible N+1 in at: 6 x" in logged[0]
+
+
+def test_strict_budget_raises_and_still_reports_lazy_loads(engine, Session, logged):
+    seed(engine, users=10, reset=False)
+    profile_engine(engine, slow_query_ms=1e9)
+
+    with Session() as db:
+        with pytest.raises(QueryBudgetExceeded):
+            with profile_queries("lazy", budget=5, n_plus_one_threshold=3, strict=True) as profile:
+                for user in db.execute(select(User)).scalars().all():
+                    user.orders   # 懒加载关系: 每个用户一次 SELECT
+    assert profile.queries == 6
+    assert len(profile.n_plus_one) == 1 and "orders" in next(iter(profile.n_plus_one))
+    assert any("possible N+1 in lazy" in message for message in logged)
+    assert any("budget 5" in message for message in logged)
@@ -0,0 +1,68 @@
+from datetime import datetime, timedelta
+
+from sqlalchemy import insert
+
+from app.core.config import get_settings
+from app.models import Order
+from app.service.recommend_svc import ItemCFRecommender, refresh_recommender
+from app.storage.order.SQLAlchemyOrderRepository import SQLAlchemyOrderRepository
+from testcases.seed import seed
+
+
+def add_orders(Session, rows):
+    with Session() as db:
+        db.execute(insert(Order), [{"order_id": f"o{uid}-{bid}-{ts:%H%M%S%f}", "user_id": uid, "book_id": bid, "warehouse_name": "主馆",
+                                    "borrow_time": ts} for uid, bid, ts in rows])
+        db.commit()
+
+
+def test_refresh_picks_up_orders_committed_behind_the_watermark(engine, Session):
+    seed(engine, users=3, books=3, reset=False)
+    now = datetime.utcnow()
+    add_orders(Session, [(1, 1, now), (1, 2, now), (2, 1, now)])
+    model = ItemCFRecommender(top_k=5, top_n=5)
+
+    with Session() as db:
+        repo = SQLAlchemyOrderRepository(db)
+        assert refresh_recommender(repo, model) == 3
+        assert [bid for bid, _ in model.recommend(2)] == [2]
+
+        # 借出时间早于水位线, 但在重叠窗口之内: 晚提交的事务, 仍然会被增量刷新读到; 窗口内重复读到的交互不会重复计数
+        add_orders(Session, [(3, 2, now - timedelta(seconds=30)), (3, 3, now - timedelta(seconds=30))])
+        assert refresh_recommender(repo, model) == 2
+        assert refresh_recommender(repo, model) == 0
+        assert [bid for bid, _ in model.similar_books(3)] == [2]
+
+
+def test_refresh_rebuilds_on_schedule(engine, Session, monkeypatch):
+    seed(engine, users=2, books=2, reset=False)
+    now = datetime.utcnow()
+    add_orders(Session, [(1, 1, now)])
+    model = ItemCFRecommender()
+
+    with Session() as db:
+        repo = SQLAlchemyOrderRepository(db)
+        refresh_recommender(repo, model)
+        fitted_at = model.fitted_at
+
+        # 超出重叠窗口的订单只有全量重建才能读到
+        add_orders(Session, [(2, 2, now - timedelta(days=1))])
+        assert refresh_recommender(repo, model) == 0 and model.fitted_at == fitted_at
+
+        monkeypatch.setattr(get_settings(), "recommend_rebuild_seconds", 1e-9)
+        assert refresh_recommender(repo, model) == 2 and model.fitted_at > fitted_at
+        assert 2 in model.user_index
+
+
+def test_refit_on_smaller_dataset_drops_stale_results():
+    now = datetime.utcnow()
+    model = ItemCFRecommender(top_k=5, top_n=5)
+    model.fit([(1, 1, now), (1, 2, now), (2, 1, now), (3, 3, now), (3, 4, now), (4, 3, now)])
+    assert [bid for bid, _ in model.similar_books(4)] == [3]
+    assert [bid for bid, _ in model.recommend(4)] == [4]
+
+    # 图书 3/4 与用户 3/4 的借阅记录都被删除之后全量重建, 旧的邻居和推荐列表不能继续返回
+    model.fit([(1, 1, now), (1, 2, now), (2, 1, now)])
+    assert model.similar_books(4) == [] and model.similar_books(3) == []
+    assert 4 not in model.user_recs and 3 not in model.user_recs
+    assert set(model.item_neighbors) == {1, 2}
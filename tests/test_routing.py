@@ -0,0 +1,60 @@
+import pytest
+from sqlalchemy import create_engine, insert, select, update
+from sqlalchemy.orm import sessionmaker
+
+from app.models import User
+from app.storage.routing import RoutingSession, read_only_context
+from testcases.seed import reset_schema, seed, student_id_of
+
+
+@pytest.fixture
+def replicas(tmp_path):
+    engines = [create_engine(f"sqlite:///{tmp_path}/replica{i}.db") for i in range(2)]
+    for e in engines:
+        reset_schema(e)
+    yield engines
+    for e in engines:
+        e.dispose()
+
+
+@pytest.fixture
+def Routing(engine, replicas):
+    seed(engine, users=3, reset=False)
+    return sessionmaker(class_=RoutingSession, primary=engine, replicas=replicas)
+
+
+def read_bind(db):
+    with read_only_context():
+        return db.get_bind()
+
+
+def test_first_read_of_each_session_rotates_replicas(Routing, replicas):
+    binds = []
+    for _ in range(4):
+        with Routing() as db:
+            binds.append(read_bind(db))
+    assert set(binds) == set(replicas)
+    assert all(a is not b for a, b in zip(binds, binds[1:]))
+
+
+@pytest.mark.parametrize("statement", [
+    update(User).where(User.student_id == student_id_of(1)).values(name="改名"),
+    insert(User).values(name="新生", student_id="20250000001", phone="13800000000"),
+])
+def test_core_dml_pins_session_to_primary(Routing, engine, statement):
+    with Routing() as db:
+        assert read_bind(db) is not engine
+        db.execute(statement)
+        assert read_bind(db) is engine
+        # 读到的是本会话刚写入的数据, 而不是从库上的旧数据
+        with read_only_context():
+            assert db.execute(select(User.uid)).first() is not None
+        db.commit()
+        assert read_bind(db) is engine
+
+
+def test_plain_reads_do_not_pin(Routing, engine):
+    with Routing() as db:
+        with read_only_context():
+            db.execute(select(User.uid)).all()
+        assert read_bind(db) is not engine
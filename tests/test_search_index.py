@@ -0,0 +1,115 @@
+import threading
+from datetime import datetime
+
+from sqlalchemy import update
+
+from app.models import Book
+from app.schemas.book import BookRetrieveReq
+from app.storage.book.changes import catalog_indexes, record_book_changes
+from app.storage.book.search_index import BookSearchIndex, book_search_index, build_book_search_index
+from app.storage.book.SQLAlchemyBookRepository import SQLAlchemyBookRepository
+from testcases.seed import isbn_of, seed
+
+
+def titles(result):
+    return sorted(book.title for book in result.books)
+
+
+def test_search_sees_writes_from_other_processes(engine, Session, monkeypatch):
+    seed(engine, books=3)
+    with Session() as db:
+        repo = SQLAlchemyBookRepository(db)
+        assert repo.search_book(BookRetrieveReq(title="图书2")).total == 1
+
+    # 另一个进程 (或批量导入) 直接改库, 只留下变更日志
+    with engine.begin() as conn:
+        conn.execute(update(Book).where(Book.bid == 2).values(title="三体"))
+        record_book_changes(conn, [2])
+
+    monkeypatch.setattr(catalog_indexes, "_check_seconds", 0)
+    with Session() as db:
+        repo = SQLAlchemyBookRepository(db)
+        assert titles(repo.search_book(BookRetrieveReq(title="三体"))) == ["三体"]
+        assert repo.search_book(BookRetrieveReq(title="图书2")).total == 0
+
+
+def test_deleted_book_leaves_the_index(engine, Session, monkeypatch):
+    seed(engine, books=2)
+    with Session() as db:
+        SQLAlchemyBookRepository(db).search_book(BookRetrieveReq(title="图书"))
+
+    with engine.begin() as conn:
+        conn.execute(Book.__table__.delete().where(Book.bid == 1))
+        record_book_changes(conn, [1])
+
+    monkeypatch.setattr(catalog_indexes, "_check_seconds", 0)
+    with Session() as db:
+        result = SQLAlchemyBookRepository(db).search_book(BookRetrieveReq(title="图书"))
+    assert [b.isbn for b in result.books] == [isbn_of(2)]
+
+
+def test_rebuild_swaps_in_a_complete_index(engine, Session):
+    seed(engine, books=200)
+    with Session() as db:
+        build_book_search_index(db)
+    assert len(book_search_index) == 200
+
+    # 重建期间并发的检索只会看到旧索引或新索引的完整内容, 不会看到构建到一半的结果
+    totals, stop = set(), threading.Event()
+
+    def search():
+        while not stop.is_set():
+            totals.add(book_search_index.search("图书")[0])
+
+    reader = threading.Thread(target=search)
+    reader.start()
+    with Session() as db:
+        for _ in range(5):
+            build_book_search_index(db, book_search_index, batch_size=10)
+    stop.set()
+    reader.join()
+    assert totals == {200}
+
+
+def test_build_leaves_other_indexes_alone(engine, Session):
+    seed(engine, books=5)
+    other = BookSearchIndex()
+    with Session() as db:
+        build_book_search_index(db, other)
+    assert len(other) == 5 and len(book_search_index) == 0
+
+
+def test_change_cursor_picks_up_late_commits(engine):
+    from sqlalchemy import insert
+    from app.models import BookChange
+    from app.storage.book.changes import ChangeCursor
+
+    with engine.begin() as conn:
+        cursor = ChangeCursor.start(conn)
+        # seq 2 先提交, seq 1 所在的事务稍后才提交
+        conn.execute(insert(BookChange), [{"seq": 2, "book_id": 20}])
+        assert cursor.poll(conn) == [20]
+        conn.execute(insert(BookChange), [{"seq": 1, "book_id": 10}])
+        assert cursor.poll(conn) == [10]
+        assert cursor.poll(conn) == []
+
+
+def test_change_cursor_asks_for_rebuild_after_pruning(engine):
+    from sqlalchemy import delete, insert
+    from app.models import BookChange
+    from app.storage.book.changes import ChangeCursor
+
+    old = datetime(2020, 1, 1)
+    with engine.begin() as conn:
+        cursor = ChangeCursor.start(conn)
+        conn.execute(insert(BookChange), [{"book_id": i, "changed_at": old} for i in range(1, 6)])
+        conn.execute(delete(BookChange).where(BookChange.seq <= 2))
+        assert cursor.poll(conn) is None
+        assert ChangeCursor(2, old).poll(conn, limit=2) is None
+        assert ChangeCursor(2, old).poll(conn) == [3, 4, 5]
+
+        # 日志开头的记录是新写入的, 但距离上次同步已经超过保留期: 缺的那段只可能是被清理掉了
+        conn.execute(delete(BookChange))
+        conn.execute(insert(BookChange), [{"seq": 9, "book_id": 9}])
+        assert ChangeCursor(5, old).poll(conn) is None
+        assert ChangeCursor.start(conn).poll(conn) == [9]
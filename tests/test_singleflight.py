@@ -0,0 +1,107 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from app.storage.book.SingleFlightBookRepository import SingleFlightBookRepository
+from app.storage.singleflight import AsyncSingleFlight, SingleFlight, flights
+from app.storage.routing import RoutingSession
+
+
+def test_concurrent_calls_share_one_load():
+    flight, release, loads = SingleFlight(), threading.Event(), []
+
+    def load():
+        loads.append(1)
+        release.wait()
+        return "book"
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(flight.do("isbn", load))) for _ in range(5)]
+    for t in threads:
+        t.start()
+    while flight.stats.calls < 5:
+        time.sleep(0.001)
+    release.set()
+    for t in threads:
+        t.join()
+    assert results == ["book"] * 5 and len(loads) == 1 and flight.stats.coalesced == 4
+
+
+def test_followers_get_their_own_exception():
+    flight, release = SingleFlight(), threading.Event()
+    original = LookupError("db down")
+
+    def load():
+        release.wait()
+        raise original
+
+    errors = []
+
+    def call():
+        try:
+            flight.do("isbn", load)
+        except LookupError as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=call) for _ in range(3)]
+    for t in threads:
+        t.start()
+    while flight.stats.calls < 3:
+        time.sleep(0.001)
+    release.set()
+    for t in threads:
+        t.join()
+
+    # leader 抛出原异常, follower 各自拿到副本, 原异常作为 __cause__ 保留
+    followers = [e for e in errors if e is not original]
+    assert len(errors) == 3 and len(followers) == 2 and followers[0] is not followers[1]
+    assert all(e.args == ("db down",) and e.__cause__ is original for e in followers)
+
+
+def test_async_flights_are_kept_per_event_loop():
+    flight, loads = AsyncSingleFlight(), []
+    started = threading.Barrier(2)
+
+    async def load():
+        loads.append(1)
+        await asyncio.sleep(0.05)
+        return threading.get_ident()
+
+    async def call():
+        await asyncio.get_running_loop().run_in_executor(None, started.wait)
+        return await asyncio.gather(flight.do("isbn", load), flight.do("isbn", load))
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(asyncio.run(call()))) for _ in range(2)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    # 两个事件循环同时加载同一个键: 各自合并本循环内的调用, 不会等待另一个循环的 Future
+    assert len(loads) == 2 and all(a == b for a, b in results) and results[0][0] != results[1][0]
+
+
+class FakeBooks:
+    def __init__(self):
+        self.calls = 0
+
+    def get_by_isbn(self, isbn):
+        self.calls += 1
+        return isbn
+
+
+@pytest.mark.parametrize("has_writes, shared", [(False, True), (True, False)])
+def test_sessions_with_writes_bypass_single_flight(has_writes, shared):
+    session = RoutingSession()
+    if has_writes:
+        session.info["has_writes"] = True
+    books = FakeBooks()
+    repo = SingleFlightBookRepository(books, {"book.get_by_isbn"}, session)
+
+    group = flights.get("book.get_by_isbn")
+    before = group.stats.calls
+    assert repo.get_by_isbn("978") == "978" and books.calls == 1
+    assert (group.stats.calls > before) is shared
@@ -0,0 +1,65 @@
+import pytest
+from pydantic import ValidationError
+from sqlalchemy import select
+
+from app.cli.bulk_import import bulk_import
+from app.models.tag import Tag
+from app.schemas.book import BookCreate, BookRetrieveReq, BookUpdate
+from app.storage.book.changes import catalog_indexes
+from app.storage.book.SQLAlchemyBookRepository import SQLAlchemyBookRepository
+from app.storage.book.tag_index import _insert_tags, book_tag_index, rebuild_book_tags, sync_book_tags
+from testcases.seed import isbn_of, seed
+
+
+def isbns(result):
+    return [book.isbn for book in result.books]
+
+
+def test_tags_from_other_processes_reach_the_index(engine, Session, tmp_path, monkeypatch):
+    seed(engine, books=3, tags="文学")
+    with Session() as db:
+        rebuild_book_tags(db)
+        repo = SQLAlchemyBookRepository(db)
+        assert repo.search_book(BookRetrieveReq(tags_all="文学")).total == 3
+        assert book_tag_index.ready
+
+    # 批量导入在另一个进程里改写图书 2 的标签, 本进程只能从变更日志得知
+    books = tmp_path / "books.csv"
+    books.write_text(f"title,author,isbn,tags\n图书2,作者2,{isbn_of(2)},科幻\n", encoding="utf-8")
+    bulk_import(engine.connect, "books", str(books), report=lambda msg: None)
+
+    monkeypatch.setattr(catalog_indexes, "_check_seconds", 0)
+    with Session() as db:
+        repo = SQLAlchemyBookRepository(db)
+        assert isbns(repo.search_book(BookRetrieveReq(tags_any="科幻"))) == [isbn_of(2)]
+        assert repo.search_book(BookRetrieveReq(tags_all="文学")).total == 2
+
+
+def test_not_only_filter_covers_untagged_books(engine, Session):
+    seed(engine, books=2)
+    with Session() as db:
+        repo = SQLAlchemyBookRepository(db)
+        repo.create_book(BookCreate(title="新书", author="作者", isbn=isbn_of(3), tags="文学"))
+        repo.delete_book(isbn_of(1))
+        assert isbns(repo.search_book(BookRetrieveReq(tags_not="文学"))) == [isbn_of(2)]
+
+
+def test_tag_names_are_limited_to_the_column_length():
+    with pytest.raises(ValidationError):
+        BookCreate(title="书", author="作者", isbn=isbn_of(1), tags="文学," + "长" * 51)
+    with pytest.raises(ValidationError):
+        BookUpdate(tags="x" * 51)
+    assert BookUpdate(tags="x" * 50).tags == "x" * 50
+
+
+def test_concurrently_inserted_tag_is_reused(engine, Session):
+    seed(engine, books=2)
+    with Session() as db:
+        sync_book_tags(db, {1: ["文学"]})
+        db.commit()
+
+        # 另一个事务抢先提交了 "文学": 本事务读取时还没看到它, 插入冲突后回滚到 SAVEPOINT 并复用已有的行
+        _insert_tags(db, ["文学", "历史"])
+        sync_book_tags(db, {2: ["文学", "历史"]})
+        db.commit()
+        assert sorted(db.execute(select(Tag.name)).scalars()) == ["历史", "文学"]
@@ -0,0 +1,18 @@
+from sqlalchemy import event
+
+from app.schemas.user import UserCreate
+from app.storage.cache.CachedCounter import CachedCounter
+from app.storage.user.SQLAlchemyUserRepository import SQLAlchemyUserRepository
+
+
+def test_create_batch_users_reloads_with_one_select(engine, Session):
+    statements = []
+    event.listen(engine, "before_cursor_execute", lambda conn, cursor, sql, *args: statements.append(sql))
+
+    with Session() as db:
+        repo = SQLAlchemyUserRepository(db, counter=CachedCounter("users"))
+        users = repo.create_batch_users([UserCreate(name=f"新生{i}", student_id=f"2025{i:07d}", phone="13800000000") for i in range(20)])
+
+    assert [u.student_id for u in users] == [f"2025{i:07d}" for i in range(20)]
+    assert len({u.uid for u in users}) == 20
+    assert sum(sql.lstrip().upper().startswith("SELECT") for sql in statements) == 1
@@ -0,0 +1,60 @@
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import insert, update
+
+from app.core.idgen import MAX_WORKER_ID, SnowflakeIdGenerator, WorkerIdUnavailable
+from app.models import WorkerLease
+from app.storage.worker_lease import WorkerIdLease
+
+
+def test_processes_get_distinct_ids(Session):
+    leases = [WorkerIdLease(Session, SnowflakeIdGenerator()) for _ in range(3)]
+    assert sorted(lease.acquire() for lease in leases) == [0, 1, 2]
+    ids = [lease.generator.next_id() for lease in leases]
+    assert len(set(ids)) == 3
+
+
+def test_startup_fails_when_every_id_is_leased(Session):
+    future = datetime.utcnow() + timedelta(days=1)
+    with Session() as db:
+        db.execute(insert(WorkerLease), [{"worker_id": i, "owner": "other", "expires_at": future} for i in range(MAX_WORKER_ID + 1)])
+        db.commit()
+    with pytest.raises(WorkerIdUnavailable):
+        WorkerIdLease(Session, SnowflakeIdGenerator()).acquire()
+
+
+def test_expired_lease_is_taken_over_and_old_owner_stops(Session):
+    old = WorkerIdLease(Session, SnowflakeIdGenerator())
+    worker_id = old.acquire()
+    with Session() as db:
+        db.execute(update(WorkerLease).values(expires_at=datetime(2000, 1, 1)))
+        db.commit()
+
+    new = WorkerIdLease(Session, SnowflakeIdGenerator())
+    assert new.acquire() == worker_id
+    assert old.renew() is False
+    with pytest.raises(WorkerIdUnavailable):
+        old.generator.next_id()
+    assert new.renew() is True
+    new.generator.next_id()
+
+
+def test_release_frees_the_id(Session):
+    first = WorkerIdLease(Session, SnowflakeIdGenerator())
+    worker_id = first.acquire()
+    first.release()
+    with pytest.raises(WorkerIdUnavailable):
+        first.generator.next_id()
+    assert WorkerIdLease(Session, SnowflakeIdGenerator()).acquire() == worker_id
+
+
+def test_generator_refuses_without_a_valid_worker_id():
+    gen = SnowflakeIdGenerator()
+    with pytest.raises(WorkerIdUnavailable):
+        gen.next_id()
+    gen.assign(5, valid_for=0)
+    with pytest.raises(WorkerIdUnavailable):
+        gen.next_id()
+    gen.assign(5)
+    assert (gen.next_id() >> 12) & MAX_WORKER_ID == 5